@@ -2,21 +2,44 @@
 📊 DataCoins Routes - Endpoints para manejo de métricas ambientales
 """
 
-from fastapi import APIRouter, HTTPException, File, UploadFile, Form
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Request
+from fastapi.responses import StreamingResponse, Response
+from starlette.requests import ClientDisconnect
+from typing import List, Dict, Any, Optional, AsyncIterator
+import asyncio
+import json
 import logging
-from pydantic import BaseModel
+from collections import defaultdict
+from pydantic import BaseModel, Field
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from services.lighthouse_service import LighthouseService, DataCoin
+from services.lighthouse_service import DataCoin, get_lighthouse_service
+from services.notification_service import get_notification_service
+from services.datacoin_ingest import METRIC_TYPES, validate_datacoin_batch, datacoin_stream_pipeline
+from services.score_aggregates import score_aggregates
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Inicializar servicio
-lighthouse_service = LighthouseService()
+# Límite de métricas aceptadas por petición de subida por lotes
+MAX_BATCH_SIZE = int(os.getenv("DATACOIN_MAX_BATCH_SIZE", "10000"))
+
+# Métricas por bloque enviado a Lighthouse durante la ingesta en streaming
+STREAM_CHUNK_SIZE = int(os.getenv("DATACOIN_STREAM_CHUNK_SIZE", "1000"))
+
+class IngestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse para rutas que leen el cuerpo mientras responden
+    
+    StreamingResponse escucha desconexiones consumiendo `receive`, lo que
+    competiría con la lectura del cuerpo de la petición. Aquí el propio
+    generador lee el cuerpo y detecta la desconexión del cliente.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
 
 class DataCoinUploadRequest(BaseModel):
     """Request para subir Data Coin"""
@@ -33,6 +56,29 @@ class DataCoinResponse(BaseModel):
     ipfs_url: Optional[str] = None
     error: Optional[str] = None
 
+class DataCoinBatchUploadRequest(BaseModel):
+    """Request para subir un lote de Data Coins"""
+    datacoins: List[DataCoinUploadRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class DataCoinBatchItemResponse(BaseModel):
+    """Resultado de un Data Coin dentro de un lote"""
+    index: int
+    success: bool
+    lighthouse_hash: Optional[str] = None
+    object_hash: Optional[str] = None
+    object_offset: Optional[int] = None
+    ipfs_url: Optional[str] = None
+    error: Optional[str] = None
+
+class DataCoinBatchResponse(BaseModel):
+    """Response de subida por lotes"""
+    success: bool
+    total: int
+    uploaded: int
+    failed: int
+    lighthouse_objects: int
+    results: List[DataCoinBatchItemResponse]
+
 @router.post("/upload", response_model=DataCoinResponse)
 async def upload_datacoin(request: DataCoinUploadRequest):
     """
@@ -57,13 +103,14 @@ async def upload_datacoin(request: DataCoinUploadRequest):
         )
         
         # Subir a Lighthouse
-        result = await lighthouse_service.upload_datacoin(datacoin)
+        result = await get_lighthouse_service().upload_datacoin(datacoin)
         
         if result["success"]:
+            # Actualizar el EcoScore mantenido de la empresa
+            await score_aggregates.add(datacoin.company_id, datacoin.metric_type, datacoin.value, result["lighthouse_hash"])
+            
             # Enviar notificación de confirmación
-            from services.notification_service import NotificationService
-            notification_service = NotificationService()
-            await notification_service.send_datacoin_confirmation(
+            await get_notification_service().send_datacoin_confirmation(
                 request.company_id,
                 request.metric_type,
                 result["lighthouse_hash"]
@@ -81,6 +128,149 @@ async def upload_datacoin(request: DataCoinUploadRequest):
         logger.error(f"❌ Error subiendo Data Coin: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/upload/batch", response_model=DataCoinBatchResponse)
+async def upload_datacoin_batch(request: DataCoinBatchUploadRequest):
+    """
+    📦 Sube un lote de métricas ambientales como Data Coins a Lighthouse
+    
+    - **datacoins**: Lista de métricas con el mismo formato que `/upload`
+    
+    Las métricas se validan en una sola pasada, se empaquetan en el menor número
+    de objetos de Lighthouse posible y se envía una única notificación por empresa.
+    Devuelve el hash de cada métrica en el mismo orden del lote.
+    """
+    try:
+        logger.info(f"📦 Subiendo lote de {len(request.datacoins)} Data Coins")
+        
+        # Validar todo el lote en una pasada
+        valid, errors = validate_datacoin_batch(request.datacoins)
+        
+        results = [
+            DataCoinBatchItemResponse(index=error["index"], success=False, error=error["error"])
+            for error in errors
+        ]
+        
+        # Subir los Data Coins válidos empaquetados
+        uploads = await get_lighthouse_service().upload_datacoin_batch([datacoin for _, datacoin in valid])
+        
+        metric_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        company_hashes: Dict[str, List[str]] = defaultdict(list)
+        object_hashes = set()
+        scored = []
+        
+        for (index, datacoin), upload in zip(valid, uploads):
+            results.append(DataCoinBatchItemResponse(index=index, **upload))
+            if upload["success"]:
+                scored.append((datacoin.company_id, datacoin.metric_type, datacoin.value, upload["lighthouse_hash"]))
+                metric_counts[datacoin.company_id][datacoin.metric_type] += 1
+                company_hashes[datacoin.company_id].append(upload["lighthouse_hash"])
+                object_hashes.add(upload["object_hash"])
+        
+        # Todo el lote en una sola anotación de los agregados
+        await score_aggregates.add_many(scored)
+        
+        # Una notificación agrupada por empresa
+        if company_hashes:
+            await asyncio.gather(*(
+                get_notification_service().send_datacoin_batch_confirmation(
+                    company_id,
+                    dict(metric_counts[company_id]),
+                    hashes
+                )
+                for company_id, hashes in company_hashes.items()
+            ))
+        
+        results.sort(key=lambda item: item.index)
+        uploaded = sum(1 for item in results if item.success)
+        
+        return DataCoinBatchResponse(
+            success=uploaded == len(results),
+            total=len(results),
+            uploaded=uploaded,
+            failed=len(results) - uploaded,
+            lighthouse_objects=len(object_hashes),
+            results=results
+        )
+    
+    except Exception as e:
+        logger.error(f"❌ Error subiendo lote de Data Coins: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/upload/stream")
+async def upload_datacoin_stream(request: Request, format: Optional[str] = None):
+    """
+    🌊 Ingesta en streaming de exportaciones de métricas (NDJSON o CSV)
+    
+    - **format**: `ndjson` o `csv` (por defecto se deduce del Content-Type)
+    
+    El cuerpo se procesa fila a fila y se sube a Lighthouse en bloques de
+    `DATACOIN_STREAM_CHUNK_SIZE` métricas, con memoria constante. La respuesta
+    es NDJSON: eventos `error` por fila inválida, `progress` tras cada bloque
+    y un `summary` final.
+    """
+    content_type = request.headers.get("content-type", "")
+    fmt = (format or ("csv" if "csv" in content_type else "ndjson")).lower()
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {fmt}")
+    
+    logger.info(f"🌊 Iniciando ingesta en streaming ({fmt})")
+    
+    async def events() -> AsyncIterator[bytes]:
+        rows = uploaded = failed = objects = 0
+        metric_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        
+        try:
+            async for chunk, errors in datacoin_stream_pipeline(request.stream(), fmt, STREAM_CHUNK_SIZE):
+                for error in errors:
+                    yield _ndjson_event("error", row=error.row, error=str(error))
+                failed += len(errors)
+                rows += len(chunk) + len(errors)
+                
+                if chunk:
+                    uploads = await get_lighthouse_service().upload_datacoin_batch([datacoin for _, datacoin in chunk])
+                    objects += len({upload["object_hash"] for upload in uploads if upload["success"]})
+                    scored = []
+                    for (row, datacoin), upload in zip(chunk, uploads):
+                        if upload["success"]:
+                            uploaded += 1
+                            scored.append((datacoin.company_id, datacoin.metric_type, datacoin.value, upload["lighthouse_hash"]))
+                            metric_counts[datacoin.company_id][datacoin.metric_type] += 1
+                        else:
+                            failed += 1
+                            yield _ndjson_event("error", row=row, error=upload["error"])
+                    await score_aggregates.add_many(scored)
+                
+                yield _ndjson_event("progress", rows=rows, uploaded=uploaded, failed=failed)
+        except ClientDisconnect:
+            logger.warning(f"⚠️ Cliente desconectado durante la ingesta tras {rows} filas")
+            return
+        except Exception as e:
+            logger.error(f"❌ Error en ingesta en streaming: {e}")
+            yield _ndjson_event("fatal", rows=rows, error=str(e))
+        
+        # Una confirmación por empresa al finalizar el stream
+        if metric_counts:
+            await asyncio.gather(*(
+                get_notification_service().send_datacoin_batch_confirmation(company_id, dict(counts), [])
+                for company_id, counts in metric_counts.items()
+            ))
+        
+        logger.info(f"✅ Ingesta en streaming finalizada: {uploaded} subidos, {failed} fallidos")
+        yield _ndjson_event(
+            "summary",
+            rows=rows,
+            uploaded=uploaded,
+            failed=failed,
+            lighthouse_objects=objects,
+            companies=len(metric_counts)
+        )
+    
+    return IngestStreamingResponse(events(), media_type="application/x-ndjson")
+
+def _ndjson_event(event: str, **fields: Any) -> bytes:
+    """Serializa un evento de progreso como línea NDJSON"""
+    return (json.dumps({"event": event, **fields}) + "\n").encode()
+
 @router.get("/company/{company_id}")
 async def get_company_datacoins(company_id: str, limit: int = 50):
     """
@@ -92,7 +282,7 @@ async def get_company_datacoins(company_id: str, limit: int = 50):
     try:
         logger.info(f"📋 Obteniendo Data Coins para empresa: {company_id}")
         
-        datacoins = await lighthouse_service.list_company_datacoins(company_id)
+        datacoins = await get_lighthouse_service().list_company_datacoins(company_id)
         
         return {
             "success": True,
@@ -115,7 +305,29 @@ async def get_datacoin_by_hash(lighthouse_hash: str):
     try:
         logger.info(f"🔍 Obteniendo Data Coin por hash: {lighthouse_hash}")
         
-        result = await lighthouse_service.get_datacoin(lighthouse_hash)
+        # Acierto en caché: servir el JSON almacenado sin deserializarlo
+        cached = get_lighthouse_service().get_cached_datacoin(lighthouse_hash)
+        if cached is not None and get_lighthouse_service().is_packed_object(lighthouse_hash):
+            # Objeto empaquetado (NDJSON): no es un único documento JSON
+            with cached:
+                data = get_lighthouse_service().decode_cached(lighthouse_hash, cached)
+            return {
+                "success": True,
+                "lighthouse_hash": lighthouse_hash,
+                "data": data
+            }
+        if cached is not None:
+            with cached:
+                body = b"".join((
+                    b'{"success":true,"lighthouse_hash":',
+                    json.dumps(lighthouse_hash).encode(),
+                    b',"data":',
+                    cached,
+                    b"}"
+                ))
+            return Response(content=body, media_type="application/json")
+        
+        result = await get_lighthouse_service().get_datacoin(lighthouse_hash)
         
         if result["success"]:
             return {
@@ -140,12 +352,13 @@ async def verify_datacoin(lighthouse_hash: str):
     try:
         logger.info(f"✅ Verificando Data Coin: {lighthouse_hash}")
         
-        result = await lighthouse_service.verify_datacoin(lighthouse_hash)
+        result = await get_lighthouse_service().verify_datacoin(lighthouse_hash)
         
         return {
             "success": result["success"],
             "hash": lighthouse_hash,
             "verified": result.get("verified", False),
+            "source": result.get("source"),
             "timestamp": "2024-10-11T12:00:00Z"
         }
         
@@ -153,53 +366,24 @@ async def verify_datacoin(lighthouse_hash: str):
         logger.error(f"❌ Error verificando Data Coin: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    🗄️ Métricas de la caché local de Data Coins (tasa de aciertos, ocupación)
+    """
+    return {
+        "success": True,
+        "cache": get_lighthouse_service().cache.stats()
+    }
+
 @router.get("/metrics/types")
 async def get_metric_types():
     """
     📊 Obtiene la lista de tipos de métricas soportadas
     """
-    metric_types = [
-        {
-            "type": "energy_consumption",
-            "name": "Consumo de Energía",
-            "units": ["kwh", "mwh", "joules"],
-            "description": "Consumo total de energía del período"
-        },
-        {
-            "type": "carbon_emissions",
-            "name": "Emisiones de Carbono",
-            "units": ["kg_co2", "tons_co2"],
-            "description": "Emisiones de CO2 equivalente"
-        },
-        {
-            "type": "water_usage",
-            "name": "Uso de Agua",
-            "units": ["liters", "m3", "gallons"],
-            "description": "Consumo total de agua"
-        },
-        {
-            "type": "waste_generation",
-            "name": "Generación de Residuos",
-            "units": ["kg", "tons"],
-            "description": "Residuos generados en el período"
-        },
-        {
-            "type": "renewable_energy_percentage",
-            "name": "Porcentaje de Energía Renovable",
-            "units": ["percentage"],
-            "description": "Porcentaje de energía proveniente de fuentes renovables"
-        },
-        {
-            "type": "recycling_rate",
-            "name": "Tasa de Reciclaje",
-            "units": ["percentage"],
-            "description": "Porcentaje de materiales reciclados"
-        }
-    ]
-    
     return {
         "success": True,
-        "metric_types": metric_types
+        "metric_types": METRIC_TYPES
     }
 
 @router.get("/stats/global")
@@ -3,17 +3,34 @@ Empresas Routes - Endpoints para gestión empresarial y métricas ambientales
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Security
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import logging
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from utils.web3_utils import Web3Utils
+from utils.web3_utils import get_web3_utils
+from services.chain_indexer import ChainIndexer, get_chain_indexer
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-web3_utils = Web3Utils()
 security = HTTPBasic()
 
+MAX_PAGE_SIZE = 1000
+
+def _indexed(consistent: bool) -> Optional[ChainIndexer]:
+    """Indexador de eventos si está al día y la lectura no exige ir al contrato"""
+    chain_indexer = get_chain_indexer()
+    if consistent or chain_indexer is None or not chain_indexer.ready:
+        return None
+    return chain_indexer
+
+def _page(query, *args, limit: int, cursor: Optional[str]):
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit debe estar entre 1 y {MAX_PAGE_SIZE}")
+    try:
+        return query(*args, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Simulación de owner para endpoints administrativos
 OWNER_WALLET = "0xOWNER_WALLET_AQUI"  # Cambia por el wallet real del owner
 
@@ -46,7 +63,7 @@ async def registrar_empresa(request: EmpresaRegisterRequest):
         # Validación de datos
         if not request.nombre or not request.sector or not request.pais:
             raise ValueError("Todos los campos son obligatorios")
-        tx_hash = web3_utils.call_contract_function(
+        tx_hash = get_web3_utils().call_contract_function(
             "registrarEmpresa",
             [request.nombre, request.sector, request.pais]
         )
@@ -62,11 +79,11 @@ async def agregar_representante(empresa: str, request: RepresentanteRequest):
     Agrega un representante a la empresa
     """
     try:
-        if not web3_utils.is_valid_address(empresa):
+        if not get_web3_utils().is_valid_address(empresa):
             raise ValueError("Wallet de empresa inválida")
-        if not web3_utils.is_valid_address(request.representante):
+        if not get_web3_utils().is_valid_address(request.representante):
             raise ValueError("Wallet de representante inválida")
-        tx_hash = web3_utils.call_contract_function(
+        tx_hash = get_web3_utils().call_contract_function(
             "agregarRepresentante",
             [request.representante],
             sender=empresa
@@ -83,11 +100,11 @@ async def eliminar_representante(empresa: str, request: RepresentanteRequest):
     Elimina un representante de la empresa
     """
     try:
-        if not web3_utils.is_valid_address(empresa):
+        if not get_web3_utils().is_valid_address(empresa):
             raise ValueError("Wallet de empresa inválida")
-        if not web3_utils.is_valid_address(request.representante):
+        if not get_web3_utils().is_valid_address(request.representante):
             raise ValueError("Wallet de representante inválida")
-        tx_hash = web3_utils.call_contract_function(
+        tx_hash = get_web3_utils().call_contract_function(
             "eliminarRepresentante",
             [request.representante],
             sender=empresa
@@ -104,11 +121,11 @@ async def registrar_metrica(empresa: str, request: MetricaRequest):
     Registra una métrica ambiental para la empresa
     """
     try:
-        if not web3_utils.is_valid_address(empresa):
+        if not get_web3_utils().is_valid_address(empresa):
             raise ValueError("Wallet de empresa inválida")
         if not request.tipo or not request.unidad:
             raise ValueError("Tipo y unidad son obligatorios")
-        tx_hash = web3_utils.call_contract_function(
+        tx_hash = get_web3_utils().call_contract_function(
             "registrarMetrica",
             [request.tipo, int(request.valor), request.unidad],
             sender=empresa
@@ -120,37 +137,67 @@ async def registrar_metrica(empresa: str, request: MetricaRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{empresa}/score")
-async def consultar_score(empresa: str):
+async def consultar_score(empresa: str, consistent: bool = False):
     """
-    Consulta el score ambiental de la empresa
+    Consulta el score ambiental de la empresa (`consistent=true` ignora la caché)
     """
     try:
-        score = web3_utils.call_contract_view("consultarScore", [empresa])
+        score = await get_web3_utils().read_contract_view("consultarScore", [empresa], consistent)
         return {"success": True, "score": score}
     except Exception as e:
         logger.error(f"Error consultando score: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/ranking")
-async def ranking_empresas():
+async def ranking_empresas(consistent: bool = False, limit: int = 100, cursor: Optional[str] = None):
     """
     Consulta el ranking de empresas
+    
+    Con el indexador al día se sirve del índice local, por score y paginado
+    (`limit`, `cursor`: `next_cursor` de la página anterior). `consistent=true`
+    lee del contrato sin caché.
     """
     try:
-        ranking = web3_utils.call_contract_view("rankingEmpresas", [])
+        indexer = _indexed(consistent)
+        if indexer is not None:
+            entries, next_cursor = _page(indexer.index.ranking, limit=limit, cursor=cursor)
+            return {
+                "success": True,
+                "ranking": [entry["wallet"] for entry in entries],
+                "detalle": entries,
+                "next_cursor": next_cursor,
+                "indexed_block": indexer.index.last_block()
+            }
+        ranking = await get_web3_utils().read_contract_view("rankingEmpresas", [], consistent)
         return {"success": True, "ranking": ranking}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error consultando ranking: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{empresa}/metricas")
-async def ver_metricas_empresa(empresa: str):
+async def ver_metricas_empresa(empresa: str, consistent: bool = False, limit: int = 100, cursor: Optional[str] = None):
     """
     Consulta las métricas ambientales de la empresa
+    
+    Con el indexador al día se sirven del índice local en orden de registro,
+    paginadas (`limit`, `cursor`). `consistent=true` lee del contrato sin caché.
     """
     try:
-        metricas = web3_utils.call_contract_view("verMetricasEmpresa", [empresa])
+        indexer = _indexed(consistent)
+        if indexer is not None:
+            metricas, next_cursor = _page(indexer.index.metricas, empresa, limit=limit, cursor=cursor)
+            return {
+                "success": True,
+                "metricas": metricas,
+                "next_cursor": next_cursor,
+                "indexed_block": indexer.index.last_block()
+            }
+        metricas = await get_web3_utils().read_contract_view("verMetricasEmpresa", [empresa], consistent)
         return {"success": True, "metricas": metricas}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error consultando métricas: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -161,11 +208,11 @@ async def reclamar_recompensa(empresa: str, amount: int):
     Reclama una recompensa para la empresa
     """
     try:
-        if not web3_utils.is_valid_address(empresa):
+        if not get_web3_utils().is_valid_address(empresa):
             raise ValueError("Wallet de empresa inválida")
         if amount <= 0:
             raise ValueError("La cantidad debe ser mayor a cero")
-        tx_hash = web3_utils.call_contract_function(
+        tx_hash = get_web3_utils().call_contract_function(
             "reclamarRecompensa",
             [amount],
             sender=empresa
@@ -182,11 +229,11 @@ async def mintear_nft_reconocimiento(empresa: str, uri: str):
     Mintea un NFT de reconocimiento para la empresa
     """
     try:
-        if not web3_utils.is_valid_address(empresa):
+        if not get_web3_utils().is_valid_address(empresa):
             raise ValueError("Wallet de empresa inválida")
         if not uri:
             raise ValueError("URI es obligatorio")
-        tx_hash = web3_utils.call_contract_function(
+        tx_hash = get_web3_utils().call_contract_function(
             "mintearNFTReconocimiento",
             [uri],
             sender=empresa
@@ -200,9 +247,9 @@ async def mintear_nft_reconocimiento(empresa: str, uri: str):
 @router.post("/admin/setEcoNFT", summary="Configura dirección EcoNFT", response_description="Hash de la transacción")
 async def set_eco_nft(address: str, owner: bool = Depends(is_owner)):
     try:
-        if not web3_utils.is_valid_address(address):
+        if not get_web3_utils().is_valid_address(address):
             raise ValueError("Dirección EcoNFT inválida")
-        tx_hash = web3_utils.call_contract_function("setEcoNFT", [address])
+        tx_hash = get_web3_utils().call_contract_function("setEcoNFT", [address])
         logger.info(f"EcoNFT configurado: {address}, tx: {tx_hash}")
         return {"success": True, "tx_hash": tx_hash}
     except Exception as e:
@@ -212,9 +259,9 @@ async def set_eco_nft(address: str, owner: bool = Depends(is_owner)):
 @router.post("/admin/setRewardDistributor", summary="Configura dirección RewardDistributor", response_description="Hash de la transacción")
 async def set_reward_distributor(address: str, owner: bool = Depends(is_owner)):
     try:
-        if not web3_utils.is_valid_address(address):
+        if not get_web3_utils().is_valid_address(address):
             raise ValueError("Dirección RewardDistributor inválida")
-        tx_hash = web3_utils.call_contract_function("setRewardDistributor", [address])
+        tx_hash = get_web3_utils().call_contract_function("setRewardDistributor", [address])
         logger.info(f"RewardDistributor configurado: {address}, tx: {tx_hash}")
         return {"success": True, "tx_hash": tx_hash}
     except Exception as e:
@@ -224,9 +271,9 @@ async def set_reward_distributor(address: str, owner: bool = Depends(is_owner)):
 @router.post("/admin/registrarSubcontrato", summary="Registra subcontrato", response_description="Hash de la transacción")
 async def registrar_subcontrato(servicioId: str, subcontrato: str, owner: bool = Depends(is_owner)):
     try:
-        if not web3_utils.is_valid_address(subcontrato):
+        if not get_web3_utils().is_valid_address(subcontrato):
             raise ValueError("Dirección de subcontrato inválida")
-        tx_hash = web3_utils.call_contract_function("registrarSubcontrato", [servicioId, subcontrato])
+        tx_hash = get_web3_utils().call_contract_function("registrarSubcontrato", [servicioId, subcontrato])
         logger.info(f"Subcontrato registrado: {servicioId} -> {subcontrato}, tx: {tx_hash}")
         return {"success": True, "tx_hash": tx_hash}
     except Exception as e:
@@ -234,13 +281,45 @@ async def registrar_subcontrato(servicioId: str, subcontrato: str, owner: bool =
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/todas")
-async def ver_todas_empresas():
+async def ver_todas_empresas(consistent: bool = False, limit: int = 100, cursor: Optional[str] = None):
     """
     Consulta todas las empresas registradas
+    
+    Con el indexador al día se sirven del índice local en orden de registro,
+    paginadas (`limit`, `cursor`). `consistent=true` lee del contrato sin caché.
     """
     try:
-        empresas = web3_utils.call_contract_view("verTodasEmpresas", [])
+        indexer = _indexed(consistent)
+        if indexer is not None:
+            entries, next_cursor = _page(indexer.index.empresas, limit=limit, cursor=cursor)
+            return {
+                "success": True,
+                "empresas": [entry["wallet"] for entry in entries],
+                "detalle": entries,
+                "next_cursor": next_cursor,
+                "indexed_block": indexer.index.last_block()
+            }
+        empresas = await get_web3_utils().read_contract_view("verTodasEmpresas", [], consistent)
         return {"success": True, "empresas": empresas}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error consultando empresas: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    Aciertos, fallos y bloque actual de la caché de vistas del contrato
+    """
+    return {"success": True, "cache": get_web3_utils().view_cache.stats()}
+
+@router.get("/index/stats")
+async def index_stats():
+    """
+    Estado del indexador de eventos: último bloque indexado, retraso y reorgs
+    """
+    chain_indexer = get_chain_indexer()
+    if chain_indexer is None:
+        return {"success": True, "index": {"enabled": False}}
+    return {"success": True, "index": {"enabled": True, **chain_indexer.stats()}}
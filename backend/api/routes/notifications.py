@@ -0,0 +1,83 @@
+"""
+📱 Notifications Routes - Endpoints para historial y estado de notificaciones
+"""
+
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+import logging
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.notification_service import NotificationType, get_notification_outbox, get_notification_service
+from services.notification_log import get_notification_log
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/latest")
+async def get_latest_notifications(limit: int = 20):
+    """
+    🕒 Últimas notificaciones del protocolo (para dashboards)
+    
+    - **limit**: Número de notificaciones (default: 20)
+    """
+    try:
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit debe ser mayor que 0")
+        
+        return {
+            "success": True,
+            "notifications": get_notification_log().latest(limit)
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo últimas notificaciones: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats")
+async def get_notification_stats():
+    """
+    📊 Estado del outbox (pendientes, entregadas, resúmenes) y del historial
+    """
+    try:
+        return {
+            "success": True,
+            "outbox": get_notification_outbox().stats(),
+            "history": get_notification_log().stats()
+        }
+    
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo estado de notificaciones: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{company_id}/history")
+async def get_notification_history(company_id: str, limit: int = 20, cursor: Optional[str] = None,
+                                   type: Optional[NotificationType] = None):
+    """
+    📋 Historial de notificaciones de una empresa, de la más reciente a la más antigua
+    
+    - **company_id**: ID de la empresa (destinatario)
+    - **limit**: Número de notificaciones por página (default: 20)
+    - **cursor**: `next_cursor` de la página anterior para continuar el historial
+    - **type**: Filtrar por tipo de notificación
+    """
+    try:
+        try:
+            history = await get_notification_service().get_notification_history(company_id, limit, cursor, type)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {
+            "success": True,
+            "company_id": company_id,
+            **history
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo historial de notificaciones: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
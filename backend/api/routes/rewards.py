@@ -2,7 +2,7 @@
 💰 Rewards Routes - Endpoints para sistema de recompensas PYUSD
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Dict, Any, Optional
 import logging
 from pydantic import BaseModel
@@ -11,14 +11,13 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from services.reward_service import RewardService, Company, RewardDistribution
+from services.reward_service import Company, RewardDistribution, get_reward_service
+from services.notification_service import get_notification_service
+from services.merkle_distribution import get_merkle_store
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Inicializar servicio
-reward_service = RewardService()
-
 class RewardCalculationRequest(BaseModel):
     """Request para calcular recompensas"""
     companies: List[Dict[str, Any]]
@@ -40,12 +39,12 @@ async def get_leaderboard(limit: int = 10):
     try:
         logger.info(f"🏆 Generando leaderboard (top {limit})")
         
-        leaderboard = await reward_service.get_leaderboard(limit)
+        leaderboard = await get_reward_service().get_leaderboard(limit)
         
         return {
             "success": True,
             "leaderboard": leaderboard,
-            "total_companies": len(leaderboard),
+            "total_companies": len(get_reward_service().leaderboard),
             "generated_at": "2024-10-11T12:00:00Z"
         }
         
@@ -77,7 +76,7 @@ async def calculate_rewards(request: RewardCalculationRequest):
             companies.append(company)
         
         # Calcular recompensas
-        distributions = await reward_service.calculate_rewards(companies)
+        distributions = await get_reward_service().calculate_rewards(companies)
         
         total_amount = sum(d.amount for d in distributions)
         
@@ -103,20 +102,26 @@ async def calculate_rewards(request: RewardCalculationRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/distribute")
-async def distribute_rewards():
+async def distribute_rewards(
+    mode: str = Query("push", pattern="^(push|merkle)$"),
+    epoch: Optional[str] = Query(None, pattern="^[0-9]{1,18}$")
+):
     """
     🚀 Ejecuta distribución automática de recompensas mensuales
     
     Distribuye PYUSD a todas las empresas elegibles basado en sus EcoScores
+    
+    - **mode**: `push` (una transferencia por empresa) o `merkle` (se publica solo la raíz y cada empresa reclama)
+    - **epoch**: Época de la distribución Merkle (default: mes actual, YYYYMM)
     """
     try:
-        logger.info("🚀 Iniciando distribución automática de recompensas")
+        logger.info(f"🚀 Iniciando distribución automática de recompensas (modo {mode})")
         
         # Obtener empresas del sistema
-        companies = await reward_service._get_all_companies()
+        companies = await get_reward_service()._get_all_companies()
         
         # Calcular recompensas
-        distributions = await reward_service.calculate_rewards(companies)
+        distributions = await get_reward_service().calculate_rewards(companies)
         
         if not distributions:
             return {
@@ -125,16 +130,23 @@ async def distribute_rewards():
                 "distributions": []
             }
         
+        if mode == "merkle":
+            result = await get_reward_service().publish_merkle_distribution(distributions, epoch)
+            if result["status"] != "published":
+                raise HTTPException(status_code=500, detail=result.get("error", "Error publicando raíz Merkle"))
+            return {
+                "success": True,
+                "distribution_date": "2024-10-11T12:00:00Z",
+                "result": result
+            }
+        
         # Distribuir recompensas
-        result = await reward_service.distribute_rewards(distributions)
+        result = await get_reward_service().distribute_rewards(distributions)
         
         # Enviar notificaciones
-        from services.notification_service import NotificationService
-        notification_service = NotificationService()
-        
         for distribution in distributions:
             if distribution.transaction_hash:
-                await notification_service.send_reward_notification(
+                await get_notification_service().send_reward_notification(
                     distribution.company_id,
                     float(distribution.amount),
                     distribution.eco_score
@@ -146,10 +158,72 @@ async def distribute_rewards():
             "result": result
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error distribuyendo recompensas: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _resolve_epoch(epoch: str) -> str:
+    """Traduce `latest` a la última época construida"""
+    if epoch != "latest":
+        return epoch
+    latest = get_merkle_store().latest_epoch()
+    if latest is None:
+        raise HTTPException(status_code=404, detail="No hay distribuciones Merkle")
+    return latest
+
+@router.get("/merkle/{epoch}")
+async def get_merkle_distribution(epoch: str):
+    """
+    🌳 Obtiene la raíz Merkle publicada para una época
+    
+    - **epoch**: Época (YYYYMM) o `latest`
+    """
+    try:
+        distribution = get_merkle_store().get_distribution(_resolve_epoch(epoch))
+        if distribution is None:
+            raise HTTPException(status_code=404, detail=f"Distribución {epoch} no encontrada")
+        
+        return {
+            "success": True,
+            "distribution": distribution
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo distribución Merkle: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/merkle/{epoch}/proof/{company_id}")
+async def get_merkle_proof(epoch: str, company_id: str):
+    """
+    🧾 Obtiene la prueba Merkle con la que una empresa reclama su recompensa
+    
+    Devuelve los argumentos de `claimReward(epoch, account, amount, proof)`
+    
+    - **epoch**: Época (YYYYMM) o `latest`
+    - **company_id**: ID de la empresa
+    """
+    try:
+        claim = get_merkle_store().get_proof(_resolve_epoch(epoch), company_id)
+        if claim is None:
+            raise HTTPException(status_code=404, detail=f"{company_id} no tiene recompensa en la distribución {epoch}")
+        
+        return {
+            "success": True,
+            "claim": claim
+        }
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo prueba Merkle: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/manual")
 async def send_manual_reward(request: ManualRewardRequest):
     """
@@ -171,12 +245,9 @@ async def send_manual_reward(request: ManualRewardRequest):
         )
         
         # Enviar recompensa
-        result = await reward_service.distribute_rewards([distribution])
+        result = await get_reward_service().distribute_rewards([distribution])
         
         # Enviar notificación personalizada
-        from services.notification_service import NotificationService
-        notification_service = NotificationService()
-        
         from services.notification_service import Notification, NotificationChannel, NotificationType
         notification = Notification(
             recipient_id=request.company_id,
@@ -190,7 +261,7 @@ async def send_manual_reward(request: ManualRewardRequest):
                 "type": "manual_reward"
             }
         )
-        await notification_service.send_notification(notification)
+        await get_notification_service().send_notification(notification)
         
         return {
             "success": True,
@@ -216,7 +287,7 @@ async def get_company_reward_history(company_id: str, limit: int = 20):
     try:
         logger.info(f"📊 Obteniendo historial de recompensas para {company_id}")
         
-        history = await reward_service.get_company_rewards_history(company_id)
+        history = await get_reward_service().get_company_rewards_history(company_id)
         
         return {
             "success": True,
@@ -6,6 +6,15 @@ from fastapi import APIRouter, HTTPException
 from typing import List, Dict, Any, Optional
 import logging
 from pydantic import BaseModel
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.notification_service import get_notification_service
+from services.score_engine import METRIC_WEIGHTS, get_score_engine, normalize_metric_value
+from services.score_aggregates import score_aggregates
+from services.leaderboard_index import leaderboard_index
+from services.rpc_batcher import get_rpc_batcher
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -15,6 +24,20 @@ class ScoreCalculationRequest(BaseModel):
     company_id: str
     datacoins: List[Dict[str, Any]]
     
+class ScoreBatchCalculationRequest(BaseModel):
+    """Request para cálculo de EcoScores por lotes (formato columnar)"""
+    company_ids: List[str]
+    metric_types: List[str]
+    values: List[float]
+
+class OnChainScoresRequest(BaseModel):
+    """Request para leer scores on-chain de muchas wallets"""
+    addresses: List[str]
+
+class DataCoinCorrectionRequest(BaseModel):
+    """Request para corregir el valor de un Data Coin ya contabilizado"""
+    value: float
+
 class ScoreUpdateRequest(BaseModel):
     """Request para actualizar score manualmente"""
     company_id: str
@@ -27,12 +50,14 @@ async def get_company_score(company_id: str):
     📊 Obtiene el EcoScore actual de una empresa
     
     - **company_id**: Identificador único de la empresa
+    
+    Lee el score mantenido de forma incremental a partir de los Data Coins
+    subidos; sin Data Coins registrados se usan los datos de referencia.
     """
     try:
         logger.info(f"📊 Obteniendo EcoScore para empresa: {company_id}")
         
-        # En implementación real, consultar smart contract ScoreCalculator
-        score_data = await _get_mock_company_score(company_id)
+        score_data = await _company_score(company_id)
         
         return {
             "success": True,
@@ -50,6 +75,74 @@ async def get_company_score(company_id: str):
         logger.error(f"❌ Error obteniendo EcoScore: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/calculate/batch")
+async def calculate_scores_batch(request: ScoreBatchCalculationRequest):
+    """
+    🧮 Calcula los EcoScores de muchas empresas en una sola pasada vectorizada
+    
+    - **company_ids**: Empresa de cada Data Coin
+    - **metric_types**: Tipo de métrica de cada Data Coin
+    - **values**: Valor de cada Data Coin
+    
+    Las tres columnas deben tener la misma longitud. Devuelve los mismos
+    scores que `/calculate/{company_id}` aplicado empresa por empresa.
+    """
+    try:
+        logger.info(f"🧮 Calculando EcoScores por lotes: {len(request.values)} Data Coins")
+        
+        if not (len(request.company_ids) == len(request.metric_types) == len(request.values)):
+            raise HTTPException(status_code=400, detail="Las columnas deben tener la misma longitud")
+        
+        scores = get_score_engine().score_columns(request.company_ids, request.metric_types, request.values)
+        
+        return {
+            "success": True,
+            "scores": scores,
+            "companies_processed": len(scores),
+            "datacoins_processed": len(request.values),
+            "calculation_method": "weighted_average",
+            "calculated_at": "2024-10-11T12:00:00Z"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error calculando EcoScores por lotes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/onchain")
+async def get_onchain_scores(request: OnChainScoresRequest):
+    """
+    ⛓️ Lee `GreenLedgerScore.getScore` de muchas wallets
+    
+    Las lecturas concurrentes se agrupan en un lote JSON-RPC o un
+    `aggregate3` de Multicall3 (RPC_BATCH_MODE).
+    """
+    try:
+        score_contract = os.getenv("GREENLEDGER_SCORE_ADDRESS")
+        if not score_contract:
+            raise HTTPException(status_code=503, detail="GREENLEDGER_SCORE_ADDRESS no configurada")
+        max_addresses = int(os.getenv("WALLET_BALANCES_MAX", "500"))
+        if not request.addresses or len(request.addresses) > max_addresses:
+            raise HTTPException(status_code=400, detail=f"Entre 1 y {max_addresses} direcciones por petición")
+        from eth_utils import is_address
+        invalid = [address for address in request.addresses if not is_address(address)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Direcciones inválidas: {invalid[:10]}")
+        
+        scores = await get_rpc_batcher().scores(score_contract, list(dict.fromkeys(request.addresses)))
+        return {
+            "success": True,
+            "scores": scores,
+            "batching": get_rpc_batcher().stats()
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error leyendo scores on-chain: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/calculate/{company_id}")
 async def calculate_company_score(company_id: str, request: ScoreCalculationRequest):
     """
@@ -68,12 +161,9 @@ async def calculate_company_score(company_id: str, request: ScoreCalculationRequ
         result = await _update_score_on_chain(company_id, score)
         
         # Enviar notificación si hay cambio significativo
-        from services.notification_service import NotificationService
-        notification_service = NotificationService()
-        
         previous_score = 85.0  # En implementación real, obtener score anterior
         if abs(score - previous_score) >= 5.0:
-            await notification_service.send_score_update_notification(
+            await get_notification_service().send_score_update_notification(
                 company_id, score, previous_score
             )
         
@@ -146,9 +236,7 @@ async def update_company_score(company_id: str, request: ScoreUpdateRequest):
         }
         
         # Enviar notificación
-        from services.notification_service import NotificationService
-        notification_service = NotificationService()
-        await notification_service.send_score_update_notification(
+        await get_notification_service().send_score_update_notification(
             company_id, request.new_score, 85.0  # Score anterior mock
         )
         
@@ -165,26 +253,91 @@ async def update_company_score(company_id: str, request: ScoreUpdateRequest):
         logger.error(f"❌ Error actualizando EcoScore: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.put("/{company_id}/datacoins/{lighthouse_hash}")
+async def correct_datacoin_score(company_id: str, lighthouse_hash: str, request: DataCoinCorrectionRequest):
+    """
+    ✏️ Corrige el valor de un Data Coin y actualiza el EcoScore sin recalcular el historial
+    
+    - **company_id**: ID de la empresa
+    - **lighthouse_hash**: Hash del Data Coin a corregir
+    - **value**: Valor corregido de la métrica
+    """
+    if score_aggregates.owner(lighthouse_hash) != company_id:
+        raise HTTPException(status_code=404, detail="Data Coin no registrado para esta empresa")
+    
+    logger.info(f"✏️ Corrigiendo Data Coin {lighthouse_hash} de {company_id}: {request.value}")
+    score = await score_aggregates.correct(lighthouse_hash, request.value)
+    
+    return {
+        "success": True,
+        "company_id": company_id,
+        "lighthouse_hash": lighthouse_hash,
+        "current_score": score
+    }
+
+@router.delete("/{company_id}/datacoins/{lighthouse_hash}")
+async def remove_datacoin_score(company_id: str, lighthouse_hash: str):
+    """
+    🗑️ Retira un Data Coin del EcoScore de una empresa sin recalcular el historial
+    
+    - **company_id**: ID de la empresa
+    - **lighthouse_hash**: Hash del Data Coin a retirar
+    """
+    if score_aggregates.owner(lighthouse_hash) != company_id:
+        raise HTTPException(status_code=404, detail="Data Coin no registrado para esta empresa")
+    
+    logger.info(f"🗑️ Retirando Data Coin {lighthouse_hash} del EcoScore de {company_id}")
+    score = await score_aggregates.remove(lighthouse_hash)
+    
+    return {
+        "success": True,
+        "company_id": company_id,
+        "lighthouse_hash": lighthouse_hash,
+        "current_score": score
+    }
+
 @router.get("/leaderboard/global")
-async def get_global_score_leaderboard(limit: int = 20):
+async def get_global_score_leaderboard(limit: int = 20, cursor: Optional[str] = None):
     """
     🏆 Obtiene el ranking global de EcoScores
     
     - **limit**: Número de empresas en el ranking (default: 20)
+    - **cursor**: `next_cursor` de la página anterior para continuar el ranking
     """
     try:
         logger.info(f"🏆 Generando ranking global de EcoScores (top {limit})")
         
-        leaderboard = await _get_mock_global_leaderboard(limit)
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit debe ser mayor que 0")
+        
+        next_cursor = None
+        # Data Coins registrados por otros workers desde la última lectura
+        score_aggregates.sync()
+        if len(leaderboard_index):
+            try:
+                entries, next_cursor = leaderboard_index.page(limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            leaderboard = [
+                {"company_id": company_id, "eco_score": eco_score, "rank": rank}
+                for rank, company_id, eco_score in entries
+            ]
+            total_companies = len(leaderboard_index)
+        else:
+            leaderboard = await _get_mock_global_leaderboard(limit)
+            total_companies = len(leaderboard)
         
         return {
             "success": True,
             "leaderboard": leaderboard,
-            "total_companies": len(leaderboard),
-            "average_score": sum(c["eco_score"] for c in leaderboard) / len(leaderboard),
+            "total_companies": total_companies,
+            "average_score": sum(c["eco_score"] for c in leaderboard) / len(leaderboard) if leaderboard else 0.0,
+            "next_cursor": next_cursor,
             "generated_at": "2024-10-11T12:00:00Z"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error generando ranking global: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -244,9 +397,9 @@ async def compare_company_scores(company_id1: str, company_id2: str):
     try:
         logger.info(f"🔍 Comparando EcoScores: {company_id1} vs {company_id2}")
         
-        # Obtener scores de ambas empresas
-        score1_data = await _get_mock_company_score(company_id1)
-        score2_data = await _get_mock_company_score(company_id2)
+        # Score y posición de ambas empresas de la misma fuente (agregados y ranking indexado)
+        score1_data = await _company_score(company_id1)
+        score2_data = await _company_score(company_id2)
         
         comparison = {
             "company_1": {
@@ -286,6 +439,33 @@ async def compare_company_scores(company_id1: str, company_id2: str):
         logger.error(f"❌ Error comparando EcoScores: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _company_score(company_id: str) -> Dict[str, Any]:
+    """EcoScore mantenido de una empresa con su posición en el ranking indexado"""
+    maintained = score_aggregates.get_score(company_id)
+    if maintained is not None:
+        score_data = await _get_mock_company_score(company_id)
+        previous_score = maintained["previous_score"]
+        score_data.update(
+            current_score=maintained["current_score"],
+            previous_score=previous_score,
+            score_change=round(maintained["current_score"] - previous_score, 1) if previous_score is not None else 0.0,
+            last_updated=maintained["last_updated"],
+            score_breakdown=maintained["score_breakdown"]
+        )
+    else:
+        # En implementación real, consultar smart contract ScoreCalculator
+        score_data = await _get_mock_company_score(company_id)
+    return _apply_ranking(company_id, score_data)
+
+def _apply_ranking(company_id: str, score_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Sustituye posición y total por los del ranking indexado si la empresa está en él"""
+    score_aggregates.sync()
+    rank = leaderboard_index.rank(company_id)
+    if rank is not None:
+        score_data["ranking_position"] = rank
+        score_data["total_companies"] = len(leaderboard_index)
+    return score_data
+
 # Funciones auxiliares mock (reemplazar con implementación real)
 async def _get_mock_company_score(company_id: str) -> Dict[str, Any]:
     """Mock de datos de EcoScore de empresa"""
@@ -310,14 +490,8 @@ async def _calculate_eco_score(datacoins: List[Dict[str, Any]]) -> float:
     if not datacoins:
         return 0.0
     
-    # Pesos por tipo de métrica
-    weights = {
-        "carbon_emissions": 0.30,
-        "energy_consumption": 0.25,
-        "water_usage": 0.15,
-        "waste_generation": 0.20,
-        "renewable_energy_percentage": 0.10
-    }
+    # Pesos por tipo de métrica (compartidos con el motor por lotes)
+    weights = METRIC_WEIGHTS
     
     # Calcular score ponderado (algoritmo simplificado)
     total_score = 0.0
@@ -329,7 +503,7 @@ async def _calculate_eco_score(datacoins: List[Dict[str, Any]]) -> float:
         
         if metric_type in weights:
             # Normalizar valor a escala 0-100 (lógica simplificada)
-            normalized_score = min(100, max(0, 100 - (value / 100)))
+            normalized_score = normalize_metric_value(value)
             weighted_score = normalized_score * weights[metric_type]
             total_score += weighted_score
             total_weight += weights[metric_type]
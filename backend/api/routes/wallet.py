@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import logging
 import sys
 import os
@@ -9,10 +9,12 @@ import time
 logger = logging.getLogger(__name__)
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from services.wallet_service import WalletService
+from services.wallet_service import get_wallet_service
 
 router = APIRouter()
-wallet_service = WalletService()
+
+# Máximo de direcciones por petición en /balances
+MAX_BULK_BALANCES = int(os.getenv("WALLET_BALANCES_MAX", "500"))
 
 class WalletConnectRequest(BaseModel):
     user_id: str
@@ -23,11 +25,14 @@ class WalletConnectRequest(BaseModel):
 class WalletConnectResponse(BaseModel):
     address: str
 
+class BulkBalancesRequest(BaseModel):
+    addresses: List[str]
+
 @router.post("/connect")
 async def connect_wallet(request: WalletConnectRequest):
     """Connect wallet extension to company account"""
     try:
-        result = await wallet_service.connect_wallet(
+        result = await get_wallet_service().connect_wallet(
             address=request.address,
             signature=request.signature,
             company_id=request.user_id
@@ -50,7 +55,7 @@ async def connect_wallet(request: WalletConnectRequest):
 async def disconnect_wallet(request: WalletConnectRequest):
     """Disconnect wallet from system"""
     try:
-        success = await wallet_service.disconnect_wallet(request.address)
+        success = await get_wallet_service().disconnect_wallet(request.address)
         
         if success:
             return {
@@ -68,10 +73,10 @@ async def disconnect_wallet(request: WalletConnectRequest):
 async def get_wallet_status(company_id: str):
     """Get connected wallet address for a given company"""
     try:
-        wallet_address = await wallet_service.get_connected_wallet(company_id)
+        wallet_address = await get_wallet_service().get_connected_wallet(company_id)
         
         if wallet_address:
-            balance = await wallet_service.get_wallet_balance(wallet_address)
+            balance = await get_wallet_service().get_wallet_balance(wallet_address)
             return {
                 "status": "connected",
                 "address": wallet_address,
@@ -93,15 +98,43 @@ async def get_wallet_status(company_id: str):
 async def get_wallet_balance_endpoint(address: str):
     """Get balance for a specific wallet address"""
     try:
-        balance = await wallet_service.get_wallet_balance(address)
+        balance = await get_wallet_service().get_wallet_balance(address)
+        if balance.get("error"):
+            raise HTTPException(status_code=503, detail=balance["error"])
         return {
             "status": "success",
             "data": balance
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting balance: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/balances")
+async def get_wallet_balances_endpoint(request: BulkBalancesRequest):
+    """Get balances for many wallet addresses (batched node reads)"""
+    try:
+        if not request.addresses or len(request.addresses) > MAX_BULK_BALANCES:
+            raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_BULK_BALANCES} addresses per request")
+        from eth_utils import is_address
+        invalid = [address for address in request.addresses if not is_address(address)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid addresses: {invalid[:10]}")
+        balances = await get_wallet_service().get_wallet_balances(list(dict.fromkeys(request.addresses)))
+        failed = next((balance["error"] for balance in balances.values() if balance.get("error")), None)
+        if failed:
+            raise HTTPException(status_code=503, detail=failed)
+        return {
+            "status": "success",
+            "data": balances
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting balances: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/signature-message")
 async def get_signature_message():
     """Get message to sign for wallet verification"""
@@ -2,78 +2,107 @@
 """
 🌿 GreenLedger Protocol - API Server
 Servidor principal para el sistema de scoring de sostenibilidad
+
+`create_app()` construye la aplicación sin crear servicios ni importar web3:
+cada servicio es una instancia compartida que se crea en su primer uso o en
+el lifespan, y los módulos lentos de importar se precargan en segundo plano
+cuando el servidor ya acepta peticiones.
 """
 
 import os
-import uvicorn
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+import importlib
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from dotenv import load_dotenv
 import logging
 from contextlib import asynccontextmanager
 
+# Cargar variables de entorno antes de construir los servicios
+load_dotenv()
+
 # Importar servicios y rutas
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.lighthouse_service import LighthouseService
-from services.reward_service import RewardService
-from services.notification_service import NotificationService
-from services.evvm_relayer import EVVMRelayer
-from api.routes import datacoins, rewards, scores, wallet, empresas
-
-# Cargar variables de entorno
-load_dotenv()
+from services.http_clients import http_clients
+from services.lighthouse_service import get_lighthouse_service
+from services.reward_service import get_reward_service
+from services.notification_service import get_notification_outbox
+from services.notification_log import get_notification_log
+from services.evvm_relayer import get_evvm_relayer
+from services.signature_verifier import get_signature_verifier
+from services.chain_indexer import get_chain_indexer
+from services.state_store import LeaderElection, get_state_store, worker_id
+from utils.web3_utils import get_web3_utils
+from api.routes import datacoins, rewards, scores, wallet, empresas, notifications
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Dependencias que tardan más de un segundo en importarse y solo se usan al hablar con la cadena
+PRELOAD_MODULES = ("web3", "eth_account", "eth_abi", "services.async_web3", "services.transfer_pipeline")
+
+def preload_modules() -> None:
+    """Importa PRELOAD_MODULES (en un hilo) para que la primera petición que los use no espere"""
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo precargar {name}: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestión del ciclo de vida de la aplicación"""
     # Startup
     logger.info("🌿 Iniciando GreenLedger Protocol API...")
     logger.info(f"📝 Documentación disponible en: http://{os.getenv('API_HOST', 'localhost')}:{os.getenv('API_PORT', 8000)}/docs")
+    # Clientes HTTP salientes compartidos durante toda la vida de la app
+    app.state.http_clients = http_clients
+    # Escritura por lotes del historial de notificaciones
+    notification_log = get_notification_log()
+    await notification_log.start()
+    # Trabajo en segundo plano que solo debe ejecutar un worker: lo arranca el elegido líder
+    leader = LeaderElection(get_state_store(), "background", start_background, stop_background)
+    app.state.leader = leader
+    await leader.start()
+    # web3 y eth_account, fuera del camino de arranque
+    if os.getenv("PRELOAD_MODULES", "true").lower() == "true":
+        app.state.preload = asyncio.create_task(asyncio.to_thread(preload_modules))
     yield
     # Shutdown
     logger.info("🔄 Cerrando GreenLedger Protocol API...")
+    await leader.stop()
+    await notification_log.stop()
+    get_signature_verifier().shutdown()
+    await http_clients.aclose()
+
+async def start_background() -> None:
+    """Entrega de notificaciones, tareas programadas e indexador de eventos (worker líder)"""
+    # Workers que entregan las notificaciones encoladas por las rutas de cualquier worker
+    await get_notification_outbox().start()
+    # Tareas programadas del relayer (recompensas mensuales, scores, verificación)
+    if os.getenv("EVVM_SCHEDULER_ENABLED", "true").lower() == "true":
+        await get_evvm_relayer().start()
+    # Indexador de eventos de los contratos (CHAIN_INDEXER_ENABLED)
+    chain_indexer = get_chain_indexer()
+    if chain_indexer is not None:
+        # Los eventos indexados invalidan las vistas cacheadas a las que afectan;
+        # en los demás workers las vistas caducan con el bloque
+        chain_indexer.subscribe(get_web3_utils().view_cache.on_event)
+        await chain_indexer.start()
+
+async def stop_background() -> None:
+    if os.getenv("EVVM_SCHEDULER_ENABLED", "true").lower() == "true":
+        await get_evvm_relayer().stop()
+    chain_indexer = get_chain_indexer()
+    if chain_indexer is not None:
+        await chain_indexer.stop()
+    await get_notification_outbox().stop()
 
-# Crear aplicación FastAPI
-app = FastAPI(
-    title="🌿 GreenLedger Protocol API",
-    description="Sistema de scoring de sostenibilidad con recompensas automatizadas",
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc",
-    lifespan=lifespan
-)
-
-# Configurar CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # En producción usar dominios específicos
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Inicializar servicios
-lighthouse_service = LighthouseService()
-reward_service = RewardService()
-notification_service = NotificationService()
-evvm_relayer = EVVMRelayer()
-
-# Incluir rutas
-app.include_router(datacoins.router, prefix="/api/v1/datacoins", tags=["DataCoins"])
-app.include_router(rewards.router, prefix="/api/v1/rewards", tags=["Rewards"])
-app.include_router(scores.router, prefix="/api/v1/scores", tags=["Scores"])
-app.include_router(wallet.router, prefix="/api/v1/wallet", tags=["Wallet"])
-app.include_router(empresas.router, prefix="/api/v1/empresas", tags=["Empresas"])
-
-@app.get("/", response_class=HTMLResponse)
 async def root():
     """Página principal con información del protocolo"""
     return """
@@ -131,13 +160,12 @@ async def root():
     </html>
     """
 
-@app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Endpoint de salud del sistema"""
     try:
         # Verificar conexión a servicios críticos
-        lighthouse_status = await lighthouse_service.check_health()
-        reward_status = await reward_service.check_health()
+        lighthouse_status = await get_lighthouse_service().check_health()
+        reward_status = await get_reward_service().check_health()
         
         return {
             "status": "healthy",
@@ -145,8 +173,13 @@ async def health_check():
             "services": {
                 "lighthouse": lighthouse_status,
                 "rewards": reward_status,
-                "notifications": "active",
-                "evvm_relayer": "active"
+                "notifications": "active" if get_notification_outbox().running else "queued_only",
+                "evvm_relayer": "active" if get_evvm_relayer().scheduler.running else "idle"
+            },
+            "worker": {
+                "id": worker_id(),
+                "leader": request.app.state.leader.is_leader,
+                "state_backend": get_state_store().backend
             },
             "timestamp": "2024-10-11T00:00:00Z"
         }
@@ -154,11 +187,55 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
+def create_app() -> FastAPI:
+    """
+    Construye la aplicación FastAPI
+    
+    No crea servicios ni abre conexiones: las rutas usan las instancias
+    compartidas (`get_*`) y el lifespan arranca los workers. Sirve como
+    factoría de uvicorn (`uvicorn --factory api.server:create_app`).
+    """
+    app = FastAPI(
+        title="🌿 GreenLedger Protocol API",
+        description="Sistema de scoring de sostenibilidad con recompensas automatizadas",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        lifespan=lifespan
+    )
+    
+    # Configurar CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # En producción usar dominios específicos
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Incluir rutas
+    app.include_router(datacoins.router, prefix="/api/v1/datacoins", tags=["DataCoins"])
+    app.include_router(rewards.router, prefix="/api/v1/rewards", tags=["Rewards"])
+    app.include_router(scores.router, prefix="/api/v1/scores", tags=["Scores"])
+    app.include_router(wallet.router, prefix="/api/v1/wallet", tags=["Wallet"])
+    app.include_router(empresas.router, prefix="/api/v1/empresas", tags=["Empresas"])
+    app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["Notifications"])
+    
+    app.get("/", response_class=HTMLResponse)(root)
+    app.get("/health")(health_check)
+    return app
+
+# Aplicación por defecto para `uvicorn api.server:app`
+app = create_app()
+
 if __name__ == "__main__":
+    import uvicorn
+    
     # Configuración del servidor
     host = os.getenv("API_HOST", "0.0.0.0")
     port = int(os.getenv("API_PORT", 8000))
-    debug = os.getenv("DEBUG", "True").lower() == "true"
+    # Recarga solo en desarrollo (DEBUG=true); en producción, `python serve.py`
+    debug = os.getenv("DEBUG", "false").lower() == "true"
     
     uvicorn.run(
         "server:app",
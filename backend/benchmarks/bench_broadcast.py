@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Alerta del sistema secuencial vs motor de difusión
+
+Envía una misma alerta a 10k destinatarios contra un proveedor HTTP local
+(el `FakeChannelServer` de bench_notification_outbox.py) de tres formas:
+
+- secuencial: el `broadcast_system_alert` anterior (una `Notification` y una
+  entrega esperada por destinatario); se mide una muestra y se extrapola
+- concurrente: `BroadcastEngine` con hasta `--concurrency` envíos simultáneos
+- por lotes: `BroadcastEngine` con la API multicast del canal (un POST por
+  lote de `--batch-size` destinatarios)
+
+Uso:
+    python benchmarks/bench_broadcast.py --recipients 10000 --latency 0.05 --concurrency 25
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from bench_notification_outbox import FakeChannelServer
+from services.broadcast_engine import BroadcastEngine
+from services.notification_outbox import TokenBucket
+from services.notification_service import Notification, NotificationChannel, NotificationType
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=10_000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latencia del proveedor falso en segundos")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=0.0, help="Límite del canal en llamadas/s (0 = sin límite)")
+    parser.add_argument("--sequential-sample", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    fake = FakeChannelServer(args.latency, args.fail_rate)
+    base_url = await fake.start()
+    client = httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=args.concurrency))
+    recipients = [f"empresa_{i}" for i in range(args.recipients)]
+    message = "Mantenimiento programado del protocolo el domingo a las 02:00 UTC"
+    
+    async def post(body) -> str:
+        response = await client.post("/send", json=body)
+        response.raise_for_status()
+        return str(response.json()["result"]["message_id"])
+    
+    # Camino anterior: una Notification y una entrega esperada por destinatario
+    sample = min(args.sequential_sample, args.recipients)
+    start = time.perf_counter()
+    for recipient_id in recipients[:sample]:
+        notification = Notification(
+            recipient_id=recipient_id,
+            channel=NotificationChannel.TELEGRAM,
+            type=NotificationType.SYSTEM_ALERT,
+            title="🚨 Alerta del Sistema",
+            message=message
+        )
+        try:
+            await post(notification.model_dump(mode="json"))
+        except httpx.HTTPStatusError:
+            pass
+    sequential_total = (time.perf_counter() - start) / sample * args.recipients
+    
+    template = Notification(recipient_id="", channel=NotificationChannel.TELEGRAM, type=NotificationType.SYSTEM_ALERT,
+                            title="🚨 Alerta del Sistema", message=message).model_dump(mode="json")
+    
+    async def send_one(recipient_id):
+        return await post(dict(template, recipient_id=recipient_id))
+    
+    async def send_batch(recipient_ids):
+        return await post(dict(template, recipient_ids=recipient_ids))
+    
+    engine = BroadcastEngine(concurrency=args.concurrency, batch_size=args.batch_size)
+    print(f"📊 {args.recipients} destinatarios, proveedor {args.latency * 1000:.0f} ms, concurrencia {args.concurrency}")
+    print(f"   {'estrategia':<14}{'primer resultado ms':>21}{'total s':>9}{'entregas/s':>12}{'fallidas':>10}{'llamadas':>10}")
+    print(f"   {'secuencial':<14}{args.latency * 1000:>21.0f}{sequential_total:>9.1f}"
+          f"{args.recipients / sequential_total:>12.0f}{'-':>10}{'-':>10}  (extrapolado de {sample})")
+    
+    for name, batch in (("concurrente", None), ("por lotes", send_batch)):
+        bucket = TokenBucket(args.rate, max(1, int(args.rate))) if args.rate > 0 else None
+        calls_before = fake.received
+        first = None
+        failed = 0
+        start = time.perf_counter()
+        async for result in engine.broadcast(recipients, send_one, batch, bucket):
+            if first is None:
+                first = time.perf_counter() - start
+            failed += not result["success"]
+        total = time.perf_counter() - start
+        print(f"   {name:<14}{first * 1000:>21.0f}{total:>9.2f}{args.recipients / total:>12.0f}"
+              f"{failed:>10}{fake.received - calls_before:>10}")
+    
+    await client.aclose()
+    await fake.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
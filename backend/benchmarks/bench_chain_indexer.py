@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Indexador de eventos de los contratos
+
+Historial sintético: `--companies` empresas registradas, `--metrics`
+métricas y unos cuantos scores por empresa repartidos en `--blocks`
+bloques. Mide:
+
+- indexación completa con `eth_getLogs` por tramos, uno a uno y con
+  `--concurrency` tramos a la vez
+- consultas al índice (ranking, todas las empresas, métricas) frente a una
+  vista del contrato (`--latency` por llamada, sin paginar)
+- un reorg de `--reorg-depth` bloques: tiempo de rollback y comparación con
+  un índice reconstruido desde cero sobre la nueva cadena
+
+Sin `--rpc` arranca un nodo JSON-RPC falso en proceso (`--latency`
+segundos por petición, como mucho `--max-logs` logs por `eth_getLogs`).
+Con `--rpc` usa un nodo local: despliega un contrato que emite los
+eventos del contrato maestro, siembra el historial con transacciones
+(una por bloque) y provoca el reorg con `evm_snapshot`/`evm_revert`.
+
+Uso:
+    npx hardhat node
+    python benchmarks/bench_chain_indexer.py --rpc http://127.0.0.1:8545 --companies 200 --metrics 5
+    python benchmarks/bench_chain_indexer.py --blocks 200000 --companies 2000 --metrics 20
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+from bisect import bisect_left, bisect_right
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eth_abi import encode
+
+from services.http_clients import http_clients
+from services.chain_indexer import ChainIndex, ChainIndexer, event_topic
+
+# Cuenta #0 de Anvil y Hardhat (clave de desarrollo conocida, sin fondos reales)
+DEV_PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+
+# Contrato que emite LOG2(topic0, topic1, datos) con calldata = topic0 | topic1 | datos
+EMITTER_INITCODE = "0x6016600c60003960166000f3" + "3660409003806040600037600035602035916000a200"
+
+MASTER = "0x" + "4d" * 20
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def synthetic_events(companies: int, metrics: int, blocks: int, seed: int = 7):
+    """(bloque, topic0, topic1, datos) en orden de cadena: registros al principio, métricas y scores después"""
+    rng = random.Random(seed)
+    wallets = [f"0x{i + 1:040x}" for i in range(companies)]
+    register_until = max(2, blocks // 10)
+    events = [(rng.randint(1, register_until - 1), "EmpresaRegistrada", wallet,
+               encode(["string", "string", "string"], [f"Empresa {i}", "energia", "ES"]))
+              for i, wallet in enumerate(wallets)]
+    for wallet in wallets:
+        for _ in range(metrics):
+            events.append((rng.randint(register_until, blocks), "MetricaRegistrada", wallet,
+                           encode(["string", "uint256", "string"], ["carbon_emissions", rng.randint(1, 10000), "kg_co2"])))
+        for _ in range(max(1, metrics // 5)):
+            events.append((rng.randint(register_until, blocks), "ScoreActualizado", wallet,
+                           encode(["uint256"], [rng.randint(0, 1000)])))
+    events.sort(key=lambda event: event[0])
+    return [(block, event_topic(name), "0x" + "00" * 12 + wallet[2:], data) for block, name, wallet, data in events]
+
+class FakeNode:
+    """Nodo JSON-RPC HTTP/1.1 keep-alive (también lotes) con un historial de logs y reorgs a demanda"""
+    
+    def __init__(self, events, head: int, latency: float, max_logs: int):
+        self.latency = latency
+        self.max_logs = max_logs
+        self.head = head
+        self.fork = 0
+        self.fork_from = head + 1
+        self.requests = 0
+        self._set(events)
+    
+    def _set(self, events) -> None:
+        self.events = events
+        self.blocks = [event[0] for event in events]
+    
+    def block_hash(self, number: int) -> str:
+        fork = self.fork if number >= self.fork_from else 0
+        return f"0x{fork:02x}{number:062x}"
+    
+    def reorg(self, depth: int, replacement) -> None:
+        """Sustituye los últimos `depth` bloques por otra rama con `replacement` eventos"""
+        self.fork += 1
+        self.fork_from = self.head - depth + 1
+        kept = self.events[:bisect_left(self.blocks, self.fork_from)]
+        self._set(kept + sorted(replacement, key=lambda event: event[0]))
+    
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+    
+    def _logs(self, query: dict) -> list:
+        start, end = int(query["fromBlock"], 16), int(query["toBlock"], 16)
+        low, high = bisect_left(self.blocks, start), bisect_right(self.blocks, end)
+        if high - low > self.max_logs:
+            raise ValueError(f"query returned more than {self.max_logs} results")
+        logs, previous, index = [], None, 0
+        for block, topic0, topic1, data in self.events[low:high]:
+            index = index + 1 if block == previous else 0
+            previous = block
+            logs.append({
+                "address": MASTER, "topics": [topic0, topic1], "data": "0x" + data.hex(),
+                "blockNumber": hex(block), "blockHash": self.block_hash(block), "logIndex": hex(index),
+                "transactionHash": f"0x{block:056x}{index:08x}", "removed": False
+            })
+        return logs
+    
+    def _answer(self, request: dict) -> dict:
+        method, params = request["method"], request["params"]
+        try:
+            if method == "eth_blockNumber":
+                result = hex(self.head)
+            elif method == "eth_getBlockByNumber":
+                number = int(params[0], 16)
+                result = {"number": params[0], "hash": self.block_hash(number)} if number <= self.head else None
+            elif method == "eth_getLogs":
+                result = self._logs(params[0])
+            else:
+                return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "method not found"}}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32005, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                payload = json.loads(await reader.readexactly(length))
+                await asyncio.sleep(self.latency)
+                self.requests += 1
+                reply = [self._answer(item) for item in payload] if isinstance(payload, list) else self._answer(payload)
+                body = json.dumps(reply).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: "
+                             + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+class LocalChain:
+    """Nodo local (Hardhat/Anvil): el historial se siembra con transacciones a un emisor de eventos"""
+    
+    def __init__(self, rpc_url: str):
+        from web3 import Web3
+        from eth_account import Account
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.account = Account.from_key(DEV_PRIVATE_KEY)
+        self.nonce = self.w3.eth.get_transaction_count(self.account.address)
+        self.chain_id = self.w3.eth.chain_id
+        self.gas_price = self.w3.eth.gas_price
+        self.address = self.w3.eth.get_transaction_receipt(self._send(None, EMITTER_INITCODE))["contractAddress"]
+    
+    def _send(self, to, data: str):
+        tx = {"from": self.account.address, "data": data, "gas": 200000, "gasPrice": self.gas_price,
+              "nonce": self.nonce, "chainId": self.chain_id}
+        if to is not None:
+            tx["to"] = to
+        self.nonce += 1
+        return self.w3.eth.send_raw_transaction(self.account.sign_transaction(tx).raw_transaction)
+    
+    def emit(self, events) -> None:
+        last = None
+        for _, topic0, topic1, data in events:
+            last = self._send(self.address, topic0 + topic1[2:] + data.hex())
+        if last is not None:
+            self.w3.eth.wait_for_transaction_receipt(last)
+    
+    def mine(self, blocks: int) -> None:
+        self.w3.provider.make_request("hardhat_mine", [hex(blocks)])
+    
+    def snapshot(self) -> str:
+        return self.w3.provider.make_request("evm_snapshot", [])["result"]
+    
+    def revert(self, snapshot: str) -> None:
+        self.w3.provider.make_request("evm_revert", [snapshot])
+        self.nonce = self.w3.eth.get_transaction_count(self.account.address)
+
+def branch_events(wallets, count: int, first_block: int, depth: int, seed: int):
+    rng = random.Random(seed)
+    return [(first_block + rng.randrange(depth), event_topic("MetricaRegistrada"), "0x" + "00" * 12 + rng.choice(wallets)[2:],
+             encode(["string", "uint256", "string"], ["carbon_emissions", rng.randint(1, 10000), "kg_co2"]))
+            for _ in range(count)]
+
+async def index_from_scratch(rpc_url: str, address: str, directory: str, name: str, concurrency: int, range_size: int):
+    indexer = ChainIndexer(rpc_url, [address], ChainIndex(os.path.join(directory, f"{name}.sqlite")), start_block=0,
+                           range_size=range_size, concurrency=concurrency, confirmations=0, poll_interval=1.0)
+    start = time.perf_counter()
+    applied = await indexer.sync()
+    return indexer, applied, time.perf_counter() - start
+
+def time_queries(label: str, query, rounds: int = 500) -> None:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        query()
+        latencies.append(time.perf_counter() - start)
+    print(f"   {label:<40} p50 {percentile(latencies, 0.5) * 1000:>6.2f} ms  p99 {percentile(latencies, 0.99) * 1000:>6.2f} ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rpc", help="Nodo local (Hardhat/Anvil); sin él se usa un nodo falso en proceso")
+    parser.add_argument("--blocks", type=int, default=200000)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--metrics", type=int, default=20, help="Métricas por empresa")
+    parser.add_argument("--range-size", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia por petición del nodo falso")
+    parser.add_argument("--max-logs", type=int, default=10000, help="Logs máximos por eth_getLogs del nodo falso")
+    parser.add_argument("--reorg-depth", type=int, default=12)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp(prefix="bench-indexer-")
+    
+    node = chain = None
+    if args.rpc:
+        chain = LocalChain(args.rpc)
+        events = synthetic_events(args.companies, args.metrics, args.companies * (args.metrics + 2))
+        print(f"🌱 Sembrando {len(events)} eventos en {args.rpc} (una transacción por bloque)...")
+        chain.emit(events)
+        rpc_url, address = args.rpc, chain.address
+        label = f"nodo {rpc_url}"
+    else:
+        events = synthetic_events(args.companies, args.metrics, args.blocks)
+        node = FakeNode(events, args.blocks, args.latency, args.max_logs)
+        rpc_url, address = await node.start(), MASTER
+        label = f"nodo falso, {args.latency * 1000:.0f} ms por petición, máx. {args.max_logs} logs por eth_getLogs"
+    
+    print(f"📊 {len(events)} eventos, {args.companies} empresas, {label}")
+    indexer = None
+    for concurrency in (1, args.concurrency):
+        indexer, applied, elapsed = await index_from_scratch(
+            rpc_url, address, directory, f"c{concurrency}", concurrency, args.range_size
+        )
+        stats = indexer.stats()
+        print(f"   indexación, {concurrency} tramo(s) a la vez {elapsed:>8.2f} s  {applied / elapsed:>8.0f} eventos/s  "
+              f"{stats['blocks_scanned'] / elapsed:>9.0f} bloques/s  {stats['rpc_requests']:>5} peticiones  "
+              f"{stats['range_splits']} tramos partidos")
+    
+    index = indexer.index
+    wallets = [f"0x{i + 1:040x}" for i in range(args.companies)]
+    _, deep_cursor = index.ranking(args.companies // 2)
+    print(f"   vista del contrato (nodo)                p50 ≥ {args.latency * 1000:>5.2f} ms por llamada, sin paginar")
+    time_queries("ranking, primera página (100)", lambda: index.ranking(100))
+    time_queries(f"ranking, página en la posición {args.companies // 2}", lambda: index.ranking(100, deep_cursor))
+    time_queries("todas las empresas, primera página (100)", lambda: index.empresas(100))
+    rng = random.Random(3)
+    time_queries("métricas de una empresa", lambda: index.metricas(rng.choice(wallets), 100))
+    
+    if node is not None:
+        head = node.head
+        node.reorg(args.reorg_depth, branch_events(wallets, args.reorg_depth * 3, head - args.reorg_depth + 1, args.reorg_depth, 11))
+    else:
+        snapshot = chain.snapshot()
+        chain.emit(branch_events(wallets, args.reorg_depth, 0, 1, 5))
+        await indexer.sync()
+        chain.revert(snapshot)
+        chain.emit(branch_events(wallets, args.reorg_depth, 0, 1, 13))
+    requests = indexer.stats()["rpc_requests"]
+    start = time.perf_counter()
+    await indexer.sync()
+    elapsed = time.perf_counter() - start
+    requests = indexer.stats()["rpc_requests"] - requests
+    fresh, _, _ = await index_from_scratch(rpc_url, address, directory, "fresh", args.concurrency, args.range_size)
+    same = (index.ranking(args.companies)[0] == fresh.index.ranking(args.companies)[0]
+            and index.counts() == fresh.index.counts())
+    print(f"   reorg de {args.reorg_depth} bloques: rollback y reindexado {elapsed * 1000:>7.1f} ms ({requests} peticiones)  "
+          f"reorgs detectados {indexer.reorgs}  igual que reindexar desde cero: {'sí' if same else 'NO'}")
+    
+    await http_clients.aclose()
+    if node is not None:
+        node.server.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
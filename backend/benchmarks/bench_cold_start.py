@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Arranque en frío de la API
+
+Cada medida se hace en un proceso nuevo, sin red (RPC_URL apunta a un
+puerto local cerrado):
+
+- importación: tiempo de `import api.server`, perfil `-X importtime` de
+  sus dependencias directas y qué módulos lentos (web3, eth_account,
+  eth_abi) quedan cargados tras importarla
+- listo: desde lanzar `uvicorn api.server:app` hasta la primera respuesta
+  de `GET /` (lifespan incluido)
+- diferido: lo que cuesta importar web3, eth_account y eth_abi, que la
+  API ya no paga al arrancar (se precargan en segundo plano)
+
+Uso:
+    python benchmarks/bench_cold_start.py --runs 5 --top 15
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import http.client
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("web3", "eth_account", "eth_abi")
+
+def environment() -> dict:
+    env = dict(os.environ)
+    env["RPC_URL"] = "http://127.0.0.1:9"
+    return env
+
+def python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=BACKEND, env=environment(),
+                          capture_output=True, text=True, check=True)
+
+def timed_process(code: str) -> float:
+    start = time.perf_counter()
+    python(code)
+    return time.perf_counter() - start
+
+def timed_import(modules: str) -> float:
+    code = f"import time; start = time.perf_counter(); import {modules}; print(time.perf_counter() - start)"
+    return float(python(code).stdout.strip().splitlines()[-1])
+
+def importtime_profile():
+    """Dependencias directas de api.server por tiempo acumulado y módulos lentos cargados"""
+    code = f"import sys, api.server; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = python(code, "-X", "importtime")
+    # Cada módulo aparece después de los que importa, con un nivel más de sangría
+    waiting, direct = {}, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        children = waiting.pop(depth + 1, [])
+        if name.strip() == "api.server":
+            direct = children
+        waiting.setdefault(depth, []).append((name.strip(), int(own), int(cumulative)))
+    lines = result.stdout.splitlines()
+    loaded = [module for module in lines[-1].split(",") if module] if lines else []
+    return sorted(direct, key=lambda entry: -entry[2]), loaded
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def time_to_ready(timeout: float = 30.0) -> float:
+    """Segundos desde lanzar uvicorn hasta el primer 200 de GET /"""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "api.server:app", "--port", str(port), "--log-level", "warning"],
+                               cwd=BACKEND, env=environment(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn terminó con código {process.returncode}")
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", "/")
+                if connection.getresponse().status == 200:
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("uvicorn no respondió a tiempo")
+    finally:
+        process.terminate()
+        process.wait()
+
+def summary(values) -> str:
+    return f"mediana {statistics.median(values) * 1000:>7.0f} ms  (mín {min(values) * 1000:.0f}, máx {max(values) * 1000:.0f})"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Dependencias directas de api.server a mostrar")
+    args = parser.parse_args()
+    
+    print(f"📊 Arranque en frío, {args.runs} procesos por medida")
+    interpreter = [timed_process("pass") for _ in range(args.runs)]
+    print(f"   proceso python vacío          {summary(interpreter)}")
+    imports = [timed_import("api.server") for _ in range(args.runs)]
+    print(f"   import api.server             {summary(imports)}")
+    ready = [time_to_ready() for _ in range(args.runs)]
+    print(f"   uvicorn listo (GET /)         {summary(ready)}")
+    deferred = [timed_import(", ".join(HEAVY_MODULES)) for _ in range(args.runs)]
+    print(f"   diferido: {', '.join(HEAVY_MODULES):<19} {summary(deferred)}")
+    
+    direct, loaded = importtime_profile()
+    print(f"   módulos lentos cargados tras importar api.server: {', '.join(loaded) or 'ninguno'}")
+    print("   -X importtime, dependencias directas de api.server (acumulado / propio):")
+    for name, own, cumulative in direct[:args.top]:
+        print(f"   {name:<40}{cumulative / 1000:>8.1f} ms {own / 1000:>8.1f} ms")
+
+if __name__ == "__main__":
+    main()
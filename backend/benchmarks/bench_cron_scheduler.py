@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Planificador cron con montículo vs sondeo periódico
+
+Para 1k y 10k tareas programadas mide:
+
+- coste de `CronExpression.next_after` y de programar todas las tareas
+- un ciclo de sondeo clásico (`while True: sleep(1)` recorriendo todas las
+  tareas y evaluando si vencen): CPU por tic y retraso medio de disparo
+- `CronScheduler`: las ejecuciones se reparten en `--span` segundos y se mide
+  el retraso real de disparo, los despertares del bucle y la CPU consumida;
+  después, los despertares con todas las tareas lejos en el futuro
+
+Uso:
+    python benchmarks/bench_cron_scheduler.py --sizes 1000 10000 --span 5
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cron_scheduler import CronExpression, CronScheduler
+
+EXPRESSIONS = ("0 0 1 * *", "0 2 * * *", "0 */6 * * *", "*/15 9-17 * * mon-fri", "30 8 * jan,jul sun")
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def bench_next_after(repeat: int = 20000) -> None:
+    now = datetime.now(timezone.utc)
+    print(f"📊 next_after ({repeat} llamadas por expresión)")
+    for expression in EXPRESSIONS:
+        cron = CronExpression(expression)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            cron.next_after(now)
+        print(f"   {expression:<24}{(time.perf_counter() - start) / repeat * 1e6:>8.1f} µs")
+
+def polling_tick(jobs, now: datetime) -> int:
+    """Un tic del sondeo clásico: evalúa cada tarea contra la hora actual"""
+    due = 0
+    for job in jobs:
+        if job["next"] <= now:
+            job["next"] = job["cron"].next_after(now)
+            due += 1
+    return due
+
+async def bench_scheduler(size: int, span: float) -> None:
+    # Sondeo clásico
+    now = datetime.now(timezone.utc)
+    jobs = [{"cron": CronExpression(EXPRESSIONS[i % len(EXPRESSIONS)]), "next": now + timedelta(hours=1)} for i in range(size)]
+    start = time.process_time()
+    ticks = 20
+    for _ in range(ticks):
+        polling_tick(jobs, datetime.now(timezone.utc))
+    poll_cpu = (time.process_time() - start) / ticks * 1000
+    
+    # Montículo
+    scheduler = CronScheduler(max_concurrent=64, misfire_grace=60)
+    lags = []
+    fire_times = {}
+    
+    def make_job(job_id):
+        async def job():
+            lags.append(time.time() - fire_times[job_id])
+        return job
+    
+    start = time.perf_counter()
+    for i in range(size):
+        scheduler.add(f"job_{i}", EXPRESSIONS[i % len(EXPRESSIONS)], make_job(f"job_{i}"))
+    add_time = (time.perf_counter() - start) * 1000
+    
+    # Reprograma las próximas ejecuciones repartidas en `span` segundos
+    base = datetime.now(timezone.utc) + timedelta(seconds=0.5)
+    for i in range(size):
+        job = scheduler._jobs[f"job_{i}"]
+        job.generation += 1
+        fire = base + timedelta(seconds=span * i / size)
+        fire_times[job.id] = fire.timestamp()
+        scheduler._push(job, fire)
+    
+    await scheduler.start()
+    cpu_start = time.process_time()
+    while len(lags) < size:
+        await asyncio.sleep(0.1)
+    cpu = time.process_time() - cpu_start
+    busy_wakeups = scheduler.wakeups
+    
+    # Todas las tareas lejos en el futuro: el bucle no debería despertar
+    await asyncio.sleep(3)
+    idle_wakeups = scheduler.wakeups - busy_wakeups
+    await scheduler.stop()
+    
+    print(f"\n📊 {size} tareas")
+    print(f"   programar todas              {add_time:>9.1f} ms ({add_time / size * 1000:.1f} µs/tarea)")
+    print(f"   sondeo cada 1 s              {poll_cpu:>9.2f} ms de CPU por tic, retraso medio ~500 ms")
+    print(f"   montículo: retraso p50/p99   {percentile(lags, 0.5) * 1000:>9.2f} / {percentile(lags, 0.99) * 1000:.2f} ms")
+    print(f"   montículo: CPU proceso {span:g} s  {cpu * 1000:>9.1f} ms ({cpu / size * 1e6:.0f} µs/disparo)")
+    print(f"   montículo: despertares       {busy_wakeups:>9} con disparos, {idle_wakeups} en 3 s sin vencimientos")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--span", type=float, default=5.0, help="Segundos en los que se reparten los disparos")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    bench_next_after()
+    for size in args.sizes:
+        await bench_scheduler(size, args.span)
+
+if __name__ == "__main__":
+    asyncio.run(main())
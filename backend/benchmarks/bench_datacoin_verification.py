@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Verificación de Data Coins secuencial vs concurrente
+
+Con `--coins` Data Coins pendientes repartidos entre `--companies` empresas
+y un Lighthouse local falso que responde tras `--latency` segundos, mide:
+
+- el recorrido anterior: un Data Coin tras otro y una confirmación por
+  Data Coin (se mide una muestra y se extrapola)
+- `EVVMRelayer.execute_data_verification` completo (ventana acotada,
+  puntos de control y una confirmación por empresa) para cada `--windows`
+
+Uso:
+    python benchmarks/bench_datacoin_verification.py --coins 100000 --latency 0.02 --windows 8 32
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["GREENLEDGER_DATA_DIR"] = tempfile.mkdtemp(prefix="bench_datacoin_")
+
+from bench_notification_outbox import FakeChannelServer
+from services.evvm_relayer import EVVMRelayer
+
+METRIC_TYPES = ("carbon_emissions", "energy_consumption", "water_usage", "waste_generated")
+
+def make_datacoins(count: int, companies: int):
+    return [
+        {
+            "company_id": f"empresa_{i % companies:05d}",
+            "metric_type": METRIC_TYPES[i % len(METRIC_TYPES)],
+            "lighthouse_hash": f"QmBench{i:010d}",
+            "uploaded_at": "2026-10-01T00:00:00Z"
+        }
+        for i in range(count)
+    ]
+
+def make_relayer(base_url: str, datacoins, window: int) -> EVVMRelayer:
+    relayer = EVVMRelayer()
+    relayer.verification_pipeline.window = window
+    lighthouse = relayer.lighthouse_service
+    
+    # Lighthouse local: cada verificación es una petición HTTP real al servidor falso
+    async def verify_integrity(hash_value: str) -> bool:
+        response = await lighthouse.client.get(f"{base_url}/verify/{hash_value}")
+        return response.status_code == 200
+    
+    async def pending_datacoins():
+        return datacoins
+    
+    lighthouse._mock_verify_integrity = verify_integrity
+    relayer._get_pending_datacoins = pending_datacoins
+    return relayer
+
+async def sequential(relayer: EVVMRelayer, datacoins) -> int:
+    """Recorrido anterior: una verificación y una confirmación por Data Coin"""
+    notifications = 0
+    for datacoin in datacoins:
+        result = await relayer.lighthouse_service.verify_datacoin(datacoin["lighthouse_hash"])
+        if result["success"] and result["verified"]:
+            await relayer.notification_service.send_datacoin_batch_confirmation(
+                datacoin["company_id"], {datacoin["metric_type"]: 1}, [datacoin["lighthouse_hash"]]
+            )
+            notifications += 1
+    return notifications
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=100_000)
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia del Lighthouse falso en segundos")
+    parser.add_argument("--windows", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--sequential-sample", type=int, default=200, help="Data Coins a medir en secuencia")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    fake = FakeChannelServer(args.latency, 0.0)
+    base_url = await fake.start()
+    datacoins = make_datacoins(args.coins, args.companies)
+    
+    relayer = make_relayer(base_url, datacoins, 1)
+    sample = datacoins[:args.sequential_sample]
+    start = time.perf_counter()
+    await sequential(relayer, sample)
+    per_coin = (time.perf_counter() - start) / len(sample)
+    
+    print(f"📊 {args.coins} Data Coins, {args.companies} empresas, Lighthouse a {args.latency * 1000:.0f} ms")
+    print(f"   secuencial (estimado)      {per_coin * args.coins:>9.1f} s   {1 / per_coin:>8.0f} Data Coins/s   {args.coins} confirmaciones")
+    
+    for window in args.windows:
+        relayer = make_relayer(base_url, datacoins, window)
+        # Cada ventana parte de cero: sin ejecución previa que reanudar
+        relayer.checkpoints._db.execute("DELETE FROM job_runs")
+        relayer.checkpoints._db.execute("DELETE FROM job_units")
+        relayer.checkpoints._db.commit()
+        start = time.perf_counter()
+        result = await relayer.execute_data_verification()
+        elapsed = time.perf_counter() - start
+        assert result["success"] and result["verified"] == args.coins, result
+        effective = relayer.verification_pipeline._effective_window()
+        print(f"   ventana {window:<3} (efectiva {effective:<3}) {elapsed:>9.1f} s   {args.coins / elapsed:>8.0f} Data Coins/s   "
+              f"{result['companies_notified']} confirmaciones")
+    
+    await fake.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
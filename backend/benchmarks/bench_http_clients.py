@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Cliente HTTP por llamada vs registro compartido con pool
+
+Levanta un servidor HTTPS local (certificado autofirmado generado con
+`openssl`) que cuenta los handshakes TLS, y lanza la misma carga concurrente
+con dos estrategias:
+
+- por llamada: `async with httpx.AsyncClient()` en cada petición (patrón
+  anterior de `LighthouseService.check_health`)
+- compartido: el cliente del destino en `services.http_clients`
+
+Uso:
+    python benchmarks/bench_http_clients.py --requests 2000 --concurrency 20 --pool-size 10
+"""
+
+import os
+import ssl
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from services.http_clients import HTTPClientRegistry, DestinationProfile
+
+RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 15\r\n\r\n{\"status\":\"ok\"}"
+
+class TLSServer:
+    """Servidor HTTP/1.1 keep-alive mínimo que cuenta handshakes TLS"""
+    
+    def __init__(self, certfile: str, keyfile: str, handshakes):
+        self.context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self.context.load_cert_chain(certfile, keyfile)
+        self.handshakes = handshakes
+    
+    async def serve(self, port_queue):
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0, ssl=self.context)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        with self.handshakes.get_lock():
+            self.handshakes.value += 1
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+def run_server(certfile: str, keyfile: str, handshakes, port_queue):
+    """Proceso separado para que el servidor no compita con el cliente por el GIL"""
+    asyncio.run(TLSServer(certfile, keyfile, handshakes).serve(port_queue))
+
+def self_signed_cert(directory: str):
+    """Genera un certificado autofirmado para 127.0.0.1"""
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", keyfile, "-out", certfile],
+        check=True, capture_output=True
+    )
+    return certfile, keyfile
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+async def run_load(call, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call()
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - start, latencies
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=10, help="max_connections del destino en el registro")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = self_signed_cert(directory)
+        handshakes = multiprocessing.Value("i", 0)
+        port_queue = multiprocessing.Queue()
+        server = multiprocessing.Process(target=run_server, args=(certfile, keyfile, handshakes, port_queue), daemon=True)
+        server.start()
+        url = f"https://127.0.0.1:{port_queue.get(timeout=10)}/api/v0/node/id"
+        verify = ssl.create_default_context(cafile=certfile)
+        
+        async def per_call():
+            async with httpx.AsyncClient(verify=verify) as client:
+                return await client.get(url)
+        
+        await run_load(per_call, args.concurrency, args.concurrency)
+        handshakes.value = 0
+        per_call_total, per_call_latencies = await run_load(per_call, args.requests, args.concurrency)
+        per_call_handshakes = handshakes.value
+        
+        profile = DestinationProfile("bench", max_connections=args.pool_size, max_keepalive_connections=args.pool_size)
+        registry = HTTPClientRegistry({"bench": profile, "default": profile})
+        registry._build_client = lambda p: httpx.AsyncClient(
+            verify=verify,
+            limits=httpx.Limits(max_connections=p.max_connections, max_keepalive_connections=p.max_keepalive_connections)
+        )
+        
+        shared_call = lambda: registry.get("bench").get(url)
+        
+        # Calentamiento: el pool abre sus conexiones una vez y las reutiliza
+        await run_load(shared_call, args.concurrency, args.concurrency)
+        handshakes.value = 0
+        shared_total, shared_latencies = await run_load(shared_call, args.requests, args.concurrency)
+        shared_handshakes = handshakes.value
+        
+        await registry.aclose()
+        server.terminate()
+        server.join()
+    
+    print(f"📊 {args.requests} peticiones HTTPS, concurrencia {args.concurrency}, pool de {args.pool_size} conexiones")
+    print(f"   {'estrategia':<14}{'handshakes':>12}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, total, latencies, handshakes in (
+        ("por llamada", per_call_total, per_call_latencies, per_call_handshakes),
+        ("compartido", shared_total, shared_latencies, shared_handshakes),
+    ):
+        print(f"   {name:<14}{handshakes:>12}{percentile(latencies, 0.50):>10.2f}"
+              f"{percentile(latencies, 0.99):>10.2f}{args.requests / total:>10.0f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Trabajos por lotes con puntos de control
+
+Simula un trabajo de `--units` unidades (pagos o verificaciones) con
+`--latency` segundos por unidad que cae al `--crash-at` del recorrido, y
+compara el coste de recuperarse:
+
+- sin puntos de control: se vuelve a ejecutar todo (y los pagos ya hechos se repetirían)
+- con `JobCheckpointStore`: se reanuda desde el último tramo registrado
+
+También mide el sobrecoste de registrar cada tramo según su tamaño.
+
+Uso:
+    python benchmarks/bench_job_checkpoints.py --units 20000 --latency 0.0005 --crash-at 0.7
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.job_checkpoints import JobCheckpointStore, UNIT_DONE
+
+class Crash(BaseException):
+    """Caída simulada del proceso"""
+
+async def run_job(store: JobCheckpointStore, units, latency: float, batch: int, crash_after=None):
+    """Ejecuta el trabajo con puntos de control y devuelve (unidades ejecutadas, segundos)"""
+    run = store.begin("bench", "bench:202610")
+    pending = run.plan(units)
+    executed = 0
+    start = time.perf_counter()
+    for offset in range(0, len(pending), batch):
+        chunk = pending[offset:offset + batch]
+        run.start_units([key for key, _ in chunk])
+        results = []
+        for key, payload in chunk:
+            if crash_after is not None and executed >= crash_after:
+                raise Crash()
+            await asyncio.sleep(latency)
+            executed += 1
+            results.append((key, UNIT_DONE, {"amount": payload["amount"], "tx_hash": f"0x{key}"}))
+        run.record(results)
+    run.finish({"executed": executed})
+    return executed, time.perf_counter() - start
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=20_000)
+    parser.add_argument("--latency", type=float, default=0.0005, help="Segundos por unidad (p. ej. envío de una transferencia)")
+    parser.add_argument("--crash-at", type=float, default=0.7, help="Fracción del trabajo completada al caer")
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    units = [(f"empresa_{i:06d}", {"amount": "12.345678"}) for i in range(args.units)]
+    crash_after = int(args.units * args.crash_at)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        # Sin puntos de control: tras la caída se repite todo
+        start = time.perf_counter()
+        for _ in range(crash_after + args.units):
+            await asyncio.sleep(args.latency)
+        naive = time.perf_counter() - start
+        
+        store = JobCheckpointStore(os.path.join(directory, "checkpoints.sqlite"))
+        start = time.perf_counter()
+        try:
+            await run_job(store, units, args.latency, args.batch, crash_after)
+        except Crash:
+            pass
+        first = time.perf_counter() - start
+        # Proceso nuevo: otra instancia sobre el mismo fichero
+        store = JobCheckpointStore(store.path)
+        resumed_units, resumed = await run_job(store, units, args.latency, args.batch)
+        unknown = len(store.get("bench:202610").results("unknown"))
+        
+        print(f"📊 {args.units} unidades, caída al {args.crash_at:.0%}, tramos de {args.batch}")
+        print(f"   {'estrategia':<24}{'unidades tras caer':>20}{'tiempo total s':>16}{'repetidas':>11}")
+        print(f"   {'repetir todo':<24}{args.units:>20}{naive:>16.2f}{crash_after:>11}")
+        print(f"   {'reanudar':<24}{resumed_units:>20}{first + resumed:>16.2f}{0:>11}"
+              f"   ({unknown} en curso al caer quedan para conciliar)")
+        
+        # Sobrecoste de registrar tramos
+        print(f"\n   {'tramo':<10}{'µs por unidad registrada':>26}")
+        for batch in (1, 10, 100, 1000):
+            store = JobCheckpointStore(os.path.join(directory, f"overhead_{batch}.sqlite"))
+            start = time.perf_counter()
+            await run_job(store, units, 0, batch)
+            print(f"   {batch:<10}{(time.perf_counter() - start) / args.units * 1e6:>26.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Leaderboard ordenando en cada petición vs índice de ranking
+
+Compara el camino anterior de `RewardService.get_leaderboard` (ordenar todas
+las empresas y cortar el top-k) con `LeaderboardIndex` para rankings de 1k a
+1M empresas: top-k, posición exacta de una empresa, actualización de score y
+página a partir de un cursor. La latencia del índice debe mantenerse plana.
+
+Uso:
+    python benchmarks/bench_leaderboard.py --sizes 1000 10000 100000 1000000 --top 20
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.leaderboard_index import LeaderboardIndex, encode_cursor
+
+def measure(operation, repeats: int) -> float:
+    """Mediana en microsegundos de `repeats` ejecuciones"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(7)
+    
+    print(f"{'empresas':>10}{'carga s':>9}{'sort top-k µs':>15}{'top-k µs':>10}"
+          f"{'rank µs':>9}{'update µs':>11}{'página µs':>11}")
+    for size in args.sizes:
+        scores = {f"empresa_{i}": round(rng.uniform(0, 100), 1) for i in range(size)}
+        company_ids = list(scores)
+        
+        start = time.perf_counter()
+        index = LeaderboardIndex(seed=size)
+        index.bulk_load(scores.items())
+        load_time = time.perf_counter() - start
+        
+        # Camino anterior: ordenar todo en cada petición (menos repeticiones: es O(n log n))
+        items = list(scores.items())
+        sort_time = measure(
+            lambda: sorted(items, key=lambda item: item[1], reverse=True)[:args.top],
+            max(3, min(args.repeats, 2_000_000 // size))
+        )
+        
+        top_time = measure(lambda: index.top(args.top), args.repeats)
+        rank_time = measure(lambda: index.rank(rng.choice(company_ids)), args.repeats)
+        update_time = measure(
+            lambda: index.update(rng.choice(company_ids), round(rng.uniform(0, 100), 1)),
+            args.repeats
+        )
+        
+        def page_at_random_cursor():
+            company_id = rng.choice(company_ids)
+            index.page(args.top, encode_cursor(index.get_score(company_id), company_id))
+        page_time = measure(page_at_random_cursor, args.repeats)
+        
+        # El índice debe seguir coincidiendo con una ordenación completa
+        current = sorted(((-score, company_id) for company_id, score in index._scores.items()))[:args.top]
+        assert [entry[1] for entry in index.top(args.top)] == [company_id for _, company_id in current]
+        
+        print(f"{size:>10}{load_time:>9.2f}{sort_time:>15.0f}{top_time:>10.1f}"
+              f"{rank_time:>9.1f}{update_time:>11.1f}{page_time:>11.1f}")
+
+if __name__ == "__main__":
+    main()
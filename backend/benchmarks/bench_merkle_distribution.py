@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Distribución por raíz Merkle
+
+Construye con `MerkleDistributionStore` el árbol (wallet, importe) de
+distribuciones de 10k a 1M empresas y mide el tiempo de construcción, el
+tamaño en disco y la latencia de servir una prueba (lectura SQLite + mmap).
+Cada prueba servida se verifica contra la raíz.
+
+Uso:
+    python benchmarks/bench_merkle_distribution.py --sizes 10000 100000 1000000 --workers 4
+"""
+
+import os
+import glob
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.merkle_distribution import MerkleDistributionStore, verify_proof
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--proofs", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(7)
+    
+    print(f"{'hojas':>10}{'construcción s':>16}{'árbol MB':>10}{'prueba µs':>11}{'nodos':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        store = MerkleDistributionStore(directory, workers=args.workers)
+        for size in args.sizes:
+            entries = [
+                (f"empresa_{i}", "0x" + rng.getrandbits(160).to_bytes(20, "big").hex(), rng.randint(1, 10**12))
+                for i in range(size)
+            ]
+            epoch = str(size)
+            
+            start = time.perf_counter()
+            summary = store.build(epoch, entries)
+            build_time = time.perf_counter() - start
+            # Una construcción deja un único fichero `<época>.<versión>.tree`
+            tree_size = sum(os.path.getsize(path) for path in glob.glob(os.path.join(directory, f"{epoch}.*.tree"))) / 1e6
+            
+            samples = []
+            claim = None
+            for _ in range(args.proofs):
+                company_id = f"empresa_{rng.randrange(size)}"
+                start = time.perf_counter()
+                claim = store.get_proof(epoch, company_id)
+                samples.append(time.perf_counter() - start)
+                assert verify_proof(
+                    bytes.fromhex(claim["leaf"][2:]),
+                    [bytes.fromhex(node[2:]) for node in claim["proof"]],
+                    bytes.fromhex(summary["root"][2:])
+                )
+            
+            print(f"{size:>10}{build_time:>16.2f}{tree_size:>10.1f}"
+                  f"{statistics.median(samples) * 1e6:>11.1f}{len(claim['proof']):>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Notificaciones sueltas vs resúmenes agrupados
+
+Simula un trabajo por lotes (ingesta de Data Coins + recálculo de EcoScores +
+distribución) en el que cada empresa recibe en pocos segundos
+`--datacoins` confirmaciones de Data Coin, una actualización de score, un
+cambio de ranking y una recompensa. Encola las notificaciones con
+`NotificationService` sobre un outbox temporal y cuenta las llamadas al
+proveedor con y sin ventana de resumen (`NOTIFICATION_DIGEST_WINDOW`).
+
+Uso:
+    python benchmarks/bench_notification_digest.py --companies 2000 --datacoins 7 --window 10 --rate 30
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.notification_outbox import NotificationOutbox
+from services.notification_service import NotificationService
+
+async def nightly_run(companies: int, datacoins: int, window: float, directory: str):
+    calls = 0
+    
+    async def sender(channel, payload):
+        nonlocal calls
+        calls += 1
+        return str(calls)
+    
+    outbox = NotificationOutbox(
+        sender, os.path.join(directory, f"outbox_{window}.sqlite"), workers=16,
+        rates={"telegram": (0, 1)}, coalescer=NotificationService.build_digest
+    )
+    service = NotificationService(outbox)
+    service.digest_window = window
+    await outbox.start()
+    
+    start = time.perf_counter()
+    for n in range(datacoins):
+        for i in range(companies):
+            await service.send_datacoin_confirmation(f"empresa_{i}", "energy_consumption", f"Qm{i:08d}{n:04d}")
+    for i in range(companies):
+        await service.send_score_update_notification(f"empresa_{i}", 81.5, 78.0)
+    for i in range(companies):
+        await service.send_leaderboard_notification(f"empresa_{i}", (i % 50) + 1, (i % 50) + 3)
+    for i in range(companies):
+        await service.send_reward_notification(f"empresa_{i}", 238.09, 81.5)
+    enqueue_time = time.perf_counter() - start
+    
+    while True:
+        counts = outbox.stats()["channels"].get("telegram", {})
+        if counts.get("pending", 0) + counts.get("sending", 0) == 0:
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    stats = outbox.stats()
+    await outbox.stop()
+    return calls, enqueue_time, elapsed, stats["coalescing"]
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--datacoins", type=int, default=7, help="Confirmaciones de Data Coin por empresa")
+    parser.add_argument("--window", type=float, default=10.0, help="Ventana de resumen en segundos")
+    parser.add_argument("--rate", type=float, default=30.0, help="Límite del proveedor para estimar el tiempo de vaciado")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    events = args.datacoins + 3
+    print(f"📊 {args.companies} empresas × {events} eventos = {args.companies * events} notificaciones")
+    print(f"   {'modo':<18}{'llamadas':>10}{'agrupadas':>11}{'resúmenes':>11}{'encolado s':>12}"
+          f"{'total s':>9}{f'vaciado a {args.rate:g}/s':>18}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, window in (("sin resumen", 0.0), (f"ventana {args.window:g}s", args.window)):
+            calls, enqueue_time, elapsed, coalescing = await nightly_run(args.companies, args.datacoins, window, directory)
+            print(f"   {name:<18}{calls:>10}{coalescing['notifications_coalesced']:>11}{coalescing['digests']:>11}"
+                  f"{enqueue_time:>12.2f}{elapsed:>9.2f}{calls / args.rate:>16.0f} s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
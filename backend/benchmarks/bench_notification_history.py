@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Historial de notificaciones
+
+Mide sobre un `NotificationLog` temporal:
+
+- registro: una transacción por notificación vs `record` + escritura por lotes
+- paginación: OFFSET/LIMIT vs cursor, en la primera página y a gran profundidad
+- últimas N: consulta ordenada sobre todo el historial vs anillo en memoria
+- compactación: borrado del tramo fuera de la retención
+
+Uso:
+    python benchmarks/bench_notification_history.py --entries 1000000 --recipients 10000
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.notification_log import NotificationLog, _COLUMNS
+
+TYPES = ("reward_distributed", "score_updated", "datacoin_uploaded", "leaderboard_change", "digest")
+
+def timed(fn, repeat: int) -> float:
+    """Mediana en ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--recipients", type=int, default=10_000)
+    parser.add_argument("--records", type=int, default=20_000, help="Notificaciones registradas en la prueba de escritura")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--days", type=float, default=120, help="Antigüedad de las entradas sintéticas")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(7)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        # Escritura: una transacción por notificación vs búfer + lotes
+        unbatched = NotificationLog(os.path.join(directory, "unbatched.sqlite"))
+        insert = f"INSERT INTO history ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+        start = time.perf_counter()
+        for i in range(args.records):
+            with unbatched._db:
+                unbatched._db.execute(insert, (f"empresa_{i}", "score_updated", "telegram", "t", "m", "delivered", "1", i, time.time()))
+        per_row = (time.perf_counter() - start) / args.records * 1e6
+        
+        batched = NotificationLog(os.path.join(directory, "batched.sqlite"))
+        record_samples = []
+        start = time.perf_counter()
+        for i in range(args.records):
+            t0 = time.perf_counter()
+            batched.record(f"empresa_{i}", "score_updated", "telegram", "t", "m", "delivered", "1", i)
+            record_samples.append(time.perf_counter() - t0)
+        batched.flush()
+        per_record = (time.perf_counter() - start) / args.records * 1e6
+        record_samples.sort()
+        print(f"📊 Registro de {args.records} notificaciones")
+        print(f"   transacción por fila {per_row:>8.1f} µs/notificación")
+        print(f"   record + lotes       {per_record:>8.1f} µs/notificación "
+              f"(p50 {record_samples[len(record_samples) // 2] * 1e6:.1f} µs, "
+              f"p99 {record_samples[int(len(record_samples) * 0.99)] * 1e6:.1f} µs en el camino de envío)")
+        
+        # Historial sintético
+        log = NotificationLog(os.path.join(directory, "history.sqlite"))
+        now = time.time()
+        start = time.perf_counter()
+        chunk = 100_000
+        for offset in range(0, args.entries, chunk):
+            rows = [
+                (f"empresa_{rng.randrange(args.recipients)}", rng.choice(TYPES), "telegram", "título", "mensaje",
+                 "delivered", "1", n, now - rng.random() * args.days * 86400)
+                for n in range(offset, min(args.entries, offset + chunk))
+            ]
+            with log._db:
+                log._db.executemany(insert, rows)
+        print(f"\n📊 {args.entries} entradas, {args.recipients} destinatarios (carga {time.perf_counter() - start:.1f}s)")
+        
+        # Paginación de un destinatario y de un tipo
+        recipient = "empresa_0"
+        per_recipient = log._db.execute("SELECT COUNT(*) FROM history WHERE recipient_id = ?", (recipient,)).fetchone()[0]
+        deep = max(0, per_recipient - args.page_size)
+        cursor = None
+        pages = 0
+        walk_start = time.perf_counter()
+        deep_cursor = None
+        while True:
+            entries, next_cursor = log.page(recipient, args.page_size, cursor)
+            pages += 1
+            if next_cursor is None:
+                break
+            cursor = next_cursor
+            deep_cursor = cursor
+        walk = (time.perf_counter() - walk_start) * 1000
+        offset_query = (
+            f"SELECT id, {', '.join(_COLUMNS)} FROM history WHERE recipient_id = ? "
+            "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        )
+        print(f"   historial de {recipient}: {per_recipient} entradas, {pages} páginas recorridas en {walk:.1f} ms")
+        print(f"   {'consulta':<34}{'offset ms':>11}{'cursor ms':>11}")
+        print(f"   {'primera página (destinatario)':<34}"
+              f"{timed(lambda: [log._to_entry(row) for row in log._db.execute(offset_query, (recipient, args.page_size, 0))], 50):>11.3f}"
+              f"{timed(lambda: log.page(recipient, args.page_size), 50):>11.3f}")
+        print(f"   {'última página (destinatario)':<34}"
+              f"{timed(lambda: [log._to_entry(row) for row in log._db.execute(offset_query, (recipient, args.page_size, deep))], 50):>11.3f}"
+              f"{timed(lambda: log.page(recipient, args.page_size, deep_cursor), 50):>11.3f}")
+        
+        type_count = log._db.execute("SELECT COUNT(*) FROM history WHERE type = 'digest'").fetchone()[0]
+        type_deep = max(0, type_count // 2)
+        mid = log._db.execute(
+            "SELECT timestamp, id FROM history WHERE type = 'digest' ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?",
+            (type_deep,)
+        ).fetchone()
+        type_offset_query = (
+            f"SELECT id, {', '.join(_COLUMNS)} FROM history WHERE type = ? "
+            "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        )
+        print(f"   {f'página {type_deep} de tipo digest':<34}"
+              f"{timed(lambda: [log._to_entry(row) for row in log._db.execute(type_offset_query, ('digest', args.page_size, type_deep))], 10):>11.3f}"
+              f"{timed(lambda: log.page(None, args.page_size, f'{mid[0]!r}:{mid[1]}', 'digest'), 50):>11.3f}")
+        
+        # Últimas N globales
+        fresh = NotificationLog(log.path)
+        latest_query = f"SELECT id, {', '.join(_COLUMNS)} FROM history ORDER BY timestamp DESC, id DESC LIMIT ?"
+        print(f"\n   {'últimas N':<34}{'consulta ms':>11}{'anillo ms':>11}")
+        print(f"   {f'latest({args.page_size})':<34}"
+              f"{timed(lambda: [log._to_entry(row) for row in log._db.execute(latest_query, (args.page_size,))], 50):>11.3f}"
+              f"{timed(lambda: fresh.latest(args.page_size), 50):>11.3f}")
+        
+        # Compactación a 90 días
+        start = time.perf_counter()
+        removed = log.compact(90)
+        print(f"\n   compactación a 90 días: {removed} entradas en {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
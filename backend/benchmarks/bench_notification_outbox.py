@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Notificaciones en línea vs outbox con workers
+
+Levanta un servidor HTTP falso que hace de proveedor (Telegram/WhatsApp)
+con latencia y tasa de errores configurables, y compara:
+
+- en línea: la ruta espera cada entrega, como hacía `distribute_rewards`
+- outbox: la ruta solo encola (`NotificationOutbox.enqueue`) y los workers
+  entregan en segundo plano con límite por canal y reintentos
+
+Mide la latencia de encolado (lo que pasa a esperar la petición) y el
+rendimiento de vaciado del outbox hasta que todo queda entregado.
+
+Uso:
+    python benchmarks/bench_notification_outbox.py --notifications 2000 --latency 0.05 --rate 200 --fail-rate 0.05
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from services.notification_outbox import NotificationOutbox
+
+class FakeChannelServer:
+    """Proveedor HTTP/1.1 keep-alive que responde tras `latency` segundos y falla con `fail_rate`"""
+    
+    def __init__(self, latency: float, fail_rate: float, seed: int = 7):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.received = 0
+        self.server = None
+    
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                await asyncio.sleep(self.latency)
+                self.received += 1
+                if self.rng.random() < self.fail_rate:
+                    status, body = b"503 Service Unavailable", b'{"ok":false}'
+                else:
+                    status, body = b"200 OK", b'{"ok":true,"result":{"message_id":1}}'
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Type: application/json\r\nContent-Length: "
+                             + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+    
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notifications", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latencia del proveedor falso en segundos")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="Fracción de respuestas 503")
+    parser.add_argument("--rate", type=float, default=200.0, help="Límite del canal en mensajes/s (0 = sin límite)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--inline-sample", type=int, default=100, help="Notificaciones a medir en línea")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    fake = FakeChannelServer(args.latency, args.fail_rate)
+    base_url = await fake.start()
+    client = httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=args.workers * 2))
+    
+    async def sender(channel, payload):
+        response = await client.post("/send", json=payload)
+        response.raise_for_status()
+        return str(response.json()["result"]["message_id"])
+    
+    payload = {"recipient_id": "empresa_1", "channel": "telegram", "type": "reward_distributed",
+               "title": "🎉 ¡Nueva Recompensa Recibida!", "message": "Has recibido 238.09 PYUSD", "data": {"amount": 238.09}}
+    
+    # En línea: cada notificación espera la respuesta del proveedor (los fallos se pierden)
+    sample = min(args.inline_sample, args.notifications)
+    start = time.perf_counter()
+    for _ in range(sample):
+        try:
+            await sender("telegram", payload)
+        except httpx.HTTPStatusError:
+            pass
+    inline_per_call = (time.perf_counter() - start) / sample
+    
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = NotificationOutbox(
+            sender, os.path.join(directory, "outbox.sqlite"), workers=args.workers,
+            rates={"telegram": (args.rate, max(1, int(args.rate)))}, max_attempts=10, retry_backoff=0.05, max_backoff=1.0
+        )
+        await outbox.start()
+        
+        enqueue_times = []
+        start = time.perf_counter()
+        for _ in range(args.notifications):
+            began = time.perf_counter()
+            outbox.enqueue("telegram", payload)
+            enqueue_times.append(time.perf_counter() - began)
+            # Ceder el loop como lo haría una ruta entre peticiones
+            await asyncio.sleep(0)
+        enqueue_total = time.perf_counter() - start
+        
+        while True:
+            counts = outbox.stats()["channels"].get("telegram", {})
+            if counts.get("delivered", 0) + counts.get("failed", 0) >= args.notifications:
+                break
+            await asyncio.sleep(0.05)
+        drain_total = time.perf_counter() - start
+        await outbox.stop()
+    
+    await client.aclose()
+    await fake.stop()
+    
+    enqueue_times.sort()
+    print(f"📊 {args.notifications} notificaciones, proveedor {args.latency * 1000:.0f} ms, "
+          f"{args.fail_rate:.0%} errores, límite {args.rate:g}/s, {args.workers} workers")
+    print(f"   en línea:  {inline_per_call * 1000:.1f} ms por notificación "
+          f"→ {inline_per_call * args.notifications:.1f} s de petición para todo el lote")
+    print(f"   encolado:  p50 {statistics.median(enqueue_times) * 1e6:.0f} µs, "
+          f"p99 {enqueue_times[int(len(enqueue_times) * 0.99)] * 1e6:.0f} µs, lote completo {enqueue_total * 1000:.0f} ms")
+    print(f"   vaciado:   {drain_total:.2f} s → {args.notifications / drain_total:.0f} entregas/s, "
+          f"entregadas {counts.get('delivered', 0)}, fallidas {counts.get('failed', 0)}, "
+          f"peticiones al proveedor {fake.received}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
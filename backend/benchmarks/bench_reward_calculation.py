@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Cálculo de recompensas con Decimal vs reparto entero
+
+Compara el camino anterior de `RewardService.calculate_rewards` (un `Decimal`
+desde `str(float)` por empresa y una división por el total en cada
+iteración) con `services.reward_allocation.allocate_pool` en unidades base
+de PYUSD. Además del tiempo muestra cuánto se desvía del pool la suma de lo
+que se transferiría (importes truncados a unidades base).
+
+Uso:
+    python benchmarks/bench_reward_calculation.py --companies 100000
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from services.reward_allocation import allocate_pool
+
+def decimal_rewards(scores, pool: Decimal, min_score: float):
+    """Camino anterior: proporción Decimal empresa por empresa"""
+    eligible = [score for score in scores if score >= min_score]
+    total_score = sum(eligible)
+    return [pool * (Decimal(str(score)) / Decimal(str(total_score))) for score in eligible]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--pool", default="10000")
+    parser.add_argument("--decimals", type=int, default=6)
+    parser.add_argument("--min-score", type=float, default=50.0)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(7)
+    pool = Decimal(args.pool)
+    unit = Decimal(10) ** args.decimals
+    pool_units = int(pool * unit)
+    
+    print(f"{'empresas':>10}{'Decimal s':>11}{'entero s':>10}{'aceleración':>13}{'desvío Decimal':>16}{'desvío entero':>15}")
+    for companies in args.companies:
+        scores = [round(rng.uniform(0, 100), 1) for _ in range(companies)]
+        
+        start = time.perf_counter()
+        amounts = decimal_rewards(scores, pool, args.min_score)
+        decimal_time = time.perf_counter() - start
+        decimal_drift = sum(int(amount * unit) for amount in amounts) - pool_units
+        
+        start = time.perf_counter()
+        allocation = allocate_pool(np.asarray(scores), pool_units, args.min_score)
+        integer_time = time.perf_counter() - start
+        integer_drift = int(allocation.sum()) - pool_units
+        
+        print(f"{companies:>10}{decimal_time:>11.3f}{integer_time:>10.4f}{decimal_time / integer_time:>12.0f}x"
+              f"{decimal_drift:>16}{integer_drift:>15}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Transferencias PYUSD secuenciales vs pipeline con nonces locales
+
+Envía el mismo lote de transferencias ERC-20 con dos estrategias:
+
+- secuencial: el camino anterior de `RewardService._execute_blockchain_transfer`
+  (consultar nonce, firmar, enviar y esperar el recibo, una tras otra)
+- pipeline: `services.transfer_pipeline.TransferPipeline`
+
+Mide duración, bloques usados y el mayor bloqueo del event loop durante el
+envío. Pensado para un nodo local con minado por intervalos, por ejemplo:
+
+    anvil --block-time 1
+    npx hardhat node   (con mining.interval configurado)
+
+Uso:
+    python benchmarks/bench_reward_distribution.py --rpc http://127.0.0.1:8545 --transfers 200
+
+Sin `--token` se despliega un token de prueba cuyo `transfer` siempre
+devuelve true. Sin `--rpc` se usa un nodo en proceso de `eth-tester` si está
+instalado (minado automático y EVM en el propio bucle: útil para validar,
+no para medir bloques ni el bloqueo del bucle).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web3 import AsyncWeb3, Web3
+from eth_account import Account
+
+from services.async_web3 import async_web3
+from services.http_clients import http_clients
+from services.transfer_pipeline import TransferPipeline, TransferRequest, ERC20_TRANSFER_ABI
+
+# Cuenta #0 de Anvil y Hardhat (clave de desarrollo conocida, sin fondos reales)
+DEV_PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+
+# Contrato cuyo código de ejecución devuelve siempre true (abi.encode(true))
+STUB_TOKEN_INITCODE = "0x600a600c600039600a6000f3" + "600160005260206000f3"
+
+def connect(args):
+    """Web3 síncrono (despliegue y camino secuencial) y AsyncWeb3 (pipeline) sobre el mismo nodo"""
+    if args.rpc:
+        return Web3(Web3.HTTPProvider(args.rpc)), async_web3(args.rpc)
+    try:
+        from web3 import AsyncEthereumTesterProvider, EthereumTesterProvider
+        provider = AsyncEthereumTesterProvider()
+        w3 = Web3(EthereumTesterProvider(ethereum_tester=provider.ethereum_tester))
+    except Exception:
+        sys.exit("❌ Indica --rpc (Anvil/Hardhat) o instala eth-tester[py-evm]")
+    # Financiar la cuenta de desarrollo desde una cuenta desbloqueada del tester
+    account = Account.from_key(args.private_key)
+    w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": account.address, "value": Web3.to_wei(100, "ether")})
+    return w3, AsyncWeb3(provider)
+
+def deploy_stub_token(w3: Web3, private_key: str) -> str:
+    account = Account.from_key(private_key)
+    tx = {
+        "data": STUB_TOKEN_INITCODE,
+        "gas": 200000,
+        "gasPrice": w3.eth.gas_price,
+        "nonce": w3.eth.get_transaction_count(account.address, "pending"),
+        "chainId": w3.eth.chain_id
+    }
+    tx_hash = w3.eth.send_raw_transaction(account.sign_transaction(tx).raw_transaction)
+    return w3.eth.wait_for_transaction_receipt(tx_hash)["contractAddress"]
+
+def sequential_transfers(w3: Web3, token: str, private_key: str, transfers):
+    """Camino anterior: una transferencia completa (hasta el recibo) tras otra"""
+    account = Account.from_key(private_key)
+    contract = w3.eth.contract(address=token, abi=ERC20_TRANSFER_ABI)
+    blocks = []
+    for transfer in transfers:
+        nonce = w3.eth.get_transaction_count(account.address)
+        tx = contract.functions.transfer(transfer.to_address, transfer.amount).build_transaction({
+            "chainId": w3.eth.chain_id,
+            "gas": 60000,
+            "gasPrice": w3.eth.gas_price,
+            "nonce": nonce,
+        })
+        signed = account.sign_transaction(tx)
+        tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+        blocks.append(w3.eth.wait_for_transaction_receipt(tx_hash)["blockNumber"])
+    return blocks
+
+async def max_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Mayor retraso observado de un temporizador del event loop"""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - start - interval)
+    return worst
+
+async def measure(run):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(max_loop_lag(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    blocks = await run()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, blocks, await lag
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rpc", help="URL JSON-RPC del nodo local (Anvil/Hardhat)")
+    parser.add_argument("--private-key", default=DEV_PRIVATE_KEY)
+    parser.add_argument("--token", help="Dirección del token ERC-20 (por defecto se despliega uno de prueba)")
+    parser.add_argument("--transfers", type=int, default=200)
+    parser.add_argument("--window", type=int, default=64)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    w3, async_w3 = connect(args)
+    token = Web3.to_checksum_address(args.token) if args.token else deploy_stub_token(w3, args.private_key)
+    transfers = [TransferRequest(f"empresa_{i}", Account.create().address, 1_000_000 + i) for i in range(args.transfers)]
+    
+    # El camino anterior era síncrono dentro de un método async: bloquea el loop
+    async def run_sequential():
+        return sequential_transfers(w3, token, args.private_key, transfers)
+    
+    pipeline = TransferPipeline(async_w3, token, args.private_key, window=args.window, poll_interval=args.poll_interval)
+    
+    async def run_pipeline():
+        results = await pipeline.run(transfers)
+        failed = [result for result in results if result.status != "confirmed"]
+        if failed:
+            raise RuntimeError(f"{len(failed)} transferencias no confirmadas: {failed[0].error}")
+        return [result.block_number for result in results]
+    
+    print(f"📊 {args.transfers} transferencias, ventana {args.window}, nodo {args.rpc or 'eth-tester'}")
+    print(f"   {'estrategia':<12}{'total s':>9}{'tx/s':>8}{'bloques':>9}{'bloqueo loop ms':>17}")
+    for name, run in (("secuencial", run_sequential), ("pipeline", run_pipeline)):
+        elapsed, blocks, lag = await measure(run)
+        print(f"   {name:<12}{elapsed:>9.2f}{args.transfers / elapsed:>8.1f}"
+              f"{max(blocks) - min(blocks) + 1:>9}{lag * 1000:>17.0f}")
+    await http_clients.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
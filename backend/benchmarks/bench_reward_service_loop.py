@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - RewardService: Web3 síncrono vs AsyncWeb3 con pool
+
+Un nodo JSON-RPC falso (en su propio hilo, `--latency` segundos por
+petición HTTP, minado instantáneo) entiende lo necesario para transferir
+PYUSD y leer `balanceOf`. Durante `--duration` segundos `--concurrency`
+clientes encadenan consultas de balance y `--reward-clients` encadenan
+recompensas on-chain; una sonda que duerme 5 ms mide el retraso del bucle
+de eventos:
+
+- antes: `Web3(HTTPProvider)` síncrono, `is_connected()` al crear el
+  servicio y en cada llamada, `balanceOf` en el hilo del bucle y las
+  llamadas del pipeline con `asyncio.to_thread`
+- después: `RewardService` con `AsyncWeb3` sobre el pool `rpc` y conexión
+  perezosa en el primer uso
+
+Uso:
+    python benchmarks/bench_reward_service_loop.py --duration 5 --concurrency 50 --reward-clients 5 --latency 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rlp
+from eth_account import Account
+from eth_hash.auto import keccak
+from web3 import Web3
+
+from services.http_clients import http_clients
+
+# Cuenta #0 de Anvil y Hardhat (clave de desarrollo conocida, sin fondos reales)
+DEV_PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+TOKEN = "0x9fE46736679d2D9a65F0992F2272dE9f3c7fa6e0"
+REWARD_COMPANY = "empresa_verde_1"
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+class FakeNode:
+    """
+    Nodo JSON-RPC HTTP/1.1 keep-alive con su propio bucle en otro hilo:
+    el camino síncrono bloquea el bucle principal mientras espera respuesta
+    """
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.nonce = 0
+        self.block = 1_000
+        self.receipts = {}
+    
+    def start(self) -> str:
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        
+        async def serve():
+            return await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        
+        self.server = asyncio.run_coroutine_threadsafe(serve(), self.loop).result()
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+    
+    def stop(self) -> None:
+        # El hilo es daemon: basta con dejar de aceptar conexiones
+        self.loop.call_soon_threadsafe(self.server.close)
+    
+    def _send_raw(self, raw: bytes) -> str:
+        fields = rlp.decode(raw)
+        tx_hash = "0x" + keccak(raw).hex()
+        if int.from_bytes(fields[0], "big") == self.nonce:
+            self.nonce += 1
+            self.block += 1
+            self.receipts[tx_hash] = {
+                "transactionHash": tx_hash, "transactionIndex": "0x0", "blockNumber": hex(self.block),
+                "blockHash": "0x" + keccak(self.block.to_bytes(8, "big")).hex(), "to": "0x" + fields[3].hex(),
+                "cumulativeGasUsed": "0xea60", "gasUsed": "0xea60", "effectiveGasPrice": hex(10 ** 9),
+                "contractAddress": None, "logs": [], "logsBloom": "0x" + "00" * 256, "status": "0x1", "type": "0x0"
+            }
+        return tx_hash
+    
+    def _answer(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params") or []
+        if method == "web3_clientVersion":
+            result = "FakeNode/1.0"
+        elif method == "eth_chainId":
+            result = hex(31337)
+        elif method == "eth_gasPrice":
+            result = hex(10 ** 9)
+        elif method == "eth_blockNumber":
+            result = hex(self.block)
+        elif method == "eth_getTransactionCount":
+            result = hex(self.nonce)
+        elif method == "eth_sendRawTransaction":
+            result = self._send_raw(bytes.fromhex(params[0][2:]))
+        elif method == "eth_getTransactionReceipt":
+            result = self.receipts.get(params[0])
+        elif method == "eth_call":
+            result = "0x" + (25_000_000).to_bytes(32, "big").hex()
+        else:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": f"{method} not found"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                payload = json.loads(await reader.readexactly(length))
+                await asyncio.sleep(self.latency)
+                self.requests += 1
+                reply = [self._answer(item) for item in payload] if isinstance(payload, list) else self._answer(payload)
+                body = json.dumps(reply).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: "
+                             + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+class LegacyRewardService:
+    """
+    Camino anterior de `RewardService`: Web3 síncrono, conexión comprobada
+    al crearlo y en cada llamada en el hilo del bucle, y la transferencia
+    con las llamadas del pipeline en `asyncio.to_thread`
+    """
+    
+    def __init__(self, rpc_url: str, poll_interval: float):
+        from services.transfer_pipeline import ERC20_TRANSFER_ABI
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.w3.is_connected()
+        abi = ERC20_TRANSFER_ABI + [{
+            "constant": True, "inputs": [{"name": "_owner", "type": "address"}], "name": "balanceOf",
+            "outputs": [{"name": "balance", "type": "uint256"}], "type": "function"
+        }]
+        self.token = self.w3.eth.contract(address=TOKEN, abi=abi)
+        self.account = Account.from_key(DEV_PRIVATE_KEY)
+        self.poll_interval = poll_interval
+        self.chain_id = None
+        self.lock = asyncio.Lock()
+    
+    def check_connection(self) -> bool:
+        return self.w3.is_connected()
+    
+    async def get_pyusd_balance(self, address: str) -> Decimal:
+        if self.check_connection():
+            return Decimal(self.token.functions.balanceOf(address).call()) / (10 ** 6)
+        return Decimal("1000.00")
+    
+    async def reward(self, to_address: str, amount: int) -> str:
+        if not self.check_connection():
+            raise RuntimeError("sin conexión")
+        eth, address = self.w3.eth, self.account.address
+        async with self.lock:
+            if self.chain_id is None:
+                self.chain_id = await asyncio.to_thread(lambda: eth.chain_id)
+            gas_price = await asyncio.to_thread(lambda: eth.gas_price)
+            nonce = await asyncio.to_thread(eth.get_transaction_count, address, "pending")
+            signed = self.account.sign_transaction({
+                "to": TOKEN, "value": 0, "data": self.token.encode_abi("transfer", args=[to_address, amount]),
+                "gas": 60000, "gasPrice": gas_price, "nonce": nonce, "chainId": self.chain_id
+            })
+            await asyncio.to_thread(eth.send_raw_transaction, signed.raw_transaction)
+            while await asyncio.to_thread(eth.get_transaction_count, address, "latest") <= nonce:
+                await asyncio.sleep(self.poll_interval)
+            receipt = await asyncio.to_thread(eth.get_transaction_receipt, signed.hash)
+        return Web3.to_hex(receipt["transactionHash"])
+
+async def probe(lags, stop: asyncio.Event, interval: float = 0.005) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def load(reward, balance, args) -> dict:
+    owners = [Web3.to_checksum_address(f"0x{i + 1:040x}") for i in range(1000)]
+    latencies = {"balance": [], "reward": []}
+    lags = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    started = time.perf_counter()
+    deadline = started + args.duration
+    
+    async def balance_client(seed: int) -> None:
+        count = seed
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await balance(owners[count % len(owners)])
+            latencies["balance"].append(time.perf_counter() - start)
+            count += 1
+    
+    async def reward_client() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await reward()
+            latencies["reward"].append(time.perf_counter() - start)
+    
+    await asyncio.gather(*(balance_client(i) for i in range(args.concurrency)),
+                         *(reward_client() for _ in range(args.reward_clients)))
+    stop.set()
+    await prober
+    return {"latencies": latencies, "lags": lags, "elapsed": time.perf_counter() - started}
+
+def report(label: str, setup: float, result: dict, args) -> None:
+    latencies, lags, elapsed = result["latencies"], result["lags"], result["elapsed"]
+    print(f"   {label:<8} creación {setup * 1000:>6.1f} ms  balances {len(latencies['balance']) / elapsed:>6.0f}/s "
+          f"(p99 {percentile(latencies['balance'], 0.99) * 1000:>7.1f} ms)  recompensas {len(latencies['reward']):>4} "
+          f"(p50 {percentile(latencies['reward'], 0.5) * 1000:>7.1f} ms)")
+    print(f"   {'':<8} retraso del bucle p50 {percentile(lags, 0.5) * 1000:>6.1f} ms  "
+          f"p99 {percentile(lags, 0.99) * 1000:>7.1f} ms  máx {max(lags) * 1000:>7.1f} ms  "
+          f"bloqueado {sum(lags) / elapsed * 100:>5.1f} %")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia por petición HTTP del nodo falso")
+    parser.add_argument("--reward-clients", type=int, default=5, help="Clientes que encadenan recompensas")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="Sondeo de recibos del pipeline")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    print(f"📊 {args.concurrency} clientes de balances durante {args.duration:g} s, nodo falso a {args.latency * 1000:.0f} ms, "
+          f"{args.reward_clients} clientes de recompensas")
+    
+    node = FakeNode(args.latency)
+    rpc_url = node.start()
+    start = time.perf_counter()
+    legacy = LegacyRewardService(rpc_url, args.poll_interval)
+    setup = time.perf_counter() - start
+    wallet = Web3.to_checksum_address("0x70997970C51812dc3A010C7d01b50e0d17dc79C8")
+    report("antes", setup, await load(lambda: legacy.reward(wallet, 1_500_000), legacy.get_pyusd_balance, args), args)
+    node.stop()
+    
+    node = FakeNode(args.latency)
+    os.environ.update({
+        "RPC_URL": node.start(), "PRIVATE_KEY": DEV_PRIVATE_KEY, "PYUSD_CONTRACT_ADDRESS": TOKEN,
+        "REWARD_TX_POLL_INTERVAL": str(args.poll_interval)
+    })
+    from services.reward_service import RewardDistribution, RewardService
+    start = time.perf_counter()
+    service = RewardService()
+    setup = time.perf_counter() - start
+    
+    async def reward():
+        result = await service.distribute_rewards([RewardDistribution(REWARD_COMPANY, Decimal("1.5"), 90.0, "2024-10-11T12:00:00Z")])
+        if result["status"] != "completed":
+            raise RuntimeError(f"recompensa fallida: {result}")
+    
+    report("después", setup, await load(reward, service.get_pyusd_balance, args), args)
+    node.stop()
+    await http_clients.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Lecturas de balances y scores: una llamada por dirección vs lotes
+
+Un panel con `--companies` empresas necesita `balanceOf` (PYUSD) y
+`getScore` de cada una. Compara:
+
+- secuencial: una `eth_call` tras otra (el camino de `get_pyusd_balance`)
+- concurrente sin agrupar: todas a la vez, una petición HTTP por llamada
+- `RPCBatcher` en modo `jsonrpc`: lotes JSON-RPC
+- `RPCBatcher` en modo `multicall`: un `aggregate3` de Multicall3 por lote
+
+Con `--rpc` usa un nodo local (Hardhat o Anvil) y despliega un contrato de
+prueba que responde 1 a cualquier llamada; el modo multicall necesita
+`--multicall` con la dirección de un Multicall3 desplegado. Sin `--rpc`
+arranca un nodo JSON-RPC falso en proceso con `--latency` segundos por
+petición HTTP, que también entiende `aggregate3`.
+
+Uso:
+    npx hardhat node
+    python benchmarks/bench_rpc_batcher.py --rpc http://127.0.0.1:8545 --companies 1000
+    python benchmarks/bench_rpc_batcher.py --companies 1000 --latency 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from eth_abi import decode, encode
+
+from services.http_clients import http_clients
+from services.rpc_batcher import AGGREGATE3, BALANCE_OF, GET_SCORE, MULTICALL3_ADDRESS, RPCBatcher
+
+# Cuenta #0 de Anvil y Hardhat (clave de desarrollo conocida, sin fondos reales)
+DEV_PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+
+# Contrato cuyo código de ejecución devuelve siempre abi.encode(1)
+STUB_INITCODE = "0x600a600c600039600a6000f3" + "600160005260206000f3"
+
+ONE = (1).to_bytes(32, "big")
+
+class FakeNode:
+    """Nodo JSON-RPC HTTP/1.1 keep-alive: `eth_call` devuelve 1 y entiende `aggregate3`"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+    
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+    
+    def _answer(self, request: dict) -> dict:
+        if request["method"] == "eth_getBalance":
+            result = hex(10 ** 18)
+        else:
+            call = request["params"][0]
+            data = bytes.fromhex(call["data"][2:])
+            if call["to"].lower() == MULTICALL3_ADDRESS.lower() and data[:4] == AGGREGATE3:
+                (calls,) = decode(["(address,bool,bytes)[]"], data[4:])
+                result = "0x" + encode(["(bool,bytes)[]"], [[(True, ONE) for _ in calls]]).hex()
+            else:
+                result = "0x" + ONE.hex()
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                payload = json.loads(await reader.readexactly(length))
+                await asyncio.sleep(self.latency)
+                self.requests += 1
+                reply = [self._answer(item) for item in payload] if isinstance(payload, list) else self._answer(payload)
+                body = json.dumps(reply).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: "
+                             + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+def deploy_stub(rpc_url: str) -> str:
+    from web3 import Web3
+    from eth_account import Account
+    w3 = Web3(Web3.HTTPProvider(rpc_url))
+    account = Account.from_key(DEV_PRIVATE_KEY)
+    tx = {
+        "from": account.address, "data": STUB_INITCODE, "gas": 100000, "gasPrice": w3.eth.gas_price,
+        "nonce": w3.eth.get_transaction_count(account.address), "chainId": w3.eth.chain_id
+    }
+    tx_hash = w3.eth.send_raw_transaction(account.sign_transaction(tx).raw_transaction)
+    return w3.eth.wait_for_transaction_receipt(tx_hash)["contractAddress"]
+
+def dashboard_calls(contract: str, owners):
+    return ([(contract, BALANCE_OF + encode(["address"], [owner])) for owner in owners]
+            + [(contract, GET_SCORE + encode(["address"], [owner])) for owner in owners])
+
+async def single_call(client: httpx.AsyncClient, rpc_url: str, to: str, data: bytes) -> int:
+    response = await client.post(rpc_url, json={
+        "jsonrpc": "2.0", "id": 1, "method": "eth_call", "params": [{"to": to, "data": "0x" + data.hex()}, "latest"]
+    })
+    return int(response.json()["result"], 16)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rpc", help="Nodo local (Hardhat/Anvil); sin él se usa un nodo falso en proceso")
+    parser.add_argument("--multicall", help="Dirección de Multicall3 en el nodo local")
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia por petición del nodo falso")
+    parser.add_argument("--sequential-sample", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    node = None
+    if args.rpc:
+        rpc_url, contract = args.rpc, deploy_stub(args.rpc)
+        multicall = args.multicall
+        label = f"nodo {rpc_url}"
+    else:
+        node = FakeNode(args.latency)
+        rpc_url, contract, multicall = await node.start(), "0x" + "11" * 20, MULTICALL3_ADDRESS
+        label = f"nodo falso, {args.latency * 1000:.0f} ms por petición"
+    owners = [f"0x{i + 1:040x}" for i in range(args.companies)]
+    calls = dashboard_calls(contract, owners)
+    client = http_clients.get("rpc")
+    
+    print(f"📊 {args.companies} empresas ({len(calls)} eth_call), {label}")
+    sample = calls[:args.sequential_sample]
+    start = time.perf_counter()
+    for to, data in sample:
+        await single_call(client, rpc_url, to, data)
+    sequential = (time.perf_counter() - start) / len(sample) * len(calls)
+    print(f"   secuencial (estimado)       {sequential:>8.2f} s   {len(calls):>6} peticiones HTTP")
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(single_call(client, rpc_url, to, data) for to, data in calls))
+    print(f"   concurrente sin agrupar     {time.perf_counter() - start:>8.2f} s   {len(calls):>6} peticiones HTTP")
+    
+    modes = [("jsonrpc", None)] + ([("multicall", multicall)] if multicall else [])
+    for mode, address in modes:
+        batcher = RPCBatcher(rpc_url, mode=mode, multicall_address=address)
+        start = time.perf_counter()
+        balances, scores = await asyncio.gather(batcher.balances(contract, owners), batcher.scores(contract, owners))
+        elapsed = time.perf_counter() - start
+        assert set(balances.values()) == {1} and set(scores.values()) == {1}
+        stats = batcher.stats()
+        print(f"   RPCBatcher {stats['mode']:<16} {elapsed:>8.2f} s   {stats['round_trips']:>6} peticiones HTTP "
+              f"({stats['batches']} lotes)")
+    
+    await http_clients.aclose()
+    if node is not None:
+        node.server.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - EcoScore por empresa vs motor vectorizado por lotes
+
+Compara `_calculate_eco_score` de `api/routes/scores.py` aplicado empresa por
+empresa con `EcoScoreEngine.score_columns` sobre el lote completo, y
+comprueba que ambos producen exactamente los mismos scores.
+
+Uso:
+    python benchmarks/bench_score_engine.py --sizes 10000 100000 1000000
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.routes.scores import _calculate_eco_score
+from services.score_engine import EcoScoreEngine, METRIC_WEIGHTS
+
+METRIC_TYPES = list(METRIC_WEIGHTS) + ["recycling_rate"]
+
+def build_batch(size: int, companies: int, seed: int = 42):
+    """Genera un lote columnar sintético de Data Coins"""
+    rng = random.Random(seed)
+    company_ids = [f"empresa_{rng.randrange(companies)}" for _ in range(size)]
+    metric_types = [rng.choice(METRIC_TYPES) for _ in range(size)]
+    values = [rng.uniform(0, 12000) for _ in range(size)]
+    return company_ids, metric_types, values
+
+async def score_per_company(company_ids, metric_types, values):
+    """Camino actual: agrupar por empresa y puntuar cada una por separado"""
+    grouped = defaultdict(list)
+    for company_id, metric_type, value in zip(company_ids, metric_types, values):
+        grouped[company_id].append({"metric_type": metric_type, "value": value})
+    return {company_id: await _calculate_eco_score(datacoins) for company_id, datacoins in grouped.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--datacoins-per-company", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    engine = EcoScoreEngine()
+    print(f"{'Data Coins':>12}{'empresas':>10}{'por empresa s':>15}{'vectorizado s':>15}{'aceleración':>13}")
+    for size in args.sizes:
+        companies = max(1, size // args.datacoins_per_company)
+        company_ids, metric_types, values = build_batch(size, companies)
+        
+        start = time.perf_counter()
+        expected = asyncio.run(score_per_company(company_ids, metric_types, values))
+        loop_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        scores = engine.score_columns(company_ids, metric_types, values)
+        engine_time = time.perf_counter() - start
+        
+        if scores != expected:
+            mismatches = sum(1 for company_id in expected if scores.get(company_id) != expected[company_id])
+            raise SystemExit(f"❌ {mismatches} scores difieren entre ambos caminos")
+        
+        print(f"{size:>12}{len(scores):>10}{loop_time:>15.3f}{engine_time:>15.3f}{loop_time / engine_time:>12.1f}x")
+
+if __name__ == "__main__":
+    main()
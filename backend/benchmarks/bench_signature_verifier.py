@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Verificación de firmas en el bucle vs pool de procesos
+
+Lanza `--requests` verificaciones de firma concurrentes (una ráfaga de
+conexiones de wallets) y, mientras tanto, una sonda que duerme 5 ms mide
+el retraso del bucle de eventos:
+
+- antes: `Web3()` nuevo y recuperación ECDSA en el hilo del bucle
+- `SignatureVerifier` en frío: recuperación por lotes en el pool de procesos
+- `SignatureVerifier` en caliente: las mismas firmas, servidas desde la LRU
+
+Se mide el verificador directamente, no la ruta HTTP: hoy `POST
+/api/v1/wallet/connect` no verifica la firma (la comprobación está
+comentada en `WalletService.connect_wallet` para desarrollo), así que una
+ráfaga de conexiones reales no pasaría por aquí. Es el camino que siguen
+`WalletService.verify_wallet_signature` y `Web3Utils.verify_signature`.
+
+Uso:
+    python benchmarks/bench_signature_verifier.py --requests 1000 --workers 1
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from web3 import Web3
+
+from services.signature_verifier import SignatureVerifier
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def legacy_verify(address: str, message: str, signature: str) -> bool:
+    """Verificación anterior: Web3 nuevo y recuperación en el hilo del bucle"""
+    w3 = Web3()
+    recovered = w3.eth.account.recover_message(encode_defunct(text=message), signature=signature)
+    return recovered.lower() == address.lower()
+
+async def probe(lags, stop: asyncio.Event, interval: float = 0.005) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def burst(verify, requests) -> tuple:
+    lags = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(verify(*request) for request in requests))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await prober
+    assert all(results)
+    return elapsed, lags
+
+def report(label: str, elapsed: float, lags, count: int) -> None:
+    print(f"   {label:<28}{elapsed:>7.2f} s  {count / elapsed:>7.0f} firmas/s   retraso del bucle "
+          f"p50 {percentile(lags, 0.5) * 1000:>6.1f} ms  p99 {percentile(lags, 0.99) * 1000:>7.1f} ms  "
+          f"máx {max(lags) * 1000:>7.1f} ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    account = Account.create()
+    requests = []
+    for i in range(args.requests):
+        message = f"Connect wallet to GreenLedger Protocol - {1790000000 + i}"
+        requests.append((account.address, message, account.sign_message(encode_defunct(text=message)).signature.hex()))
+    
+    print(f"📊 {args.requests} verificaciones concurrentes ({args.workers} procesos)")
+    elapsed, lags = await burst(legacy_verify, requests)
+    report("en el bucle (antes)", elapsed, lags, args.requests)
+    
+    verifier = SignatureVerifier(workers=args.workers)
+    # El pool arranca con la primera petición: se calienta fuera de la medida
+    await verifier.verify(*requests[0])
+    verifier._cache.clear()
+    elapsed, lags = await burst(verifier.verify, requests)
+    report("SignatureVerifier en frío", elapsed, lags, args.requests)
+    elapsed, lags = await burst(verifier.verify, requests)
+    report("SignatureVerifier en caché", elapsed, lags, args.requests)
+    print(f"   {verifier.stats()}")
+    verifier.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
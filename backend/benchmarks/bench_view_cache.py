@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Caché de vistas del contrato por bloque
+
+Un nodo local falso responde `eth_blockNumber` (un bloque cada
+`--block-time` segundos) y cada llamada a una vista tarda `--latency`
+segundos. Durante `--duration` segundos `--concurrency` clientes encadenan
+lecturas (score, métricas, ranking y todas las empresas, con empresas
+repartidas según una ley de Zipf) y cada `--event-interval` segundos se
+registra una métrica que invalida su empresa y el ranking. Compara:
+
+- sin caché (`consistent=true`): una llamada al nodo por lectura
+- `ViewCache`: llamadas al nodo, tasa de aciertos y latencia
+
+Uso:
+    python benchmarks/bench_view_cache.py --duration 10 --concurrency 50 --companies 1000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.view_cache import BlockTracker, ViewCache
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+class FakeNode:
+    """Nodo JSON-RPC HTTP/1.1 keep-alive que solo sabe `eth_blockNumber`"""
+    
+    def __init__(self, block_time: float):
+        self.block_time = block_time
+        self.started = time.monotonic()
+        self.requests = 0
+    
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                request = json.loads(await reader.readexactly(length))
+                self.requests += 1
+                block = 1_000_000 + int((time.monotonic() - self.started) / self.block_time)
+                body = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": hex(block)}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: "
+                             + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+    
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+async def run(cache: ViewCache, args, consistent: bool, calls) -> dict:
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(args.companies)]
+    companies = [f"0x{i:040x}" for i in range(args.companies)]
+    latencies = []
+    deadline = time.perf_counter() + args.duration
+    
+    async def client(seed: int) -> None:
+        # Cliente que encadena lecturas: score, métricas, ranking y todas las empresas
+        kind = seed % 4
+        while time.perf_counter() < deadline:
+            company = rng.choices(companies, weights)[0]
+            function, view_args = (("consultarScore", [company]), ("verMetricasEmpresa", [company]),
+                                   ("rankingEmpresas", []), ("verTodasEmpresas", []))[kind]
+            kind = (kind + 1) % 4
+            start = time.perf_counter()
+            await cache.call(function, view_args, consistent)
+            latencies.append(time.perf_counter() - start)
+    
+    async def events() -> None:
+        # Métricas registradas: invalidan la empresa y el ranking
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(args.event_interval)
+            cache.on_event("MetricaRegistrada", rng.choices(companies, weights)[0])
+    
+    calls.clear()
+    await asyncio.gather(events(), *(client(i) for i in range(args.concurrency)))
+    return {"reads": len(latencies), "calls": len(calls), "latencies": latencies}
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia de una llamada a una vista en segundos")
+    parser.add_argument("--block-time", type=float, default=2.0)
+    parser.add_argument("--event-interval", type=float, default=0.05, help="Segundos entre métricas registradas")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    node = FakeNode(args.block_time)
+    rpc_url = await node.start()
+    calls = []
+    
+    async def fetch(function, view_args):
+        calls.append(function)
+        await asyncio.sleep(args.latency)
+        return 88
+    
+    print(f"📊 {args.concurrency} clientes concurrentes, {args.companies} empresas, "
+          f"vistas a {args.latency * 1000:.0f} ms, bloque cada {args.block_time:g} s")
+    for label, consistent in (("sin caché", True), ("ViewCache", False)):
+        cache = ViewCache(fetch, BlockTracker(rpc_url, poll_interval=0.5), enabled=True)
+        result = await run(cache, args, consistent, calls)
+        stats = cache.stats()
+        ratio = f"{stats['hit_ratio'] * 100:5.1f} %" if stats["hit_ratio"] is not None else "    -  "
+        print(f"   {label:<11}{result['reads'] / args.duration:>9.0f} lecturas/s  {result['calls']:>8} llamadas al nodo  "
+              f"aciertos {ratio}  p50 {percentile(result['latencies'], 0.5) * 1000:>6.1f} ms  "
+              f"p99 {percentile(result['latencies'], 0.99) * 1000:>6.1f} ms")
+    print(f"   eth_blockNumber: {node.requests} peticiones")
+    await node.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
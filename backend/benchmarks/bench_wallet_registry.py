@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Registro de wallets con índice inverso y expiración
+
+Para N wallets conectadas mide `get_connected_wallet(company_id)`:
+
+- diccionarios anteriores: recorrido de `connected_wallets` buscando la empresa
+- `MemorySessionRegistry`: índice empresa -> wallet
+- `SQLiteSessionRegistry`: fichero compartido entre workers
+
+Después reconecta las mismas wallets en `--rounds` rondas con sesiones de
+`--ttl` segundos y compara las sesiones retenidas y la memoria usada.
+
+Uso:
+    python benchmarks/bench_wallet_registry.py --sizes 10000 100000 --rounds 4 --ttl 1
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.session_registry import MemorySessionRegistry, SQLiteSessionRegistry
+
+class LegacyWallets:
+    """Diccionarios de WalletService antes del registro"""
+    
+    def __init__(self):
+        self.connected_wallets = {}
+        self.session_store = {}
+    
+    def connect(self, address, company_id, session_id, connected_at):
+        self.connected_wallets[address] = {"company_id": company_id, "connected_at": connected_at,
+                                           "session_id": session_id, "verified": True}
+        self.session_store[session_id] = {"address": address, "company_id": company_id,
+                                          "expires_at": connected_at + 86400}
+    
+    def company_wallet(self, company_id):
+        for address, data in self.connected_wallets.items():
+            if data["company_id"] == company_id and data["verified"]:
+                return address
+        return None
+
+def time_lookups(registry, companies, repeat: int) -> float:
+    start = time.perf_counter()
+    for company_id in companies[:repeat]:
+        assert registry.company_wallet(company_id) is not None
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def bench_lookups(size: int, directory: str) -> None:
+    now = int(time.time())
+    rng = random.Random(size)
+    companies = [f"empresa_{rng.randrange(size):07d}" for _ in range(2000)]
+    
+    legacy = LegacyWallets()
+    memory = MemorySessionRegistry()
+    sqlite = SQLiteSessionRegistry(os.path.join(directory, f"sessions_{size}.sqlite"))
+    start = time.perf_counter()
+    for i in range(size):
+        address, company_id, session_id = f"0x{i:040x}", f"empresa_{i:07d}", f"wallet_{i}_{now}"
+        legacy.connect(address, company_id, session_id, now)
+        memory.connect(address, company_id, session_id, now)
+    load = time.perf_counter() - start
+    with sqlite._db:
+        sqlite._db.executemany(
+            "INSERT INTO wallet_sessions (address, session_id, company_id, connected_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            ((f"0x{i:040x}", f"wallet_{i}_{now}", f"empresa_{i:07d}", now, now + sqlite.ttl) for i in range(size))
+        )
+    
+    print(f"\n📊 {size} wallets conectadas (carga en memoria {load:.1f} s)")
+    legacy_us = time_lookups(legacy, companies, 20 if size > 10000 else 200)
+    print(f"   recorrido de diccionarios  {legacy_us:>10.1f} µs por consulta")
+    print(f"   MemorySessionRegistry      {time_lookups(memory, companies, 2000):>10.2f} µs por consulta")
+    print(f"   SQLiteSessionRegistry      {time_lookups(sqlite, companies, 2000):>10.2f} µs por consulta")
+
+def bench_churn(size: int, rounds: int, ttl: int) -> None:
+    def run(registry) -> tuple:
+        tracemalloc.start()
+        for round_ in range(rounds):
+            now = int(time.time())
+            for i in range(size):
+                registry.connect(f"0x{i:040x}", f"empresa_{i:07d}", f"wallet_{i}_{round_}", now)
+            if round_ < rounds - 1:
+                time.sleep(ttl + 1)
+        # Ya vencidas todas menos la última ronda, que vence en `ttl` segundos
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return memory
+    
+    legacy = LegacyWallets()
+    legacy_memory = run(legacy)
+    registry = MemorySessionRegistry(ttl=ttl)
+    registry_memory = run(registry)
+    print(f"\n📊 {rounds} rondas de {size} reconexiones con sesiones de {ttl} s")
+    print(f"   diccionarios anteriores    {len(legacy.session_store):>10} sesiones   {legacy_memory / 2**20:>7.1f} MiB")
+    print(f"   MemorySessionRegistry      {registry.stats()['sessions']:>10} sesiones   {registry_memory / 2**20:>7.1f} MiB "
+          f"({registry.expired} expiradas)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--ttl", type=int, default=1, help="Duración de las sesiones en la prueba de expiración")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            bench_lookups(size, directory)
+    bench_churn(min(args.sizes), args.rounds, args.ttl)
+
+if __name__ == "__main__":
+    main()
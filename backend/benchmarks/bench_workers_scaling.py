@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark - Escalado de throughput con N workers (serve.py)
+
+Para cada número de workers de `--workers` arranca `serve.py` con el estado
+compartido en SQLite (directorio de datos temporal, sin red: RPC_URL apunta
+a un puerto local cerrado), espera a que respondan todos los workers y
+durante `--duration` segundos `--clients` procesos generadores mantienen
+`--connections` conexiones keep-alive en total, encadenando GET sobre
+`--path` (por defecto, EcoScore de una empresa y ranking global, que leen
+el diario compartido de agregados).
+
+Se informa throughput, latencias p50/p99, aceleración frente a 1 worker y
+eficiencia (aceleración / workers). Los generadores comparten CPU con el
+servidor: el escalado solo es casi lineal mientras queden CPUs libres para
+ellos (p. ej. `--workers 1 2 4` en una máquina de 8 CPUs).
+
+Uso:
+    python benchmarks/bench_workers_scaling.py --workers 1 2 4 --duration 10 --connections 64 --clients 4
+"""
+
+import os
+import sys
+import time
+import json
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import http.client
+from multiprocessing import Pool
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATHS = ["/api/v1/scores/empresa_verde_1", "/api/v1/scores/leaderboard/global?limit=20"]
+WARMUP = 1.0
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def available_cpus() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(workers: int, port: int, data_dir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        GREENLEDGER_DATA_DIR=data_dir,
+        STATE_BACKEND="sqlite",
+        WALLET_SESSION_BACKEND="sqlite",
+        RPC_URL="http://127.0.0.1:9",
+        PRELOAD_MODULES="false",
+    )
+    return subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_for_workers(process: subprocess.Popen, port: int, workers: int, timeout: float = 60.0) -> int:
+    """Sondea /health con conexiones nuevas hasta ver `workers` procesos distintos; devuelve cuántos respondieron"""
+    seen = set()
+    deadline = time.time() + timeout
+    while time.time() < deadline and len(seen) < workers:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py terminó con código {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/health", headers={"Connection": "close"})
+            response = connection.getresponse()
+            if response.status == 200:
+                seen.add(json.loads(response.read())["worker"]["id"])
+            connection.close()
+        except OSError:
+            time.sleep(0.05)
+    return len(seen)
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.split(b"\r\n")
+    status = int(lines[0].split()[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def _connection(port: int, requests, measure_from: float, deadline: float, offset: int, latencies, counts) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    index = offset
+    try:
+        while time.time() < deadline:
+            start = time.perf_counter()
+            writer.write(requests[index % len(requests)])
+            index += 1
+            status = await _read_response(reader)
+            if time.time() < measure_from:
+                continue
+            if status == 200:
+                counts[0] += 1
+                latencies.append(time.perf_counter() - start)
+            else:
+                counts[1] += 1
+    finally:
+        writer.close()
+
+def load_generator(args):
+    """Un proceso generador: `connections` conexiones keep-alive hasta `deadline` (hora de pared común)"""
+    port, paths, connections, measure_from, deadline, offset = args
+    requests = [f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n".encode() for path in paths]
+    latencies, counts = [], [0, 0]
+    
+    async def run():
+        await asyncio.gather(*(
+            _connection(port, requests, measure_from, deadline, offset + i, latencies, counts)
+            for i in range(connections)
+        ))
+    
+    asyncio.run(run())
+    return counts[0], counts[1], latencies
+
+def measure(pool: Pool, port: int, paths, connections: int, clients: int, duration: float):
+    measure_from = time.time() + WARMUP
+    deadline = measure_from + duration
+    shares = [connections // clients + (1 if i < connections % clients else 0) for i in range(clients)]
+    jobs = [(port, paths, share, measure_from, deadline, sum(shares[:i])) for i, share in enumerate(shares) if share]
+    ok, errors, latencies = 0, 0, []
+    for done, failed, sample in pool.map(load_generator, jobs):
+        ok += done
+        errors += failed
+        latencies.extend(sample)
+    return ok / duration, errors, latencies
+
+def main():
+    cpus = available_cpus()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, max(1, cpus // 2), cpus}))
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=max(1, cpus // 2), help="Procesos generadores de carga")
+    parser.add_argument("--path", action="append", dest="paths", help="Ruta GET (repetible)")
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+    
+    print(f"📊 Escalado con workers: {cpus} CPUs disponibles, {args.clients} procesos generadores, "
+          f"{args.connections} conexiones, {args.duration:.0f}s por medida")
+    if max(args.workers) + args.clients > cpus:
+        print(f"   ⚠️ workers + generadores ({max(args.workers)} + {args.clients}) superan las {cpus} CPUs: "
+              f"a partir de ahí compiten por CPU y el escalado deja de ser lineal")
+    print(f"   {'workers':>7} {'listos':>6} {'peticiones/s':>13} {'p50 ms':>8} {'p99 ms':>8} {'errores':>8} {'aceleración':>12} {'eficiencia':>11}")
+    
+    baseline = None
+    with Pool(args.clients) as pool:
+        for workers in args.workers:
+            port = free_port()
+            with tempfile.TemporaryDirectory(prefix="greenledger-scaling-") as data_dir:
+                process = start_server(workers, port, data_dir)
+                try:
+                    ready = wait_for_workers(process, port, workers)
+                    throughput, errors, latencies = measure(pool, port, paths, args.connections, args.clients, args.duration)
+                finally:
+                    stop_server(process)
+            if baseline is None:
+                baseline = throughput / workers
+            speedup = throughput / baseline
+            print(f"   {workers:>7} {ready:>6} {throughput:>13,.0f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+                  f"{percentile(latencies, 0.99) * 1000:>8.2f} {errors:>8} {speedup:>11.2f}x {speedup / workers:>10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,8 @@ if __name__ == "__main__":
     # Configuración del servidor
     host = os.getenv("API_HOST", "0.0.0.0")
     port = int(os.getenv("API_PORT", 8000))
-    debug = os.getenv("DEBUG", "True").lower() == "true"
+    # Recarga solo en desarrollo (DEBUG=true); en producción, `python serve.py`
+    debug = os.getenv("DEBUG", "false").lower() == "true"
     
     print("🌿 Iniciando GreenLedger Protocol Backend...")
     print(f"📡 Servidor: http://{host}:{port}")
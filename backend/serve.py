@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+🏭 Lanzador de producción para GreenLedger Protocol Backend
+
+Arranca `API_WORKERS` procesos uvicorn (por defecto, uno por CPU) sobre la
+factoría `api.server:create_app`, sin recarga. El proceso supervisor de
+uvicorn reinicia los workers que mueren y atiende señales:
+
+- SIGTERM / SIGINT: cierre ordenado; cada worker deja de aceptar
+  conexiones y espera hasta `API_GRACEFUL_TIMEOUT` a las peticiones en curso
+- SIGHUP: reinicio escalonado; cada worker nuevo tiene que estar listo
+  antes de parar al que sustituye, así que no se pierden peticiones
+- SIGTTIN / SIGTTOU: un worker más / uno menos
+
+Con más de un worker, el estado compartido (STATE_BACKEND) y las sesiones
+de wallets (WALLET_SESSION_BACKEND) pasan por defecto a SQLite; `memory`
+se rechaza porque cada worker vería su propia copia.
+
+Uso:
+    python serve.py --workers 4 --port 8000
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar el directorio backend al path
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, backend_dir)
+
+# Estado que debe compartirse entre workers
+SHARED_BACKENDS = ("STATE_BACKEND", "WALLET_SESSION_BACKEND")
+
+def default_workers() -> int:
+    """API_WORKERS o, si no está definido, una por CPU disponible para este proceso"""
+    if os.getenv("API_WORKERS"):
+        return int(os.getenv("API_WORKERS"))
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def configure_shared_state(workers: int) -> None:
+    """Con varios workers, SQLite como backend compartido; `memory` explícito es un error"""
+    if workers <= 1:
+        return
+    for name in SHARED_BACKENDS:
+        backend = os.environ.setdefault(name, "sqlite").lower()
+        if backend == "memory":
+            raise SystemExit(f"❌ {name}=memory no se puede usar con {workers} workers: cada uno tendría su propio estado")
+
+def main():
+    from dotenv import load_dotenv
+    
+    # Mismo .env que la aplicación, antes de decidir los backends que heredan los workers
+    load_dotenv(os.path.join(backend_dir, ".env"))
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("API_GRACEFUL_TIMEOUT", "30")),
+                        help="Segundos que un worker espera a las peticiones en curso al pararse")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("API_MAX_REQUESTS", "0")),
+                        help="Reciclar cada worker tras N peticiones (0 = nunca)")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info").lower())
+    args = parser.parse_args()
+    
+    configure_shared_state(args.workers)
+    
+    import uvicorn
+    
+    print("🌿 Iniciando GreenLedger Protocol Backend (producción)...")
+    print(f"📡 Servidor: http://{args.host}:{args.port} con {args.workers} workers")
+    
+    uvicorn.run(
+        "api.server:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        reload=False,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests or None,
+        proxy_headers=True,
+        log_level=args.log_level
+    )
+
+if __name__ == "__main__":
+    main()
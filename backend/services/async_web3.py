@@ -0,0 +1,59 @@
+"""
+⚡ Async Web3 - AsyncWeb3 over the shared RPC connection pool
+Node calls are awaited on the event loop instead of blocking it or a worker thread
+"""
+
+import logging
+from typing import Any, List, Union, cast
+
+import httpx
+from web3 import AsyncWeb3
+from web3.exceptions import ProviderConnectionError
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from services.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+class PooledHTTPProvider(AsyncJSONBaseProvider):
+    """
+    Async JSON-RPC provider posting through the shared `rpc` httpx client
+    
+    Keep-alive connections are shared with the RPC batcher and the view
+    cache, so a reward distribution and a burst of balance reads reuse the
+    same pool instead of opening one session per provider. Creating the
+    provider does no I/O: the first request opens the connection.
+    """
+    
+    def __init__(self, endpoint_uri: str, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.endpoint_uri = endpoint_uri
+    
+    def __str__(self) -> str:
+        return f"PooledHTTPProvider({self.endpoint_uri})"
+    
+    async def _post(self, request_data: bytes) -> bytes:
+        try:
+            response = await http_clients.get("rpc").post(self.endpoint_uri, content=request_data, headers=JSON_HEADERS)
+            response.raise_for_status()
+        except httpx.TransportError as e:
+            # `is_connected` reports these as a missing node instead of raising
+            raise ProviderConnectionError(f"Could not reach {self.endpoint_uri}: {e}") from e
+        return response.content
+    
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        return self.decode_rpc_response(await self._post(self.encode_rpc_request(method, params)))
+    
+    async def make_batch_request(self, batch_requests: List[tuple]) -> Union[List[RPCResponse], RPCResponse]:
+        response = self.decode_rpc_response(await self._post(self.encode_batch_rpc_request(batch_requests)))
+        if not isinstance(response, list):
+            # Some nodes answer a rejected batch with a single error object
+            return response
+        return sorted(cast(List[RPCResponse], response), key=lambda reply: reply.get("id", 0))
+
+def async_web3(rpc_url: str) -> AsyncWeb3:
+    """AsyncWeb3 bound to `rpc_url` over the shared pool; does not connect"""
+    return AsyncWeb3(PooledHTTPProvider(rpc_url))
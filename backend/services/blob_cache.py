@@ -0,0 +1,262 @@
+"""
+🗄️ Blob Cache - Caché local direccionada por contenido
+Objetos inmutables de Lighthouse guardados en disco bajo su hash, con LRU acotado
+"""
+
+import os
+import mmap
+import sqlite3
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+class BlobCache:
+    """
+    Caché en disco de objetos inmutables indexados por su hash de contenido
+    
+    Cada objeto se guarda en un fichero cuyo nombre es su hash. Las lecturas
+    usan mmap y devuelven un memoryview, de modo que los objetos calientes se
+    sirven desde la caché de páginas del sistema sin copiarlos a memoria de
+    Python. El tamaño total está acotado por `max_bytes` con expulsión LRU.
+    
+    `put` puede ejecutarse en un hilo (`asyncio.to_thread`) para no escribir
+    en disco desde el event loop; un cerrojo protege el índice LRU.
+    
+    Los objetos empaquetados (varios Data Coins en NDJSON) se guardan en un
+    único fichero con `put_packed`; un índice SQLite en el mismo directorio
+    asocia el hash de cada elemento a su objeto, offset y longitud, y `get`
+    devuelve el tramo correspondiente sin crear un fichero por elemento.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int, digest: Callable[[Union[bytes, memoryview]], str], max_open_maps: int = 256):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_open_maps = max_open_maps
+        self.digest = digest
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        # Cada mmap mantiene un descriptor abierto: solo los más calientes siguen mapeados
+        self._maps: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+        self._lock = threading.RLock()
+        
+        os.makedirs(self.directory, exist_ok=True)
+        self._members = sqlite3.connect(os.path.join(self.directory, ".members.sqlite"), check_same_thread=False, timeout=5.0)
+        self._members.execute("PRAGMA journal_mode=WAL")
+        self._members.executescript("""
+            CREATE TABLE IF NOT EXISTS members (
+                item_hash TEXT PRIMARY KEY,
+                object_hash TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS members_object ON members (object_hash);
+        """)
+        self._load_index()
+    
+    def _load_index(self) -> None:
+        """Reconstruye el índice LRU a partir de los ficheros existentes"""
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(".") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, name, stat.st_size))
+        
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.size_bytes += size
+        
+        # Elementos cuyo objeto empaquetado ya no está en disco
+        with self._members:
+            stale = [
+                (object_hash,) for (object_hash,) in self._members.execute("SELECT DISTINCT object_hash FROM members")
+                if object_hash not in self._entries
+            ]
+            self._members.executemany("DELETE FROM members WHERE object_hash = ?", stale)
+        
+        self._evict()
+        if self._entries:
+            logger.info(f"🗄️ Caché de blobs cargada: {len(self._entries)} objetos, {self.size_bytes} bytes")
+    
+    def _path(self, content_hash: str) -> str:
+        if not content_hash or "/" in content_hash or content_hash.startswith("."):
+            raise ValueError(f"Hash inválido: {content_hash}")
+        return os.path.join(self.directory, content_hash)
+    
+    def __contains__(self, content_hash: str) -> bool:
+        return content_hash in self._entries
+    
+    def get(self, content_hash: str) -> Optional[memoryview]:
+        """
+        Devuelve el contenido mapeado en memoria, o None si no está en caché
+        
+        Si el hash es de un elemento de un objeto empaquetado, devuelve el
+        tramo del objeto que ocupa ese elemento.
+        """
+        with self._lock:
+            if content_hash in self._entries:
+                return self._get(content_hash)
+            member = self._locate(content_hash)
+            if member is None:
+                self.misses += 1
+                return None
+            object_hash, offset, length = member
+            content = self._get(object_hash)
+            if content is None:
+                return None
+            return content[offset:offset + length]
+    
+    def _locate(self, item_hash: str) -> Optional[Tuple[str, int, int]]:
+        row = self._members.execute(
+            "SELECT object_hash, offset, length FROM members WHERE item_hash = ?", (item_hash,)
+        ).fetchone()
+        return tuple(row) if row else None
+    
+    def is_packed(self, content_hash: str) -> bool:
+        """True si el objeto en caché es un objeto empaquetado (NDJSON)"""
+        with self._lock:
+            return self._members.execute(
+                "SELECT 1 FROM members WHERE object_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone() is not None
+    
+    def _get(self, content_hash: str) -> Optional[memoryview]:
+        if content_hash not in self._entries:
+            self.misses += 1
+            return None
+        
+        mapped = self._maps.get(content_hash)
+        if mapped is None:
+            try:
+                with open(self._path(content_hash), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                # Fichero borrado o vacío fuera de la caché: tratar como fallo
+                logger.warning(f"⚠️ Entrada de caché ilegible {content_hash}: {e}")
+                self._drop(content_hash)
+                self.misses += 1
+                return None
+            self._maps[content_hash] = mapped
+            if len(self._maps) > self.max_open_maps:
+                self._maps.popitem(last=False)
+        else:
+            self._maps.move_to_end(content_hash)
+        
+        self._entries.move_to_end(content_hash)
+        self.hits += 1
+        return memoryview(mapped)
+    
+    def put(self, content_hash: str, content: Union[bytes, memoryview], trusted: bool = False) -> bool:
+        """
+        Guarda un objeto bajo su hash si el digest del contenido coincide
+        
+        Con `trusted=True` se omite el recálculo del digest (el llamador
+        acaba de calcularlo). Devuelve False (sin guardar) si el contenido no
+        corresponde al hash o si el objeto no cabe en la caché.
+        """
+        if content_hash in self._entries:
+            return True
+        if len(content) > self.max_bytes:
+            return False
+        if not trusted and self.digest(content) != content_hash:
+            logger.warning(f"⚠️ Contenido no coincide con el hash {content_hash}, no se guarda en caché")
+            return False
+        
+        path = self._path(content_hash)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"❌ Error escribiendo en la caché de blobs: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+        
+        with self._lock:
+            if content_hash not in self._entries:
+                self._entries[content_hash] = len(content)
+                self.size_bytes += len(content)
+            self._evict()
+        return True
+    
+    def put_packed(self, object_hash: str, content: Union[bytes, memoryview],
+                   members: List[Tuple[str, int, int]], trusted: bool = False) -> bool:
+        """
+        Guarda un objeto empaquetado e indexa sus elementos
+        
+        `members` contiene (hash del elemento, offset, longitud) dentro de
+        `content`. Los elementos quedan accesibles por su hash mientras el
+        objeto siga en caché.
+        """
+        if not self.put(object_hash, content, trusted=trusted):
+            return False
+        with self._lock, self._members:
+            self._members.executemany(
+                "INSERT OR REPLACE INTO members (item_hash, object_hash, offset, length) VALUES (?, ?, ?, ?)",
+                [(item_hash, object_hash, offset, length) for item_hash, offset, length in members]
+            )
+        return True
+    
+    def verify(self, content_hash: str) -> Optional[bool]:
+        """
+        Verifica localmente la integridad de un objeto en caché
+        
+        Devuelve None si el objeto no está en caché. Si el digest no coincide
+        (fichero corrupto) la entrada se elimina.
+        """
+        content = self.get(content_hash)
+        if content is None:
+            return None
+        valid = self.digest(content) == content_hash
+        content.release()
+        if not valid:
+            logger.warning(f"⚠️ Objeto corrupto en caché, eliminando: {content_hash}")
+            with self._lock:
+                if content_hash not in self._entries:
+                    # Elemento de un objeto empaquetado: se elimina el objeto entero
+                    member = self._locate(content_hash)
+                    if member is not None:
+                        content_hash = member[0]
+                self._drop(content_hash)
+        return valid
+    
+    def _evict(self) -> None:
+        while self.size_bytes > self.max_bytes and self._entries:
+            content_hash = next(iter(self._entries))
+            self._drop(content_hash)
+            self.evictions += 1
+    
+    def _drop(self, content_hash: str) -> None:
+        with self._lock:
+            size = self._entries.pop(content_hash, 0)
+            self.size_bytes -= size
+            # El mmap se libera cuando no quedan memoryviews vivos que lo referencien
+            self._maps.pop(content_hash, None)
+            with self._members:
+                self._members.execute("DELETE FROM members WHERE object_hash = ?", (content_hash,))
+        try:
+            os.unlink(self._path(content_hash))
+        except OSError:
+            pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de la caché (tasa de aciertos, ocupación, expulsiones)"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,84 @@
+"""
+📣 Broadcast Engine - Envíos masivos concurrentes
+Un mensaje renderizado una vez, entregado a muchos destinatarios con concurrencia acotada
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from services.notification_outbox import TokenBucket, PermanentDeliveryError
+
+logger = logging.getLogger(__name__)
+
+# Entrega a un destinatario o a un lote (API multicast del canal) -> message_id
+SendOne = Callable[[str], Awaitable[Optional[str]]]
+SendBatch = Callable[[List[str]], Awaitable[Optional[str]]]
+
+class BroadcastEngine:
+    """
+    Motor de difusión
+    
+    Reparte los destinatarios entre un grupo fijo de `concurrency` tareas (no
+    una tarea por destinatario) y devuelve cada resultado en cuanto se
+    conoce, en orden de finalización. Si el canal ofrece envío por lotes
+    (`send_batch`), cada tarea entrega lotes de `batch_size` destinatarios en
+    una sola llamada. El cubo de tokens opcional limita las llamadas al
+    proveedor por segundo.
+    """
+    
+    def __init__(self, concurrency: Optional[int] = None, batch_size: Optional[int] = None):
+        self.concurrency = concurrency or int(os.getenv("BROADCAST_CONCURRENCY", "25"))
+        self.batch_size = batch_size or int(os.getenv("BROADCAST_BATCH_SIZE", "500"))
+    
+    async def broadcast(self, recipients: Iterable[str], send_one: SendOne, send_batch: Optional[SendBatch] = None,
+                        bucket: Optional[TokenBucket] = None, concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Entrega a todos los destinatarios (sin duplicados) y produce un resultado por cada uno
+        
+        Cada resultado es {"recipient_id", "success", "message_id"} o
+        {"recipient_id", "success": False, "error", "retryable"}. Cerrar el
+        iterador antes de tiempo cancela los envíos pendientes. `concurrency`
+        reduce la concurrencia para esta difusión (p. ej. al tamaño del pool
+        HTTP del canal: más envíos que conexiones solo esperan en el pool).
+        """
+        recipients = list(dict.fromkeys(recipients))
+        if not recipients:
+            return
+        if send_batch is not None:
+            units: List[Any] = [recipients[i:i + self.batch_size] for i in range(0, len(recipients), self.batch_size)]
+        else:
+            units = recipients
+        pending = iter(units)
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker() -> None:
+            # El iterador es compartido: cada tarea toma la siguiente unidad libre
+            for unit in pending:
+                if bucket is not None:
+                    await bucket.acquire()
+                try:
+                    if send_batch is not None:
+                        message_id = await send_batch(unit)
+                        for recipient_id in unit:
+                            results.put_nowait({"recipient_id": recipient_id, "success": True, "message_id": message_id})
+                    else:
+                        message_id = await send_one(unit)
+                        results.put_nowait({"recipient_id": unit, "success": True, "message_id": message_id})
+                except Exception as e:
+                    retryable = not isinstance(e, PermanentDeliveryError)
+                    for recipient_id in (unit if send_batch is not None else [unit]):
+                        results.put_nowait({"recipient_id": recipient_id, "success": False, "error": str(e), "retryable": retryable})
+        
+        workers = min(self.concurrency, concurrency or self.concurrency, len(units))
+        tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+        try:
+            for _ in range(len(recipients)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+broadcast_engine = BroadcastEngine()
@@ -0,0 +1,604 @@
+"""
+🔎 Chain Indexer - GreenLedger contract events followed into a local SQLite index
+Rankings, company lists and metrics read from indexed tables instead of on-chain view calls
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from eth_hash.auto import keccak
+
+from services.data_dir import data_path
+from services.http_clients import http_clients
+from services.rpc_batcher import RPCBatcher, RPCError
+
+logger = logging.getLogger(__name__)
+
+# (argument, type, indexed) of every event followed. GreenLedgerScore and
+# RewardDistributor emit no events of their own: their changes arrive through
+# the master's ScoreUpdated and RewardAssigned. EcoNFT ownership follows the
+# ERC-721 Transfer event.
+EVENT_ABIS: Dict[str, Tuple[Tuple[str, str, bool], ...]] = {
+    "EmpresaRegistrada": (("wallet", "address", True), ("nombre", "string", False),
+                          ("sector", "string", False), ("pais", "string", False)),
+    "RepresentanteAgregado": (("empresa", "address", True), ("representante", "address", True)),
+    "RepresentanteEliminado": (("empresa", "address", True), ("representante", "address", True)),
+    "MetricaRegistrada": (("empresa", "address", True), ("tipo", "string", False),
+                          ("valor", "uint256", False), ("unidad", "string", False)),
+    "ScoreActualizado": (("empresa", "address", True), ("nuevoScore", "uint256", False)),
+    "ScoreUpdated": (("user", "address", True), ("newScore", "uint256", False)),
+    "RewardAssigned": (("user", "address", True), ("amount", "uint256", False)),
+    "EcoNFTMinted": (("to", "address", True), ("tokenId", "uint256", True), ("uri", "string", False)),
+    "Transfer": (("from", "address", True), ("to", "address", True), ("tokenId", "uint256", True)),
+}
+
+# Contract addresses followed, by environment variable
+CONTRACT_ENV = ("CONTRACT_ADDRESS", "GREENLEDGER_SCORE_ADDRESS", "REWARD_DISTRIBUTOR_ADDRESS", "ECO_NFT_ADDRESS")
+
+ZERO_ADDRESS = "0x" + "00" * 20
+
+def event_topic(name: str) -> str:
+    return "0x" + keccak(f"{name}({','.join(kind for _, kind, _ in EVENT_ABIS[name])})".encode()).hex()
+
+# topic0 -> (event, indexed arguments, data arguments, data types)
+_LAYOUTS = {
+    event_topic(name): (
+        name,
+        tuple((arg, kind) for arg, kind, indexed in abi if indexed),
+        tuple(arg for arg, _, indexed in abi if not indexed),
+        [kind for _, kind, indexed in abi if not indexed]
+    )
+    for name, abi in EVENT_ABIS.items()
+}
+
+def decode_log(log: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(event, arguments) of a raw log, or None for logs of other events"""
+    topics = log["topics"]
+    layout = _LAYOUTS.get(topics[0]) if topics else None
+    if layout is None:
+        return None
+    name, indexed, data_args, data_types = layout
+    if len(topics) != len(indexed) + 1:
+        # Same signature with other indexing (an ERC-20 Transfer)
+        return None
+    values: Dict[str, Any] = {}
+    for (arg, kind), topic in zip(indexed, topics[1:]):
+        values[arg] = "0x" + topic[-40:].lower() if kind == "address" else int(topic, 16)
+    if data_args:
+        try:
+            values.update(zip(data_args, _decode_data(data_types, bytes.fromhex(log["data"][2:]))))
+        except Exception as e:
+            logger.warning(f"⚠️ Skipping undecodable {name} log in block {log.get('blockNumber')}: {e}")
+            return None
+    return name, values
+
+def _decode_data(types: List[str], data: bytes) -> List[Any]:
+    """
+    ABI decoding of log data made of uint256, address and string values
+    
+    Reads the head words and string tails directly (several times faster
+    than eth_abi, which is used for any other type or irregular layout).
+    """
+    values = []
+    if len(data) >= 32 * len(types):
+        for position, kind in enumerate(types):
+            word = data[32 * position:32 * position + 32]
+            if kind == "uint256":
+                values.append(int.from_bytes(word, "big"))
+            elif kind == "address" and not any(word[:12]):
+                values.append("0x" + word[12:].hex())
+            elif kind == "string":
+                offset = int.from_bytes(word, "big")
+                length = int.from_bytes(data[offset:offset + 32], "big")
+                if offset + 32 > len(data) or offset + 32 + length > len(data):
+                    break
+                values.append(data[offset + 32:offset + 32 + length].decode("utf-8"))
+            else:
+                break
+        else:
+            return values
+    from eth_abi import decode
+    return [value.lower() if isinstance(value, str) and value.startswith("0x") else value for value in decode(types, data)]
+
+def _subject(name: str, values: Dict[str, Any]) -> str:
+    """Row key an event changes: a token for NFT events, otherwise its first address"""
+    if name in ("EcoNFTMinted", "Transfer"):
+        return f"nft:{values['tokenId']}"
+    return values[EVENT_ABIS[name][0][0]]
+
+def _sql_int(value: int) -> Any:
+    # uint256 values past SQLite's 64-bit integers are kept as text
+    return value if value < 2 ** 63 else str(value)
+
+def encode_cursor(*key: Any) -> str:
+    """Opaque pagination cursor from the sort key of the last entry served"""
+    return ":".join(str(part) for part in key)
+
+def decode_cursor(cursor: str, parts: int) -> Tuple[int, ...]:
+    """Sort key of a cursor; ValueError if malformed"""
+    values = cursor.split(":")
+    if len(values) != parts:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return tuple(_sql_int(int(value)) for value in values)
+
+class ChainIndex:
+    """
+    Events and the tables derived from them, in SQLite (WAL)
+    
+    Every event is kept with its block and log index, keyed by the row it
+    changes (`subject`: a company/user address or an NFT token). Derived
+    tables are updated as events are applied; rolling back a reorg deletes
+    the orphaned events and rebuilds only the subjects they touched from
+    the events that remain. Queries page with cursors over indexed sort
+    keys, so every page costs the same whatever its depth.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path("chain", "index.sqlite")
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                block_number INTEGER NOT NULL,
+                log_index INTEGER NOT NULL,
+                block_hash TEXT NOT NULL,
+                tx_hash TEXT NOT NULL,
+                address TEXT NOT NULL,
+                event TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                args TEXT NOT NULL,
+                PRIMARY KEY (block_number, log_index)
+            );
+            CREATE INDEX IF NOT EXISTS events_subject ON events (subject, block_number, log_index);
+            CREATE TABLE IF NOT EXISTS blocks (number INTEGER PRIMARY KEY, hash TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS empresas (
+                wallet TEXT PRIMARY KEY,
+                nombre TEXT NOT NULL,
+                sector TEXT NOT NULL,
+                pais TEXT NOT NULL,
+                score INTEGER NOT NULL DEFAULT 0,
+                metricas INTEGER NOT NULL DEFAULT 0,
+                block_number INTEGER NOT NULL,
+                log_index INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS empresas_ranking ON empresas (score DESC, block_number, log_index);
+            CREATE INDEX IF NOT EXISTS empresas_order ON empresas (block_number, log_index);
+            CREATE TABLE IF NOT EXISTS metricas (
+                empresa TEXT NOT NULL,
+                block_number INTEGER NOT NULL,
+                log_index INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                valor INTEGER NOT NULL,
+                unidad TEXT NOT NULL,
+                tx_hash TEXT NOT NULL,
+                PRIMARY KEY (empresa, block_number, log_index)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS representantes (
+                empresa TEXT NOT NULL,
+                representante TEXT NOT NULL,
+                PRIMARY KEY (empresa, representante)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS scores (user TEXT PRIMARY KEY, score INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS recompensas (
+                user TEXT NOT NULL,
+                block_number INTEGER NOT NULL,
+                log_index INTEGER NOT NULL,
+                amount TEXT NOT NULL,
+                PRIMARY KEY (user, block_number, log_index)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS nfts (token_id INTEGER PRIMARY KEY, owner TEXT NOT NULL, uri TEXT);
+            CREATE INDEX IF NOT EXISTS nfts_owner ON nfts (owner, token_id);
+        """)
+    
+    # Writes
+    def last_block(self) -> Optional[int]:
+        row = self._db.execute("SELECT value FROM state WHERE key = 'last_block'").fetchone()
+        return row[0] if row else None
+    
+    def mark_synced(self, head: int) -> None:
+        """Record that the index reached the confirmed head (read by every worker)"""
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO state VALUES (?, ?)", [("head", head), ("synced_at", int(time.time()))])
+    
+    def synced(self) -> Tuple[Optional[int], Optional[int]]:
+        """(head, synced_at) written by the worker that runs the indexer"""
+        rows = dict(self._db.execute("SELECT key, value FROM state WHERE key IN ('head', 'synced_at')").fetchall())
+        return rows.get("head"), rows.get("synced_at")
+    
+    def block_hashes(self) -> List[Tuple[int, str]]:
+        """Stored block hashes, newest first"""
+        return self._db.execute("SELECT number, hash FROM blocks ORDER BY number DESC").fetchall()
+    
+    def apply(self, events: List[Tuple], hashes: Dict[int, str], last_block: int, keep_from: int) -> int:
+        """
+        Apply decoded events in one transaction and move the cursor to `last_block`
+        
+        `events` are (block, log index, block hash, tx hash, address, event,
+        subject, arguments) in chain order; `hashes` are the block hashes to
+        remember for reorg detection. Hashes older than `keep_from` are
+        forgotten except the newest one. Returns how many events were new.
+        """
+        applied = 0
+        with self._db:
+            for block, index, block_hash, tx_hash, address, name, subject, values in events:
+                inserted = self._db.execute(
+                    "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (block, index, block_hash, tx_hash, address, name, subject, json.dumps(values))
+                ).rowcount
+                if inserted:
+                    self._project(name, values, block, index, tx_hash)
+                    applied += 1
+            self._db.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?)", hashes.items())
+            self._db.execute(
+                "DELETE FROM blocks WHERE number < ? AND number < (SELECT MAX(number) FROM blocks)", (keep_from,)
+            )
+            self._db.execute("INSERT OR REPLACE INTO state VALUES ('last_block', ?)", (last_block,))
+        return applied
+    
+    def _project(self, name: str, values: Dict[str, Any], block: int, index: int, tx_hash: str) -> None:
+        db = self._db
+        if name == "EmpresaRegistrada":
+            db.execute(
+                "INSERT OR REPLACE INTO empresas VALUES (?, ?, ?, ?, 0, 0, ?, ?)",
+                (values["wallet"], values["nombre"], values["sector"], values["pais"], block, index)
+            )
+        elif name == "MetricaRegistrada":
+            db.execute(
+                "INSERT OR REPLACE INTO metricas VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (values["empresa"], block, index, values["tipo"], _sql_int(values["valor"]), values["unidad"], tx_hash)
+            )
+            db.execute("UPDATE empresas SET metricas = metricas + 1 WHERE wallet = ?", (values["empresa"],))
+        elif name == "ScoreActualizado":
+            db.execute("UPDATE empresas SET score = ? WHERE wallet = ?", (_sql_int(values["nuevoScore"]), values["empresa"]))
+        elif name == "RepresentanteAgregado":
+            db.execute("INSERT OR IGNORE INTO representantes VALUES (?, ?)", (values["empresa"], values["representante"]))
+        elif name == "RepresentanteEliminado":
+            db.execute(
+                "DELETE FROM representantes WHERE empresa = ? AND representante = ?", (values["empresa"], values["representante"])
+            )
+        elif name == "ScoreUpdated":
+            db.execute("INSERT OR REPLACE INTO scores VALUES (?, ?)", (values["user"], _sql_int(values["newScore"])))
+        elif name == "RewardAssigned":
+            db.execute("INSERT OR REPLACE INTO recompensas VALUES (?, ?, ?, ?)", (values["user"], block, index, str(values["amount"])))
+        elif name == "EcoNFTMinted":
+            db.execute(
+                "INSERT INTO nfts VALUES (?, ?, ?) ON CONFLICT (token_id) DO UPDATE SET owner = excluded.owner, uri = excluded.uri",
+                (_sql_int(values["tokenId"]), values["to"], values["uri"])
+            )
+        elif name == "Transfer":
+            if values["to"] == ZERO_ADDRESS:
+                db.execute("DELETE FROM nfts WHERE token_id = ?", (_sql_int(values["tokenId"]),))
+            else:
+                db.execute(
+                    "INSERT INTO nfts VALUES (?, ?, NULL) ON CONFLICT (token_id) DO UPDATE SET owner = excluded.owner",
+                    (_sql_int(values["tokenId"]), values["to"])
+                )
+    
+    def rollback(self, block: int) -> List[Tuple[str, str]]:
+        """
+        Undo every event after `block` (a reorg) and rebuild the rows they touched
+        
+        Returns the (event, subject) pairs removed, so caches can drop them.
+        """
+        with self._db:
+            removed = self._db.execute(
+                "SELECT DISTINCT event, subject FROM events WHERE block_number > ?", (block,)
+            ).fetchall()
+            subjects = sorted({subject for _, subject in removed})
+            self._db.execute("DELETE FROM events WHERE block_number > ?", (block,))
+            self._db.execute("DELETE FROM blocks WHERE number > ?", (block,))
+            for start in range(0, len(subjects), 500):
+                chunk = subjects[start:start + 500]
+                self._clear(chunk)
+                marks = ", ".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT block_number, log_index, tx_hash, event, args FROM events WHERE subject IN ({marks}) "
+                    "ORDER BY block_number, log_index", chunk
+                ).fetchall()
+                for row_block, index, tx_hash, name, args in rows:
+                    self._project(name, json.loads(args), row_block, index, tx_hash)
+            self._db.execute("INSERT OR REPLACE INTO state VALUES ('last_block', ?)", (block,))
+        return removed
+    
+    def _clear(self, subjects: List[str]) -> None:
+        wallets = [subject for subject in subjects if not subject.startswith("nft:")]
+        tokens = [_sql_int(int(subject[4:])) for subject in subjects if subject.startswith("nft:")]
+        for table, column, keys in (("empresas", "wallet", wallets), ("metricas", "empresa", wallets),
+                                    ("representantes", "empresa", wallets), ("scores", "user", wallets),
+                                    ("recompensas", "user", wallets), ("nfts", "token_id", tokens)):
+            if keys:
+                self._db.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join('?' * len(keys))})", keys)
+    
+    # Reads
+    @staticmethod
+    def _empresa(row: Tuple) -> Dict[str, Any]:
+        wallet, nombre, sector, pais, score, metricas = row[:6]
+        return {"wallet": wallet, "nombre": nombre, "sector": sector, "pais": pais, "score": int(score), "metricas": metricas}
+    
+    def ranking(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Companies by score (highest first, ties by registration order); (entries, next_cursor)"""
+        where, params = "", ()
+        if cursor is not None:
+            score, block, index = decode_cursor(cursor, 3)
+            where = "WHERE score < ? OR (score = ? AND (block_number, log_index) > (?, ?))"
+            params = (score, score, block, index)
+        rows = self._db.execute(
+            f"SELECT wallet, nombre, sector, pais, score, metricas, block_number, log_index FROM empresas {where} "
+            "ORDER BY score DESC, block_number, log_index LIMIT ?", (*params, limit + 1)
+        ).fetchall()
+        next_cursor = encode_cursor(rows[limit - 1][4], *rows[limit - 1][6:]) if len(rows) > limit else None
+        return [self._empresa(row) for row in rows[:limit]], next_cursor
+    
+    def empresas(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Companies in registration order (the order of `verTodasEmpresas`); (entries, next_cursor)"""
+        where, params = "", ()
+        if cursor is not None:
+            where, params = "WHERE (block_number, log_index) > (?, ?)", decode_cursor(cursor, 2)
+        rows = self._db.execute(
+            f"SELECT wallet, nombre, sector, pais, score, metricas, block_number, log_index FROM empresas {where} "
+            "ORDER BY block_number, log_index LIMIT ?", (*params, limit + 1)
+        ).fetchall()
+        next_cursor = encode_cursor(*rows[limit - 1][6:]) if len(rows) > limit else None
+        return [self._empresa(row) for row in rows[:limit]], next_cursor
+    
+    def metricas(self, empresa: str, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Metrics of a company in the order they were registered; (entries, next_cursor)"""
+        where, params = "", ()
+        if cursor is not None:
+            where, params = "AND (block_number, log_index) > (?, ?)", decode_cursor(cursor, 2)
+        rows = self._db.execute(
+            f"SELECT tipo, valor, unidad, block_number, log_index, tx_hash FROM metricas WHERE empresa = ? {where} "
+            "ORDER BY block_number, log_index LIMIT ?", (empresa.lower(), *params, limit + 1)
+        ).fetchall()
+        next_cursor = encode_cursor(*rows[limit - 1][3:5]) if len(rows) > limit else None
+        return [
+            {"tipo": tipo, "valor": int(valor), "unidad": unidad, "block_number": block, "tx_hash": tx_hash}
+            for tipo, valor, unidad, block, _, tx_hash in rows[:limit]
+        ], next_cursor
+    
+    def counts(self) -> Dict[str, int]:
+        return {
+            table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("events", "empresas", "metricas", "nfts")
+        }
+    
+    def close(self) -> None:
+        self._db.close()
+
+class ChainIndexer:
+    """
+    Follows the GreenLedger contracts with `eth_getLogs` into a `ChainIndex`
+    
+    Only blocks `confirmations` deep are indexed. Each step covers up to
+    `concurrency` ranges of `range_size` blocks, fetched concurrently and
+    applied in order in one transaction; a range the node refuses as too
+    large is split in half and later ranges use the smaller size.
+    
+    Reorgs: the hash of the step's last block is read before and after the
+    fetch (a change means the chain moved under it and the step is retried),
+    and every step first compares the stored hash of the last indexed block
+    with the node's. On a mismatch it walks back through the hashes kept for
+    the last `reorg_depth` blocks to the fork point and rolls the index back.
+    Listeners get (event, address) for applied and rolled-back events.
+    
+    Only the leader worker runs the indexer, but every worker reads the same
+    SQLite file: `ready` comes from the head and time of the last sync
+    stored in the index, so followers serve indexed reads too, and stop
+    when the leader has not reached the head for `ready_ttl` seconds.
+    """
+    
+    def __init__(self, rpc_url: Optional[str] = None, addresses: Optional[List[str]] = None,
+                 index: Optional[ChainIndex] = None, start_block: Optional[int] = None,
+                 range_size: Optional[int] = None, concurrency: Optional[int] = None,
+                 confirmations: Optional[int] = None, poll_interval: Optional[float] = None, reorg_depth: int = 64,
+                 ready_ttl: Optional[float] = None):
+        self.rpc_url = rpc_url or os.getenv("RPC_URL", "https://sepolia.infura.io/v3/YOUR_KEY")
+        if addresses is None:
+            addresses = [os.getenv(name) for name in CONTRACT_ENV if os.getenv(name)]
+        self.addresses = [address.lower() for address in addresses]
+        self.index = index or ChainIndex()
+        self.start_block = start_block if start_block is not None else int(os.getenv("INDEXER_START_BLOCK", "0"))
+        self.range_size = range_size or int(os.getenv("INDEXER_RANGE_SIZE", "2000"))
+        self.concurrency = concurrency or int(os.getenv("INDEXER_CONCURRENCY", "4"))
+        self.confirmations = confirmations if confirmations is not None else int(os.getenv("INDEXER_CONFIRMATIONS", "2"))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("INDEXER_POLL_INTERVAL", "2.0"))
+        self.reorg_depth = reorg_depth
+        self.ready_ttl = ready_ttl if ready_ttl is not None else float(os.getenv("INDEXER_READY_TTL", "60"))
+        self.topics = [list(_LAYOUTS)]
+        # Block hashes read in the same loop tick share one JSON-RPC batch
+        self._batcher = RPCBatcher(self.rpc_url, window=0, mode="jsonrpc")
+        self.head: Optional[int] = None
+        self.error: Optional[str] = None
+        self.events = 0
+        self.blocks = 0
+        self.requests = 0
+        self.splits = 0
+        self.reorgs = 0
+        self.retries = 0
+        self._listeners: List[Callable[[str, Optional[str]], Any]] = []
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def ready(self) -> bool:
+        """Whether the shared index reached the confirmed head within the last `ready_ttl` seconds"""
+        _, synced_at = self.index.synced()
+        return synced_at is not None and time.time() - synced_at <= self.ready_ttl
+    
+    def subscribe(self, listener: Callable[[str, Optional[str]], Any]) -> None:
+        """Call `listener(event, address)` for every event applied or rolled back"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+    
+    async def start(self) -> None:
+        if not self.addresses:
+            logger.warning("⚠️ Chain indexer not started: no contract address configured")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+                if self.error is not None:
+                    logger.info("✅ Chain indexer following the node again")
+                self.error = None
+            except Exception as e:
+                if self.error is None:
+                    logger.error(f"❌ Chain indexer error: {e}")
+                self.error = str(e)
+            await asyncio.sleep(self.poll_interval)
+    
+    async def sync(self) -> int:
+        """Index up to the confirmed head; returns how many events were applied"""
+        applied, target = 0, None
+        while True:
+            last = self.index.last_block()
+            start = self.start_block if last is None else last + 1
+            if target is None or start > target:
+                self.head = int(await self._rpc("eth_blockNumber", []), 16)
+                target = self.head - self.confirmations
+                if start > target:
+                    if not await self._check_reorg():
+                        self.index.mark_synced(self.head)
+                        return applied
+                    continue
+            end = min(target, start + self.range_size * self.concurrency - 1)
+            # Both reads go out in one JSON-RPC batch
+            rolled_back, before = await asyncio.gather(self._check_reorg(), self._block_hash(end))
+            if not rolled_back:
+                applied += await self._step(start, end, before)
+    
+    async def _step(self, start: int, end: int, before: Optional[str]) -> int:
+        bounds = [(low, min(end, low + self.range_size - 1)) for low in range(start, end + 1, self.range_size)]
+        results = await asyncio.gather(*(self._get_logs(low, high) for low, high in bounds))
+        after = await self._block_hash(end)
+        if after is None or after != before:
+            # The chain changed while fetching: the next step checks for a reorg and retries
+            self.retries += 1
+            return 0
+        
+        events, hashes = [], {end: after}
+        keep_from = self.head - self.reorg_depth
+        for logs in results:
+            for log in logs:
+                decoded = None if log.get("removed") else decode_log(log)
+                if decoded is None:
+                    continue
+                name, values = decoded
+                block = int(log["blockNumber"], 16)
+                events.append((block, int(log["logIndex"], 16), log["blockHash"], log["transactionHash"],
+                               log["address"].lower(), name, _subject(name, values), values))
+                if block >= keep_from:
+                    hashes[block] = log["blockHash"]
+        applied = self.index.apply(events, hashes, end, keep_from)
+        self.events += applied
+        self.blocks += end - start + 1
+        self._notify({(event[5], event[6]) for event in events})
+        return applied
+    
+    async def _check_reorg(self) -> bool:
+        """Roll the index back to the fork point if the last indexed block is no longer canonical"""
+        stored = self.index.block_hashes()
+        if not stored or await self._block_hash(stored[0][0]) == stored[0][1]:
+            return False
+        # The rest of the window in one JSON-RPC batch; nothing matching drops the whole window
+        current = await asyncio.gather(*(self._block_hash(number) for number, _ in stored[1:]))
+        fork = stored[-1][0] - 1
+        for (number, known), block_hash in zip(stored[1:], current):
+            if block_hash == known:
+                fork = number
+                break
+        removed = self.index.rollback(fork)
+        self.reorgs += 1
+        logger.warning(f"⚠️ Reorg below block {stored[0][0]}: index rolled back to {fork} ({len(removed)} events undone)")
+        self._notify(removed)
+        return True
+    
+    def _notify(self, events) -> None:
+        for name, subject in events:
+            address = None if subject.startswith("nft:") else subject
+            for listener in self._listeners:
+                try:
+                    listener(name, address)
+                except Exception as e:
+                    logger.error(f"❌ Chain indexer listener failed for {name}: {e}")
+    
+    async def _get_logs(self, start: int, end: int) -> List[Dict[str, Any]]:
+        try:
+            return await self._rpc("eth_getLogs", [{
+                "fromBlock": hex(start), "toBlock": hex(end), "address": self.addresses, "topics": self.topics
+            }])
+        except RPCError as e:
+            if start == end or not _too_large(e):
+                raise
+            self.splits += 1
+            middle = (start + end) // 2
+            self.range_size = max(1, min(self.range_size, middle - start + 1))
+            first, second = await asyncio.gather(self._get_logs(start, middle), self._get_logs(middle + 1, end))
+            return first + second
+    
+    async def _block_hash(self, number: int) -> Optional[str]:
+        block = await self._batcher.request("eth_getBlockByNumber", [hex(number), False])
+        return block["hash"] if block else None
+    
+    async def _rpc(self, method: str, params: list) -> Any:
+        self.requests += 1
+        response = await http_clients.get("rpc").post(
+            self.rpc_url, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        )
+        response.raise_for_status()
+        reply = response.json()
+        if "error" in reply:
+            raise RPCError(reply["error"])
+        return reply["result"]
+    
+    def stats(self) -> Dict[str, Any]:
+        last = self.index.last_block()
+        # Followers do not poll the node: they report the head the leader stored
+        head, synced_at = self.index.synced()
+        head = self.head if self.head is not None else head
+        return {
+            "ready": self.ready,
+            "last_block": last,
+            "head": head,
+            "synced_at": synced_at,
+            "lag": head - last if head is not None and last is not None else None,
+            "contracts": self.addresses,
+            "range_size": self.range_size,
+            "events_applied": self.events,
+            "blocks_scanned": self.blocks,
+            "rpc_requests": self.requests + self._batcher.round_trips,
+            "range_splits": self.splits,
+            "reorgs": self.reorgs,
+            "retried_steps": self.retries,
+            "error": self.error,
+            **self.index.counts()
+        }
+
+def _too_large(error: RPCError) -> bool:
+    """Whether the node refused an eth_getLogs range for its size or result count"""
+    message = str(error).lower()
+    return any(hint in message for hint in ("range", "limit", "too many", "exceed", "more than", "-32005"))
+
+_indexer: Optional[ChainIndexer] = None
+
+def get_chain_indexer() -> Optional[ChainIndexer]:
+    """Indexer shared by the lifespan and the company routes; None unless CHAIN_INDEXER_ENABLED"""
+    global _indexer
+    if _indexer is None and os.getenv("CHAIN_INDEXER_ENABLED", "false").lower() == "true":
+        _indexer = ChainIndexer()
+    return _indexer
@@ -0,0 +1,329 @@
+"""
+⏰ Cron Scheduler - Planificador de tareas en proceso
+Expresiones cron evaluadas en UTC y un montículo de próximas ejecuciones sobre asyncio
+"""
+
+import os
+import time
+import heapq
+import calendar
+import asyncio
+import logging
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tarea programada: corrutina sin argumentos
+JobFunc = Callable[[], Awaitable[Any]]
+
+_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTHS = {name: i for i, name in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+_WEEKDAYS = {name: i for i, name in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))}
+
+# Tope de espera del bucle: vuelve a mirar el reloj aunque no venza nada (cambios de hora del sistema)
+_MAX_SLEEP = 60.0
+
+def _parse_value(token: str, names: Dict[str, int]) -> int:
+    return names[token] if token in names else int(token)
+
+def _parse_field(text: str, low: int, high: int, names: Dict[str, int]) -> Tuple[int, ...]:
+    values: Set[int] = set()
+    for part in text.lower().split(","):
+        base, _, step = part.partition("/")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            first, _, last = base.partition("-")
+            start, end = _parse_value(first, names), _parse_value(last, names)
+        else:
+            start = _parse_value(base, names)
+            end = high if step else start
+        step_value = int(step) if step else 1
+        if step_value < 1 or start > end:
+            raise ValueError(f"Rango cron inválido: {part}")
+        values.update(range(start, end + 1, step_value))
+    if not values or min(values) < low or max(values) > high:
+        raise ValueError(f"Valor cron fuera de rango [{low}-{high}]: {text}")
+    return tuple(sorted(values))
+
+class CronExpression:
+    """
+    Expresión cron de cinco campos (minuto hora día mes día-de-la-semana)
+    
+    Admite `*`, listas, rangos, pasos (`*/6`, `8-18/2`), nombres de mes y de
+    día (`jan`, `mon`) y los alias `@daily`, `@monthly`... Si se restringen
+    el día del mes y el de la semana, basta con que coincida uno (como en
+    cron). `next_after` salta campo a campo en lugar de recorrer minutos.
+    """
+    
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = _ALIASES.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"La expresión cron debe tener 5 campos: {expression}")
+        minute, hour, day, month, weekday = fields
+        self.minutes = _parse_field(minute, 0, 59, {})
+        self.hours = _parse_field(hour, 0, 23, {})
+        self.day_list = _parse_field(day, 1, 31, {})
+        self.days: FrozenSet[int] = frozenset(self.day_list)
+        self.months = _parse_field(month, 1, 12, _MONTHS)
+        # 7 también es domingo
+        self.weekdays: FrozenSet[int] = frozenset(d % 7 for d in _parse_field(weekday, 0, 7, _WEEKDAYS))
+        self._any_day = day.startswith("*")
+        self._any_weekday = weekday.startswith("*")
+    
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+    
+    def next_after(self, moment: datetime) -> datetime:
+        """Primera ejecución estrictamente posterior a `moment` (UTC)"""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        candidate = moment.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate.year + 8
+        while candidate.year <= limit:
+            if candidate.month not in self.months:
+                i = bisect_left(self.months, candidate.month)
+                if i < len(self.months):
+                    candidate = candidate.replace(month=self.months[i], day=1, hour=0, minute=0)
+                else:
+                    candidate = candidate.replace(year=candidate.year + 1, month=self.months[0], day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                if self._any_weekday:
+                    # Solo cuenta el día del mes: salta al siguiente permitido (o al mes siguiente)
+                    i = bisect_left(self.day_list, candidate.day)
+                    if i < len(self.day_list) and self.day_list[i] <= calendar.monthrange(candidate.year, candidate.month)[1]:
+                        candidate = candidate.replace(day=self.day_list[i], hour=0, minute=0)
+                    else:
+                        candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                else:
+                    candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                i = bisect_left(self.hours, candidate.hour)
+                if i < len(self.hours):
+                    candidate = candidate.replace(hour=self.hours[i], minute=0)
+                else:
+                    candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.minute not in self.minutes:
+                i = bisect_left(self.minutes, candidate.minute)
+                if i < len(self.minutes):
+                    candidate = candidate.replace(minute=self.minutes[i])
+                else:
+                    candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            return candidate
+        raise ValueError(f"La expresión cron no tiene próximas ejecuciones: {self.expression}")
+
+def isoformat(moment: Optional[datetime]) -> Optional[str]:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ") if moment else None
+
+class _Job:
+    """Estado en memoria de una tarea programada"""
+    __slots__ = ("id", "cron", "func", "misfire_grace", "next_run", "generation",
+                 "last_run", "last_status", "last_error", "runs", "failures", "misfires")
+    
+    def __init__(self, job_id: str, cron: CronExpression, func: JobFunc, misfire_grace: float):
+        self.id = job_id
+        self.cron = cron
+        self.func = func
+        self.misfire_grace = misfire_grace
+        self.next_run: Optional[datetime] = None
+        self.generation = 0
+        self.last_run: Optional[datetime] = None
+        self.last_status: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.failures = 0
+        self.misfires = 0
+
+class CronScheduler:
+    """
+    Planificador cron en proceso
+    
+    Las próximas ejecuciones viven en un montículo: el bucle duerme hasta la
+    primera (o hasta que `add` programe otra anterior), así que con miles de
+    tareas cada despertar sigue costando O(log n) y no hay sondeo periódico.
+    
+    Como mucho `max_concurrent` tareas se ejecutan a la vez y una tarea nunca
+    se solapa consigo misma. Una ejecución que no puede empezar dentro de
+    `misfire_grace` segundos de su hora (proceso dormido, bucle bloqueado o
+    espera por el límite de concurrencia) se omite y cuenta como misfire; las
+    horas perdidas no se recuperan una a una, se sigue con la siguiente.
+    """
+    
+    def __init__(self, max_concurrent: Optional[int] = None, misfire_grace: Optional[float] = None):
+        self.max_concurrent = max_concurrent or int(os.getenv("SCHEDULER_MAX_CONCURRENT", "2"))
+        self.misfire_grace = misfire_grace if misfire_grace is not None else float(os.getenv("SCHEDULER_MISFIRE_GRACE", "300"))
+        self._jobs: Dict[str, _Job] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._counter = 0
+        self._waiter: Optional[asyncio.Future] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running_tasks: Set[asyncio.Task] = set()
+        self._active: Set[str] = set()
+        self.wakeups = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+    
+    def __len__(self) -> int:
+        return len(self._jobs)
+    
+    def add(self, job_id: str, schedule: str, func: JobFunc, misfire_grace: Optional[float] = None) -> datetime:
+        """Programa (o reprograma) una tarea y devuelve su próxima ejecución"""
+        job = _Job(job_id, CronExpression(schedule), func, self.misfire_grace if misfire_grace is None else misfire_grace)
+        previous = self._jobs.get(job_id)
+        if previous is not None:
+            job.generation = previous.generation + 1
+        self._jobs[job_id] = job
+        self._push(job, job.cron.next_after(datetime.now(timezone.utc)))
+        return job.next_run
+    
+    def remove(self, job_id: str) -> bool:
+        """Deja de programar una tarea (una ejecución en curso termina normalmente)"""
+        # Sus entradas en el montículo quedan huérfanas y se descartan al salir
+        return self._jobs.pop(job_id, None) is not None
+    
+    def _push(self, job: _Job, next_run: datetime) -> None:
+        job.next_run = next_run
+        fire_at = next_run.timestamp()
+        # Solo hay que despertar al bucle si esta pasa a ser la primera
+        if not self._heap or fire_at < self._heap[0][0]:
+            self._wake()
+        self._counter += 1
+        heapq.heappush(self._heap, (fire_at, self._counter, job.id, job.generation))
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {
+            "id": job.id,
+            "schedule": job.cron.expression,
+            "next_run": isoformat(job.next_run),
+            "running": job.id in self._active,
+            "last_run": isoformat(job.last_run),
+            "last_status": job.last_status,
+            "last_error": job.last_error,
+            "runs": job.runs,
+            "failures": job.failures,
+            "misfires": job.misfires
+        }
+    
+    def jobs(self) -> List[Dict[str, Any]]:
+        return [self.get(job_id) for job_id in self._jobs]
+    
+    async def start(self) -> None:
+        if self._task is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"⏰ Planificador activo ({len(self._jobs)} tareas, {self.max_concurrent} ejecuciones simultáneas)")
+    
+    async def stop(self) -> None:
+        """Detiene el bucle y cancela las ejecuciones en curso"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in self._running_tasks:
+            task.cancel()
+        await asyncio.gather(self._task, *self._running_tasks, return_exceptions=True)
+        self._task = None
+    
+    async def _run(self) -> None:
+        while True:
+            # Entradas de tareas eliminadas o reprogramadas
+            while self._heap:
+                _, _, job_id, generation = self._heap[0]
+                job = self._jobs.get(job_id)
+                if job is not None and job.generation == generation:
+                    break
+                heapq.heappop(self._heap)
+            
+            if not self._heap:
+                delay = _MAX_SLEEP
+            else:
+                delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                # Un único temporizador del event loop, sea cual sea el número de tareas
+                loop = asyncio.get_running_loop()
+                self._waiter = loop.create_future()
+                timer = loop.call_later(min(delay, _MAX_SLEEP), self._wake)
+                try:
+                    await self._waiter
+                finally:
+                    timer.cancel()
+                    self._waiter = None
+                self.wakeups += 1
+                continue
+            
+            fire_at, _, job_id, _ = heapq.heappop(self._heap)
+            job = self._jobs[job_id]
+            now = datetime.now(timezone.utc)
+            self._dispatch(job, fire_at)
+            # La siguiente hora se calcula desde ahora: las perdidas no se encadenan
+            self._push(job, job.cron.next_after(max(now, job.next_run)))
+    
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+    
+    def _dispatch(self, job: _Job, fire_at: float) -> None:
+        late = time.time() - fire_at
+        if late > job.misfire_grace:
+            self._misfire(job, f"{late:.0f}s tarde")
+        elif job.id in self._active:
+            self._misfire(job, "la ejecución anterior sigue en curso")
+        else:
+            self._active.add(job.id)
+            task = asyncio.create_task(self._execute(job, fire_at))
+            self._running_tasks.add(task)
+            task.add_done_callback(self._running_tasks.discard)
+    
+    def _misfire(self, job: _Job, reason: str) -> None:
+        job.misfires += 1
+        job.last_status = "misfire"
+        logger.warning(f"⚠️ Ejecución de {job.id} omitida ({reason})")
+    
+    async def _execute(self, job: _Job, fire_at: float) -> None:
+        try:
+            async with self._semaphore:
+                late = time.time() - fire_at
+                if late > job.misfire_grace:
+                    self._misfire(job, f"{late:.0f}s esperando turno")
+                    return
+                job.last_run = datetime.now(timezone.utc)
+                job.runs += 1
+                logger.info(f"⏰ Ejecutando tarea programada {job.id}")
+                try:
+                    await job.func()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    job.failures += 1
+                    job.last_status = "failed"
+                    job.last_error = str(e)
+                    logger.error(f"❌ Error en tarea programada {job.id}: {e}")
+                else:
+                    job.last_status = "completed"
+                    job.last_error = None
+        finally:
+            self._active.discard(job.id)
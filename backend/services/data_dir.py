@@ -0,0 +1,17 @@
+"""
+💾 Data Dir - Ubicación de los datos locales del backend
+Cachés, colas y almacenes SQLite comparten el directorio GREENLEDGER_DATA_DIR
+"""
+
+import os
+
+DATA_DIR = os.getenv(
+    "GREENLEDGER_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+)
+
+def data_path(*parts: str) -> str:
+    """Ruta dentro del directorio de datos, creando los directorios padre"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
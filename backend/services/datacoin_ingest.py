@@ -0,0 +1,263 @@
+"""
+📥 DataCoin Ingest - Validación de métricas para ingesta masiva
+Catálogo de métricas soportadas y validación de lotes de Data Coins
+"""
+
+import csv
+import json
+import math
+import logging
+from typing import Dict, Any, List, Tuple, Iterable, AsyncIterator, Optional, Union
+
+from services.lighthouse_service import DataCoin
+
+logger = logging.getLogger(__name__)
+
+# Catálogo de métricas soportadas (expuesto en /api/v1/datacoins/metrics/types)
+METRIC_TYPES: List[Dict[str, Any]] = [
+    {
+        "type": "energy_consumption",
+        "name": "Consumo de Energía",
+        "units": ["kwh", "mwh", "joules"],
+        "description": "Consumo total de energía del período"
+    },
+    {
+        "type": "carbon_emissions",
+        "name": "Emisiones de Carbono",
+        "units": ["kg_co2", "tons_co2"],
+        "description": "Emisiones de CO2 equivalente"
+    },
+    {
+        "type": "water_usage",
+        "name": "Uso de Agua",
+        "units": ["liters", "m3", "gallons"],
+        "description": "Consumo total de agua"
+    },
+    {
+        "type": "waste_generation",
+        "name": "Generación de Residuos",
+        "units": ["kg", "tons"],
+        "description": "Residuos generados en el período"
+    },
+    {
+        "type": "renewable_energy_percentage",
+        "name": "Porcentaje de Energía Renovable",
+        "units": ["percentage"],
+        "description": "Porcentaje de energía proveniente de fuentes renovables"
+    },
+    {
+        "type": "recycling_rate",
+        "name": "Tasa de Reciclaje",
+        "units": ["percentage"],
+        "description": "Porcentaje de materiales reciclados"
+    }
+]
+
+# Índice tipo de métrica -> unidades válidas
+METRIC_UNITS: Dict[str, frozenset] = {
+    metric["type"]: frozenset(metric["units"]) for metric in METRIC_TYPES
+}
+
+def validate_datacoin(company_id: str, metric_type: str, value: float, unit: str, timestamp: str) -> DataCoin:
+    """
+    Valida los campos de una métrica y construye su Data Coin
+    
+    Lanza ValueError con un mensaje legible si la métrica no es válida.
+    """
+    if not company_id:
+        raise ValueError("company_id es obligatorio")
+    
+    units = METRIC_UNITS.get(metric_type)
+    if units is None:
+        raise ValueError(f"Tipo de métrica no soportado: {metric_type}")
+    if unit not in units:
+        raise ValueError(f"Unidad '{unit}' no válida para {metric_type} (válidas: {', '.join(sorted(units))})")
+    if not math.isfinite(value):
+        raise ValueError("El valor de la métrica debe ser un número finito")
+    if not timestamp:
+        raise ValueError("timestamp es obligatorio")
+    
+    return DataCoin(
+        company_id=company_id,
+        metric_type=metric_type,
+        value=value,
+        unit=unit,
+        timestamp=timestamp
+    )
+
+def validate_datacoin_batch(records: Iterable[Any]) -> Tuple[List[Tuple[int, DataCoin]], List[Dict[str, Any]]]:
+    """
+    Valida un lote de métricas en una sola pasada
+    
+    Cada registro debe exponer company_id, metric_type, value, unit y timestamp
+    como atributos (p. ej. DataCoinUploadRequest). Devuelve los Data Coins válidos
+    junto a su índice original y la lista de errores por índice.
+    """
+    valid: List[Tuple[int, DataCoin]] = []
+    errors: List[Dict[str, Any]] = []
+    
+    for index, record in enumerate(records):
+        try:
+            datacoin = validate_datacoin(
+                record.company_id,
+                record.metric_type,
+                record.value,
+                record.unit,
+                record.timestamp
+            )
+            valid.append((index, datacoin))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    
+    if errors:
+        logger.warning(f"⚠️ {len(errors)} métricas rechazadas en la validación del lote")
+    
+    return valid, errors
+
+# ==========================================
+# Pipeline de ingesta en streaming (NDJSON / CSV)
+# ==========================================
+
+DATACOIN_FIELDS = ("company_id", "metric_type", "value", "unit", "timestamp")
+
+class RowError(ValueError):
+    """Error de validación asociado a una fila del stream"""
+    
+    def __init__(self, row: int, message: str):
+        super().__init__(message)
+        self.row = row
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = 64 * 1024) -> AsyncIterator[Tuple[int, Union[str, RowError]]]:
+    """
+    Divide un stream de bytes en líneas sin cargarlo completo en memoria
+    
+    Produce (número de fila, línea) empezando en 1. Las líneas que superan
+    `max_line_bytes` se descartan y se reportan como RowError.
+    """
+    buffer = b""
+    row = 0
+    oversized = False
+    
+    async for chunk in chunks:
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            row += 1
+            if oversized or len(line) > max_line_bytes:
+                oversized = False
+                yield row, RowError(row, f"La fila supera el máximo de {max_line_bytes} bytes")
+            elif line.strip():
+                yield row, line.rstrip(b"\r").decode("utf-8", errors="replace")
+        if len(buffer) > max_line_bytes:
+            # Descartar la fila en curso y seguir leyendo hasta su salto de línea
+            buffer = b""
+            oversized = True
+    
+    if oversized:
+        row += 1
+        yield row, RowError(row, f"La fila supera el máximo de {max_line_bytes} bytes")
+    elif buffer.strip():
+        row += 1
+        yield row, buffer.rstrip(b"\r").decode("utf-8", errors="replace")
+
+async def parse_ndjson_rows(lines: AsyncIterator[Tuple[int, Union[str, RowError]]]) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], RowError]]]:
+    """Convierte líneas NDJSON en diccionarios"""
+    async for row, line in lines:
+        if isinstance(line, RowError):
+            yield row, line
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, RowError(row, f"JSON inválido: {e.msg}")
+            continue
+        if not isinstance(record, dict):
+            yield row, RowError(row, "Cada fila debe ser un objeto JSON")
+            continue
+        yield row, record
+
+async def parse_csv_rows(lines: AsyncIterator[Tuple[int, Union[str, RowError]]]) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], RowError]]]:
+    """Convierte líneas CSV en diccionarios usando la primera fila como cabecera"""
+    header: Optional[List[str]] = None
+    
+    async for row, line in lines:
+        if isinstance(line, RowError):
+            yield row, line
+            continue
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error as e:
+            yield row, RowError(row, f"CSV inválido: {e}")
+            continue
+        
+        if header is None:
+            header = [name.strip() for name in values]
+            missing = [field for field in DATACOIN_FIELDS if field not in header]
+            if missing:
+                raise ValueError(f"Cabecera CSV sin columnas obligatorias: {', '.join(missing)}")
+            continue
+        
+        if len(values) != len(header):
+            yield row, RowError(row, f"Se esperaban {len(header)} columnas y se recibieron {len(values)}")
+            continue
+        yield row, dict(zip(header, values))
+
+async def validate_rows(records: AsyncIterator[Tuple[int, Union[Dict[str, Any], RowError]]]) -> AsyncIterator[Tuple[int, Union[DataCoin, RowError]]]:
+    """Valida cada registro contra el esquema DataCoin y el catálogo de unidades"""
+    async for row, record in records:
+        if isinstance(record, RowError):
+            yield row, record
+            continue
+        try:
+            missing = [field for field in DATACOIN_FIELDS if record.get(field) in (None, "")]
+            if missing:
+                raise ValueError(f"Campos obligatorios ausentes: {', '.join(missing)}")
+            try:
+                value = float(record["value"])
+            except (TypeError, ValueError):
+                raise ValueError(f"Valor numérico inválido: {record['value']!r}")
+            datacoin = validate_datacoin(
+                str(record["company_id"]),
+                str(record["metric_type"]),
+                value,
+                str(record["unit"]),
+                str(record["timestamp"])
+            )
+        except ValueError as e:
+            yield row, RowError(row, str(e))
+            continue
+        yield row, datacoin
+
+async def chunk_rows(rows: AsyncIterator[Tuple[int, Union[DataCoin, RowError]]], chunk_size: int) -> AsyncIterator[Tuple[List[Tuple[int, DataCoin]], List[RowError]]]:
+    """
+    Agrupa las filas válidas en bloques de como máximo `chunk_size`
+    
+    Los errores se emiten junto al bloque en curso para poder reportarlos
+    en cuanto se detectan, sin esperar al final del stream.
+    """
+    chunk: List[Tuple[int, DataCoin]] = []
+    errors: List[RowError] = []
+    
+    async for row, item in rows:
+        if isinstance(item, RowError):
+            errors.append(item)
+        else:
+            chunk.append((row, item))
+        if len(chunk) >= chunk_size or len(errors) >= chunk_size:
+            yield chunk, errors
+            chunk, errors = [], []
+    
+    if chunk or errors:
+        yield chunk, errors
+
+def datacoin_stream_pipeline(chunks: AsyncIterator[bytes], fmt: str, chunk_size: int) -> AsyncIterator[Tuple[List[Tuple[int, DataCoin]], List[RowError]]]:
+    """
+    Encadena lectura, parseo, validación y agrupación de un stream de métricas
+    
+    `fmt` es "ndjson" o "csv". La memoria usada está acotada por `chunk_size`
+    y la longitud máxima de fila, independientemente del tamaño del stream.
+    """
+    parsers = {"ndjson": parse_ndjson_rows, "csv": parse_csv_rows}
+    if fmt not in parsers:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    return chunk_rows(validate_rows(parsers[fmt](iter_lines(chunks))), chunk_size)
@@ -4,15 +4,30 @@ Manejo de ejecución automática y programada de operaciones
 """
 
 import os
+import asyncio
 import logging
 import httpx
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel
 from enum import Enum
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from services.cron_scheduler import CronExpression, CronScheduler, isoformat
+from services.http_clients import http_clients
+from services.job_checkpoints import UNIT_DONE, UNIT_FAILED, UNIT_PLANNED, UNIT_UNKNOWN, get_checkpoint_store
+from services.lighthouse_service import get_lighthouse_service
+from services.notification_service import get_notification_service
+from services.score_engine import get_score_engine
+from services.state_store import get_state_store
+from services.verification_pipeline import VerificationPipeline
 
 logger = logging.getLogger(__name__)
 
+# Espacio de nombres del almacén de estado con el estado de las tareas programadas
+TASK_STATE_NAMESPACE = "evvm_tasks"
+
 class TaskType(str, Enum):
     MONTHLY_REWARDS = "monthly_rewards"
     SCORE_CALCULATION = "score_calculation"
@@ -44,7 +59,29 @@ class EVVMRelayer:
     def __init__(self):
         self.relayer_url = os.getenv("EVVM_RELAYER_URL", "https://relayer.evvm.org")
         self.api_key = os.getenv("EVVM_API_KEY")
-        self.client = httpx.AsyncClient()
+        
+        # Servicios compartidos entre ejecuciones de tareas
+        self.lighthouse_service = get_lighthouse_service()
+        self.notification_service = get_notification_service()
+        self.score_engine = get_score_engine()
+        self.verification_pipeline = VerificationPipeline(self.lighthouse_service)
+        
+        # Progreso de los trabajos por lotes, para reanudar tras una caída
+        self.checkpoints = get_checkpoint_store()
+        self.checkpoint_batch = int(os.getenv("JOB_CHECKPOINT_BATCH", "100"))
+        # Intentos de verificación de un Data Coin antes de darlo por fallido y cerrar el trabajo
+        self.verify_max_attempts = int(os.getenv("DATACOIN_VERIFY_MAX_ATTEMPTS", "5"))
+        
+        # Planificador en proceso que ejecuta las tareas programadas (arrancado en el
+        # lifespan solo por el worker líder); estado, última y próxima ejecución de
+        # cada tarea en el almacén de estado, visibles desde cualquier worker
+        self.scheduler = CronScheduler()
+        self.state = get_state_store()
+        self._task_handlers = {
+            TaskType.MONTHLY_REWARDS: self.execute_monthly_rewards,
+            TaskType.SCORE_CALCULATION: self.execute_score_calculation,
+            TaskType.DATA_VERIFICATION: self.execute_data_verification
+        }
         
         # Tareas programadas del sistema
         self.scheduled_tasks = [
@@ -54,7 +91,7 @@ class EVVMRelayer:
                 title="Distribución Mensual de Recompensas",
                 description="Distribución automática de PYUSD basada en EcoScores",
                 schedule="0 0 1 * *",  # Primer día de cada mes
-                next_execution="2024-11-01T00:00:00Z"
+                next_execution=self._next_execution("0 0 1 * *")
             ),
             AutomationTask(
                 id="daily_score_update",
@@ -62,7 +99,7 @@ class EVVMRelayer:
                 title="Actualización Diaria de EcoScores",
                 description="Recálculo de puntuaciones basado en nuevos Data Coins",
                 schedule="0 2 * * *",  # Todos los días a las 2 AM
-                next_execution="2024-10-12T02:00:00Z"
+                next_execution=self._next_execution("0 2 * * *")
             ),
             AutomationTask(
                 id="datacoin_verification",
@@ -70,10 +107,72 @@ class EVVMRelayer:
                 title="Verificación de Data Coins",
                 description="Verificación automática de integridad de datos",
                 schedule="0 */6 * * *",  # Cada 6 horas
-                next_execution="2024-10-11T18:00:00Z"
+                next_execution=self._next_execution("0 */6 * * *")
             )
         ]
     
+    @staticmethod
+    def _next_execution(schedule: str) -> str:
+        return isoformat(CronExpression(schedule).next_after(datetime.now(timezone.utc)))
+    
+    def _tasks(self) -> List[AutomationTask]:
+        """Tareas del sistema con el estado guardado por cualquier worker"""
+        saved = self.state.items(TASK_STATE_NAMESPACE)
+        for task in self.scheduled_tasks:
+            fields = saved.get(task.id)
+            if fields:
+                task.status = TaskStatus(fields["status"])
+                task.last_execution = fields["last_execution"]
+                task.next_execution = fields["next_execution"]
+        return self.scheduled_tasks
+    
+    def _save(self, task: AutomationTask) -> None:
+        self.state.put(TASK_STATE_NAMESPACE, task.id, {
+            "status": task.status.value,
+            "last_execution": task.last_execution,
+            "next_execution": task.next_execution
+        })
+    
+    async def start(self) -> None:
+        """Programa las tareas del sistema en el planificador y lo arranca"""
+        for task in self._tasks():
+            if task.status != TaskStatus.CANCELLED and task.type in self._task_handlers:
+                next_run = self.scheduler.add(task.id, task.schedule, lambda task=task: self._run_scheduled_task(task))
+                task.next_execution = isoformat(next_run)
+                self._save(task)
+        await self.scheduler.start()
+    
+    async def stop(self) -> None:
+        await self.scheduler.stop()
+    
+    async def _run_scheduled_task(self, task: AutomationTask) -> None:
+        """Ejecución disparada por el planificador; un resultado sin éxito cuenta como fallo"""
+        self._tasks()
+        if task.status == TaskStatus.CANCELLED:
+            # Cancelada desde otro worker después de programarla aquí
+            self.scheduler.remove(task.id)
+            return
+        task.status = TaskStatus.RUNNING
+        task.last_execution = isoformat(datetime.now(timezone.utc))
+        task.next_execution = self.scheduler.get(task.id)["next_run"]
+        self._save(task)
+        result = await self._task_handlers[task.type]()
+        task.status = TaskStatus.COMPLETED if result.get("success") else TaskStatus.FAILED
+        self._save(task)
+        if task.status == TaskStatus.FAILED:
+            raise RuntimeError(result.get("error", "la tarea no se completó"))
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartido con pool de conexiones hacia el relayer"""
+        return http_clients.get("evvm")
+    
+    @property
+    def reward_service(self):
+        """RewardService compartido, importado en el primer uso"""
+        from services.reward_service import get_reward_service
+        return get_reward_service()
+    
     async def register_automation_task(self, task: AutomationTask) -> Dict[str, Any]:
         """
         Registra una nueva tarea de automatización en EVVM
@@ -99,53 +198,109 @@ class EVVMRelayer:
                 "error": str(e)
             }
     
-    async def execute_monthly_rewards(self) -> Dict[str, Any]:
+    async def execute_monthly_rewards(self, period: Optional[str] = None) -> Dict[str, Any]:
         """
         Ejecuta la distribución mensual de recompensas
+        
+        Idempotente por mes (`period` AAAAMM, por defecto el actual): el plan
+        empresa → importe se fija en la primera ejecución y cada pago tiene la
+        clave `monthly_rewards:AAAAMM:empresa`, que llega al motor de
+        transferencias: una clave ya enviada no se envía otra vez. Si el proceso cae a mitad, la
+        siguiente ejecución del mes paga solo lo que falta; los pagos que
+        estaban saliendo al caer (o cuyo tramo falló) quedan como `unknown` y
+        se concilian por su clave con lo que registró el motor: sin registro
+        no salió nada y se vuelven a planificar; con registro se adopta su
+        resultado. Los enviados que seguían sin minar también quedan como
+        `unknown`, con todos sus hashes, y cada nueva ejecución del mes los
+        vuelve a comprobar.
         """
         try:
+            from services.reward_service import RewardDistribution
+            
+            period = period or datetime.now(timezone.utc).strftime("%Y%m")
+            job_key = f"{TaskType.MONTHLY_REWARDS.value}:{period}"
+            run = self.checkpoints.begin(TaskType.MONTHLY_REWARDS.value, job_key)
+            if run.completed:
+                logger.info(f"💰 La distribución de {period} ya se completó; no se repite")
+                return {
+                    **run.summary,
+                    "success": True,
+                    "already_completed": True,
+                    "job": run.to_dict()
+                }
             logger.info("💰 Ejecutando distribución mensual de recompensas")
             
-            # Importar servicios necesarios
-            from .reward_service import RewardService
-            from .notification_service import NotificationService
+            reward_service = self.reward_service
+            notification_service = self.notification_service
             
-            reward_service = RewardService()
-            notification_service = NotificationService()
+            # 0. Pagos `unknown` de una ejecución anterior: se concilian por su clave
+            # y los que siguen sin minar se comprueban de nuevo por sus hashes
+            await self._reconcile_unknown_rewards(run)
+            await self._track_pending_rewards(run)
             
-            # 1. Obtener empresas elegibles
+            # 1-2. Empresas elegibles y recompensas (al reanudar se usa el plan guardado)
             companies = await reward_service._get_all_companies()
-            
-            # 2. Calcular recompensas
             distributions = await reward_service.calculate_rewards(companies)
+            pending = run.plan(
+                (d.company_id, {"amount": str(d.amount), "eco_score": d.eco_score, "reward_date": d.reward_date})
+                for d in distributions
+            )
             
-            if not distributions:
-                return {
-                    "success": True,
-                    "message": "No hay empresas elegibles para recompensas este mes",
-                    "distributions": []
-                }
-            
-            # 3. Distribuir recompensas
-            distribution_result = await reward_service.distribute_rewards(distributions)
-            
-            # 4. Enviar notificaciones
-            for distribution in distributions:
-                if distribution.transaction_hash:
+            # 3. Distribuir por tramos, con un punto de control tras cada uno
+            for start in range(0, len(pending), self.checkpoint_batch):
+                chunk = [
+                    RewardDistribution(company_id, Decimal(plan["amount"]), plan["eco_score"], plan["reward_date"],
+                                       idempotency_key=run.idempotency_key(company_id))
+                    for company_id, plan in pending[start:start + self.checkpoint_batch]
+                ]
+                run.start_units([d.company_id for d in chunk])
+                distribution_result = await reward_service.distribute_rewards(chunk)
+                if distribution_result["status"] == "error":
+                    # No se sabe qué llegó a enviarse antes del error
+                    run.record([(d.company_id, UNIT_UNKNOWN, {"error": distribution_result["error"]}) for d in chunk])
+                    continue
+                run.record(
+                    [(d["company_id"], UNIT_DONE, {"amount": d["amount"], "tx_hash": d["tx_hash"]})
+                     for d in distribution_result["successful_distributions"]] +
+                    [(d["company_id"], UNIT_FAILED, {"error": d["error"], "tx_hash": d.get("tx_hash")})
+                     for d in distribution_result["failed_distributions"]] +
+                    [(d["company_id"], UNIT_UNKNOWN, {key: value for key, value in d.items() if key != "company_id"})
+                     for d in distribution_result.get("pending_distributions", [])]
+                )
+                
+                # 4. Enviar notificaciones
+                scores = {d.company_id: d.eco_score for d in chunk}
+                for paid in distribution_result["successful_distributions"]:
                     await notification_service.send_reward_notification(
-                        distribution.company_id,
-                        float(distribution.amount),
-                        distribution.eco_score
+                        paid["company_id"],
+                        paid["amount"],
+                        scores[paid["company_id"]]
                     )
             
-            return {
+            paid = run.results(UNIT_DONE)
+            unknown = run.results(UNIT_UNKNOWN)
+            unmined = [unit for unit in unknown if (unit["result"] or {}).get("tx_hashes")]
+            failed = run.results(UNIT_FAILED) + [unit for unit in unknown if unit not in unmined]
+            summary = {
                 "success": True,
-                "execution_time": "2024-10-11T12:00:00Z",
+                "status": "completed" if not failed and not unmined else "partial",
+                "period": period,
+                "execution_time": isoformat(datetime.now(timezone.utc)),
                 "total_companies": len(companies),
-                "eligible_companies": len(distributions),
-                "total_distributed": float(sum(d.amount for d in distributions)),
-                "distributions": [d.dict() for d in distributions]
+                "eligible_companies": len(paid) + len(failed),
+                "total_distributed": sum(unit["result"]["amount"] for unit in paid),
+                "distributions": [{"company_id": unit["unit_key"], **unit["result"]} for unit in paid],
+                "failed_distributions": [
+                    {"company_id": unit["unit_key"], "status": unit["status"], **(unit["result"] or {})} for unit in failed
+                ],
+                "pending_distributions": [{"company_id": unit["unit_key"], **unit["result"]} for unit in unmined]
             }
+            if not paid and not failed:
+                summary["message"] = "No hay empresas elegibles para recompensas este mes"
+            # Con fallos o pagos sin minar el trabajo queda abierto: volver a ejecutarlo
+            # este mes reintenta solo esos pagos y comprueba de nuevo los pendientes
+            run.finish(summary, failed=bool(failed or unmined))
+            return {**summary, "job": run.to_dict()}
             
         except Exception as e:
             logger.error(f"❌ Error en distribución mensual: {e}")
@@ -154,6 +309,78 @@ class EVVMRelayer:
                 "error": str(e)
             }
     
+    async def _reconcile_unknown_rewards(self, run) -> None:
+        """
+        Concilia los pagos `unknown` sin hashes (en curso al caer o de un tramo que falló)
+        
+        El motor guarda el resultado de cada clave de idempotencia antes de
+        difundir nada: sin registro el pago no salió y vuelve a `planned`; con
+        registro se adopta (confirmado, revertido, fallido o sin minar con sus hashes).
+        """
+        from services.transfer_pipeline import recorded_transfers
+        
+        unsent = [unit for unit in run.results(UNIT_UNKNOWN) if not (unit["result"] or {}).get("tx_hashes")]
+        if not unsent:
+            return
+        recorded = await asyncio.to_thread(recorded_transfers, [run.idempotency_key(unit["unit_key"]) for unit in unsent])
+        
+        replanned = []
+        adopted = []
+        for unit in unsent:
+            company_id = unit["unit_key"]
+            amount = float(unit["payload"]["amount"])
+            result = recorded.get(run.idempotency_key(company_id))
+            if result is None:
+                replanned.append((company_id, UNIT_PLANNED, None))
+            elif result.status == "confirmed":
+                adopted.append((company_id, UNIT_DONE, {"amount": amount, "tx_hash": result.tx_hash}))
+                await self.notification_service.send_reward_notification(company_id, amount, unit["payload"]["eco_score"])
+            elif result.status == "reverted":
+                adopted.append((company_id, UNIT_FAILED, {"error": result.error or result.status, "tx_hash": result.tx_hash}))
+            elif result.status == "failed":
+                # El pago no salió: sin `tx_hash`, el plan lo reintenta
+                adopted.append((company_id, UNIT_FAILED, {"error": result.error or result.status}))
+            else:
+                adopted.append((company_id, UNIT_UNKNOWN, {
+                    "amount": amount,
+                    "status": "pending",
+                    "error": result.error,
+                    "nonce": result.nonce,
+                    "tx_hashes": list(result.tx_hashes),
+                    "missing_receipt_since": result.missing_receipt_since
+                }))
+        
+        logger.info(f"🔎 {len(unsent)} pagos sin resultado conciliados por su clave: {len(replanned)} se vuelven a planificar")
+        run.update(replanned)
+        run.record(adopted)
+    
+    async def _track_pending_rewards(self, run) -> None:
+        """Concilia los pagos `unknown` con hashes enviados: confirmados pasan a `done`, los demás según su recibo"""
+        sent = [unit for unit in run.results(UNIT_UNKNOWN) if (unit["result"] or {}).get("tx_hashes")]
+        if not sent:
+            return
+        tracked = await self.reward_service.track_pending_distributions(
+            [{"company_id": unit["unit_key"], **unit["result"]} for unit in sent]
+        )
+        results = []
+        waiting = []
+        for unit, entry in zip(sent, tracked):
+            if entry["status"] == "confirmed":
+                results.append((unit["unit_key"], UNIT_DONE, {"amount": entry["amount"], "tx_hash": entry["tx_hash"]}))
+                await self.notification_service.send_reward_notification(unit["unit_key"], entry["amount"], unit["payload"]["eco_score"])
+            elif entry["status"] == "reverted":
+                results.append((unit["unit_key"], UNIT_FAILED, {"error": entry["error"], "tx_hash": entry["tx_hash"]}))
+            elif entry["status"] == "failed":
+                # El nonce lo consumió otra transacción: el pago no salió y puede reintentarse
+                results.append((unit["unit_key"], UNIT_FAILED, {"error": entry["error"]}))
+            elif entry.get("missing_receipt_since") != unit["result"].get("missing_receipt_since"):
+                # Nonce minado sin recibo todavía: se guarda desde cuándo para respetar la espera
+                waiting.append((unit["unit_key"], UNIT_UNKNOWN, {**unit["result"], "missing_receipt_since": entry["missing_receipt_since"]}))
+        run.update(waiting)
+        if results:
+            logger.info(f"🔎 {len(results)} de {len(sent)} pagos pendientes conciliados")
+            run.record(results)
+    
     async def execute_score_calculation(self) -> Dict[str, Any]:
         """
         Ejecuta recálculo diario de EcoScores
@@ -161,12 +388,11 @@ class EVVMRelayer:
         try:
             logger.info("📊 Ejecutando cálculo de EcoScores")
             
-            # En implementación real, integrar con ScoreCalculator contract
-            companies_updated = await self._mock_calculate_scores()
+            # Recalcular todas las empresas en una pasada vectorizada
+            companies_updated = await self._calculate_scores()
             
             # Enviar notificaciones de cambios significativos
-            from services.notification_service import NotificationService
-            notification_service = NotificationService()
+            notification_service = self.notification_service
             
             notifications_sent = 0
             for company in companies_updated:
@@ -196,45 +422,71 @@ class EVVMRelayer:
     async def execute_data_verification(self) -> Dict[str, Any]:
         """
         Ejecuta verificación automática de Data Coins
+        
+        Las verificaciones corren en paralelo con una ventana acotada
+        (DATACOIN_VERIFY_CONCURRENCY). Tras cada tramo guardado en el punto de
+        control cada empresa recibe una confirmación con sus Data Coins
+        verificados en ese tramo, y el punto de control anota cuáles se
+        confirmaron. Reanuda la última verificación que no terminó: lo ya
+        verificado no se vuelve a consultar y lo verificado sin confirmar
+        (caída entre ambos pasos) se confirma al empezar. Un Data Coin que
+        falla DATACOIN_VERIFY_MAX_ATTEMPTS veces se da por fallido y deja de
+        mantener abierto el trabajo.
         """
         try:
             logger.info("🔍 Ejecutando verificación de Data Coins")
             
-            from services.lighthouse_service import LighthouseService
-            lighthouse_service = LighthouseService()
+            run = self.checkpoints.begin(TaskType.DATA_VERIFICATION.value)
             
-            # Obtener Data Coins pendientes de verificación
-            pending_datacoins = await self._get_pending_datacoins()
+            # Verificados antes de una caída y aún sin confirmar
+            await self._confirm_verified(run, run.results(UNIT_DONE))
             
-            verified_count = 0
-            failed_count = 0
-            
-            for datacoin in pending_datacoins:
-                verification_result = await lighthouse_service.verify_datacoin(
-                    datacoin["lighthouse_hash"]
+            # Intentos previos de los Data Coins que fallaron; los agotados no se reintentan
+            attempts = {unit["unit_key"]: (unit["result"] or {}).get("attempts", 1) for unit in run.results(UNIT_FAILED)}
+            pending_datacoins = [
+                (lighthouse_hash, datacoin)
+                for lighthouse_hash, datacoin in run.plan(
+                    (datacoin["lighthouse_hash"], datacoin) for datacoin in await self._get_pending_datacoins()
                 )
-                
-                if verification_result["success"] and verification_result["verified"]:
-                    verified_count += 1
-                    
-                    # Enviar confirmación
-                    from services.notification_service import NotificationService
-                    notification_service = NotificationService()
-                    await notification_service.send_datacoin_confirmation(
-                        datacoin["company_id"],
-                        datacoin["metric_type"],
-                        datacoin["lighthouse_hash"]
-                    )
+                if attempts.get(lighthouse_hash, 0) < self.verify_max_attempts
+            ]
+            
+            results = []
+            async for lighthouse_hash, datacoin, verification_result in self.verification_pipeline.verify(pending_datacoins):
+                if not verification_result["success"]:
+                    results.append((lighthouse_hash, UNIT_FAILED, {
+                        "error": verification_result.get("error"),
+                        "attempts": attempts.get(lighthouse_hash, 0) + 1
+                    }))
                 else:
-                    failed_count += 1
+                    results.append((lighthouse_hash, UNIT_DONE, {
+                        "verified": bool(verification_result["verified"]),
+                        "company_id": datacoin["company_id"],
+                        "metric_type": datacoin["metric_type"],
+                        "notified": False
+                    }))
+                if len(results) >= self.checkpoint_batch:
+                    await self._record_verifications(run, results)
+                    results = []
+            await self._record_verifications(run, results)
             
-            return {
+            processed = run.results(UNIT_DONE)
+            errors = run.results(UNIT_FAILED)
+            retryable = [unit for unit in errors if (unit["result"] or {}).get("attempts", 1) < self.verify_max_attempts]
+            
+            verified = [unit for unit in processed if unit["result"]["verified"]]
+            summary = {
                 "success": True,
-                "execution_time": "2024-10-11T18:00:00Z",
-                "datacoins_processed": len(pending_datacoins),
-                "verified": verified_count,
-                "failed": failed_count
+                "execution_time": isoformat(datetime.now(timezone.utc)),
+                "datacoins_processed": len(processed) + len(errors),
+                "verified": len(verified),
+                "failed": len(processed) - len(verified) + len(errors),
+                "abandoned": len(errors) - len(retryable),
+                "companies_notified": len({unit["payload"]["company_id"] for unit in verified if unit["result"].get("notified")})
             }
+            # Solo los fallos con intentos restantes mantienen abierto el trabajo
+            run.finish(summary, failed=bool(retryable))
+            return {**summary, "job": run.to_dict()}
             
         except Exception as e:
             logger.error(f"❌ Error en verificación de datos: {e}")
@@ -243,18 +495,41 @@ class EVVMRelayer:
                 "error": str(e)
             }
     
+    async def _record_verifications(self, run, results: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Guarda un tramo en el punto de control y envía sus confirmaciones"""
+        run.record(results)
+        await self._confirm_verified(run, [
+            {"unit_key": unit_key, "status": status, "result": result}
+            for unit_key, status, result in results if status == UNIT_DONE
+        ])
+    
+    async def _confirm_verified(self, run, units: List[Dict[str, Any]]) -> None:
+        """Una confirmación por empresa con sus Data Coins verificados y sin confirmar; los marca como confirmados"""
+        confirmations: Dict[str, Tuple[Counter, List[Dict[str, Any]]]] = {}
+        for unit in units:
+            result = unit["result"]
+            if result["verified"] and not result.get("notified", True):
+                metric_counts, company_units = confirmations.setdefault(result["company_id"], (Counter(), []))
+                metric_counts[result["metric_type"]] += 1
+                company_units.append(unit)
+        for company_id, (metric_counts, company_units) in confirmations.items():
+            await self.notification_service.send_datacoin_batch_confirmation(
+                company_id, dict(metric_counts), [unit["unit_key"] for unit in company_units]
+            )
+            run.update([(unit["unit_key"], UNIT_DONE, {**unit["result"], "notified": True}) for unit in company_units])
+    
     async def get_scheduled_tasks(self) -> List[Dict[str, Any]]:
         """
         Obtiene lista de tareas programadas
         """
-        return [task.dict() for task in self.scheduled_tasks]
+        return [task.dict() for task in self._tasks()]
     
     async def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """
         Obtiene estado de una tarea específica
         """
         try:
-            task = next((t for t in self.scheduled_tasks if t.id == task_id), None)
+            task = next((t for t in self._tasks() if t.id == task_id), None)
             
             if not task:
                 raise ValueError(f"Tarea no encontrada: {task_id}")
@@ -264,6 +539,7 @@ class EVVMRelayer:
             
             return {
                 "task": task.dict(),
+                "schedule": self.scheduler.get(task_id),
                 "execution_history": execution_history
             }
             
@@ -283,10 +559,12 @@ class EVVMRelayer:
             # En implementación real, cancelar en EVVM Relayer
             result = await self._mock_cancel_evvm_task(task_id)
             
-            # Actualizar estado local
-            for task in self.scheduled_tasks:
+            # Actualizar estado compartido; el líder la descarta en su próxima ejecución si no es este worker
+            self.scheduler.remove(task_id)
+            for task in self._tasks():
                 if task.id == task_id:
                     task.status = TaskStatus.CANCELLED
+                    self._save(task)
                     break
             
             return {
@@ -315,22 +593,43 @@ class EVVMRelayer:
             "evvm_job_id": f"evvm_{evvm_job_id[:16]}"
         }
     
-    async def _mock_calculate_scores(self) -> List[Dict[str, Any]]:
-        """Mock de cálculo de scores"""
-        return [
-            {
-                "company_id": "empresa_verde_1",
-                "previous_score": 90.0,
-                "new_score": 92.5,
-                "score_change": +2.5
-            },
-            {
-                "company_id": "empresa_verde_2",
-                "previous_score": 85.0,
-                "new_score": 87.3,
-                "score_change": +2.3
-            }
-        ]
+    async def _calculate_scores(self) -> List[Dict[str, Any]]:
+        """Recalcula los EcoScores de todas las empresas con el motor por lotes"""
+        batch = await self._get_scoring_batch()
+        new_scores = self.score_engine.score_columns(
+            batch["company_ids"],
+            batch["metric_types"],
+            batch["values"]
+        )
+        previous_scores = await self._get_previous_scores()
+        
+        companies_updated = []
+        for company_id, new_score in new_scores.items():
+            previous_score = previous_scores.get(company_id, 0.0)
+            companies_updated.append({
+                "company_id": company_id,
+                "previous_score": previous_score,
+                "new_score": new_score,
+                "score_change": round(new_score - previous_score, 1)
+            })
+        
+        # En implementación real, publicar los scores en el contrato ScoreCalculator
+        return companies_updated
+    
+    async def _get_scoring_batch(self) -> Dict[str, List[Any]]:
+        """Mock de Data Coins del período en formato columnar"""
+        return {
+            "company_ids": ["empresa_verde_1", "empresa_verde_1", "empresa_verde_1", "empresa_verde_2", "empresa_verde_2"],
+            "metric_types": ["carbon_emissions", "energy_consumption", "water_usage", "carbon_emissions", "waste_generation"],
+            "values": [750.0, 850.0, 600.0, 1250.5, 1300.0]
+        }
+    
+    async def _get_previous_scores(self) -> Dict[str, float]:
+        """Mock de EcoScores vigentes"""
+        return {
+            "empresa_verde_1": 90.0,
+            "empresa_verde_2": 85.0
+        }
     
     async def _get_pending_datacoins(self) -> List[Dict[str, Any]]:
         """Mock de Data Coins pendientes"""
@@ -344,23 +643,24 @@ class EVVMRelayer:
         ]
     
     async def _get_task_execution_history(self, task_id: str) -> List[Dict[str, Any]]:
-        """Mock de historial de ejecuciones"""
-        return [
-            {
-                "execution_id": "exec_001",
-                "started_at": "2024-10-01T00:00:00Z",
-                "completed_at": "2024-10-01T00:05:30Z",
-                "status": "completed",
-                "result": {
-                    "companies_processed": 25,
-                    "total_distributed": 10000.0
-                }
-            }
-        ]
+        """Ejecuciones registradas en el almacén de puntos de control"""
+        task = next((t for t in self.scheduled_tasks if t.id == task_id), None)
+        if task is None:
+            return []
+        return self.checkpoints.history(task.type.value)
     
     async def _mock_cancel_evvm_task(self, task_id: str) -> Dict[str, Any]:
         """Mock de cancelación en EVVM"""
         return {
             "task_id": task_id,
             "evvm_response": "Task cancelled successfully"
-        }
\ No newline at end of file
+        }
+
+_evvm_relayer: Optional[EVVMRelayer] = None
+
+def get_evvm_relayer() -> EVVMRelayer:
+    """Relayer compartido por la API (su planificador se arranca en el lifespan)"""
+    global _evvm_relayer
+    if _evvm_relayer is None:
+        _evvm_relayer = EVVMRelayer()
+    return _evvm_relayer
@@ -0,0 +1,102 @@
+"""
+🔌 HTTP Clients - Registro compartido de clientes HTTP salientes
+Un cliente httpx con pool de conexiones por destino, con el ciclo de vida de la app
+"""
+
+import os
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+def _http2_available() -> bool:
+    """HTTP/2 requiere el extra `httpx[http2]` (paquete h2)"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class DestinationProfile:
+    """Límites de conexión y timeouts para un destino"""
+    def __init__(self, name: str, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0, timeout: float = 10.0, http2: bool = True):
+        prefix = f"HTTP_POOL_{name.upper()}_"
+        self.name = name
+        self.max_connections = int(os.getenv(f"{prefix}MAX_CONNECTIONS", max_connections))
+        self.max_keepalive_connections = int(os.getenv(f"{prefix}MAX_KEEPALIVE", max_keepalive_connections))
+        self.keepalive_expiry = float(os.getenv(f"{prefix}KEEPALIVE_EXPIRY", keepalive_expiry))
+        self.timeout = float(os.getenv(f"{prefix}TIMEOUT", timeout))
+        self.http2 = http2
+
+# Destinos salientes conocidos (configurables con HTTP_POOL_<DESTINO>_*)
+DEFAULT_PROFILES = {
+    "lighthouse": DestinationProfile("lighthouse", max_connections=50, max_keepalive_connections=20, timeout=30.0),
+    "evvm": DestinationProfile("evvm", max_connections=10, max_keepalive_connections=5),
+    "rpc": DestinationProfile("rpc", max_connections=20, max_keepalive_connections=20),
+    "telegram": DestinationProfile("telegram", max_connections=30, max_keepalive_connections=15),
+    "whatsapp": DestinationProfile("whatsapp", max_connections=30, max_keepalive_connections=15),
+    "default": DestinationProfile("default"),
+}
+
+class HTTPClientRegistry:
+    """
+    Registro de clientes httpx compartidos, uno por destino
+    
+    Los clientes se crean de forma perezosa en el primer uso y se reutilizan
+    entre peticiones, manteniendo conexiones keep-alive (y HTTP/2 cuando está
+    disponible) para evitar un handshake TLS por llamada. El `lifespan` de la
+    API cierra todos los clientes al apagar el servidor.
+    """
+    
+    def __init__(self, profiles: Optional[Dict[str, DestinationProfile]] = None):
+        self.profiles = dict(profiles or DEFAULT_PROFILES)
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._http2 = _http2_available()
+    
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Devuelve el cliente compartido del destino, creándolo si hace falta"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build_client(self.profiles.get(name) or self.profiles["default"])
+            self._clients[name] = client
+        return client
+    
+    def _build_client(self, profile: DestinationProfile) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=profile.max_connections,
+            max_keepalive_connections=profile.max_keepalive_connections,
+            keepalive_expiry=profile.keepalive_expiry
+        )
+        logger.info(f"🔌 Creando cliente HTTP compartido '{profile.name}' (max {profile.max_connections} conexiones)")
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=profile.timeout,
+            http2=profile.http2 and self._http2
+        )
+    
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """Estado de los clientes abiertos para diagnóstico"""
+        return {
+            name: {
+                "closed": client.is_closed,
+                "http2": self.profiles.get(name, self.profiles["default"]).http2 and self._http2
+            }
+            for name, client in self._clients.items()
+        }
+    
+    async def aclose(self) -> None:
+        """Cierra todos los clientes y sus conexiones"""
+        clients, self._clients = self._clients, {}
+        for name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"⚠️ Error cerrando cliente HTTP '{name}': {e}")
+        if clients:
+            logger.info(f"🔌 {len(clients)} clientes HTTP cerrados")
+
+# Registro único de la aplicación
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,297 @@
+"""
+📌 Job Checkpoints - Progreso duradero de los trabajos por lotes
+Plan, unidades completadas y punto de control en SQLite para reanudar tras una caída
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.data_dir import data_path
+
+logger = logging.getLogger(__name__)
+
+# Estados de una unidad de trabajo. `in_flight` queda solo si el proceso cayó
+# en mitad de la unidad: para pagos no se sabe si llegó a salir, así que no se reintenta sola
+UNIT_PLANNED = "planned"
+UNIT_IN_FLIGHT = "in_flight"
+UNIT_DONE = "done"
+UNIT_FAILED = "failed"
+UNIT_UNKNOWN = "unknown"
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if timestamp else None
+
+class JobRun:
+    """
+    Una ejecución de un trabajo con clave `job_key`
+    
+    El plan (unidades y su payload) se guarda al empezar; al reanudar se usa
+    el guardado, no uno recalculado. Cada unidad se identifica con la clave
+    de idempotencia `job_key:unit_key` y se marca `done` una sola vez.
+    """
+    
+    def __init__(self, store: "JobCheckpointStore", job_key: str, task_type: str, status: str,
+                 attempts: int, cursor: Optional[str], processed: int, digest: str, summary: Optional[Dict[str, Any]]):
+        self.store = store
+        self.job_key = job_key
+        self.task_type = task_type
+        self.status = status
+        self.attempts = attempts
+        self.cursor = cursor
+        self.processed = processed
+        self.digest = digest
+        self.summary = summary
+    
+    @property
+    def completed(self) -> bool:
+        return self.status == "completed"
+    
+    @property
+    def resumed(self) -> bool:
+        return self.attempts > 1
+    
+    def idempotency_key(self, unit_key: str) -> str:
+        return f"{self.job_key}:{unit_key}"
+    
+    def plan(self, units: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Guarda el plan la primera vez y devuelve las unidades pendientes
+        
+        Pendientes son las `planned`, y las `failed` sin transacción enviada:
+        las `done` no se repiten nunca y las `in_flight` de una caída pasan a
+        `unknown` (requieren conciliación).
+        """
+        return self.store._plan(self, units)
+    
+    def start_units(self, unit_keys: List[str]) -> None:
+        """Marca unidades como en curso antes de ejecutarlas"""
+        self.store._set_units(self, [(key, UNIT_IN_FLIGHT, None) for key in unit_keys], advance=False)
+    
+    def record(self, results: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Registra (unit_key, estado, resultado) de un tramo y avanza el punto de control"""
+        self.store._set_units(self, results, advance=True)
+    
+    def update(self, results: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Reescribe estado y resultado de unidades ya registradas sin mover el punto de control"""
+        self.store._set_units(self, results, advance=False)
+    
+    def results(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.store._results(self, status)
+    
+    def finish(self, summary: Dict[str, Any], failed: bool = False) -> None:
+        self.store._finish(self, summary, failed)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_key": self.job_key,
+            "status": self.status,
+            "attempts": self.attempts,
+            "checkpoint": self.cursor,
+            "processed": self.processed,
+            "digest": self.digest
+        }
+
+class JobCheckpointStore:
+    """
+    Almacén de puntos de control de trabajos por lotes
+    
+    `begin` devuelve la ejecución de una clave: nueva, reanudada si la
+    anterior no terminó (caída o fallo) o ya completada, en cuyo caso el
+    trabajo no debe repetirse. Cada tramo registrado actualiza en la misma
+    transacción las unidades, la última unidad procesada y un resumen
+    (sha256 encadenado) de los resultados parciales.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path("jobs", "checkpoints.sqlite")
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS job_runs (
+                job_key TEXT PRIMARY KEY,
+                task_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                cursor TEXT,
+                processed INTEGER NOT NULL DEFAULT 0,
+                digest TEXT NOT NULL DEFAULT '',
+                summary TEXT,
+                error TEXT,
+                started_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS job_runs_task ON job_runs (task_type, started_at);
+            CREATE TABLE IF NOT EXISTS job_units (
+                job_key TEXT NOT NULL,
+                unit_key TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_key, unit_key)
+            );
+        """)
+    
+    def begin(self, task_type: str, job_key: Optional[str] = None) -> JobRun:
+        """
+        Ejecución para `job_key` (nueva, reanudada o ya completada)
+        
+        Sin clave se reanuda la última ejecución sin terminar del tipo de
+        tarea, o se abre una nueva con clave `task_type:<timestamp>`.
+        """
+        now = time.time()
+        with self._db:
+            if job_key is None:
+                row = self._db.execute(
+                    "SELECT job_key FROM job_runs WHERE task_type = ? AND status != 'completed' ORDER BY started_at DESC LIMIT 1",
+                    (task_type,)
+                ).fetchone()
+                job_key = row[0] if row else f"{task_type}:{now:.6f}"
+            row = self._db.execute("SELECT status FROM job_runs WHERE job_key = ?", (job_key,)).fetchone()
+            if row is None:
+                self._db.execute(
+                    "INSERT INTO job_runs (job_key, task_type, status, started_at, updated_at) VALUES (?, ?, 'running', ?, ?)",
+                    (job_key, task_type, now, now)
+                )
+            elif row[0] != "completed":
+                # Lo que estaba en curso al caer el proceso ya no se sabe si terminó
+                self._db.execute(
+                    "UPDATE job_units SET status = ?, updated_at = ? WHERE job_key = ? AND status = ?",
+                    (UNIT_UNKNOWN, now, job_key, UNIT_IN_FLIGHT)
+                )
+                self._db.execute(
+                    "UPDATE job_runs SET status = 'running', attempts = attempts + 1, error = NULL, updated_at = ? WHERE job_key = ?",
+                    (now, job_key)
+                )
+        run = self.get(job_key)
+        if run.resumed and not run.completed:
+            logger.info(f"📌 Reanudando {job_key} desde {run.cursor or 'el inicio'} ({run.processed} unidades ya procesadas)")
+        return run
+    
+    def get(self, job_key: str) -> Optional[JobRun]:
+        row = self._db.execute(
+            "SELECT task_type, status, attempts, cursor, processed, digest, summary FROM job_runs WHERE job_key = ?",
+            (job_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        task_type, status, attempts, cursor, processed, digest, summary = row
+        return JobRun(self, job_key, task_type, status, attempts, cursor, processed, digest,
+                      json.loads(summary) if summary else None)
+    
+    def _plan(self, run: JobRun, units: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        now = time.time()
+        with self._db:
+            # INSERT OR IGNORE: al reanudar, el plan original manda
+            self._db.executemany(
+                "INSERT OR IGNORE INTO job_units (job_key, unit_key, position, status, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (run.job_key, unit_key, position, UNIT_PLANNED, json.dumps(payload, default=str), now)
+                    for position, (unit_key, payload) in enumerate(units)
+                )
+            )
+        rows = self._db.execute(
+            "SELECT unit_key, payload, status, result FROM job_units WHERE job_key = ? AND status IN (?, ?) ORDER BY position",
+            (run.job_key, UNIT_PLANNED, UNIT_FAILED)
+        ).fetchall()
+        pending = []
+        for unit_key, payload, status, result in rows:
+            if status == UNIT_FAILED and result and json.loads(result).get("tx_hash"):
+                continue
+            pending.append((unit_key, json.loads(payload)))
+        return pending
+    
+    def _set_units(self, run: JobRun, results: List[Tuple[str, str, Optional[Dict[str, Any]]]], advance: bool) -> None:
+        if not results:
+            return
+        now = time.time()
+        digest = run.digest
+        if advance:
+            hasher = hashlib.sha256(digest.encode())
+            for unit_key, status, result in results:
+                hasher.update(json.dumps([unit_key, status, result], sort_keys=True, default=str).encode())
+            digest = hasher.hexdigest()
+        with self._db:
+            self._db.executemany(
+                "UPDATE job_units SET status = ?, result = COALESCE(?, result), updated_at = ? WHERE job_key = ? AND unit_key = ?",
+                (
+                    (status, json.dumps(result, default=str) if result is not None else None, now, run.job_key, unit_key)
+                    for unit_key, status, result in results
+                )
+            )
+            if advance:
+                self._db.execute(
+                    "UPDATE job_runs SET cursor = ?, processed = processed + ?, digest = ?, updated_at = ? WHERE job_key = ?",
+                    (results[-1][0], len(results), digest, now, run.job_key)
+                )
+        if advance:
+            run.cursor = results[-1][0]
+            run.processed += len(results)
+            run.digest = digest
+    
+    def _results(self, run: JobRun, status: Optional[str]) -> List[Dict[str, Any]]:
+        query = "SELECT unit_key, status, payload, result FROM job_units WHERE job_key = ?"
+        params: List[Any] = [run.job_key]
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        return [
+            {
+                "unit_key": unit_key,
+                "status": unit_status,
+                "payload": json.loads(payload),
+                "result": json.loads(result) if result else None
+            }
+            for unit_key, unit_status, payload, result in self._db.execute(query + " ORDER BY position", params)
+        ]
+    
+    def _finish(self, run: JobRun, summary: Dict[str, Any], failed: bool) -> None:
+        now = time.time()
+        run.status = "failed" if failed else "completed"
+        run.summary = summary
+        with self._db:
+            self._db.execute(
+                "UPDATE job_runs SET status = ?, summary = ?, error = ?, updated_at = ?, finished_at = ? WHERE job_key = ?",
+                (run.status, json.dumps(summary, default=str), summary.get("error", "unidades sin completar") if failed else None,
+                 now, now, run.job_key)
+            )
+    
+    def history(self, task_type: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Últimas ejecuciones de un tipo de tarea, de la más reciente a la más antigua"""
+        rows = self._db.execute(
+            "SELECT job_key, status, attempts, cursor, processed, digest, summary, error, started_at, finished_at "
+            "FROM job_runs WHERE task_type = ? ORDER BY started_at DESC LIMIT ?",
+            (task_type, limit)
+        ).fetchall()
+        return [
+            {
+                "execution_id": job_key,
+                "started_at": _iso(started_at),
+                "completed_at": _iso(finished_at),
+                "status": status,
+                "attempts": attempts,
+                "checkpoint": cursor,
+                "processed": processed,
+                "digest": digest,
+                "result": json.loads(summary) if summary else None,
+                "error": error
+            }
+            for job_key, status, attempts, cursor, processed, digest, summary, error, started_at, finished_at in rows
+        ]
+
+_store: Optional[JobCheckpointStore] = None
+
+def get_checkpoint_store() -> JobCheckpointStore:
+    """Almacén compartido por los trabajos del relayer"""
+    global _store
+    if _store is None:
+        _store = JobCheckpointStore()
+    return _store
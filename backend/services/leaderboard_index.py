@@ -0,0 +1,210 @@
+"""
+🏆 Leaderboard Index - Ranking de empresas por EcoScore en memoria
+Skip list indexable: actualizaciones, top-k, posición y paginación en O(log n)
+"""
+
+import math
+import random
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_LEVEL = 16
+LEVEL_PROBABILITY = 0.25
+
+# Clave de ordenación: mayor EcoScore primero, empates por company_id
+RankKey = Tuple[float, str]
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+    
+    def __init__(self, key: RankKey, level: int):
+        self.key = key
+        self.next: List["_Node"] = [None] * level
+        self.width: List[int] = [0] * level
+
+class LeaderboardIndex:
+    """
+    Ranking de empresas ordenado por EcoScore
+    
+    Skip list indexable: cada enlace guarda cuántas posiciones salta, de modo
+    que la posición de una empresa se obtiene sumando anchos durante la
+    búsqueda. Actualizar un score, consultar la posición de una empresa o
+    saltar a un cursor cuesta O(log n); leer k empresas a partir de ahí, O(k).
+    """
+    
+    def __init__(self, seed: Optional[int] = None):
+        self._random = random.Random(seed)
+        self._tail = _Node((math.inf, ""), 0)
+        self._head = _Node((-math.inf, ""), MAX_LEVEL)
+        self._head.next = [self._tail] * MAX_LEVEL
+        self._head.width = [1] * MAX_LEVEL
+        self._scores: Dict[str, float] = {}
+    
+    def __len__(self) -> int:
+        return len(self._scores)
+    
+    def __contains__(self, company_id: str) -> bool:
+        return company_id in self._scores
+    
+    def get_score(self, company_id: str) -> Optional[float]:
+        return self._scores.get(company_id)
+    
+    def _random_level(self) -> int:
+        level = 1
+        while level < MAX_LEVEL and self._random.random() < LEVEL_PROBABILITY:
+            level += 1
+        return level
+    
+    def update(self, company_id: str, score: float) -> None:
+        """Inserta la empresa o mueve su posición si el score ha cambiado"""
+        previous = self._scores.get(company_id)
+        if previous == score:
+            return
+        if previous is not None:
+            self._unlink((-previous, company_id))
+        self._link((-score, company_id))
+        self._scores[company_id] = score
+    
+    def remove(self, company_id: str) -> bool:
+        """Elimina una empresa del ranking; devuelve False si no estaba"""
+        score = self._scores.pop(company_id, None)
+        if score is None:
+            return False
+        self._unlink((-score, company_id))
+        return True
+    
+    def bulk_load(self, scores: Iterable[Tuple[str, float]]) -> None:
+        """
+        Sustituye el contenido del índice por los scores dados en O(n log n)
+        
+        Ordena una vez y enlaza los niveles en una sola pasada, mucho más
+        rápido que n inserciones al arrancar con un ranking completo.
+        """
+        self._scores = dict(scores)
+        keys = sorted((-score, company_id) for company_id, score in self._scores.items())
+        
+        self._head.next = [self._tail] * MAX_LEVEL
+        self._head.width = [0] * MAX_LEVEL
+        last = [self._head] * MAX_LEVEL
+        last_position = [0] * MAX_LEVEL
+        
+        for position, key in enumerate(keys, 1):
+            node = _Node(key, self._random_level())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level] = node
+                last_position[level] = position
+        
+        end = len(keys) + 1
+        for level in range(MAX_LEVEL):
+            last[level].next[level] = self._tail
+            last[level].width[level] = end - last_position[level]
+    
+    def _link(self, key: RankKey) -> None:
+        chain = [None] * MAX_LEVEL
+        steps_at_level = [0] * MAX_LEVEL
+        node = self._head
+        for level in range(MAX_LEVEL - 1, -1, -1):
+            while node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        
+        level_count = self._random_level()
+        new_node = _Node(key, level_count)
+        steps = 0
+        for level in range(level_count):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(level_count, MAX_LEVEL):
+            chain[level].width[level] += 1
+    
+    def _unlink(self, key: RankKey) -> None:
+        chain = [None] * MAX_LEVEL
+        node = self._head
+        for level in range(MAX_LEVEL - 1, -1, -1):
+            while node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        
+        target = chain[0].next[0]
+        if target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), MAX_LEVEL):
+            chain[level].width[level] -= 1
+    
+    def rank(self, company_id: str) -> Optional[int]:
+        """Posición (1 = mejor EcoScore) de una empresa, o None si no está en el ranking"""
+        score = self._scores.get(company_id)
+        if score is None:
+            return None
+        return self._seek((-score, company_id))[1]
+    
+    def _seek(self, key: RankKey) -> Tuple["_Node", int]:
+        """Último nodo con clave <= key y su posición"""
+        position = 0
+        node = self._head
+        for level in range(MAX_LEVEL - 1, -1, -1):
+            while node.next[level].key <= key:
+                position += node.width[level]
+                node = node.next[level]
+        return node, position
+    
+    def _collect(self, node: "_Node", position: int, limit: int) -> List[Tuple[int, str, float]]:
+        entries = []
+        node = node.next[0]
+        while node is not self._tail and len(entries) < limit:
+            position += 1
+            entries.append((position, node.key[1], -node.key[0]))
+            node = node.next[0]
+        return entries
+    
+    def top(self, limit: int) -> List[Tuple[int, str, float]]:
+        """Las `limit` mejores empresas como tuplas (posición, company_id, score)"""
+        return self._collect(self._head, 0, limit)
+    
+    def page(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Tuple[int, str, float]], Optional[str]]:
+        """
+        Página del ranking a continuación de `cursor`
+        
+        El cursor identifica la última entrada servida (score y empresa), por
+        lo que la paginación es estable aunque cambien scores de otras
+        empresas entre peticiones. Devuelve las entradas y el cursor siguiente
+        (None al llegar al final).
+        """
+        if cursor is None:
+            node, position = self._head, 0
+        else:
+            node, position = self._seek(decode_cursor(cursor))
+        entries = self._collect(node, position, limit)
+        
+        next_cursor = None
+        if len(entries) == limit and entries and entries[-1][0] < len(self):
+            _, company_id, score = entries[-1]
+            next_cursor = encode_cursor(score, company_id)
+        return entries, next_cursor
+
+def encode_cursor(score: float, company_id: str) -> str:
+    """Cursor opaco de paginación a partir de la última entrada servida"""
+    return f"{score!r}:{company_id}"
+
+def decode_cursor(cursor: str) -> RankKey:
+    """Clave de ordenación de un cursor; ValueError si está mal formado"""
+    score, separator, company_id = cursor.partition(":")
+    if not separator:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return (-float(score), company_id)
+
+# Ranking compartido, alimentado por los EcoScores mantenidos
+leaderboard_index = LeaderboardIndex()
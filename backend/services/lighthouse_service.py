@@ -4,13 +4,34 @@ Manejo de Data Coins y almacenamiento cifrado en Lighthouse
 """
 
 import os
+import json
+import asyncio
+import hashlib
 import httpx
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Union
 from pydantic import BaseModel
 
+from services.http_clients import http_clients
+from services.blob_cache import BlobCache
+from services.data_dir import data_path
+
 logger = logging.getLogger(__name__)
 
+# Caché de blobs compartida por todas las instancias del servicio
+_blob_cache: Optional[BlobCache] = None
+
+def get_blob_cache() -> BlobCache:
+    """Caché local direccionada por contenido para objetos de Lighthouse"""
+    global _blob_cache
+    if _blob_cache is None:
+        _blob_cache = BlobCache(
+            directory=os.getenv("LIGHTHOUSE_CACHE_DIR") or data_path("lighthouse_cache"),
+            max_bytes=int(os.getenv("LIGHTHOUSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            digest=LighthouseService._content_hash
+        )
+    return _blob_cache
+
 class DataCoin(BaseModel):
     """Modelo para Data Coins - métricas ambientales tokenizadas"""
     company_id: str
@@ -27,7 +48,21 @@ class LighthouseService:
     def __init__(self):
         self.api_key = os.getenv("LIGHTHOUSE_API_KEY")
         self.endpoint = os.getenv("LIGHTHOUSE_ENDPOINT", "https://node.lighthouse.storage")
-        self.client = httpx.AsyncClient()
+        self.gateway = os.getenv("LIGHTHOUSE_GATEWAY", "https://gateway.lighthouse.storage")
+        # Tamaño máximo de cada objeto empaquetado en subidas por lotes
+        self.max_object_bytes = int(os.getenv("LIGHTHOUSE_MAX_OBJECT_BYTES", str(4 * 1024 * 1024)))
+        # Guardar en la caché local los Data Coins recién subidos
+        self.cache_write_through = os.getenv("LIGHTHOUSE_CACHE_WRITE_THROUGH", "true").lower() == "true"
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartido con pool de conexiones hacia Lighthouse"""
+        return http_clients.get("lighthouse")
+    
+    @property
+    def cache(self) -> BlobCache:
+        """Caché local de objetos inmutables indexada por hash"""
+        return get_blob_cache()
     
     async def upload_datacoin(self, datacoin: DataCoin) -> Dict[str, Any]:
         """
@@ -35,25 +70,21 @@ class LighthouseService:
         """
         try:
             # Preparar datos para subida
-            data = {
-                "company_id": datacoin.company_id,
-                "metric_type": datacoin.metric_type,
-                "value": datacoin.value,
-                "unit": datacoin.unit,
-                "timestamp": datacoin.timestamp,
-                "verification_status": datacoin.verification_status
-            }
+            content = json.dumps(self._datacoin_record(datacoin), sort_keys=True).encode()
             
             # Simular subida a Lighthouse (implementar con API real)
             logger.info(f"📁 Subiendo Data Coin a Lighthouse: {datacoin.metric_type} para {datacoin.company_id}")
             
             # En implementación real, usar la API de Lighthouse
-            response = await self._mock_lighthouse_upload(data)
+            response = await self._mock_lighthouse_upload(content)
+            
+            if self.cache_write_through:
+                await asyncio.to_thread(self.cache.put, response["hash"], content, trusted=True)
             
             return {
                 "success": True,
                 "lighthouse_hash": response["hash"],
-                "ipfs_url": f"https://gateway.lighthouse.storage/ipfs/{response['hash']}",
+                "ipfs_url": f"{self.gateway}/ipfs/{response['hash']}",
                 "size": response["size"]
             }
             
@@ -64,6 +95,82 @@ class LighthouseService:
                 "error": str(e)
             }
     
+    async def upload_datacoin_batch(self, datacoins: List[DataCoin]) -> List[Dict[str, Any]]:
+        """
+        Sube un lote de Data Coins empaquetándolos en el menor número de objetos
+        
+        Cada Data Coin se serializa como una línea NDJSON y las líneas se agrupan
+        en objetos de hasta `max_object_bytes`. Cada elemento conserva su propio
+        hash de contenido (idéntico al de `upload_datacoin`) y referencia el objeto
+        de Lighthouse que lo contiene. Devuelve un resultado por elemento, en orden.
+        
+        La caché de escritura guarda cada objeto empaquetado bajo su propio hash
+        (un fichero por objeto, no por Data Coin), fuera del event loop, e indexa
+        el offset de cada Data Coin para servirlo también por su propio hash.
+        """
+        if not datacoins:
+            return []
+        
+        logger.info(f"📦 Empaquetando {len(datacoins)} Data Coins para Lighthouse")
+        
+        # Serializar y agrupar en objetos acotados por tamaño
+        packs: List[List[int]] = []
+        pack_lines: List[List[bytes]] = []
+        pack_members: List[List[Tuple[str, int, int]]] = []
+        item_hashes: List[str] = []
+        current_size = 0
+        
+        for index, datacoin in enumerate(datacoins):
+            line = json.dumps(self._datacoin_record(datacoin), sort_keys=True).encode()
+            item_hashes.append(self._content_hash(line))
+            
+            if not packs or current_size + len(line) + 1 > self.max_object_bytes:
+                packs.append([])
+                pack_lines.append([])
+                pack_members.append([])
+                current_size = 0
+            packs[-1].append(index)
+            pack_lines[-1].append(line)
+            pack_members[-1].append((item_hashes[-1], current_size, len(line)))
+            current_size += len(line) + 1
+        
+        # Subir los objetos empaquetados en paralelo
+        payloads = [b"\n".join(lines) for lines in pack_lines]
+        uploads = await asyncio.gather(
+            *(self._mock_lighthouse_upload_object(payload) for payload in payloads),
+            return_exceptions=True
+        )
+        
+        if self.cache_write_through:
+            await asyncio.to_thread(self._cache_objects, [
+                (upload["hash"], payload, members) for upload, payload, members in zip(uploads, payloads, pack_members)
+                if not isinstance(upload, Exception)
+            ])
+        
+        results: List[Dict[str, Any]] = [{} for _ in datacoins]
+        for indexes, upload in zip(packs, uploads):
+            if isinstance(upload, Exception):
+                logger.error(f"❌ Error subiendo objeto empaquetado: {upload}")
+                for position in indexes:
+                    results[position] = {"success": False, "error": str(upload)}
+                continue
+            
+            for offset, position in enumerate(indexes):
+                results[position] = {
+                    "success": True,
+                    "lighthouse_hash": item_hashes[position],
+                    "object_hash": upload["hash"],
+                    "object_offset": offset,
+                    "ipfs_url": f"{self.gateway}/ipfs/{upload['hash']}"
+                }
+        
+        logger.info(f"✅ Lote subido en {len(packs)} objetos de Lighthouse")
+        return results
+    
+    def _cache_objects(self, objects: List[Tuple[str, bytes, List[Tuple[str, int, int]]]]) -> None:
+        for object_hash, payload, members in objects:
+            self.cache.put_packed(object_hash, payload, members)
+    
     async def get_datacoin(self, lighthouse_hash: str) -> Dict[str, Any]:
         """
         Recupera un Data Coin usando su hash de Lighthouse
@@ -71,12 +178,26 @@ class LighthouseService:
         try:
             logger.info(f"📥 Recuperando Data Coin: {lighthouse_hash}")
             
+            # El contenido es inmutable: servir desde la caché local si existe
+            cached = self.get_cached_datacoin(lighthouse_hash)
+            if cached is not None:
+                with cached:
+                    return {
+                        "success": True,
+                        "data": self.decode_cached(lighthouse_hash, cached),
+                        "source": "cache"
+                    }
+            
             # En implementación real, usar la API de Lighthouse
             response = await self._mock_lighthouse_retrieve(lighthouse_hash)
             
+            # Solo se guarda si el contenido corresponde al hash solicitado
+            await asyncio.to_thread(self.cache.put, lighthouse_hash, json.dumps(response, sort_keys=True).encode())
+            
             return {
                 "success": True,
-                "data": response
+                "data": response,
+                "source": "lighthouse"
             }
             
         except Exception as e:
@@ -86,6 +207,28 @@ class LighthouseService:
                 "error": str(e)
             }
     
+    def get_cached_datacoin(self, lighthouse_hash: str) -> Optional[memoryview]:
+        """
+        Contenido serializado de un Data Coin en la caché local, sin copiarlo
+        
+        Devuelve un memoryview sobre el fichero mapeado en memoria, o None si
+        el hash no está en caché.
+        """
+        try:
+            return self.cache.get(lighthouse_hash)
+        except ValueError:
+            return None
+    
+    def is_packed_object(self, lighthouse_hash: str) -> bool:
+        """True si el hash es de un objeto empaquetado (NDJSON con varios Data Coins)"""
+        return self.cache.is_packed(lighthouse_hash)
+    
+    def decode_cached(self, lighthouse_hash: str, content: memoryview) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Deserializa un objeto en caché: un Data Coin, o la lista de un objeto empaquetado"""
+        if self.is_packed_object(lighthouse_hash):
+            return [json.loads(line) for line in content.tobytes().split(b"\n")]
+        return json.loads(content.tobytes())
+    
     async def list_company_datacoins(self, company_id: str) -> List[Dict[str, Any]]:
         """
         Lista todos los Data Coins de una empresa
@@ -107,7 +250,20 @@ class LighthouseService:
         Verifica la integridad de un Data Coin
         """
         try:
-            logger.info(f"✅ Verificando Data Coin: {lighthouse_hash}")
+            logger.debug(f"✅ Verificando Data Coin: {lighthouse_hash}")
+            
+            # Recalcular el digest de la copia local evita la llamada a la red
+            try:
+                locally_verified = self.cache.verify(lighthouse_hash)
+            except ValueError:
+                locally_verified = None
+            if locally_verified:
+                return {
+                    "success": True,
+                    "verified": True,
+                    "hash": lighthouse_hash,
+                    "source": "cache"
+                }
             
             # Verificar hash e integridad en Lighthouse
             is_valid = await self._mock_verify_integrity(lighthouse_hash)
@@ -115,7 +271,8 @@ class LighthouseService:
             return {
                 "success": True,
                 "verified": is_valid,
-                "hash": lighthouse_hash
+                "hash": lighthouse_hash,
+                "source": "lighthouse"
             }
             
         except Exception as e:
@@ -128,30 +285,47 @@ class LighthouseService:
     async def check_health(self) -> str:
         """Verificar estado del servicio Lighthouse"""
         try:
-            # Ping a Lighthouse
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.endpoint}/api/v0/node/id", timeout=5.0)
-                if response.status_code == 200:
-                    return "healthy"
-                else:
-                    return "degraded"
+            # Ping a Lighthouse reutilizando las conexiones del pool
+            response = await self.client.get(f"{self.endpoint}/api/v0/node/id", timeout=5.0)
+            if response.status_code == 200:
+                return "healthy"
+            else:
+                return "degraded"
         except:
             return "unhealthy"
     
+    @staticmethod
+    def _datacoin_record(datacoin: DataCoin) -> Dict[str, Any]:
+        """Registro serializable que se almacena en Lighthouse"""
+        return {
+            "company_id": datacoin.company_id,
+            "metric_type": datacoin.metric_type,
+            "value": datacoin.value,
+            "unit": datacoin.unit,
+            "timestamp": datacoin.timestamp,
+            "verification_status": datacoin.verification_status
+        }
+    
+    @staticmethod
+    def _content_hash(content: Union[bytes, memoryview]) -> str:
+        """Hash de contenido con formato IPFS simulado"""
+        return f"Qm{hashlib.sha256(content).hexdigest()[:40]}"
+    
     # Métodos mock para desarrollo (reemplazar con implementación real)
-    async def _mock_lighthouse_upload(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _mock_lighthouse_upload(self, content: bytes) -> Dict[str, Any]:
         """Mock de subida a Lighthouse"""
-        import hashlib
-        import json
-        
-        content = json.dumps(data, sort_keys=True)
-        hash_value = hashlib.sha256(content.encode()).hexdigest()
-        
         return {
-            "hash": f"Qm{hash_value[:40]}",  # Hash IPFS simulado
+            "hash": self._content_hash(content),  # Hash IPFS simulado
             "size": len(content)
         }
     
+    async def _mock_lighthouse_upload_object(self, payload: bytes) -> Dict[str, Any]:
+        """Mock de subida de un objeto empaquetado a Lighthouse"""
+        return {
+            "hash": self._content_hash(payload),
+            "size": len(payload)
+        }
+    
     async def _mock_lighthouse_retrieve(self, hash_value: str) -> Dict[str, Any]:
         """Mock de recuperación desde Lighthouse"""
         return {
@@ -184,4 +358,13 @@ class LighthouseService:
     
     async def _mock_verify_integrity(self, hash_value: str) -> bool:
         """Mock de verificación de integridad"""
-        return True  # En implementación real, verificar con Lighthouse
\ No newline at end of file
+        return True  # En implementación real, verificar con Lighthouse
+
+_lighthouse_service: Optional[LighthouseService] = None
+
+def get_lighthouse_service() -> LighthouseService:
+    """Servicio de Lighthouse compartido por las rutas y el relayer"""
+    global _lighthouse_service
+    if _lighthouse_service is None:
+        _lighthouse_service = LighthouseService()
+    return _lighthouse_service
@@ -0,0 +1,378 @@
+"""
+🌳 Merkle Distribution - Distribución de recompensas por raíz Merkle
+Árbol (wallet, importe) por época: se publica solo la raíz y cada empresa reclama con su prueba
+"""
+
+import os
+import re
+import mmap
+import time
+import struct
+import sqlite3
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from eth_hash.auto import keccak
+
+from services.data_dir import data_path
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 32
+TREE_MAGIC = b"GLMK"
+TREE_HEADER = struct.Struct("<4sI")
+EPOCH_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+# Por debajo de este número de hojas no compensa arrancar procesos
+PARALLEL_MIN_LEAVES = 65536
+
+def leaf_hash(wallet: str, amount: int) -> bytes:
+    """
+    Hoja del árbol: keccak256(abi.encodePacked(address, uint256))
+    
+    Las hojas miden 52 bytes y los nodos internos 64, por lo que un nodo
+    interno no puede hacerse pasar por hoja (segunda preimagen).
+    """
+    return keccak(bytes.fromhex(wallet[2:]) + amount.to_bytes(32, "big"))
+
+def hash_pair(a: bytes, b: bytes) -> bytes:
+    """Nodo interno con el par ordenado (compatible con MerkleProof de OpenZeppelin)"""
+    return keccak(a + b if a <= b else b + a)
+
+def checksum_address(wallet: str) -> str:
+    """Checksum EIP-55 de una dirección ya validada (sin la validación completa de eth_utils)"""
+    address = wallet[2:].lower()
+    digest = keccak(address.encode()).hex()
+    return "0x" + "".join(char.upper() if int(nibble, 16) >= 8 else char for char, nibble in zip(address, digest))
+
+def _hash_leaves(entries: List[Tuple[str, int]]) -> List[bytes]:
+    return [leaf_hash(wallet, amount) for wallet, amount in entries]
+
+def _build_levels(leaves: bytes, max_depth: Optional[int] = None) -> List[bytes]:
+    """Niveles desde `leaves` hacia arriba, hasta la raíz o `max_depth` niveles por encima"""
+    levels = [leaves]
+    current = leaves
+    while len(current) > HASH_SIZE and (max_depth is None or len(levels) <= max_depth):
+        count = len(current) // HASH_SIZE
+        parent = bytearray()
+        for offset in range(0, (count - 1) * HASH_SIZE, 2 * HASH_SIZE):
+            parent += hash_pair(current[offset:offset + HASH_SIZE], current[offset + HASH_SIZE:offset + 2 * HASH_SIZE])
+        if count % 2:
+            parent += current[-HASH_SIZE:]
+        current = bytes(parent)
+        levels.append(current)
+    return levels
+
+def verify_proof(leaf: bytes, proof: Iterable[bytes], root: bytes) -> bool:
+    """Recalcula la raíz a partir de una hoja y su prueba"""
+    computed = leaf
+    for sibling in proof:
+        computed = hash_pair(computed, sibling)
+    return computed == root
+
+class MerkleTree:
+    """
+    Árbol Merkle guardado nivel a nivel como bytes contiguos
+    
+    Cada nivel ocupa 32 bytes por nodo (las hojas primero, la raíz al
+    final); un nodo sin pareja sube tal cual al nivel siguiente. El árbol
+    completo ocupa ~64 bytes por hoja y cualquier prueba se obtiene en
+    O(log n) leyendo un hermano por nivel, sin guardar cada prueba aparte.
+    """
+    
+    def __init__(self, levels: List[memoryview]):
+        self.levels = levels
+    
+    @classmethod
+    def build(cls, leaves: bytes, executor: Optional[ProcessPoolExecutor] = None, workers: int = 1) -> "MerkleTree":
+        """
+        Construye el árbol a partir de las hojas concatenadas (ya ordenadas)
+        
+        Con `executor`, los niveles bajos se reparten en subárboles de 2^k
+        hojas consecutivas: cada proceso construye el suyo y los niveles se
+        concatenan, idénticos a los de una construcción secuencial.
+        """
+        if not leaves:
+            raise ValueError("El árbol necesita al menos una hoja")
+        count = len(leaves) // HASH_SIZE
+        if executor is None or workers < 2 or count < PARALLEL_MIN_LEAVES:
+            return cls([memoryview(level) for level in _build_levels(leaves)])
+        
+        depth = (count // workers).bit_length() - 1
+        chunk = (1 << depth) * HASH_SIZE
+        parts = [leaves[offset:offset + chunk] for offset in range(0, len(leaves), chunk)]
+        subtrees = list(executor.map(_build_levels, parts, [depth] * len(parts)))
+        # Un subárbol final pequeño llega antes a su raíz: el nodo sube sin cambios
+        for subtree in subtrees:
+            subtree.extend([subtree[-1]] * (depth + 1 - len(subtree)))
+        levels = [b"".join(subtree[level] for subtree in subtrees) for level in range(depth + 1)]
+        levels.extend(_build_levels(levels.pop()))
+        return cls([memoryview(level) for level in levels])
+    
+    @property
+    def root(self) -> bytes:
+        return bytes(self.levels[-1][:HASH_SIZE])
+    
+    @property
+    def leaf_count(self) -> int:
+        return len(self.levels[0]) // HASH_SIZE
+    
+    def leaf(self, index: int) -> bytes:
+        return bytes(self.levels[0][index * HASH_SIZE:(index + 1) * HASH_SIZE])
+    
+    def proof(self, index: int) -> List[bytes]:
+        """Hermanos desde la hoja hasta la raíz"""
+        if not 0 <= index < self.leaf_count:
+            raise IndexError(index)
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling * HASH_SIZE < len(level):
+                proof.append(bytes(level[sibling * HASH_SIZE:(sibling + 1) * HASH_SIZE]))
+            index //= 2
+        return proof
+    
+    def save(self, path: str) -> None:
+        """Escribe el árbol de forma atómica: cabecera, longitudes de nivel y niveles"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(TREE_HEADER.pack(TREE_MAGIC, len(self.levels)))
+            f.write(struct.pack(f"<{len(self.levels)}Q", *(len(level) for level in self.levels)))
+            for level in self.levels:
+                f.write(level)
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path: str) -> "MerkleTree":
+        """Abre un árbol guardado con mmap: solo se leen las páginas de las pruebas servidas"""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, level_count = TREE_HEADER.unpack_from(mapped, 0)
+        if magic != TREE_MAGIC:
+            raise ValueError(f"Fichero de árbol Merkle inválido: {path}")
+        lengths = struct.unpack_from(f"<{level_count}Q", mapped, TREE_HEADER.size)
+        offset = TREE_HEADER.size + 8 * level_count
+        view = memoryview(mapped)
+        levels = []
+        for length in lengths:
+            levels.append(view[offset:offset + length])
+            offset += length
+        return cls(levels)
+
+class MerkleDistributionStore:
+    """
+    Distribuciones Merkle por época
+    
+    Los árboles se guardan en `<directorio>/<época>.<versión>.tree` y el
+    índice de hojas (empresa → wallet, importe, posición) en SQLite, de modo
+    que servir una prueba es una búsqueda por clave más O(log n) lecturas del
+    árbol. Cada construcción escribe un fichero nuevo y lo registra en la
+    misma transacción que sus hojas: una prueba lee ambos de la misma
+    versión aunque otro worker reconstruya la época a la vez.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, workers: Optional[int] = None):
+        self.directory = directory or os.path.dirname(data_path("merkle", "distributions.sqlite"))
+        self.workers = workers or int(os.getenv("MERKLE_BUILD_WORKERS", "0")) or os.cpu_count() or 1
+        os.makedirs(self.directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.directory, "distributions.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS distributions (
+                epoch TEXT PRIMARY KEY,
+                root TEXT NOT NULL,
+                leaf_count INTEGER NOT NULL,
+                total_amount TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                publish_tx TEXT
+            );
+            CREATE TABLE IF NOT EXISTS leaves (
+                epoch TEXT NOT NULL,
+                company_id TEXT NOT NULL,
+                wallet TEXT NOT NULL,
+                amount TEXT NOT NULL,
+                leaf_index INTEGER NOT NULL,
+                PRIMARY KEY (epoch, company_id)
+            ) WITHOUT ROWID;
+        """)
+        # Transacción que deposita el importe en el distribuidor (añadida a almacenes creados antes de existir)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(distributions)")}
+        if "funding_tx" not in columns:
+            self._db.execute("ALTER TABLE distributions ADD COLUMN funding_tx TEXT")
+        # Fichero del árbol de cada época (NULL en almacenes anteriores: `<época>.tree`)
+        if "tree_file" not in columns:
+            self._db.execute("ALTER TABLE distributions ADD COLUMN tree_file TEXT")
+        # época -> (fichero, árbol); otro worker puede reconstruir la época con otro fichero
+        self._trees: Dict[str, Tuple[str, MerkleTree]] = {}
+    
+    def _tree_path(self, epoch: str, tree_file: Optional[str] = None) -> str:
+        if not EPOCH_PATTERN.match(epoch):
+            raise ValueError(f"Época inválida: {epoch}")
+        return os.path.join(self.directory, tree_file or f"{epoch}.tree")
+    
+    def build(self, epoch: str, entries: Iterable[Tuple[str, str, int]]) -> Dict[str, Any]:
+        """
+        Construye y guarda el árbol de una época a partir de (company_id, wallet, importe)
+        
+        Los importes van en unidades base del token. Las hojas se ordenan por
+        hash para que el árbol sea determinista. Cada wallet aparece en una
+        sola hoja: el contrato marca como reclamada la wallet de la época, así
+        que una segunda hoja suya no podría reclamarse nunca. Reconstruir una
+        época la sustituye por completo, salvo que su raíz ya se haya
+        publicado: las pruebas servidas dejarían de coincidir con la raíz on-chain.
+        """
+        previous = self._db.execute("SELECT publish_tx, tree_file FROM distributions WHERE epoch = ?", (epoch,)).fetchone()
+        if previous is not None and previous[0]:
+            raise ValueError(f"La época {epoch} ya está publicada (tx {previous[0]}): no se reconstruye")
+        tree_file = f"{epoch}.{time.time_ns():x}.tree"
+        path = self._tree_path(epoch, tree_file)
+        start = time.perf_counter()
+        
+        rows = []
+        seen = set()
+        wallets: Dict[str, str] = {}
+        total = 0
+        for company_id, wallet, amount in entries:
+            if company_id in seen:
+                raise ValueError(f"Empresa duplicada en la distribución: {company_id}")
+            if amount <= 0:
+                raise ValueError(f"Importe inválido para {company_id}: {amount}")
+            if not ADDRESS_PATTERN.match(wallet):
+                raise ValueError(f"Wallet inválida para {company_id}: {wallet}")
+            wallet = wallet.lower()
+            if wallet in wallets:
+                raise ValueError(f"Wallet {wallet} repetida en la distribución ({wallets[wallet]} y {company_id})")
+            seen.add(company_id)
+            wallets[wallet] = company_id
+            # El checksum solo se calcula al servir una prueba: a millones de hojas cuesta más que el árbol
+            rows.append((company_id, wallet, amount))
+            total += amount
+        if not rows:
+            raise ValueError("La distribución no tiene hojas")
+        
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 1 and len(rows) >= PARALLEL_MIN_LEAVES else None
+        try:
+            pairs = [(wallet, amount) for _, wallet, amount in rows]
+            if executor is not None:
+                size = -(-len(pairs) // self.workers)
+                hashes = [leaf for chunk in executor.map(_hash_leaves, [pairs[i:i + size] for i in range(0, len(pairs), size)]) for leaf in chunk]
+            else:
+                hashes = _hash_leaves(pairs)
+            
+            order = sorted(range(len(rows)), key=hashes.__getitem__)
+            records = [(hashes[i], *rows[i]) for i in order]
+            tree = MerkleTree.build(b"".join(record[0] for record in records), executor, self.workers)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        tree.save(path)
+        
+        root = "0x" + tree.root.hex()
+        # Conexión propia: las pruebas se siguen sirviendo (WAL) sin ver una época a medio escribir.
+        # El fichero nuevo ya está escrito; hojas y fichero cambian juntos al confirmar
+        db = sqlite3.connect(os.path.join(self.directory, "distributions.sqlite"))
+        try:
+            with db:
+                db.execute("DELETE FROM leaves WHERE epoch = ?", (epoch,))
+                db.executemany(
+                    "INSERT INTO leaves (epoch, company_id, wallet, amount, leaf_index) VALUES (?, ?, ?, ?, ?)",
+                    ((epoch, company_id, wallet, str(amount), index) for index, (_, company_id, wallet, amount) in enumerate(records))
+                )
+                db.execute(
+                    "INSERT OR REPLACE INTO distributions (epoch, root, leaf_count, total_amount, created_at, publish_tx, tree_file) "
+                    "VALUES (?, ?, ?, ?, ?, NULL, ?)",
+                    (epoch, root, len(records), str(total), time.time(), tree_file)
+                )
+        except sqlite3.Error:
+            os.unlink(path)
+            raise
+        finally:
+            db.close()
+        # El árbol anterior ya no lo referencia ninguna fila (los mmap abiertos siguen siendo válidos)
+        if previous is not None:
+            try:
+                os.unlink(self._tree_path(epoch, previous[1]))
+            except FileNotFoundError:
+                pass
+        
+        logger.info(f"🌳 Árbol Merkle {epoch}: {len(records)} hojas en {time.perf_counter() - start:.2f}s, raíz {root}")
+        return {"epoch": epoch, "root": root, "leaf_count": len(records), "total_amount": total}
+    
+    def set_publish_tx(self, epoch: str, tx_hash: str) -> None:
+        with self._db:
+            self._db.execute("UPDATE distributions SET publish_tx = ? WHERE epoch = ?", (tx_hash, epoch))
+    
+    def set_funding_tx(self, epoch: str, tx_hash: str) -> None:
+        with self._db:
+            self._db.execute("UPDATE distributions SET funding_tx = ? WHERE epoch = ?", (tx_hash, epoch))
+    
+    def _tree(self, epoch: str, tree_file: Optional[str]) -> Optional[MerkleTree]:
+        cached = self._trees.get(epoch)
+        if cached is None or cached[0] != tree_file:
+            # Reconstruida (en este u otro worker): la fila apunta a otro fichero
+            try:
+                cached = self._trees[epoch] = (tree_file, MerkleTree.load(self._tree_path(epoch, tree_file)))
+            except FileNotFoundError:
+                self._trees.pop(epoch, None)
+                return None
+        return cached[1]
+    
+    def latest_epoch(self) -> Optional[str]:
+        row = self._db.execute("SELECT epoch FROM distributions ORDER BY created_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+    
+    def get_distribution(self, epoch: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT root, leaf_count, total_amount, created_at, publish_tx, funding_tx FROM distributions WHERE epoch = ?",
+            (epoch,)
+        ).fetchone()
+        if row is None:
+            return None
+        root, leaf_count, total_amount, created_at, publish_tx, funding_tx = row
+        return {
+            "epoch": epoch,
+            "root": root,
+            "leaf_count": leaf_count,
+            "total_amount": int(total_amount),
+            "created_at": created_at,
+            "publish_tx": publish_tx,
+            "funding_tx": funding_tx
+        }
+    
+    def get_proof(self, epoch: str, company_id: str) -> Optional[Dict[str, Any]]:
+        """Datos de reclamación de una empresa (wallet, importe y prueba), o None"""
+        # Hoja y fichero del árbol en la misma lectura: siempre de la misma construcción.
+        # Si otra construcción borra el fichero justo después, se lee de nuevo
+        for _ in range(2):
+            row = self._db.execute(
+                "SELECT l.wallet, l.amount, l.leaf_index, d.tree_file FROM leaves l "
+                "JOIN distributions d ON d.epoch = l.epoch WHERE l.epoch = ? AND l.company_id = ?",
+                (epoch, company_id)
+            ).fetchone()
+            if row is None:
+                return None
+            tree = self._tree(epoch, row[3])
+            if tree is not None:
+                break
+        else:
+            return None
+        wallet, amount, leaf_index, _ = row
+        return {
+            "epoch": epoch,
+            "company_id": company_id,
+            "wallet": checksum_address(wallet),
+            "amount": int(amount),
+            "leaf": "0x" + tree.leaf(leaf_index).hex(),
+            "proof": ["0x" + node.hex() for node in tree.proof(leaf_index)],
+            "root": "0x" + tree.root.hex()
+        }
+
+_store: Optional[MerkleDistributionStore] = None
+
+def get_merkle_store() -> MerkleDistributionStore:
+    """Almacén de distribuciones Merkle compartido por el servicio y las rutas"""
+    global _store
+    if _store is None:
+        _store = MerkleDistributionStore(os.getenv("MERKLE_DISTRIBUTION_DIR") or None)
+    return _store
@@ -0,0 +1,251 @@
+"""
+🗂️ Notification Log - Historial persistente de notificaciones enviadas
+Registro append-only en SQLite con escritura por lotes, paginación por cursor y retención
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.data_dir import data_path
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("recipient_id", "type", "channel", "title", "message", "status", "message_id", "notification_id", "timestamp")
+
+def encode_cursor(timestamp: float, entry_id: int) -> str:
+    """Cursor opaco de paginación a partir de la última entrada servida"""
+    return f"{timestamp!r}:{entry_id}"
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """(timestamp, id) de un cursor; ValueError si está mal formado"""
+    timestamp, separator, entry_id = cursor.partition(":")
+    if not separator:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return float(timestamp), int(entry_id)
+
+class NotificationLog:
+    """
+    Historial de notificaciones
+    
+    `record` solo añade la entrada a un búfer en memoria: una tarea de fondo
+    (o el propio búfer al llenarse) la escribe con el resto del lote en una
+    única transacción, así que registrar no frena el envío. Las lecturas
+    vuelcan antes lo pendiente.
+    
+    Las consultas por destinatario y por tipo usan índices
+    (recipient_id, timestamp, id) y (type, timestamp, id) y se paginan con
+    cursores sobre esa clave: cada página cuesta lo mismo sea cual sea su
+    profundidad. Las últimas entradas globales (`latest`) se sirven de un
+    anillo en memoria. `compact` borra lo que excede la retención.
+    """
+    
+    def __init__(self, path: Optional[str] = None, batch_size: int = 500, flush_interval: Optional[float] = None,
+                 retention_days: Optional[float] = None, latest_size: int = 200):
+        self.path = path or data_path("notifications", "history.sqlite")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("NOTIFICATION_LOG_FLUSH_INTERVAL", "0.5"))
+        self.retention_days = retention_days if retention_days is not None else float(os.getenv("NOTIFICATION_LOG_RETENTION_DAYS", "90"))
+        
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipient_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                title TEXT NOT NULL,
+                message TEXT NOT NULL,
+                status TEXT NOT NULL,
+                message_id TEXT,
+                notification_id INTEGER,
+                timestamp REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS history_recipient ON history (recipient_id, timestamp, id);
+            CREATE INDEX IF NOT EXISTS history_type ON history (type, timestamp, id);
+            CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp, id);
+        """)
+        self._buffer: List[Tuple] = []
+        self._latest: deque = deque(maxlen=latest_size)
+        rows = self._db.execute(
+            f"SELECT id, {', '.join(_COLUMNS)} FROM history ORDER BY timestamp DESC, id DESC LIMIT ?", (latest_size,)
+        ).fetchall()
+        self._latest.extend(self._to_entry(row) for row in reversed(rows))
+        self._task: Optional[asyncio.Task] = None
+    
+    # Escritura
+    def record(self, recipient_id: str, type: str, channel: str, title: str, message: str, status: str,
+               message_id: Optional[str] = None, notification_id: Optional[int] = None) -> None:
+        """Añade una entrada al búfer (se escribe en el próximo lote)"""
+        self._buffer.append((recipient_id, type, channel, title, message, status, message_id, notification_id, time.time()))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+    
+    def flush(self) -> int:
+        """Escribe el búfer en una transacción y devuelve cuántas entradas escribió"""
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        with self._db:
+            self._db.executemany(
+                f"INSERT INTO history ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", batch
+            )
+            last_id = self._db.execute("SELECT last_insert_rowid()").fetchone()[0]
+        # Los ids de un lote escrito en una transacción son consecutivos
+        first_id = last_id - len(batch) + 1
+        self._latest.extend(self._to_entry((first_id + offset, *row)) for offset, row in enumerate(batch))
+        return len(batch)
+    
+    async def start(self) -> None:
+        """Arranca el volcado periódico del búfer y la compactación diaria"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush()
+    
+    async def _run(self) -> None:
+        next_compaction = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+                if self.retention_days > 0 and time.monotonic() >= next_compaction:
+                    next_compaction = time.monotonic() + 86400
+                    # El borrado va en un hilo con su propia conexión para no bloquear el event loop
+                    cutoff = time.time() - self.retention_days * 86400
+                    removed = await asyncio.to_thread(self._delete_before, cutoff)
+                    self._compacted(removed, cutoff)
+            except Exception as e:
+                logger.error(f"❌ Error escribiendo historial de notificaciones: {e}")
+    
+    def compact(self, retention_days: Optional[float] = None) -> int:
+        """Borra las entradas más antiguas que la retención y devuelve cuántas borró"""
+        retention_days = retention_days if retention_days is not None else self.retention_days
+        cutoff = time.time() - retention_days * 86400
+        removed = self._delete_before(cutoff)
+        self._compacted(removed, cutoff)
+        return removed
+    
+    def _delete_before(self, cutoff: float, chunk_size: int = 5000) -> int:
+        # Tramos cortos: cada transacción bloquea la escritura de lotes solo un momento
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            removed = 0
+            while True:
+                with db:
+                    deleted = db.execute(
+                        "DELETE FROM history WHERE id IN (SELECT id FROM history WHERE timestamp < ? ORDER BY timestamp LIMIT ?)",
+                        (cutoff, chunk_size)
+                    ).rowcount
+                removed += deleted
+                if deleted < chunk_size:
+                    break
+            if removed:
+                db.execute("PRAGMA incremental_vacuum")
+            return removed
+        finally:
+            db.close()
+    
+    def _compacted(self, removed: int, cutoff: float) -> None:
+        while self._latest and self._latest[0]["_timestamp"] < cutoff:
+            self._latest.popleft()
+        if removed:
+            logger.info(f"🗂️ Historial de notificaciones compactado: {removed} entradas eliminadas")
+    
+    # Lectura
+    @staticmethod
+    def _to_entry(row: Tuple) -> Dict[str, Any]:
+        entry_id, recipient_id, type, channel, title, message, status, message_id, notification_id, timestamp = row
+        return {
+            "id": entry_id,
+            "recipient_id": recipient_id,
+            "type": type,
+            "channel": channel,
+            "title": title,
+            "message": message,
+            "status": status,
+            "message_id": message_id,
+            "notification_id": notification_id,
+            "timestamp": datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "_timestamp": timestamp
+        }
+    
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in entry.items() if key != "_timestamp"}
+    
+    def page(self, recipient_id: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None,
+             type: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Una página del historial, de la más reciente a la más antigua
+        
+        Filtra por destinatario y/o tipo. Devuelve (entradas, next_cursor);
+        next_cursor es None en la última página.
+        """
+        if limit < 1:
+            raise ValueError("limit debe ser mayor que 0")
+        self.flush()
+        
+        conditions, params = [], []
+        if recipient_id is not None:
+            conditions.append("recipient_id = ?")
+            params.append(recipient_id)
+        if type is not None:
+            conditions.append("type = ?")
+            params.append(type)
+        if cursor is not None:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._db.execute(
+            f"SELECT id, {', '.join(_COLUMNS)} FROM history {where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+        
+        entries = [self._to_entry(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(entries[-1]["_timestamp"], entries[-1]["id"]) if len(rows) > limit else None
+        return [self._public(entry) for entry in entries], next_cursor
+    
+    def latest(self, limit: int = 20, recipient_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Últimas entradas, de la más reciente a la más antigua
+        
+        Sin destinatario se sirven del anillo en memoria (sin consultar
+        SQLite); con destinatario, del índice (recipient_id, timestamp, id).
+        """
+        if recipient_id is not None or limit > self._latest.maxlen:
+            return self.page(recipient_id, limit)[0]
+        self.flush()
+        count = min(limit, len(self._latest))
+        return [self._public(self._latest[-i]) for i in range(1, count + 1)]
+    
+    def stats(self) -> Dict[str, Any]:
+        self.flush()
+        total, oldest = self._db.execute("SELECT COUNT(*), MIN(timestamp) FROM history").fetchone()
+        return {
+            "entries": total,
+            "oldest": datetime.fromtimestamp(oldest, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if oldest else None,
+            "retention_days": self.retention_days
+        }
+
+_log: Optional[NotificationLog] = None
+
+def get_notification_log() -> NotificationLog:
+    """Historial compartido por el servicio de notificaciones y las rutas"""
+    global _log
+    if _log is None:
+        _log = NotificationLog()
+    return _log
@@ -0,0 +1,394 @@
+"""
+📬 Notification Outbox - Cola persistente de notificaciones
+Las rutas encolan en SQLite y workers asíncronos entregan con límite por canal y reintentos
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.data_dir import data_path
+
+logger = logging.getLogger(__name__)
+
+# (mensajes por segundo, ráfaga) por canal; configurables con NOTIFICATION_RATE_<CANAL> y NOTIFICATION_BURST_<CANAL>
+DEFAULT_CHANNEL_RATES: Dict[str, Tuple[float, int]] = {
+    "telegram": (30.0, 30),
+    "whatsapp": (20.0, 20),
+    "email": (10.0, 10),
+}
+
+# Entrega de una notificación: (canal, payload) -> message_id del proveedor
+Sender = Callable[[str, Dict[str, Any]], Awaitable[Optional[str]]]
+# Fusión de notificaciones pendientes de un mismo destinatario en un resumen
+Coalescer = Callable[[List[Dict[str, Any]]], Dict[str, Any]]
+# Aviso de resultado final: (id, canal, payload, "delivered" | "failed", message_id)
+Settled = Callable[[int, str, Dict[str, Any], str, Optional[str]], None]
+
+class PermanentDeliveryError(Exception):
+    """Error de entrega que no se resuelve reintentando (configuración o destinatario inválido)"""
+
+class TokenBucket:
+    """Cubo de tokens: `rate` entregas por segundo con ráfagas de hasta `burst` (rate <= 0 = sin límite)"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        # El lock mantiene el orden de llegada entre los workers del canal
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class _ChannelRuntime:
+    """Cola en memoria, cubo de tokens y tareas de un canal"""
+    __slots__ = ("name", "queue", "bucket", "wakeup", "tasks")
+    
+    def __init__(self, name: str, bucket: TokenBucket, queue_size: int):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.bucket = bucket
+        self.wakeup = asyncio.Event()
+        self.tasks: List[asyncio.Task] = []
+
+class NotificationOutbox:
+    """
+    Outbox de notificaciones sobre SQLite
+    
+    `enqueue` inserta la notificación y vuelve en microsegundos; la entrega
+    ocurre en segundo plano. Cada canal tiene su propio despachador, que
+    reclama en la base de datos las filas vencidas, y un grupo de workers que
+    entregan respetando el cubo de tokens del canal, así que un proveedor
+    lento o limitado no frena a los demás. Los fallos se reintentan con
+    backoff exponencial y jitter hasta `max_attempts`; los
+    `PermanentDeliveryError` fallan a la primera. La entrega es al menos una
+    vez: lo que estaba en curso al apagar o caerse el proceso vuelve a
+    pendiente al arrancar.
+    
+    Las notificaciones encoladas con `coalesce_key` se agrupan: cuando vence
+    la primera de una clave, todas las pendientes con esa clave se fusionan
+    con `coalescer` en una sola entrega y el resto queda como `coalesced`.
+    Encolarlas con `delay` abre la ventana durante la que se acumulan.
+    
+    `on_settled` se llama cuando una notificación se entrega o se descarta
+    definitivamente (p. ej. para llevar el historial).
+    
+    Con varios workers solo el líder entrega (`start`); los demás solo
+    encolan, así que el despachador vuelve a mirar la base de datos cada
+    `poll_interval` segundos aunque nadie lo despierte en su proceso.
+    
+    Los métodos deben llamarse desde el event loop donde se ejecutó `start`.
+    """
+    
+    def __init__(self, sender: Sender, path: Optional[str] = None, workers: Optional[int] = None,
+                 rates: Optional[Dict[str, Tuple[float, int]]] = None, max_attempts: Optional[int] = None,
+                 retry_backoff: Optional[float] = None, max_backoff: Optional[float] = None,
+                 coalescer: Optional[Coalescer] = None, on_settled: Optional[Settled] = None,
+                 poll_interval: Optional[float] = None):
+        self.sender = sender
+        self.coalescer = coalescer
+        self.on_settled = on_settled
+        self.path = path or data_path("notifications", "outbox.sqlite")
+        self.workers = workers or int(os.getenv("NOTIFICATION_WORKERS", "8"))
+        self.max_attempts = max_attempts or int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+        self.retry_backoff = retry_backoff if retry_backoff is not None else float(os.getenv("NOTIFICATION_RETRY_BACKOFF", "2.0"))
+        self.max_backoff = max_backoff if max_backoff is not None else float(os.getenv("NOTIFICATION_MAX_BACKOFF", "300"))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("NOTIFICATION_POLL_INTERVAL", "1.0"))
+        self.rates = dict(DEFAULT_CHANNEL_RATES)
+        self.rates.update(rates or {})
+        self.queue_size = self.workers * 4
+        
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                message_id TEXT,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, channel, next_attempt_at);
+        """)
+        # Columnas de agrupación (añadidas a outboxes creados antes de existir)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        for column, definition in (
+            ("coalesce_key", "TEXT"),
+            ("coalesced_into", "INTEGER"),
+            ("merged_count", "INTEGER NOT NULL DEFAULT 1")
+        ):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE outbox ADD COLUMN {column} {definition}")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_coalesce ON outbox (channel, coalesce_key, status) WHERE coalesce_key IS NOT NULL"
+        )
+        self._channels: Dict[str, _ChannelRuntime] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._running = False
+    
+    def bucket(self, channel: str) -> TokenBucket:
+        """Cubo de tokens del canal, compartido por los workers y los envíos masivos"""
+        bucket = self._buckets.get(channel)
+        if bucket is None:
+            rate, burst = self.rates.get(channel, (10.0, 10))
+            prefix = channel.upper()
+            bucket = self._buckets[channel] = TokenBucket(
+                float(os.getenv(f"NOTIFICATION_RATE_{prefix}", rate)),
+                int(os.getenv(f"NOTIFICATION_BURST_{prefix}", burst))
+            )
+        return bucket
+    
+    # Encolado
+    def enqueue(self, channel: str, payload: Dict[str, Any], coalesce_key: Optional[str] = None, delay: float = 0.0) -> int:
+        """Guarda una notificación pendiente (entregable tras `delay` segundos) y devuelve su id"""
+        return self.enqueue_many([(channel, payload, coalesce_key)], delay)[0]
+    
+    def enqueue_many(self, items: Iterable[Tuple[str, Dict[str, Any], Optional[str]]], delay: float = 0.0) -> List[int]:
+        """Guarda varias notificaciones (canal, payload, clave de agrupación) en una sola transacción"""
+        now = time.time()
+        ids = []
+        channels = set()
+        with self._db:
+            for channel, payload, coalesce_key in items:
+                cursor = self._db.execute(
+                    "INSERT INTO outbox (channel, payload, coalesce_key, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (channel, json.dumps(payload, ensure_ascii=False, default=str), coalesce_key, now + delay, now, now)
+                )
+                ids.append(cursor.lastrowid)
+                channels.add(channel)
+        for channel in channels:
+            self._wake(channel)
+        return ids
+    
+    def _wake(self, channel: str) -> None:
+        if not self._running:
+            return
+        runtime = self._channels.get(channel)
+        if runtime is None:
+            runtime = self._start_channel(channel)
+        runtime.wakeup.set()
+    
+    # Ciclo de vida
+    @property
+    def running(self) -> bool:
+        return self._running
+    
+    async def start(self) -> None:
+        """Recupera lo que quedó en curso y arranca despachadores y workers"""
+        if self._running:
+            return
+        with self._db:
+            recovered = self._db.execute(
+                "UPDATE outbox SET status = 'pending', updated_at = ? WHERE status = 'sending'", (time.time(),)
+            ).rowcount
+        if recovered:
+            logger.info(f"📬 {recovered} notificaciones en curso vuelven a pendiente")
+        
+        self._running = True
+        pending = [row[0] for row in self._db.execute("SELECT DISTINCT channel FROM outbox WHERE status = 'pending'")]
+        for channel in set(self.rates) | set(pending):
+            self._start_channel(channel)
+        logger.info(f"📬 Outbox de notificaciones activo ({self.workers} workers por canal)")
+    
+    def _start_channel(self, channel: str) -> _ChannelRuntime:
+        runtime = _ChannelRuntime(channel, self.bucket(channel), self.queue_size)
+        runtime.tasks.append(asyncio.create_task(self._dispatch(runtime)))
+        runtime.tasks.extend(asyncio.create_task(self._work(runtime)) for _ in range(self.workers))
+        self._channels[channel] = runtime
+        runtime.wakeup.set()
+        return runtime
+    
+    async def stop(self) -> None:
+        """Detiene los workers; lo reclamado y no entregado vuelve a pendiente"""
+        if not self._running:
+            return
+        self._running = False
+        tasks = [task for runtime in self._channels.values() for task in runtime.tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._channels.clear()
+        with self._db:
+            self._db.execute("UPDATE outbox SET status = 'pending', updated_at = ? WHERE status = 'sending'", (time.time(),))
+    
+    # Despacho y entrega
+    def _claim(self, channel: str, limit: int) -> List[Tuple[int, str, int]]:
+        """Marca como en curso hasta `limit` notificaciones vencidas del canal, fusionando las agrupables"""
+        now = time.time()
+        claimed = []
+        with self._db:
+            rows = self._db.execute(
+                "SELECT id, payload, attempts, coalesce_key FROM outbox WHERE status = 'pending' AND channel = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (channel, now, limit)
+            ).fetchall()
+            keys = set()
+            for notification_id, payload, attempts, coalesce_key in rows:
+                if coalesce_key is not None and self.coalescer is not None:
+                    if coalesce_key in keys:
+                        continue
+                    keys.add(coalesce_key)
+                    # Toda la clave, también lo que aún no ha vencido: una sola entrega por ventana
+                    group = self._db.execute(
+                        "SELECT id, payload, attempts, merged_count FROM outbox WHERE channel = ? AND coalesce_key = ? AND status = 'pending' ORDER BY id",
+                        (channel, coalesce_key)
+                    ).fetchall()
+                    if len(group) > 1:
+                        notification_id, attempts = group[0][0], group[0][2]
+                        payload = json.dumps(self.coalescer([json.loads(item[1]) for item in group]), ensure_ascii=False, default=str)
+                        self._db.execute(
+                            "UPDATE outbox SET payload = ?, merged_count = ? WHERE id = ?",
+                            (payload, sum(item[3] for item in group), notification_id)
+                        )
+                        self._db.executemany(
+                            "UPDATE outbox SET status = 'coalesced', coalesced_into = ?, updated_at = ? WHERE id = ?",
+                            ((notification_id, now, item[0]) for item in group[1:])
+                        )
+                claimed.append((notification_id, payload, attempts))
+            if claimed:
+                self._db.executemany(
+                    "UPDATE outbox SET status = 'sending', updated_at = ? WHERE id = ?",
+                    ((now, row[0]) for row in claimed)
+                )
+        return claimed
+    
+    def _next_due_in(self, channel: str) -> Optional[float]:
+        row = self._db.execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending' AND channel = ?", (channel,)
+        ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+    
+    async def _dispatch(self, runtime: _ChannelRuntime) -> None:
+        while True:
+            runtime.wakeup.clear()
+            room = self.queue_size - runtime.queue.qsize()
+            delay = None
+            if room > 0:
+                rows = self._claim(runtime.name, room)
+                for row in rows:
+                    runtime.queue.put_nowait(row)
+                # Cola llena: esperar a que los workers la vacíen; si no, hasta el próximo reintento
+                if len(rows) < room:
+                    delay = self._next_due_in(runtime.name)
+            # Lo encolado por otros workers no despierta a este proceso
+            delay = self.poll_interval if delay is None else min(delay, self.poll_interval)
+            try:
+                await asyncio.wait_for(runtime.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _work(self, runtime: _ChannelRuntime) -> None:
+        while True:
+            notification_id, payload, attempts = await runtime.queue.get()
+            if runtime.queue.qsize() <= self.queue_size // 2:
+                runtime.wakeup.set()
+            await runtime.bucket.acquire()
+            payload = json.loads(payload)
+            try:
+                message_id = await self.sender(runtime.name, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record_failure(runtime, notification_id, payload, attempts + 1, e)
+            else:
+                with self._db:
+                    self._db.execute(
+                        "UPDATE outbox SET status = 'delivered', attempts = ?, message_id = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                        (attempts + 1, message_id, time.time(), notification_id)
+                    )
+                self._settled(notification_id, runtime.name, payload, "delivered", message_id)
+    
+    def _settled(self, notification_id: int, channel: str, payload: Dict[str, Any], status: str, message_id: Optional[str]) -> None:
+        if self.on_settled is None:
+            return
+        try:
+            self.on_settled(notification_id, channel, payload, status, message_id)
+        except Exception as e:
+            logger.error(f"❌ Error en on_settled de la notificación #{notification_id}: {e}")
+    
+    def _record_failure(self, runtime: _ChannelRuntime, notification_id: int, payload: Dict[str, Any],
+                        attempts: int, error: Exception) -> None:
+        now = time.time()
+        if isinstance(error, PermanentDeliveryError) or attempts >= self.max_attempts:
+            status, next_attempt_at = "failed", now
+            logger.error(f"❌ Notificación #{notification_id} descartada tras {attempts} intentos: {error}")
+        else:
+            # Backoff exponencial con jitter para no reintentar en bloque contra el proveedor
+            backoff = min(self.max_backoff, self.retry_backoff * 2 ** (attempts - 1))
+            status, next_attempt_at = "pending", now + backoff * (0.5 + random.random() / 2)
+            logger.warning(f"⚠️ Notificación #{notification_id} falló (intento {attempts}), reintento en {next_attempt_at - now:.1f}s: {error}")
+        with self._db:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (status, attempts, next_attempt_at, str(error)[:500], now, notification_id)
+            )
+        if status == "pending":
+            runtime.wakeup.set()
+        else:
+            self._settled(notification_id, runtime.name, payload, status, None)
+    
+    # Consultas
+    def get(self, notification_id: int) -> Optional[Dict[str, Any]]:
+        """Estado de entrega de una notificación"""
+        row = self._db.execute(
+            "SELECT channel, status, attempts, created_at, updated_at, message_id, last_error, coalesced_into, merged_count "
+            "FROM outbox WHERE id = ?",
+            (notification_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        channel, status, attempts, created_at, updated_at, message_id, last_error, coalesced_into, merged_count = row
+        return {
+            "id": notification_id,
+            "channel": channel,
+            "status": status,
+            "attempts": attempts,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "message_id": message_id,
+            "last_error": last_error,
+            "coalesced_into": coalesced_into,
+            "merged_count": merged_count
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Número de notificaciones por canal y estado, y ahorro por agrupación"""
+        channels: Dict[str, Dict[str, int]] = {}
+        for channel, status, count in self._db.execute("SELECT channel, status, COUNT(*) FROM outbox GROUP BY channel, status"):
+            channels.setdefault(channel, {})[status] = count
+        digests, merged = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(merged_count), 0) FROM outbox WHERE merged_count > 1 AND status != 'coalesced'"
+        ).fetchone()
+        return {
+            "running": self._running,
+            "workers_per_channel": self.workers,
+            "channels": channels,
+            "coalescing": {
+                "digests": digests,
+                "notifications_coalesced": merged,
+                "deliveries_saved": merged - digests
+            }
+        }
@@ -1,15 +1,20 @@
 """
 📱 Notification Service - Servicio de notificaciones
-Alertas vía Telegram y WhatsApp para eventos del protocolo
+Alertas vía Telegram y WhatsApp para eventos del protocolo (entregadas desde el outbox)
 """
 
 import os
 import logging
 import httpx
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
 from pydantic import BaseModel
 from enum import Enum
 
+from services.http_clients import http_clients
+from services.notification_outbox import NotificationOutbox, PermanentDeliveryError
+from services.notification_log import NotificationLog, get_notification_log
+from services.broadcast_engine import broadcast_engine
+
 logger = logging.getLogger(__name__)
 
 class NotificationType(str, Enum):
@@ -18,12 +23,21 @@ class NotificationType(str, Enum):
     DATACOIN_UPLOADED = "datacoin_uploaded"
     LEADERBOARD_CHANGE = "leaderboard_change"
     SYSTEM_ALERT = "system_alert"
+    DIGEST = "digest"
 
 class NotificationChannel(str, Enum):
     TELEGRAM = "telegram"
     WHATSAPP = "whatsapp"
     EMAIL = "email"
 
+# Tipos que se agrupan por destinatario en un resumen (las alertas del sistema salen siempre al momento)
+DIGEST_TYPES = frozenset({
+    NotificationType.REWARD_DISTRIBUTED,
+    NotificationType.SCORE_UPDATED,
+    NotificationType.DATACOIN_UPLOADED,
+    NotificationType.LEADERBOARD_CHANGE
+})
+
 class Notification(BaseModel):
     """Modelo para notificaciones"""
     recipient_id: str
@@ -36,41 +50,125 @@ class Notification(BaseModel):
 class NotificationService:
     """Servicio para envío de notificaciones"""
     
-    def __init__(self):
+    def __init__(self, outbox: Optional[NotificationOutbox] = None, log: Optional[NotificationLog] = None):
         self.telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.whatsapp_api_key = os.getenv("WHATSAPP_API_KEY")
         self.telegram_api_url = f"https://api.telegram.org/bot{self.telegram_token}"
-        
+        # Segundos que una notificación agrupable espera a otras del mismo destinatario (0 = sin resumen)
+        self.digest_window = float(os.getenv("NOTIFICATION_DIGEST_WINDOW", "30"))
+        self._outbox = outbox
+        self._log = log
+    
+    @property
+    def outbox(self) -> NotificationOutbox:
+        """Outbox donde se encolan las notificaciones (compartido por defecto)"""
+        return self._outbox or get_notification_outbox()
+    
+    @property
+    def log(self) -> NotificationLog:
+        """Historial de notificaciones entregadas y descartadas (compartido por defecto)"""
+        return self._log or get_notification_log()
+    
+    def record_history(self, notification_id: Optional[int], channel: str, payload: Dict[str, Any],
+                       status: str, message_id: Optional[str] = None) -> None:
+        """Anota en el historial el resultado final de una entrega (callback `on_settled` del outbox)"""
+        self.log.record(
+            payload["recipient_id"], payload["type"], channel, payload["title"], payload["message"],
+            status, message_id, notification_id
+        )
+    
+    def _http_client(self, channel: NotificationChannel) -> httpx.AsyncClient:
+        """Cliente HTTP compartido con pool de conexiones para el canal"""
+        return http_clients.get(channel.value)
+    
+    def _pool_size(self, channel: NotificationChannel) -> int:
+        """Conexiones máximas hacia el proveedor del canal"""
+        profile = http_clients.profiles.get(channel.value) or http_clients.profiles["default"]
+        return profile.max_connections
+    
     async def send_notification(self, notification: Notification) -> Dict[str, Any]:
         """
-        Envía una notificación a través del canal especificado
+        Encola una notificación para el canal especificado
+        
+        Vuelve en cuanto la notificación queda guardada en el outbox; la entrega,
+        los reintentos y el límite por canal corren a cargo de sus workers. Los
+        tipos de `DIGEST_TYPES` esperan `digest_window` segundos y salen en un
+        único resumen junto al resto de notificaciones del destinatario.
         """
         try:
-            logger.info(f"📤 Enviando notificación {notification.type} vía {notification.channel}")
-            
-            if notification.channel == NotificationChannel.TELEGRAM:
-                result = await self._send_telegram(notification)
-            elif notification.channel == NotificationChannel.WHATSAPP:
-                result = await self._send_whatsapp(notification)
-            elif notification.channel == NotificationChannel.EMAIL:
-                result = await self._send_email(notification)
+            if self.digest_window > 0 and notification.type in DIGEST_TYPES:
+                coalesce_key, delay = notification.recipient_id, self.digest_window
             else:
-                raise ValueError(f"Canal no soportado: {notification.channel}")
+                coalesce_key, delay = None, 0.0
+            notification_id = self.outbox.enqueue(
+                notification.channel.value,
+                notification.model_dump(mode="json"),
+                coalesce_key,
+                delay
+            )
+            logger.info(f"📤 Notificación {notification.type} encolada vía {notification.channel} (#{notification_id})")
             
             return {
                 "success": True,
+                "queued": True,
+                "notification_id": notification_id,
                 "channel": notification.channel,
-                "message_id": result.get("message_id"),
                 "timestamp": "2024-10-11T12:00:00Z"
             }
             
         except Exception as e:
-            logger.error(f"❌ Error enviando notificación: {e}")
+            logger.error(f"❌ Error encolando notificación: {e}")
             return {
                 "success": False,
                 "error": str(e)
             }
     
+    async def deliver(self, notification: Notification) -> Dict[str, Any]:
+        """
+        Entrega una notificación por su canal (lo usan los workers del outbox)
+        
+        Lanza la excepción del canal si la entrega falla.
+        """
+        logger.info(f"📤 Enviando notificación {notification.type} vía {notification.channel}")
+        
+        if notification.channel == NotificationChannel.TELEGRAM:
+            return await self._send_telegram(notification)
+        elif notification.channel == NotificationChannel.WHATSAPP:
+            return await self._send_whatsapp(notification)
+        elif notification.channel == NotificationChannel.EMAIL:
+            return await self._send_email(notification)
+        else:
+            raise PermanentDeliveryError(f"Canal no soportado: {notification.channel}")
+    
+    @staticmethod
+    def build_digest(payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Fusiona notificaciones pendientes de un destinatario en un único resumen
+        
+        Los resúmenes previos (p. ej. uno que espera reintento) se aplanan.
+        """
+        items = []
+        for payload in payloads:
+            if payload["type"] == NotificationType.DIGEST.value:
+                items.extend(payload["data"]["items"])
+            else:
+                items.append({key: payload.get(key) for key in ("type", "title", "message", "data")})
+        
+        digest = Notification(
+            recipient_id=payloads[0]["recipient_id"],
+            channel=payloads[0]["channel"],
+            type=NotificationType.DIGEST,
+            title=f"📬 Resumen: {len(items)} novedades",
+            message="\n\n".join(f"{item['title']}\n{item['message']}" for item in items),
+            data={"items": items}
+        )
+        return digest.model_dump(mode="json")
+    
+    async def _deliver_queued(self, channel: str, payload: Dict[str, Any]) -> Optional[str]:
+        """Entrega desde el outbox: reconstruye la notificación y devuelve el message_id"""
+        result = await self.deliver(Notification(**payload))
+        return result.get("message_id")
+    
     async def send_reward_notification(self, company_id: str, amount: float, eco_score: float) -> Dict[str, Any]:
         """
         Envía notificación de recompensa distribuida
@@ -130,6 +228,28 @@ class NotificationService:
         
         return await self.send_notification(notification)
     
+    async def send_datacoin_batch_confirmation(self, company_id: str, metric_counts: Dict[str, int], lighthouse_hashes: List[str]) -> Dict[str, Any]:
+        """
+        Envía una única confirmación para todos los Data Coins de una empresa en un lote
+        """
+        total = sum(metric_counts.values())
+        summary = ", ".join(f"{metric_type} ({count})" for metric_type, count in sorted(metric_counts.items()))
+        
+        notification = Notification(
+            recipient_id=company_id,
+            channel=NotificationChannel.TELEGRAM,
+            type=NotificationType.DATACOIN_UPLOADED,
+            title="✅ Data Coins Verificados",
+            message=f"{total} métricas han sido verificadas y almacenadas de forma segura: {summary}.",
+            data={
+                "total": total,
+                "metric_counts": metric_counts,
+                "lighthouse_hashes": lighthouse_hashes
+            }
+        )
+        
+        return await self.send_notification(notification)
+    
     async def send_leaderboard_notification(self, company_id: str, new_rank: int, previous_rank: int) -> Dict[str, Any]:
         """
         Envía notificación de cambio en el ranking
@@ -155,51 +275,87 @@ class NotificationService:
         
         return await self.send_notification(notification)
     
-    async def broadcast_system_alert(self, message: str, recipients: List[str]) -> List[Dict[str, Any]]:
+    async def broadcast_system_alert(self, message: str, recipients: List[str],
+                                     channel: NotificationChannel = NotificationChannel.TELEGRAM) -> List[Dict[str, Any]]:
         """
         Envía alerta del sistema a múltiples recipients
         """
-        results = []
+        return [
+            {"recipient_id": result["recipient_id"], "result": result}
+            async for result in self.stream_system_alert(message, recipients, channel)
+        ]
+    
+    async def stream_system_alert(self, message: str, recipients: List[str],
+                                  channel: NotificationChannel = NotificationChannel.TELEGRAM) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Difunde una alerta del sistema y produce cada resultado en cuanto termina
         
-        for recipient_id in recipients:
-            notification = Notification(
-                recipient_id=recipient_id,
-                channel=NotificationChannel.TELEGRAM,
-                type=NotificationType.SYSTEM_ALERT,
-                title="🚨 Alerta del Sistema",
-                message=message
-            )
-            
-            result = await self.send_notification(notification)
-            results.append({
-                "recipient_id": recipient_id,
-                "result": result
-            })
+        El mensaje se renderiza una sola vez y se entrega en paralelo con el
+        motor de difusión, respetando el límite del canal. Los canales con envío
+        por lotes (email) entregan muchos destinatarios por llamada. Las
+        entregas con errores transitorios se encolan en el outbox para
+        reintentarlas.
+        """
+        template = Notification(
+            recipient_id="",
+            channel=channel,
+            type=NotificationType.SYSTEM_ALERT,
+            title="🚨 Alerta del Sistema",
+            message=message
+        )
+        payload = template.model_dump(mode="json")
+        logger.info(f"🚨 Difundiendo alerta del sistema a {len(recipients)} destinatarios vía {channel}")
+        
+        async def send_one(recipient_id: str) -> Optional[str]:
+            result = await self.deliver(template.model_copy(update={"recipient_id": recipient_id}))
+            return result.get("message_id")
         
-        return results
+        async def send_batch(recipient_ids: List[str]) -> Optional[str]:
+            result = await self._send_email_batch(template, recipient_ids)
+            return result.get("message_id")
+        
+        delivered = queued = failed = 0
+        async for result in broadcast_engine.broadcast(
+            recipients,
+            send_one,
+            send_batch if channel == NotificationChannel.EMAIL else None,
+            self.outbox.bucket(channel.value),
+            self._pool_size(channel)
+        ):
+            recipient_payload = dict(payload, recipient_id=result["recipient_id"])
+            if result["success"]:
+                delivered += 1
+                self.record_history(None, channel.value, recipient_payload, "delivered", result["message_id"])
+            elif result["retryable"]:
+                queued += 1
+                result["notification_id"] = self.outbox.enqueue(channel.value, recipient_payload)
+                result["queued"] = True
+            else:
+                failed += 1
+                self.record_history(None, channel.value, recipient_payload, "failed")
+            yield result
+        
+        logger.info(f"🚨 Alerta difundida: {delivered} entregadas, {queued} encoladas para reintento, {failed} fallidas")
     
-    async def get_notification_history(self, company_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+    async def get_notification_history(self, company_id: str, limit: int = 20, cursor: Optional[str] = None,
+                                       type: Optional[NotificationType] = None) -> Dict[str, Any]:
         """
-        Obtiene historial de notificaciones enviadas
+        Obtiene historial de notificaciones enviadas, de la más reciente a la más antigua
+        
+        Devuelve {"notifications", "next_cursor"}; `next_cursor` continúa la
+        paginación y es None en la última página. Lanza ValueError si el
+        cursor o el límite no son válidos.
         """
-        try:
-            logger.info(f"📋 Obteniendo historial de notificaciones para {company_id}")
-            
-            # En implementación real, consultar base de datos
-            history = await self._get_mock_notification_history(company_id, limit)
-            
-            return history
-            
-        except Exception as e:
-            logger.error(f"❌ Error obteniendo historial de notificaciones: {e}")
-            return []
+        logger.info(f"📋 Obteniendo historial de notificaciones para {company_id}")
+        notifications, next_cursor = self.log.page(company_id, limit, cursor, type.value if type else None)
+        return {"notifications": notifications, "next_cursor": next_cursor}
     
     # Métodos de envío por canal
     async def _send_telegram(self, notification: Notification) -> Dict[str, Any]:
         """Envía mensaje vía Telegram"""
         try:
             if not self.telegram_token:
-                raise ValueError("Token de Telegram no configurado")
+                raise PermanentDeliveryError("Token de Telegram no configurado")
             
             # En implementación real, usar la API de Telegram
             logger.info(f"📱 Enviando mensaje Telegram a {notification.recipient_id}")
@@ -219,7 +375,7 @@ class NotificationService:
         """Envía mensaje vía WhatsApp"""
         try:
             if not self.whatsapp_api_key:
-                raise ValueError("API key de WhatsApp no configurada")
+                raise PermanentDeliveryError("API key de WhatsApp no configurada")
             
             logger.info(f"💬 Enviando mensaje WhatsApp a {notification.recipient_id}")
             
@@ -250,34 +406,38 @@ class NotificationService:
             logger.error(f"❌ Error enviando email: {e}")
             raise
     
-    async def _get_mock_notification_history(self, company_id: str, limit: int) -> List[Dict[str, Any]]:
-        """Mock de historial de notificaciones"""
-        return [
-            {
-                "id": "notif_001",
-                "type": "reward_distributed",
-                "title": "🎉 ¡Nueva Recompensa Recibida!",
-                "message": "Has recibido 425.50 PYUSD por tu EcoScore de 89.2",
-                "channel": "telegram",
-                "timestamp": "2024-10-10T15:30:00Z",
-                "status": "delivered"
-            },
-            {
-                "id": "notif_002",
-                "type": "score_updated",
-                "title": "📈 EcoScore Actualizado",
-                "message": "Tu EcoScore se ha actualizado a 89.2 (cambio: +2.1)",
-                "channel": "telegram",
-                "timestamp": "2024-10-09T09:15:00Z",
-                "status": "delivered"
-            },
-            {
-                "id": "notif_003",
-                "type": "datacoin_uploaded",
-                "title": "✅ Data Coin Verificado",
-                "message": "Tu métrica de carbon_emissions ha sido verificada",
-                "channel": "telegram",
-                "timestamp": "2024-10-08T14:20:00Z",
-                "status": "delivered"
+    async def _send_email_batch(self, notification: Notification, recipients: List[str]) -> Dict[str, Any]:
+        """Envía un mismo email a varios destinatarios en un solo mensaje (BCC)"""
+        try:
+            logger.info(f"📧 Enviando email a {len(recipients)} destinatarios")
+            
+            # Mock de respuesta de email
+            return {
+                "message_id": "email_54321",
+                "recipients": len(recipients),
+                "status": "sent"
             }
-        ]
\ No newline at end of file
+        
+        except Exception as e:
+            logger.error(f"❌ Error enviando email: {e}")
+            raise
+
+_outbox: Optional[NotificationOutbox] = None
+
+def get_notification_outbox() -> NotificationOutbox:
+    """Outbox compartido por todas las instancias del servicio (workers arrancados en el lifespan)"""
+    global _outbox
+    if _outbox is None:
+        service = get_notification_service()
+        _outbox = NotificationOutbox(service._deliver_queued, coalescer=NotificationService.build_digest,
+                                     on_settled=service.record_history)
+    return _outbox
+
+_notification_service: Optional[NotificationService] = None
+
+def get_notification_service() -> NotificationService:
+    """Servicio de notificaciones compartido por las rutas, el relayer y el outbox"""
+    global _notification_service
+    if _notification_service is None:
+        _notification_service = NotificationService()
+    return _notification_service
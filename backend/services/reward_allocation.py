@@ -0,0 +1,81 @@
+"""
+💰 Reward Allocation - Reparto exacto del pool de recompensas
+Cuotas proporcionales en unidades base de PYUSD (enteros) con el método del mayor resto
+"""
+
+import logging
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Los EcoScores se convierten a pesos enteros con 4 decimales de precisión
+SCORE_SCALE = 10_000
+# Por encima de este producto los cálculos pasan a enteros de Python (sin desbordamiento)
+_INT64_SAFE = 2 ** 62
+
+def score_weights(scores: Sequence[float]) -> np.ndarray:
+    """Pesos enteros de reparto a partir de EcoScores (negativos cuentan como 0)"""
+    scores = np.asarray(scores, dtype=np.float64)
+    return np.rint(np.clip(scores, 0, None) * SCORE_SCALE).astype(np.int64)
+
+def _floor_shares(weights: np.ndarray, pool: int, total: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parte entera y resto exactos de weights * pool / total
+    
+    Con pool = q * total + r, cada cuota es w * q + (w * r) // total y su resto
+    (w * r) % total: ningún producto intermedio supera max(w) * max(q, r).
+    """
+    quotient, remainder = divmod(pool, total)
+    largest = int(weights.max())
+    if largest * max(quotient, remainder) < _INT64_SAFE:
+        scaled = weights * remainder
+        return weights * quotient + scaled // total, scaled % total
+    exact = weights.astype(object) * pool
+    return (exact // total).astype(np.int64), (exact % total).astype(np.int64)
+
+def allocate_pool(scores: Sequence[float], pool_units: int, min_score: float = 0.0,
+                  cap_units: Optional[int] = None) -> np.ndarray:
+    """
+    Reparte `pool_units` unidades base entre empresas en proporción a su EcoScore
+    
+    Las empresas con score menor que `min_score` reciben 0. Cada cuota es el
+    suelo de su parte exacta y las unidades sobrantes van, de una en una, a
+    los mayores restos (empates por orden de entrada), así que la suma es
+    exactamente el pool. Con `cap_units` las empresas que superarían el tope
+    se fijan en él y su exceso se reparte entre el resto; solo si todas
+    quedan topadas sobra pool sin repartir.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    allocation = np.zeros(len(scores), dtype=np.int64)
+    if not 0 <= pool_units < 2 ** 63:
+        raise ValueError(f"El pool debe estar entre 0 y 2**63 - 1 unidades: {pool_units}")
+    if cap_units is not None and cap_units < 0:
+        raise ValueError(f"El tope no puede ser negativo: {cap_units}")
+    
+    weights = score_weights(scores)
+    active = np.flatnonzero((scores >= min_score) & (weights > 0))
+    remaining = int(pool_units)
+    
+    while active.size and remaining > 0:
+        active_weights = weights[active]
+        total = int(active_weights.sum())
+        shares, remainders = _floor_shares(active_weights, remaining, total)
+        
+        if cap_units is not None:
+            # Parte exacta > tope  ⇔  suelo > tope, o suelo == tope con resto
+            over = (shares > cap_units) | ((shares == cap_units) & (remainders > 0))
+            if over.any():
+                allocation[active[over]] = cap_units
+                remaining -= cap_units * int(over.sum())
+                active = active[~over]
+                continue
+        
+        leftover = remaining - int(shares.sum())
+        if leftover:
+            shares[np.argsort(-remainders, kind="stable")[:leftover]] += 1
+        allocation[active] = shares
+        remaining = 0
+    
+    return allocation
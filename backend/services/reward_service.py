@@ -4,17 +4,36 @@ Automated reward distribution based on environmental scores
 """
 
 import os
+import time
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 from decimal import Decimal
 from datetime import datetime
 import json
 
-from web3 import Web3
-from eth_account import Account
+import numpy as np
+
+from services.leaderboard_index import leaderboard_index
+from services.merkle_distribution import get_merkle_store
+from services.reward_allocation import allocate_pool
+from services.score_aggregates import score_aggregates
+from services.rpc_batcher import get_rpc_batcher
+
+if TYPE_CHECKING:
+    from web3 import AsyncWeb3
+    from services.transfer_pipeline import TransferPipeline
 
 logger = logging.getLogger(__name__)
 
+COMPANY_WALLETS = {
+    "empresa_verde_1": "0x70997970C51812dc3A010C7d01b50e0d17dc79C8",
+    "empresa_verde_2": "0x3C44CdDdB6a900fa2b585dd299e03d12FA4293BC",
+    "empresa_verde_3": "0x90F79bf6EB2c4f870365E785982E1f101E93b906",
+    "empresa_verde_4": "0x15d34AAf54267DB7D7c367839AAf71A00a2C6A65"
+}
+
 class Company:
     """Company model for reward system"""
     def __init__(self, id: str, name: str, wallet_address: str, eco_score: float, 
@@ -28,14 +47,15 @@ class Company:
         self.total_rewards_earned = total_rewards_earned
 
 class RewardDistribution:
-    """Reward distribution model"""
+    """Reward distribution model; with an idempotency key the transfer is sent at most once"""
     def __init__(self, company_id: str, amount: Decimal, eco_score: float, 
-                 reward_date: str, transaction_hash: Optional[str] = None):
+                 reward_date: str, transaction_hash: Optional[str] = None, idempotency_key: Optional[str] = None):
         self.company_id = company_id
         self.amount = amount
         self.eco_score = eco_score
         self.reward_date = reward_date
         self.transaction_hash = transaction_hash
+        self.idempotency_key = idempotency_key
 
 class RewardService:
     """PYUSD reward distribution service"""
@@ -45,9 +65,45 @@ class RewardService:
         self.pyusd_contract_address = os.getenv("PYUSD_CONTRACT_ADDRESS", "0x9fE46736679d2D9a65F0992F2272dE9f3c7fa6e0")
         self.private_key = os.getenv("PRIVATE_KEY")
         self.pyusd_decimals = int(os.getenv("PYUSD_DECIMALS", "6"))
+        self.merkle_distributor_address = os.getenv("MERKLE_DISTRIBUTOR_ADDRESS")
+        
+        # AsyncWeb3 over the shared RPC pool: nothing connects until the first call
+        self._w3: Optional["AsyncWeb3"] = None
+        self.pyusd_contract = None
+        self.connection_check_interval = float(os.getenv("RPC_CONNECTION_CHECK_INTERVAL", "30"))
+        self._connected: Optional[bool] = None
+        self._connection_checked_at = 0.0
+        self._connection_lock = asyncio.Lock()
+        self.monthly_reward_pool = Decimal(os.getenv("MONTHLY_REWARD_POOL", "10000"))
+        self.min_eligible_score = float(os.getenv("MIN_ELIGIBLE_SCORE", "50"))
+        max_reward = os.getenv("MAX_REWARD_PER_COMPANY")
+        self.max_reward_per_company = Decimal(max_reward) if max_reward else None
         
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
-        self.monthly_reward_pool = Decimal("10000")
+        # Ranking shared with the maintained EcoScores
+        self.leaderboard = leaderboard_index
+        self._company_directory: Dict[str, Company] = {}
+        self._transfer_pipeline: Optional["TransferPipeline"] = None
+        
+        self.merkle_distributor_abi = [
+            {
+                "inputs": [
+                    {"name": "epoch", "type": "uint256"},
+                    {"name": "root", "type": "bytes32"},
+                    {"name": "totalAmount", "type": "uint256"}
+                ],
+                "name": "publishMerkleRoot",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [{"name": "", "type": "uint256"}],
+                "name": "merkleRoots",
+                "outputs": [{"name": "", "type": "bytes32"}],
+                "stateMutability": "view",
+                "type": "function"
+            }
+        ]
         
         self.pyusd_abi = [
             {
@@ -68,23 +124,46 @@ class RewardService:
                 "type": "function"
             }
         ]
-        
-        if self.w3.is_connected():
-            self.pyusd_contract = self.w3.eth.contract(
-                address=self.pyusd_contract_address,
-                abi=self.pyusd_abi
-            )
-            logger.info("Connected to blockchain and PYUSD contract")
-        else:
-            self.pyusd_contract = None
-            logger.warning("Could not connect to blockchain - using mock mode")
     
-    def check_connection(self) -> bool:
-        """Check blockchain connection status"""
-        try:
-            return self.w3.is_connected()
-        except:
-            return False
+    @property
+    def w3(self) -> "AsyncWeb3":
+        """AsyncWeb3 client, built on first use so web3 is only imported when the chain is needed"""
+        if self._w3 is None:
+            from services.async_web3 import async_web3
+            self._w3 = async_web3(self.rpc_url)
+        return self._w3
+    
+    async def check_connection(self) -> bool:
+        """
+        Check blockchain connection status
+        Checked on first use and re-checked at most every `connection_check_interval` seconds;
+        concurrent callers share one check
+        """
+        if self._connection_fresh():
+            return self._connected
+        async with self._connection_lock:
+            if self._connection_fresh():
+                return self._connected
+            try:
+                connected = await self.w3.is_connected()
+            except Exception:
+                connected = False
+            if connected and self.pyusd_contract is None:
+                self.pyusd_contract = self.w3.eth.contract(
+                    address=self.pyusd_contract_address,
+                    abi=self.pyusd_abi
+                )
+            if connected != self._connected:
+                if connected:
+                    logger.info("Connected to blockchain and PYUSD contract")
+                else:
+                    logger.warning("Could not connect to blockchain - using mock mode")
+            self._connected = connected
+            self._connection_checked_at = time.monotonic()
+            return connected
+    
+    def _connection_fresh(self) -> bool:
+        return self._connected is not None and time.monotonic() - self._connection_checked_at < self.connection_check_interval
         
     async def calculate_rewards(self, companies: List[Company]) -> List[RewardDistribution]:
         """
@@ -94,29 +173,31 @@ class RewardService:
         try:
             logger.info(f"Calculating rewards for {len(companies)} companies")
             
-            eligible_companies = [c for c in companies if c.eco_score >= 50.0]
+            # Exact split in PYUSD base units: shares always add up to the pool
+            unit = Decimal(10) ** self.pyusd_decimals
+            pool_units = int(self.monthly_reward_pool * unit)
+            cap_units = int(self.max_reward_per_company * unit) if self.max_reward_per_company is not None else None
+            scores = np.fromiter((c.eco_score for c in companies), dtype=np.float64, count=len(companies))
+            allocation = allocate_pool(scores, pool_units, self.min_eligible_score, cap_units)
             
-            if not eligible_companies:
+            eligible = np.flatnonzero(allocation > 0)
+            if not eligible.size:
                 logger.warning("No eligible companies for rewards")
                 return []
             
-            total_score = sum(c.eco_score for c in eligible_companies)
-            
             distributions = []
-            for company in eligible_companies:
-                proportion = Decimal(str(company.eco_score)) / Decimal(str(total_score))
-                reward_amount = self.monthly_reward_pool * proportion
-                
-                distribution = RewardDistribution(
+            for index, units in zip(eligible.tolist(), allocation[eligible].tolist()):
+                company = companies[index]
+                reward_amount = Decimal(units).scaleb(-self.pyusd_decimals)
+                distributions.append(RewardDistribution(
                     company_id=company.id,
                     amount=reward_amount,
                     eco_score=company.eco_score,
                     reward_date="2024-10-11T12:00:00Z"
-                )
-                distributions.append(distribution)
-                
-                logger.info(f"{company.name}: {reward_amount:.2f} PYUSD (Score: {company.eco_score})")
+                ))
+                logger.debug(f"{company.name}: {reward_amount} PYUSD (Score: {company.eco_score})")
             
+            logger.info(f"{len(distributions)} eligible companies share {Decimal(int(allocation.sum())).scaleb(-self.pyusd_decimals)} PYUSD")
             return distributions
             
         except Exception as e:
@@ -130,6 +211,10 @@ class RewardService:
         try:
             logger.info(f"Distributing rewards to {len(distributions)} companies")
             
+            if await self.check_connection() and self.private_key and self.pyusd_contract:
+                successful_distributions, failed_distributions, pending_distributions = await self._distribute_on_chain(distributions)
+                return self._distribution_summary(successful_distributions, failed_distributions, pending_distributions)
+            
             successful_distributions = []
             failed_distributions = []
             
@@ -153,20 +238,7 @@ class RewardService:
                         "error": str(e)
                     })
             
-            return {
-                "status": "completed" if not failed_distributions else "partial",
-                "successful_count": len(successful_distributions),
-                "failed_count": len(failed_distributions),
-                "successful_distributions": [
-                    {
-                        "company_id": d.company_id,
-                        "amount": float(d.amount),
-                        "tx_hash": d.transaction_hash
-                    } for d in successful_distributions
-                ],
-                "failed_distributions": failed_distributions,
-                "total_distributed": sum(float(d.amount) for d in successful_distributions)
-            }
+            return self._distribution_summary(successful_distributions, failed_distributions)
             
         except Exception as e:
             logger.error(f"Error in reward distribution: {e}")
@@ -177,24 +249,272 @@ class RewardService:
                 "failed_count": len(distributions)
             }
     
+    @staticmethod
+    def _distribution_summary(successful_distributions: List[RewardDistribution], failed_distributions: List[Dict[str, Any]],
+                              pending_distributions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        pending_distributions = pending_distributions or []
+        return {
+            "status": "completed" if not failed_distributions and not pending_distributions else "partial",
+            "successful_count": len(successful_distributions),
+            "failed_count": len(failed_distributions),
+            "pending_count": len(pending_distributions),
+            "successful_distributions": [
+                {
+                    "company_id": d.company_id,
+                    "amount": float(d.amount),
+                    "tx_hash": d.transaction_hash
+                } for d in successful_distributions
+            ],
+            "failed_distributions": failed_distributions,
+            # Sent but not mined yet: any of tx_hashes may still land, so they are neither paid nor failed
+            "pending_distributions": pending_distributions,
+            "total_distributed": sum(float(d.amount) for d in successful_distributions)
+        }
+    
+    @property
+    def transfer_pipeline(self) -> "TransferPipeline":
+        """Transfer engine for the reward account (nonces are assigned locally)"""
+        if self._transfer_pipeline is None:
+            from services.transfer_pipeline import TransferPipeline
+            self._transfer_pipeline = TransferPipeline(
+                self.w3,
+                self.pyusd_contract_address,
+                self.private_key,
+                token_abi=self.pyusd_abi
+            )
+        return self._transfer_pipeline
+    
+    async def _distribute_on_chain(self, distributions: List[RewardDistribution]):
+        """
+        Send all rewards through the transfer pipeline
+        Transfers are signed up front and broadcast without waiting for each receipt
+        """
+        from services.transfer_pipeline import TransferRequest
+        
+        successful_distributions = []
+        failed_distributions = []
+        pending_distributions = []
+        
+        transfers = []
+        sent_distributions = []
+        for distribution in distributions:
+            to_address = COMPANY_WALLETS.get(distribution.company_id)
+            if not to_address:
+                failed_distributions.append({
+                    "company_id": distribution.company_id,
+                    "amount": float(distribution.amount),
+                    "error": f"Wallet not found for company {distribution.company_id}"
+                })
+                continue
+            transfers.append(TransferRequest(
+                distribution.company_id,
+                to_address,
+                int(distribution.amount * (10 ** self.pyusd_decimals)),
+                idempotency_key=distribution.idempotency_key
+            ))
+            sent_distributions.append(distribution)
+        
+        results = await self.transfer_pipeline.run(transfers)
+        
+        for distribution, result in zip(sent_distributions, results):
+            if result.status == "confirmed":
+                distribution.transaction_hash = result.tx_hash
+                successful_distributions.append(distribution)
+            elif result.status == "pending":
+                pending_distributions.append({
+                    "company_id": distribution.company_id,
+                    "amount": float(distribution.amount),
+                    "status": "pending",
+                    "error": result.error,
+                    "nonce": result.nonce,
+                    "tx_hashes": list(result.tx_hashes),
+                    "missing_receipt_since": result.missing_receipt_since
+                })
+            else:
+                failed_distributions.append({
+                    "company_id": distribution.company_id,
+                    "amount": float(distribution.amount),
+                    "error": result.error or result.status,
+                    "tx_hash": result.tx_hash
+                })
+        
+        return successful_distributions, failed_distributions, pending_distributions
+    
+    async def track_pending_distributions(self, pending: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Check again transfers reported as pending by an earlier distribution
+        Each entry comes back with status confirmed (and tx_hash), reverted, failed or still pending;
+        a nonce mined with no receipt for any hash stays pending (missing_receipt_since set) until the
+        pipeline's receipt grace period has passed
+        """
+        from services.transfer_pipeline import TransferResult
+        
+        results = []
+        for entry in pending:
+            result = TransferResult(entry["company_id"], COMPANY_WALLETS.get(entry["company_id"], ""), 0, entry["nonce"])
+            result.tx_hashes = list(entry["tx_hashes"])
+            result.missing_receipt_since = entry.get("missing_receipt_since")
+            results.append(result)
+        await self.transfer_pipeline.track(results)
+        return [
+            {**entry, "status": result.status, "tx_hash": result.tx_hash, "error": result.error,
+             "missing_receipt_since": result.missing_receipt_since}
+            for entry, result in zip(pending, results)
+        ]
+    
+    async def publish_merkle_distribution(self, distributions: List[RewardDistribution], epoch: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Publish rewards as a Merkle root (claim mode)
+        Builds the (wallet, amount) tree off the event loop, publishes the root and only then
+        funds the distributor; each company claims with its proof from /rewards/merkle/{epoch}/proof/{company_id}.
+        An epoch is built and published once: running it again only retries a funding that did not
+        go through, so the served proofs always match the on-chain root and the pool is sent once.
+        """
+        try:
+            epoch = epoch or datetime.utcnow().strftime("%Y%m")
+            if not epoch.isdigit():
+                raise ValueError(f"Epoch must be numeric (YYYYMM): {epoch}")
+            logger.info(f"Publishing Merkle distribution {epoch} for {len(distributions)} companies")
+            
+            store = get_merkle_store()
+            skipped = []
+            summary = store.get_distribution(epoch)
+            if summary is not None and summary["funding_tx"]:
+                raise ValueError(f"Epoch {epoch} already published and funded (tx {summary['funding_tx']})")
+            
+            if summary is None or not summary["publish_tx"]:
+                onchain_root = await self._published_merkle_root(int(epoch))
+                if onchain_root is not None:
+                    raise ValueError(f"Epoch {epoch} already has a root on-chain ({onchain_root}); not rebuilding it")
+                
+                entries = []
+                for distribution in distributions:
+                    wallet = COMPANY_WALLETS.get(distribution.company_id)
+                    if not wallet:
+                        skipped.append({
+                            "company_id": distribution.company_id,
+                            "amount": float(distribution.amount),
+                            "error": f"Wallet not found for company {distribution.company_id}"
+                        })
+                        continue
+                    entries.append((distribution.company_id, wallet, int(distribution.amount * (10 ** self.pyusd_decimals))))
+                
+                if not entries:
+                    raise ValueError("No companies with a wallet to include in the distribution")
+                
+                summary = await asyncio.to_thread(store.build, epoch, entries)
+                summary["publish_tx"] = await self._publish_merkle_root(epoch, summary["root"], summary["total_amount"])
+            else:
+                # Root already published by an earlier run whose funding did not go through
+                onchain_root = await self._published_merkle_root(int(epoch))
+                if onchain_root is not None and onchain_root != summary["root"]:
+                    raise ValueError(f"Epoch {epoch} root on-chain ({onchain_root}) differs from the stored tree ({summary['root']})")
+                if onchain_root is None and await self._merkle_onchain():
+                    raise ValueError(f"Root publication for epoch {epoch} (tx {summary['publish_tx']}) is not mined yet; not funding")
+                logger.info(f"Epoch {epoch} already published (tx {summary['publish_tx']}), retrying funding only")
+            
+            funding_tx = await self._fund_merkle_distributor(epoch, summary["total_amount"])
+            
+            return {
+                "status": "published",
+                "mode": "merkle",
+                "epoch": epoch,
+                "merkle_root": summary["root"],
+                "claimable_count": summary["leaf_count"],
+                "total_amount": float(Decimal(summary["total_amount"]) / (10 ** self.pyusd_decimals)),
+                "publish_tx": summary["publish_tx"],
+                "funding_tx": funding_tx,
+                "skipped_distributions": skipped
+            }
+        
+        except Exception as e:
+            logger.error(f"Error publishing Merkle distribution: {e}")
+            return {
+                "status": "error",
+                "mode": "merkle",
+                "error": str(e)
+            }
+    
+    async def _merkle_onchain(self) -> bool:
+        """Whether Merkle roots and funding go to a real distributor (otherwise they are mocked)"""
+        return bool(await self.check_connection() and self.private_key and self.pyusd_contract and self.merkle_distributor_address)
+    
+    def _merkle_distributor(self):
+        from web3 import Web3
+        return self.w3.eth.contract(
+            address=Web3.to_checksum_address(self.merkle_distributor_address),
+            abi=self.merkle_distributor_abi
+        )
+    
+    async def _published_merkle_root(self, epoch: int) -> Optional[str]:
+        """Root stored in the distributor for `epoch`, or None if the epoch is free (or in mock mode)"""
+        if not await self._merkle_onchain():
+            return None
+        root = await self._merkle_distributor().functions.merkleRoots(epoch).call()
+        return None if root == bytes(32) else "0x" + bytes(root).hex()
+    
+    async def _publish_merkle_root(self, epoch: str, root: str, total_amount: int) -> str:
+        """
+        Publish the root through the transfer pipeline (same local nonces as the reward transfers)
+        The tx hash is stored as soon as it is broadcast and not failed, so a rerun never rebuilds
+        an epoch whose root may still be mined
+        """
+        from services.transfer_pipeline import ContractCall
+        
+        store = get_merkle_store()
+        if not await self._merkle_onchain():
+            mock_hash = "0x" + hashlib.sha256(f"{epoch}{root}{total_amount}".encode()).hexdigest()
+            logger.info(f"Mock Merkle root publication: {root} (epoch {epoch})")
+            store.set_publish_tx(epoch, mock_hash)
+            return mock_hash
+        
+        data = self._merkle_distributor().encode_abi("publishMerkleRoot", args=[int(epoch), bytes.fromhex(root[2:]), total_amount])
+        result = (await self.transfer_pipeline.run([
+            ContractCall("merkle_root", self.merkle_distributor_address, data, 100000)
+        ]))[0]
+        if result.status in ("failed", "reverted"):
+            raise ValueError(f"publishMerkleRoot failed: {result.error or result.status}")
+        store.set_publish_tx(epoch, result.tx_hash)
+        if result.status != "confirmed":
+            raise ValueError(f"publishMerkleRoot not confirmed yet ({result.status}, txs {', '.join(result.tx_hashes)}); the distributor is not funded until it is")
+        logger.info(f"Merkle root published: {root} (epoch {epoch}, tx {result.tx_hash})")
+        return result.tx_hash
+    
+    async def _fund_merkle_distributor(self, epoch: str, total_amount: int) -> str:
+        """
+        Send the epoch total to the distributor, only after its root is published
+        Funds sent without a root would be stuck until the owner recovers them
+        """
+        from services.transfer_pipeline import TransferRequest
+        
+        store = get_merkle_store()
+        if not await self._merkle_onchain():
+            mock_hash = "0x" + hashlib.sha256(f"fund{epoch}{total_amount}".encode()).hexdigest()
+            store.set_funding_tx(epoch, mock_hash)
+            return mock_hash
+        
+        funding = (await self.transfer_pipeline.run([
+            TransferRequest("merkle_distributor", self.merkle_distributor_address, total_amount)
+        ]))[0]
+        if funding.status in ("failed", "reverted"):
+            raise ValueError(f"Root published but distributor funding failed ({funding.error or funding.status}); run the epoch again to retry funding")
+        store.set_funding_tx(epoch, funding.tx_hash)
+        if funding.status != "confirmed":
+            raise ValueError(f"Distributor funding not confirmed yet ({funding.status}, txs {', '.join(funding.tx_hashes)}); it is not sent again")
+        logger.info(f"Merkle distributor funded for epoch {epoch} (tx {funding.tx_hash})")
+        return funding.tx_hash
+    
     async def _send_pyusd_reward(self, company_id: str, amount: Decimal) -> str:
         """
         Send PYUSD to a specific company
         """
         try:
-            company_wallets = {
-                "empresa_verde_1": "0x70997970C51812dc3A010C7d01b50e0d17dc79C8",
-                "empresa_verde_2": "0x3C44CdDdB6a900fa2b585dd299e03d12FA4293BC",
-                "empresa_verde_3": "0x90F79bf6EB2c4f870365E785982E1f101E93b906",
-                "empresa_verde_4": "0x15d34AAf54267DB7D7c367839AAf71A00a2C6A65"
-            }
-            
-            to_address = company_wallets.get(company_id)
+            to_address = COMPANY_WALLETS.get(company_id)
             if not to_address:
                 raise ValueError(f"Wallet not found for company {company_id}")
             
-            if self.check_connection() and self.private_key and self.pyusd_contract:
-                return await self._execute_blockchain_transfer(to_address, amount)
+            if await self.check_connection() and self.private_key and self.pyusd_contract:
+                return await self._execute_blockchain_transfer(company_id, to_address, amount)
             else:
                 mock_hash = f"0x{''.join([f'{ord(c):02x}' for c in f'{company_id}{amount}{datetime.now().isoformat()}'])[:64]}"
                 logger.info(f"Mock transaction: {amount} PYUSD → {to_address}")
@@ -204,7 +524,7 @@ class RewardService:
             logger.error(f"Error sending PYUSD: {e}")
             raise
     
-    async def _execute_blockchain_transfer(self, to_address: str, amount: Decimal) -> str:
+    async def _execute_blockchain_transfer(self, company_id: str, to_address: str, amount: Decimal) -> str:
         """
         Execute real blockchain transfer
         """
@@ -212,38 +532,26 @@ class RewardService:
             if not self.private_key:
                 raise ValueError("Private key not configured")
             
-            account = Account.from_key(self.private_key)
+            from services.transfer_pipeline import TransferRequest
             amount_wei = int(amount * (10 ** self.pyusd_decimals))
-            nonce = self.w3.eth.get_transaction_count(account.address)
-            
-            transaction = self.pyusd_contract.functions.transfer(
-                to_address,
-                amount_wei
-            ).build_transaction({
-                'chainId': self.w3.eth.chain_id,
-                'gas': 60000,
-                'gasPrice': self.w3.eth.gas_price,
-                'nonce': nonce,
-            })
+            result = (await self.transfer_pipeline.run([TransferRequest(company_id, to_address, amount_wei)]))[0]
+            if result.status != "confirmed":
+                raise ValueError(result.error or f"Transfer {result.status}")
             
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            
-            logger.info(f"Transaction confirmed: {receipt.transactionHash.hex()}")
-            return receipt.transactionHash.hex()
+            logger.info(f"Transaction confirmed: {result.tx_hash}")
+            return result.tx_hash
             
         except Exception as e:
             logger.error(f"Blockchain transaction error: {e}")
             raise
     
-    def get_pyusd_balance(self, address: str) -> Decimal:
+    async def get_pyusd_balance(self, address: str) -> Decimal:
         """
         Get PYUSD balance for an address
         """
         try:
-            if self.check_connection() and self.pyusd_contract:
-                balance_wei = self.pyusd_contract.functions.balanceOf(address).call()
+            if await self.check_connection() and self.pyusd_contract:
+                balance_wei = await get_rpc_batcher().balance_of(self.pyusd_contract_address, address)
                 balance = Decimal(balance_wei) / (10 ** self.pyusd_decimals)
                 return balance
             else:
@@ -252,25 +560,41 @@ class RewardService:
             logger.error(f"Error getting balance: {e}")
             return Decimal("0")
     
+    async def get_pyusd_balances(self, addresses: List[str]) -> Dict[str, Decimal]:
+        """
+        Get PYUSD balances for many addresses
+        Concurrent balanceOf reads are batched into shared node round trips
+        """
+        if not (await self.check_connection() and self.pyusd_contract):
+            return {address: Decimal("1000.00") for address in addresses}
+        try:
+            units = await get_rpc_batcher().balances(self.pyusd_contract_address, addresses)
+            return {address: Decimal(value) / (10 ** self.pyusd_decimals) for address, value in units.items()}
+        except Exception as e:
+            logger.error(f"Error getting balances: {e}")
+            return {address: Decimal("0") for address in addresses}
+    
     async def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Get company ranking by environmental score
+        Reads the top entries of the ranked index instead of sorting every company
         """
         try:
             logger.info(f"Generating leaderboard (top {limit})")
             
-            companies = await self._get_all_companies()
-            sorted_companies = sorted(companies, key=lambda x: x.eco_score, reverse=True)
+            await self._load_company_directory()
+            score_aggregates.sync()
             
             leaderboard = []
-            for i, company in enumerate(sorted_companies[:limit], 1):
+            for rank, company_id, eco_score in self.leaderboard.top(limit):
+                company = self._company_directory.get(company_id)
                 leaderboard.append({
-                    "rank": i,
-                    "company_id": company.id,
-                    "company_name": company.name,
-                    "eco_score": company.eco_score,
-                    "total_rewards": float(company.total_rewards_earned),
-                    "last_reward_date": company.last_reward_date
+                    "rank": rank,
+                    "company_id": company_id,
+                    "company_name": company.name if company else company_id,
+                    "eco_score": eco_score,
+                    "total_rewards": float(company.total_rewards_earned) if company else 0.0,
+                    "last_reward_date": company.last_reward_date if company else None
                 })
             
             return leaderboard
@@ -279,6 +603,18 @@ class RewardService:
             logger.error(f"Error generating leaderboard: {e}")
             return []
     
+    async def _load_company_directory(self) -> None:
+        """
+        Load company metadata once and seed the ranking with companies
+        that have no maintained EcoScore yet
+        """
+        if self._company_directory:
+            return
+        for company in await self._get_all_companies():
+            self._company_directory[company.id] = company
+            if company.id not in self.leaderboard:
+                self.leaderboard.update(company.id, company.eco_score)
+    
     async def get_company_rewards_history(self, company_id: str) -> List[Dict[str, Any]]:
         """
         Get reward history for a company
@@ -296,7 +632,7 @@ class RewardService:
         """Verificar estado del servicio de recompensas"""
         try:
             # Verificar conexión RPC y contrato PYUSD
-            if self.pyusd_contract and self.rpc_url:
+            if self.rpc_url and await self.check_connection():
                 return "healthy"
             else:
                 return "degraded"
@@ -364,4 +700,13 @@ class RewardService:
                 "transaction_hash": "0xdef789abc012...",
                 "status": "completed"
             }
-        ]
\ No newline at end of file
+        ]
+
+_reward_service: Optional[RewardService] = None
+
+def get_reward_service() -> RewardService:
+    """Reward service shared by the routes, the relayer and the health check"""
+    global _reward_service
+    if _reward_service is None:
+        _reward_service = RewardService()
+    return _reward_service
@@ -0,0 +1,223 @@
+"""
+📦 RPC Batcher - Concurrent node reads grouped into one round trip
+Calls arriving within a short window go out as one JSON-RPC batch or one Multicall3 aggregate3
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from eth_hash.auto import keccak
+
+from services.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+# Same address on every chain where Multicall3 is deployed
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+def selector(signature: str) -> bytes:
+    return keccak(signature.encode())[:4]
+
+BALANCE_OF = selector("balanceOf(address)")
+GET_SCORE = selector("getScore(address)")
+AGGREGATE3 = selector("aggregate3((address,bool,bytes)[])")
+
+# Seconds without Multicall after a transient failure (timeout, HTTP error, rate limit)
+DEFAULT_MULTICALL_COOLDOWN = 30.0
+
+class RPCError(Exception):
+    """Error returned by the node for one request of a batch"""
+
+class MulticallUnavailable(RPCError):
+    """aggregate3 cannot work on this node: no contract at the address, or the call itself reverts"""
+
+class RPCBatcher:
+    """
+    Groups concurrent reads into one request to the node
+    
+    Requests wait at most `window` seconds (or until `max_batch` are queued)
+    and are then sent together; identical requests in the same batch are
+    sent once. In `multicall` mode the `eth_call`s of a batch become a
+    single `aggregate3` call (allowFailure on each), and if that call fails
+    the batch is retried as a JSON-RPC batch. Multicall is switched off for
+    good only when the contract is missing or reverts (e.g. a local node);
+    after a transient failure it is tried again once `multicall_cooldown`
+    seconds have passed. Other methods always go in a JSON-RPC batch.
+    """
+    
+    def __init__(self, rpc_url: Optional[str] = None, window: Optional[float] = None, max_batch: Optional[int] = None,
+                 mode: Optional[str] = None, multicall_address: Optional[str] = None,
+                 multicall_cooldown: Optional[float] = None):
+        self.rpc_url = rpc_url or os.getenv("RPC_URL", "https://sepolia.infura.io/v3/YOUR_KEY")
+        self.window = window if window is not None else float(os.getenv("RPC_BATCH_WINDOW", "0.005"))
+        self.max_batch = max_batch or int(os.getenv("RPC_BATCH_MAX", "100"))
+        self.mode = (mode or os.getenv("RPC_BATCH_MODE", "jsonrpc")).lower()
+        if self.mode not in ("jsonrpc", "multicall"):
+            raise ValueError(f"Unknown RPC_BATCH_MODE: {self.mode}")
+        self.multicall_address = multicall_address or os.getenv("MULTICALL3_ADDRESS", MULTICALL3_ADDRESS)
+        self._queue: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.multicall_cooldown = (multicall_cooldown if multicall_cooldown is not None
+                                   else float(os.getenv("MULTICALL_COOLDOWN", DEFAULT_MULTICALL_COOLDOWN)))
+        self._multicall_failed = False
+        self._multicall_retry_at = 0.0
+        self.requests = 0
+        self.round_trips = 0
+        self.batches = 0
+    
+    async def request(self, method: str, params: list) -> Any:
+        """Result of one JSON-RPC call, sent together with the calls around it"""
+        key = (method, json.dumps(params, sort_keys=True))
+        self.requests += 1
+        future = self._queue.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._queue[key] = loop.create_future()
+            if len(self._queue) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+    
+    async def call(self, to: str, data: bytes, block: str = "latest") -> bytes:
+        """`eth_call` returning the raw return data"""
+        result = await self.request("eth_call", [{"to": to, "data": "0x" + data.hex()}, block])
+        return bytes.fromhex(result[2:])
+    
+    async def balance_of(self, token: str, owner: str) -> int:
+        from eth_abi import encode
+        return _uint(await self.call(token, BALANCE_OF + encode(["address"], [owner])))
+    
+    async def balances(self, token: str, owners: List[str]) -> Dict[str, int]:
+        """ERC-20 balances of many owners in as few round trips as the batch size allows"""
+        values = await asyncio.gather(*(self.balance_of(token, owner) for owner in owners))
+        return dict(zip(owners, values))
+    
+    async def scores(self, score_contract: str, users: List[str]) -> Dict[str, int]:
+        """`GreenLedgerScore.getScore` of many users"""
+        from eth_abi import encode
+        values = await asyncio.gather(
+            *(self.call(score_contract, GET_SCORE + encode(["address"], [user])) for user in users)
+        )
+        return {user: _uint(value) for user, value in zip(users, values)}
+    
+    async def eth_balances(self, owners: List[str]) -> Dict[str, int]:
+        values = await asyncio.gather(*(self.request("eth_getBalance", [owner, "latest"]) for owner in owners))
+        return {owner: int(value, 16) for owner, value in zip(owners, values)}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "jsonrpc" if not self._multicall_enabled() else self.mode,
+            "requests": self.requests,
+            "batches": self.batches,
+            "round_trips": self.round_trips,
+            "queued": len(self._queue)
+        }
+    
+    def _multicall_enabled(self) -> bool:
+        return self.mode == "multicall" and not self._multicall_failed and time.monotonic() >= self._multicall_retry_at
+    
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, {}
+        if batch:
+            self.batches += 1
+            asyncio.ensure_future(self._send(batch))
+    
+    async def _send(self, batch: Dict[Tuple[str, str], asyncio.Future]) -> None:
+        items = [(method, json.loads(params), future) for (method, params), future in batch.items()]
+        try:
+            calls = [item for item in items if item[0] == "eth_call" and item[1][1] == "latest"]
+            if self._multicall_enabled() and len(calls) > 1:
+                try:
+                    await self._send_multicall(calls)
+                    items = [item for item in items if not item[2].done()]
+                except MulticallUnavailable as e:
+                    # Multicall3 missing or reverting: this and later batches go as JSON-RPC
+                    self._multicall_failed = True
+                    logger.warning(f"⚠️ Multicall3 unavailable at {self.multicall_address}, using JSON-RPC batches: {e}")
+                except Exception as e:
+                    # Transient: this batch goes as JSON-RPC, Multicall is tried again after the cooldown
+                    self._multicall_retry_at = time.monotonic() + self.multicall_cooldown
+                    logger.warning(f"⚠️ Multicall3 call failed, JSON-RPC batches for {self.multicall_cooldown:.0f}s: {e}")
+            if items:
+                await self._send_jsonrpc(items)
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+    
+    async def _post(self, payload: Any) -> Any:
+        self.round_trips += 1
+        response = await http_clients.get("rpc").post(self.rpc_url, json=payload)
+        response.raise_for_status()
+        return response.json()
+    
+    async def _send_jsonrpc(self, items: List[Tuple[str, list, asyncio.Future]]) -> None:
+        replies = await self._post([
+            {"jsonrpc": "2.0", "id": position, "method": method, "params": params}
+            for position, (method, params, _) in enumerate(items)
+        ])
+        if isinstance(replies, dict):
+            # Some nodes answer a rejected batch with a single error object
+            raise RPCError(replies.get("error", replies))
+        by_id = {reply.get("id"): reply for reply in replies}
+        for position, (_, _, future) in enumerate(items):
+            reply = by_id.get(position)
+            if reply is None:
+                future.set_exception(RPCError("missing reply in batch"))
+            elif "error" in reply:
+                future.set_exception(RPCError(reply["error"]))
+            else:
+                future.set_result(reply["result"])
+    
+    async def _send_multicall(self, calls: List[Tuple[str, list, asyncio.Future]]) -> None:
+        from eth_abi import decode, encode
+        data = AGGREGATE3 + encode(
+            ["(address,bool,bytes)[]"],
+            [[(params[0]["to"], True, bytes.fromhex(params[0]["data"][2:])) for _, params, _ in calls]]
+        )
+        reply = await self._post({
+            "jsonrpc": "2.0", "id": 0, "method": "eth_call",
+            "params": [{"to": self.multicall_address, "data": "0x" + data.hex()}, "latest"]
+        })
+        if "error" in reply:
+            error = reply["error"]
+            message = str(error.get("message", "")) if isinstance(error, dict) else str(error)
+            if (isinstance(error, dict) and error.get("code") == 3) or "revert" in message.lower():
+                raise MulticallUnavailable(error)
+            raise RPCError(error)
+        if reply.get("result") in (None, "0x"):
+            # eth_call to an address without code returns empty data
+            raise MulticallUnavailable(f"no contract at {self.multicall_address}")
+        try:
+            (results,) = decode(["(bool,bytes)[]"], bytes.fromhex(reply["result"][2:]))
+        except Exception as e:
+            raise MulticallUnavailable(f"unexpected aggregate3 return data: {e}")
+        if len(results) != len(calls):
+            raise RPCError(f"aggregate3 returned {len(results)} results for {len(calls)} calls")
+        for (success, return_data), (_, _, future) in zip(results, calls):
+            if success:
+                future.set_result("0x" + return_data.hex())
+            else:
+                future.set_exception(RPCError(f"call reverted: 0x{return_data.hex()}"))
+
+def _uint(data: bytes) -> int:
+    if len(data) < 32:
+        raise RPCError(f"unexpected return data: 0x{data.hex()}")
+    return int.from_bytes(data[:32], "big")
+
+_batcher: Optional[RPCBatcher] = None
+
+def get_rpc_batcher() -> RPCBatcher:
+    """Batcher shared by the reward, wallet and score reads"""
+    global _batcher
+    if _batcher is None:
+        _batcher = RPCBatcher()
+    return _batcher
@@ -0,0 +1,352 @@
+"""
+📈 Score Aggregates - Mantenimiento incremental de EcoScores
+Agregados ponderados por empresa y tipo de métrica actualizados en O(1) por Data Coin
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from services.score_engine import METRIC_WEIGHTS, normalize_metric_value
+from services.leaderboard_index import LeaderboardIndex, leaderboard_index
+from services.state_store import get_state_store, worker_id
+
+logger = logging.getLogger(__name__)
+
+# Los agregados se guardan en punto fijo para que altas y bajas se cancelen
+# exactamente, sin deriva de coma flotante tras millones de actualizaciones
+FIXED_POINT_SCALE = 10 ** 9
+
+# Entradas del diario entre instantáneas de los agregados
+DEFAULT_SNAPSHOT_EVERY = 5000
+SNAPSHOT_NAMESPACE = "journal_snapshots"
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class MetricAggregate:
+    """Suma ponderada, peso y número de Data Coins de un tipo de métrica"""
+    __slots__ = ("weighted_sum", "weight", "count")
+    
+    def __init__(self):
+        self.weighted_sum = 0
+        self.weight = 0
+        self.count = 0
+
+class CompanyAggregate:
+    """Agregados de una empresa y su EcoScore mantenido"""
+    __slots__ = ("metrics", "weighted_sum", "weight", "count", "score", "previous_score", "last_updated")
+    
+    def __init__(self):
+        self.metrics: Dict[str, MetricAggregate] = {}
+        self.weighted_sum = 0
+        self.weight = 0
+        self.count = 0
+        self.score: Optional[float] = None
+        self.previous_score: Optional[float] = None
+        self.last_updated: Optional[str] = None
+
+class ScoreAggregateStore:
+    """
+    EcoScores mantenidos de forma incremental
+    
+    Cada Data Coin aporta (valor normalizado × peso, peso) al agregado de su
+    empresa y tipo de métrica. Añadir, eliminar o corregir un Data Coin cuesta
+    O(1) y el score resultante equivale a recalcular la media ponderada sobre
+    todo el historial (`_calculate_eco_score`), con precisión de 1e-9.
+    
+    Con `journal` y un almacén de estado compartido (STATE_BACKEND=sqlite),
+    las altas, bajas y correcciones se anotan en ese diario y se aplican al
+    leerlas de vuelta: todos los workers aplican las mismas operaciones en el
+    mismo orden y mantienen agregados y ranking idénticos. Cada petición o
+    bloque de ingesta anota sus Data Coins en una sola transacción, en un
+    hilo aparte. `sync` pone al día este proceso antes de leer el ranking.
+    
+    Cada `snapshot_every` entradas un worker guarda una instantánea de los
+    agregados y trunca el diario hasta ella; un worker que arranca (o que se
+    ha quedado atrás) carga la instantánea y solo aplica lo posterior, así
+    que el coste de ponerse al día no crece con el historial.
+    """
+    
+    def __init__(self, weights: Optional[Dict[str, float]] = None, leaderboard: Optional[LeaderboardIndex] = None,
+                 journal: Optional[str] = None, snapshot_every: Optional[int] = None):
+        self.weights = dict(weights or METRIC_WEIGHTS)
+        self.leaderboard = leaderboard
+        self._fixed_weights = {
+            metric_type: round(weight * FIXED_POINT_SCALE)
+            for metric_type, weight in self.weights.items()
+        }
+        self.companies: Dict[str, CompanyAggregate] = {}
+        # datacoin_id -> (company_id, metric_type, suma ponderada, peso)
+        self._contributions: Dict[str, Tuple[str, str, int, int]] = {}
+        self.journal = journal
+        self.snapshot_every = snapshot_every or int(os.getenv("SCORE_SNAPSHOT_EVERY", DEFAULT_SNAPSHOT_EVERY))
+        self._state = None
+        self._cursor = 0
+        self._snapshot_seq = 0
+    
+    @property
+    def journaled(self) -> bool:
+        """Las operaciones pasan por el diario (solo si el almacén se comparte entre procesos)"""
+        if self.journal is None:
+            return False
+        if self._state is None:
+            self._state = get_state_store()
+        return self._state.shared
+    
+    def sync(self) -> int:
+        """Aplica las operaciones del diario posteriores a la última aplicada; devuelve cuántas"""
+        if not self.journaled:
+            return 0
+        return self._catch_up(*self._fetch(self._cursor))
+    
+    async def refresh(self) -> int:
+        """Como `sync`, con las lecturas de SQLite en un hilo aparte"""
+        if not self.journaled:
+            return 0
+        return self._catch_up(*await asyncio.to_thread(self._fetch, self._cursor))
+    
+    def _fetch(self, cursor: int) -> Tuple[int, Optional[Dict[str, Any]], List[Tuple[int, Any]]]:
+        """Marca de la última instantánea, la instantánea si es posterior a `cursor` y las entradas nuevas"""
+        marker = self._state.get(SNAPSHOT_NAMESPACE, f"{self.journal}:seq") or 0
+        snapshot = None
+        if marker > cursor:
+            snapshot = self._state.get(SNAPSHOT_NAMESPACE, self.journal)
+            cursor = max(cursor, snapshot["seq"])
+        return marker, snapshot, self._state.read(self.journal, cursor)
+    
+    def _catch_up(self, marker: int, snapshot: Optional[Dict[str, Any]], entries: List[Tuple[int, Any]]) -> int:
+        # Dos lecturas concurrentes pueden traer las mismas entradas: se aplican por `seq`, una vez
+        self._snapshot_seq = max(self._snapshot_seq, marker)
+        if snapshot is not None and snapshot["seq"] > self._cursor:
+            self._restore(snapshot["state"])
+            self._cursor = snapshot["seq"]
+        applied = 0
+        for seq, entry in entries:
+            if seq > self._cursor:
+                self._replay(entry)
+                self._cursor = seq
+                applied += 1
+        return applied
+    
+    async def _maybe_snapshot(self) -> None:
+        """Guarda una instantánea y trunca el diario si han pasado `snapshot_every` entradas"""
+        if self._cursor - self._snapshot_seq < self.snapshot_every:
+            return
+        lease, owner = f"{self.journal}:snapshot", worker_id()
+        if not await asyncio.to_thread(self._state.acquire, lease, owner, 60.0):
+            return
+        try:
+            seq, state = self._cursor, self._export()
+            await asyncio.to_thread(self._write_snapshot, seq, state)
+            self._snapshot_seq = seq
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar la instantánea de {self.journal}: {e}")
+        finally:
+            await asyncio.to_thread(self._state.release, lease, owner)
+    
+    def _write_snapshot(self, seq: int, state: Dict[str, Any]) -> None:
+        if (self._state.get(SNAPSHOT_NAMESPACE, f"{self.journal}:seq") or 0) >= seq:
+            return
+        # Instantánea, después la marca y por último el truncado: quien vea la marca encuentra la instantánea
+        self._state.put(SNAPSHOT_NAMESPACE, self.journal, {"seq": seq, "state": state})
+        self._state.put(SNAPSHOT_NAMESPACE, f"{self.journal}:seq", seq)
+        removed = self._state.truncate(self.journal, seq)
+        logger.info(f"🗜️ Instantánea de {self.journal} en seq {seq}; {removed} entradas del diario eliminadas")
+    
+    def _export(self) -> Dict[str, Any]:
+        return {
+            "companies": {
+                company_id: [
+                    company.score, company.previous_score, company.last_updated,
+                    {metric_type: [metric.weighted_sum, metric.weight, metric.count] for metric_type, metric in company.metrics.items()}
+                ]
+                for company_id, company in self.companies.items()
+            },
+            "contributions": {datacoin_id: list(contribution) for datacoin_id, contribution in self._contributions.items()}
+        }
+    
+    def _restore(self, state: Dict[str, Any]) -> None:
+        previous = self.companies
+        self.companies = {}
+        for company_id, (score, previous_score, last_updated, metrics) in state["companies"].items():
+            company = self.companies[company_id] = CompanyAggregate()
+            for metric_type, (weighted_sum, weight, count) in metrics.items():
+                metric = company.metrics[metric_type] = MetricAggregate()
+                metric.weighted_sum, metric.weight, metric.count = weighted_sum, weight, count
+                company.weighted_sum += weighted_sum
+                company.weight += weight
+                company.count += count
+            company.score, company.previous_score, company.last_updated = score, previous_score, last_updated
+        self._contributions = {datacoin_id: tuple(contribution) for datacoin_id, contribution in state["contributions"].items()}
+        if self.leaderboard is not None:
+            for company_id in previous.keys() - self.companies.keys():
+                self.leaderboard.remove(company_id)
+            for company_id, company in self.companies.items():
+                self.leaderboard.update(company_id, company.score)
+    
+    def _replay(self, entry: Dict[str, Any]) -> None:
+        op, at = entry["op"], entry["at"]
+        if op == "add":
+            self._add(entry["company_id"], entry["metric_type"], entry["value"], entry["datacoin_id"], at)
+        elif op == "remove":
+            self._remove(entry["datacoin_id"], at)
+        elif op == "correct":
+            self._correct(entry["datacoin_id"], entry["value"], at)
+    
+    async def _record(self, entries: List[Dict[str, Any]]) -> None:
+        """Una transacción por lote, en un hilo; después aplica lo nuevo del diario"""
+        at = _now()
+        for entry in entries:
+            entry["at"] = at
+        await asyncio.to_thread(self._state.append_many, self.journal, entries)
+        await self.refresh()
+        await self._maybe_snapshot()
+    
+    def _current_score(self, company_id: str) -> float:
+        company = self.companies.get(company_id)
+        return company.score if company is not None else 0.0
+    
+    def _contribution(self, metric_type: str, value: float) -> Tuple[int, int]:
+        fixed_weight = self._fixed_weights.get(metric_type, 0)
+        if not fixed_weight:
+            return 0, 0
+        return round(normalize_metric_value(value) * fixed_weight), fixed_weight
+    
+    def _apply(self, company_id: str, metric_type: str, weighted_sum: int, weight: int, sign: int, at: str) -> float:
+        company = self.companies.get(company_id)
+        if company is None:
+            company = self.companies[company_id] = CompanyAggregate()
+        metric = company.metrics.get(metric_type)
+        if metric is None:
+            metric = company.metrics[metric_type] = MetricAggregate()
+        
+        metric.weighted_sum += sign * weighted_sum
+        metric.weight += sign * weight
+        metric.count += sign
+        company.weighted_sum += sign * weighted_sum
+        company.weight += sign * weight
+        company.count += sign
+        
+        if metric.count == 0:
+            del company.metrics[metric_type]
+        if company.count == 0:
+            del self.companies[company_id]
+            if self.leaderboard is not None:
+                self.leaderboard.remove(company_id)
+            return 0.0
+        
+        new_score = round(company.weighted_sum / company.weight, 1) if company.weight > 0 else 0.0
+        if new_score != company.score:
+            company.previous_score = company.score
+            company.score = new_score
+            if self.leaderboard is not None:
+                self.leaderboard.update(company_id, new_score)
+        company.last_updated = at
+        return company.score
+    
+    async def add(self, company_id: str, metric_type: str, value: float, datacoin_id: Optional[str] = None) -> float:
+        """
+        Incorpora un Data Coin y devuelve el EcoScore actualizado de la empresa
+        
+        Con `datacoin_id` (p. ej. el hash de Lighthouse) la operación es
+        idempotente y el Data Coin puede eliminarse o corregirse después.
+        """
+        return (await self.add_many([(company_id, metric_type, value, datacoin_id)]))[0]
+    
+    async def add_many(self, datacoins: Iterable[Tuple[str, str, float, Optional[str]]]) -> List[float]:
+        """Incorpora un lote de (company_id, metric_type, value, datacoin_id); devuelve el score de cada uno"""
+        datacoins = list(datacoins)
+        if not self.journaled:
+            at = _now()
+            return [self._add(company_id, metric_type, value, datacoin_id, at) for company_id, metric_type, value, datacoin_id in datacoins]
+        if datacoins:
+            await self._record([
+                {"op": "add", "company_id": company_id, "metric_type": metric_type, "value": value, "datacoin_id": datacoin_id}
+                for company_id, metric_type, value, datacoin_id in datacoins
+            ])
+        # Si otro worker ya lo registró, cuenta el de la primera alta
+        return [
+            self._current_score(self._contributions[datacoin_id][0] if datacoin_id in self._contributions else company_id)
+            for company_id, _, _, datacoin_id in datacoins
+        ]
+    
+    async def remove(self, datacoin_id: str) -> Optional[float]:
+        """Retira un Data Coin registrado; devuelve el nuevo score o None si no existe"""
+        if not self.journaled:
+            return self._remove(datacoin_id, _now())
+        await self.refresh()
+        company_id = self._owner(datacoin_id)
+        if company_id is None:
+            return None
+        await self._record([{"op": "remove", "datacoin_id": datacoin_id}])
+        return self._current_score(company_id)
+    
+    async def correct(self, datacoin_id: str, value: float) -> Optional[float]:
+        """Sustituye el valor de un Data Coin registrado; devuelve el nuevo score o None"""
+        if not self.journaled:
+            return self._correct(datacoin_id, value, _now())
+        await self.refresh()
+        company_id = self._owner(datacoin_id)
+        if company_id is None:
+            return None
+        await self._record([{"op": "correct", "datacoin_id": datacoin_id, "value": value}])
+        return self._current_score(company_id)
+    
+    def _add(self, company_id: str, metric_type: str, value: float, datacoin_id: Optional[str], at: str) -> float:
+        if datacoin_id is not None and datacoin_id in self._contributions:
+            return self.companies[self._contributions[datacoin_id][0]].score
+        
+        weighted_sum, weight = self._contribution(metric_type, value)
+        if datacoin_id is not None:
+            self._contributions[datacoin_id] = (company_id, metric_type, weighted_sum, weight)
+        return self._apply(company_id, metric_type, weighted_sum, weight, 1, at)
+    
+    def _remove(self, datacoin_id: str, at: str) -> Optional[float]:
+        contribution = self._contributions.pop(datacoin_id, None)
+        if contribution is None:
+            return None
+        company_id, metric_type, weighted_sum, weight = contribution
+        return self._apply(company_id, metric_type, weighted_sum, weight, -1, at)
+    
+    def _correct(self, datacoin_id: str, value: float, at: str) -> Optional[float]:
+        contribution = self._contributions.get(datacoin_id)
+        if contribution is None:
+            return None
+        company_id, metric_type, _, _ = contribution
+        self._remove(datacoin_id, at)
+        return self._add(company_id, metric_type, value, datacoin_id, at)
+    
+    def owner(self, datacoin_id: str) -> Optional[str]:
+        """Empresa a la que pertenece un Data Coin registrado"""
+        self.sync()
+        return self._owner(datacoin_id)
+    
+    def _owner(self, datacoin_id: str) -> Optional[str]:
+        contribution = self._contributions.get(datacoin_id)
+        return contribution[0] if contribution else None
+    
+    def get_score(self, company_id: str) -> Optional[Dict[str, Any]]:
+        """EcoScore mantenido y desglose por métrica, o None si no hay datos"""
+        self.sync()
+        company = self.companies.get(company_id)
+        if company is None or company.count == 0:
+            return None
+        
+        breakdown = {
+            metric_type: round(metric.weighted_sum / company.weight, 1) if company.weight > 0 else 0.0
+            for metric_type, metric in company.metrics.items()
+        }
+        return {
+            "current_score": company.score,
+            "previous_score": company.previous_score,
+            "datacoins_count": company.count,
+            "last_updated": company.last_updated,
+            "score_breakdown": breakdown,
+            "metric_counts": {metric_type: metric.count for metric_type, metric in company.metrics.items()}
+        }
+
+# Agregados compartidos por las rutas de ingesta y de scores (y entre workers con STATE_BACKEND=sqlite)
+score_aggregates = ScoreAggregateStore(leaderboard=leaderboard_index, journal="score_aggregates")
@@ -0,0 +1,92 @@
+"""
+🧮 Score Engine - Cálculo vectorizado de EcoScores
+Puntuaciones ponderadas de todas las empresas en una sola pasada con NumPy
+"""
+
+import logging
+from typing import Dict, Any, List, Sequence, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pesos por tipo de métrica
+METRIC_WEIGHTS: Dict[str, float] = {
+    "carbon_emissions": 0.30,
+    "energy_consumption": 0.25,
+    "water_usage": 0.15,
+    "waste_generation": 0.20,
+    "renewable_energy_percentage": 0.10
+}
+
+def normalize_metric_value(value: float) -> float:
+    """Normaliza el valor de una métrica a escala 0-100 (lógica simplificada)"""
+    return min(100, max(0, 100 - (value / 100)))
+
+class EcoScoreEngine:
+    """
+    Motor de EcoScores por lotes
+    
+    Recibe un lote columnar (empresa, tipo de métrica, valor) con los Data
+    Coins de todas las empresas y calcula la media ponderada normalizada de
+    cada una con operaciones vectorizadas. Los resultados coinciden con el
+    cálculo por empresa de `/scores/calculate/{company_id}`: las sumas se
+    acumulan en el mismo orden y el redondeo final usa `round` de Python.
+    """
+    
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = dict(weights or METRIC_WEIGHTS)
+    
+    def score_columns(self, company_ids: Sequence[str], metric_types: Sequence[str], values: Sequence[float]) -> Dict[str, float]:
+        """
+        Calcula el EcoScore de cada empresa presente en el lote
+        
+        Las tres columnas deben tener la misma longitud. Las métricas sin peso
+        no cuentan; una empresa sin métricas ponderadas obtiene 0.0.
+        """
+        count = len(company_ids)
+        if len(metric_types) != count or len(values) != count:
+            raise ValueError("Las columnas company_ids, metric_types y values deben tener la misma longitud")
+        if count == 0:
+            return {}
+        
+        # Factorizar empresas en códigos enteros conservando el orden de aparición
+        index: Dict[str, int] = dict.fromkeys(company_ids)
+        for code, company_id in enumerate(index):
+            index[company_id] = code
+        codes = np.fromiter(map(index.__getitem__, company_ids), dtype=np.intp, count=count)
+        
+        # Peso de cada Data Coin (0 para métricas sin peso)
+        lookup = {metric_type: self.weights.get(metric_type, 0.0) for metric_type in dict.fromkeys(metric_types)}
+        weights = np.fromiter(map(lookup.__getitem__, metric_types), dtype=np.float64, count=count)
+        values = np.asarray(values, dtype=np.float64)
+        
+        normalized = np.clip(100 - (values / 100), 0, 100)
+        total_score = np.bincount(codes, weights=normalized * weights, minlength=len(index))
+        total_weight = np.bincount(codes, weights=weights, minlength=len(index))
+        
+        scores = np.divide(total_score, total_weight, out=np.zeros_like(total_score), where=total_weight > 0)
+        return {
+            company_id: round(float(score), 1)
+            for company_id, score in zip(index, scores.tolist())
+        }
+    
+    def score_datacoins(self, datacoins: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+        """Variante por filas: convierte Data Coins (dicts) a columnas y puntúa"""
+        company_ids: List[str] = []
+        metric_types: List[str] = []
+        values: List[float] = []
+        for datacoin in datacoins:
+            company_ids.append(datacoin["company_id"])
+            metric_types.append(datacoin.get("metric_type"))
+            values.append(datacoin.get("value", 0))
+        return self.score_columns(company_ids, metric_types, values)
+
+_score_engine: Optional[EcoScoreEngine] = None
+
+def get_score_engine() -> EcoScoreEngine:
+    """Motor con los pesos por defecto, compartido por las rutas y el relayer"""
+    global _score_engine
+    if _score_engine is None:
+        _score_engine = EcoScoreEngine()
+    return _score_engine
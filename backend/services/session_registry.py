@@ -0,0 +1,254 @@
+"""
+🔐 Session Registry - Connected wallets, their sessions and a company -> wallet index
+
+Every lookup is a dictionary (or primary-key) hit instead of a scan, and
+sessions are evicted once their `expires_at` passes so memory stays bounded.
+Two backends share the same interface:
+
+- `MemorySessionRegistry` (default): per-process dictionaries plus a
+  min-heap of expiry times, swept on every write and lookup
+- `SQLiteSessionRegistry`: a local SQLite file, so several uvicorn workers
+  on one host see the same sessions (WALLET_SESSION_BACKEND=sqlite)
+"""
+
+import os
+import time
+import heapq
+import sqlite3
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from services.data_dir import data_path
+
+logger = logging.getLogger(__name__)
+
+class _Session:
+    __slots__ = ("session_id", "address", "company_id", "connected_at", "expires_at")
+    
+    def __init__(self, session_id: str, address: str, company_id: str, connected_at: int, expires_at: float):
+        self.session_id = session_id
+        self.address = address
+        self.company_id = company_id
+        self.connected_at = connected_at
+        self.expires_at = expires_at
+    
+    def wallet(self) -> Dict:
+        return {
+            "company_id": self.company_id,
+            "connected_at": self.connected_at,
+            "session_id": self.session_id,
+            "verified": True
+        }
+    
+    def session(self) -> Dict:
+        return {
+            "address": self.address,
+            "company_id": self.company_id,
+            "expires_at": self.expires_at
+        }
+
+class MemorySessionRegistry:
+    """
+    In-process registry
+    
+    A wallet has one live session; reconnecting replaces it. Each company
+    keeps its wallets in connection order and `company_wallet` returns the
+    oldest one still connected. Expired sessions are popped off the heap;
+    heap entries left behind by replaced or disconnected sessions are
+    skipped, and the heap is rebuilt when they outnumber the live ones.
+    """
+    
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl or int(os.getenv("WALLET_SESSION_TTL", "86400"))
+        self._wallets: Dict[str, _Session] = {}
+        self._sessions: Dict[str, _Session] = {}
+        self._by_company: Dict[str, Dict[str, None]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self.expired = 0
+    
+    def connect(self, address: str, company_id: str, session_id: str, connected_at: int) -> Dict:
+        self.expire()
+        self._drop(address)
+        entry = _Session(session_id, address, company_id, connected_at, connected_at + self.ttl)
+        self._wallets[address] = entry
+        self._sessions[session_id] = entry
+        self._by_company.setdefault(company_id, {})[address] = None
+        heapq.heappush(self._expiry, (entry.expires_at, session_id))
+        if len(self._expiry) > 2 * len(self._sessions) + 1024:
+            self._expiry = [(live.expires_at, live.session_id) for live in self._sessions.values()]
+            heapq.heapify(self._expiry)
+        return entry.session()
+    
+    def disconnect(self, address: str) -> bool:
+        self.expire()
+        return self._drop(address)
+    
+    def company_wallet(self, company_id: str) -> Optional[str]:
+        self.expire()
+        addresses = self._by_company.get(company_id)
+        return next(iter(addresses)) if addresses else None
+    
+    def wallet(self, address: str) -> Optional[Dict]:
+        self.expire()
+        entry = self._wallets.get(address)
+        return entry.wallet() if entry else None
+    
+    def session(self, session_id: str) -> Optional[Dict]:
+        self.expire()
+        entry = self._sessions.get(session_id)
+        return entry.session() if entry else None
+    
+    def expire(self, now: Optional[float] = None) -> int:
+        """Evict every session whose `expires_at` has passed"""
+        now = time.time() if now is None else now
+        evicted = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, session_id = heapq.heappop(self._expiry)
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry.expires_at == expires_at:
+                self._drop(entry.address)
+                evicted += 1
+        self.expired += evicted
+        return evicted
+    
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "wallets": len(self._wallets),
+            "sessions": len(self._sessions),
+            "companies": len(self._by_company),
+            "expiry_heap": len(self._expiry),
+            "expired": self.expired
+        }
+    
+    def _drop(self, address: str) -> bool:
+        entry = self._wallets.pop(address, None)
+        if entry is None:
+            return False
+        self._sessions.pop(entry.session_id, None)
+        addresses = self._by_company.get(entry.company_id)
+        if addresses is not None:
+            addresses.pop(address, None)
+            if not addresses:
+                del self._by_company[entry.company_id]
+        return True
+
+class SQLiteSessionRegistry:
+    """
+    Registry shared through a local SQLite file
+    
+    Every worker opens its own connection. Lookups go through the primary
+    key or the (company_id, connected_at) index and ignore expired rows;
+    expired rows are deleted at most once per `sweep_interval` seconds.
+    """
+    
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None, sweep_interval: float = 60.0):
+        self.path = path or os.getenv("WALLET_SESSION_DB") or data_path("wallets", "sessions.sqlite")
+        self.ttl = ttl or int(os.getenv("WALLET_SESSION_TTL", "86400"))
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self.expired = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS wallet_sessions (
+                address TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL UNIQUE,
+                company_id TEXT NOT NULL,
+                connected_at INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS wallet_sessions_company ON wallet_sessions (company_id, connected_at);
+            CREATE INDEX IF NOT EXISTS wallet_sessions_expiry ON wallet_sessions (expires_at);
+        """)
+    
+    def connect(self, address: str, company_id: str, session_id: str, connected_at: int) -> Dict:
+        self._sweep()
+        expires_at = connected_at + self.ttl
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO wallet_sessions (address, session_id, company_id, connected_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (address, session_id, company_id, connected_at, expires_at)
+            )
+        return {"address": address, "company_id": company_id, "expires_at": expires_at}
+    
+    def disconnect(self, address: str) -> bool:
+        with self._db:
+            cursor = self._db.execute(
+                "DELETE FROM wallet_sessions WHERE address = ? AND expires_at > ?",
+                (address, time.time())
+            )
+        return cursor.rowcount > 0
+    
+    def company_wallet(self, company_id: str) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT address FROM wallet_sessions WHERE company_id = ? AND expires_at > ? ORDER BY connected_at LIMIT 1",
+            (company_id, time.time())
+        ).fetchone()
+        return row[0] if row else None
+    
+    def wallet(self, address: str) -> Optional[Dict]:
+        row = self._db.execute(
+            "SELECT company_id, connected_at, session_id FROM wallet_sessions WHERE address = ? AND expires_at > ?",
+            (address, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        company_id, connected_at, session_id = row
+        return {"company_id": company_id, "connected_at": connected_at, "session_id": session_id, "verified": True}
+    
+    def session(self, session_id: str) -> Optional[Dict]:
+        row = self._db.execute(
+            "SELECT address, company_id, expires_at FROM wallet_sessions WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        address, company_id, expires_at = row
+        return {"address": address, "company_id": company_id, "expires_at": expires_at}
+    
+    def expire(self, now: Optional[float] = None) -> int:
+        """Delete every session whose `expires_at` has passed"""
+        now = time.time() if now is None else now
+        with self._db:
+            cursor = self._db.execute("DELETE FROM wallet_sessions WHERE expires_at <= ?", (now,))
+        self._next_sweep = now + self.sweep_interval
+        self.expired += cursor.rowcount
+        return cursor.rowcount
+    
+    def stats(self) -> Dict:
+        sessions, companies = self._db.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT company_id) FROM wallet_sessions WHERE expires_at > ?",
+            (time.time(),)
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "wallets": sessions,
+            "sessions": sessions,
+            "companies": companies,
+            "expired": self.expired
+        }
+    
+    def _sweep(self) -> None:
+        now = time.time()
+        if now >= self._next_sweep:
+            self.expire(now)
+
+_registry = None
+
+def get_session_registry():
+    """Registry selected by WALLET_SESSION_BACKEND (memory or sqlite)"""
+    global _registry
+    if _registry is None:
+        backend = os.getenv("WALLET_SESSION_BACKEND", "memory").lower()
+        if backend == "sqlite":
+            _registry = SQLiteSessionRegistry()
+        elif backend == "memory":
+            _registry = MemorySessionRegistry()
+        else:
+            raise ValueError(f"Unknown WALLET_SESSION_BACKEND: {backend}")
+        logger.info(f"Wallet session registry: {backend}")
+    return _registry
@@ -0,0 +1,148 @@
+"""
+✍️ Signature Verifier - ECDSA recovery off the event loop
+Memoized (message, signature) -> address with recoveries batched into a process pool
+"""
+
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def recover_address(message: str, signature: str) -> Optional[str]:
+    """Signer of an EIP-191 (personal_sign) message, or None when the signature is invalid"""
+    # Imported on first use: eth_account alone takes most of a second to import
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+    try:
+        return Account.recover_message(encode_defunct(text=message), signature=signature)
+    except Exception:
+        return None
+
+def _recover_batch(pairs: List[Tuple[str, str]]) -> List[Optional[str]]:
+    # One round trip to the pool per chunk rather than per signature
+    return [recover_address(message, signature) for message, signature in pairs]
+
+class SignatureVerifier:
+    """
+    Signature verification shared by the wallet endpoints
+    
+    Recovering a signer takes milliseconds of pure CPU (native ECC
+    backend), so it runs in a process pool and never holds the event loop.
+    Requests arriving in the same loop iteration are sent to the pool in
+    chunks of `chunk_size`; identical requests already in flight share one
+    recovery, and results (invalid signatures included) are kept in an LRU
+    of `cache_size` entries.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, cache_size: Optional[int] = None, chunk_size: int = 32):
+        self.workers = workers or int(os.getenv("SIGNATURE_VERIFY_WORKERS", str(os.cpu_count() or 1)))
+        self.cache_size = cache_size or int(os.getenv("SIGNATURE_CACHE_SIZE", "10000"))
+        self.chunk_size = chunk_size
+        self._cache: "OrderedDict[Tuple[str, str], Optional[str]]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._queued: List[Tuple[str, str]] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+    
+    async def recover(self, message: str, signature: str) -> Optional[str]:
+        """Address that signed `message`, or None"""
+        key = (message, signature)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return self._cache[key]
+        future = self._pending.get(key)
+        if future is None:
+            self.misses += 1
+            future = self._submit(key)
+        return await asyncio.shield(future)
+    
+    async def verify(self, address: str, message: str, signature: str) -> bool:
+        """True when `signature` over `message` was produced by `address`"""
+        try:
+            recovered = await self.recover(message, signature)
+        except Exception as e:
+            logger.error(f"Signature verification failed: {e}")
+            return False
+        return recovered is not None and recovered.lower() == address.lower()
+    
+    async def verify_batch(self, items: List[Tuple[str, str, str]]) -> List[bool]:
+        """Verify many (address, message, signature) at once, in order"""
+        return list(await asyncio.gather(*(self.verify(address, message, signature) for address, message, signature in items)))
+    
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "cache_entries": len(self._cache),
+            "cache_size": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "in_flight": len(self._pending)
+        }
+    
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def _submit(self, key: Tuple[str, str]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = future
+        if not self._queued:
+            loop.call_soon(self._flush)
+        self._queued.append(key)
+        return future
+    
+    def _flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        queued, self._queued = self._queued, []
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        for start in range(0, len(queued), self.chunk_size):
+            chunk = queued[start:start + self.chunk_size]
+            try:
+                result = loop.run_in_executor(self._executor, _recover_batch, chunk)
+            except Exception as e:
+                # Broken pool: fail this chunk and start a new pool on the next request
+                self._executor = None
+                self._resolve(chunk, None, e)
+                continue
+            result.add_done_callback(lambda done, chunk=chunk: self._resolve(chunk, done, None))
+    
+    def _resolve(self, chunk: List[Tuple[str, str]], done: Optional[asyncio.Future], error: Optional[Exception]) -> None:
+        if done is not None and error is None:
+            error = asyncio.CancelledError() if done.cancelled() else done.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._executor = None
+        addresses = done.result() if error is None else None
+        for position, key in enumerate(chunk):
+            future = self._pending.pop(key)
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+            else:
+                self._store(key, addresses[position])
+                future.set_result(addresses[position])
+    
+    def _store(self, key: Tuple[str, str], address: Optional[str]) -> None:
+        self._cache[key] = address
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+_verifier: Optional[SignatureVerifier] = None
+
+def get_signature_verifier() -> SignatureVerifier:
+    """Verifier shared by the wallet service and Web3 utilities"""
+    global _verifier
+    if _verifier is None:
+        _verifier = SignatureVerifier()
+    return _verifier
@@ -0,0 +1,333 @@
+"""
+🗄️ State Store - Estado compartido entre workers de la API
+Valores por espacio de nombres, diarios de operaciones y concesiones de líder
+
+Todo el estado que antes vivía en diccionarios de un único proceso pasa por
+este almacén, así que varios workers uvicorn ven lo mismo. Dos backends con
+la misma interfaz:
+
+- `MemoryStateStore` (por defecto): en el proceso; correcto con un worker
+- `SQLiteStateStore`: un fichero SQLite local en modo WAL que hace de Redis
+  para los workers de una misma máquina (STATE_BACKEND=sqlite)
+
+Los valores y las entradas de los diarios se guardan como JSON. Un diario
+se puede truncar hasta una instantánea del estado que resume sus entradas
+(ver `ScoreAggregateStore`), así que no crece con el historial.
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.data_dir import data_path
+
+logger = logging.getLogger(__name__)
+
+# Duración por defecto de la concesión de líder; se renueva cada tercio
+DEFAULT_LEASE_TTL = 15.0
+
+def worker_id() -> str:
+    """Identificador de este proceso entre los workers de la máquina"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class MemoryStateStore:
+    """
+    Almacén en el proceso
+    
+    Cada worker tiene el suyo, así que solo es correcto con un worker: el
+    lanzador (`serve.py`) se niega a usarlo con más de uno.
+    """
+    
+    backend = "memory"
+    shared = False
+    
+    def __init__(self):
+        self._values: Dict[str, Dict[str, Any]] = {}
+        self._journals: Dict[str, List[Tuple[int, Any]]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._seq = 0
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        return self._values.get(namespace, {}).get(key)
+    
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        # Copia por JSON: el llamador no comparte objetos con el almacén, como con SQLite
+        self._values.setdefault(namespace, {})[key] = json.loads(json.dumps(value, default=str))
+    
+    def delete(self, namespace: str, key: str) -> bool:
+        return self._values.get(namespace, {}).pop(key, None) is not None
+    
+    def items(self, namespace: str) -> Dict[str, Any]:
+        return dict(self._values.get(namespace, {}))
+    
+    def append(self, journal: str, entry: Any) -> int:
+        return self.append_many(journal, [entry])
+    
+    def append_many(self, journal: str, entries: List[Any]) -> int:
+        entries_list = self._journals.setdefault(journal, [])
+        for entry in entries:
+            self._seq += 1
+            entries_list.append((self._seq, json.loads(json.dumps(entry, default=str))))
+        return self._seq
+    
+    def truncate(self, journal: str, upto: int) -> int:
+        entries = self._journals.get(journal, [])
+        kept = [entry for entry in entries if entry[0] > upto]
+        self._journals[journal] = kept
+        return len(entries) - len(kept)
+    
+    def read(self, journal: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, Any]]:
+        entries = [entry for entry in self._journals.get(journal, []) if entry[0] > after]
+        return entries[:limit] if limit is not None else entries
+    
+    def acquire(self, lease: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        holder = self._leases.get(lease)
+        if holder is not None and holder[0] != owner and holder[1] > now:
+            return False
+        self._leases[lease] = (owner, now + ttl)
+        return True
+    
+    def release(self, lease: str, owner: str) -> bool:
+        holder = self._leases.get(lease)
+        if holder is None or holder[0] != owner:
+            return False
+        del self._leases[lease]
+        return True
+    
+    def holder(self, lease: str) -> Optional[str]:
+        holder = self._leases.get(lease)
+        return holder[0] if holder is not None and holder[1] > time.time() else None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "namespaces": len(self._values),
+            "journal_entries": sum(len(entries) for entries in self._journals.values()),
+            "leases": {lease: self.holder(lease) for lease in self._leases}
+        }
+
+class SQLiteStateStore:
+    """
+    Almacén compartido a través de un fichero SQLite local
+    
+    Cada worker abre su conexión. SQLite serializa las escrituras, así que
+    las secuencias de un diario se confirman en orden y quien lee desde su
+    último `seq` no se salta entradas. Una concesión se toma con un único
+    upsert condicional: solo gana si está libre, caducada o ya era suya.
+    
+    Los métodos pueden llamarse desde `asyncio.to_thread`: un cerrojo evita
+    que las transacciones de dos hilos se mezclen en la misma conexión.
+    """
+    
+    backend = "sqlite"
+    shared = True
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("STATE_DB") or data_path("state", "state.sqlite")
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS state_values (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE TABLE IF NOT EXISTS state_journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                journal TEXT NOT NULL,
+                entry TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS state_journal_seq ON state_journal (journal, seq);
+            CREATE TABLE IF NOT EXISTS state_leases (
+                lease TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM state_values WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        value = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO state_values (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, time.time())
+            )
+    
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock, self._db:
+            cursor = self._db.execute("DELETE FROM state_values WHERE namespace = ? AND key = ?", (namespace, key))
+        return cursor.rowcount > 0
+    
+    def items(self, namespace: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db.execute("SELECT key, value FROM state_values WHERE namespace = ?", (namespace,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+    
+    def append(self, journal: str, entry: Any) -> int:
+        return self.append_many(journal, [entry])
+    
+    def append_many(self, journal: str, entries: List[Any]) -> int:
+        """Anota las entradas en una sola transacción; devuelve el `seq` de la última"""
+        rows = [(journal, json.dumps(entry, ensure_ascii=False, default=str)) for entry in entries]
+        with self._lock, self._db:
+            self._db.executemany("INSERT INTO state_journal (journal, entry) VALUES (?, ?)", rows)
+            return self._db.execute("SELECT MAX(seq) FROM state_journal WHERE journal = ?", (journal,)).fetchone()[0] or 0
+    
+    def read(self, journal: str, after: int = 0, limit: Optional[int] = None) -> List[Tuple[int, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, entry FROM state_journal WHERE journal = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (journal, after, -1 if limit is None else limit)
+            ).fetchall()
+        return [(seq, json.loads(entry)) for seq, entry in rows]
+    
+    def truncate(self, journal: str, upto: int) -> int:
+        """Borra las entradas hasta `upto` incluido; devuelve cuántas"""
+        with self._lock, self._db:
+            cursor = self._db.execute("DELETE FROM state_journal WHERE journal = ? AND seq <= ?", (journal, upto))
+        return cursor.rowcount
+    
+    def acquire(self, lease: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO state_leases (lease, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (lease) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE state_leases.owner = excluded.owner OR state_leases.expires_at <= ?",
+                (lease, owner, now + ttl, now)
+            )
+        return cursor.rowcount > 0
+    
+    def release(self, lease: str, owner: str) -> bool:
+        with self._lock, self._db:
+            cursor = self._db.execute("DELETE FROM state_leases WHERE lease = ? AND owner = ?", (lease, owner))
+        return cursor.rowcount > 0
+    
+    def holder(self, lease: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT owner FROM state_leases WHERE lease = ? AND expires_at > ?", (lease, time.time())
+            ).fetchone()
+        return row[0] if row else None
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = self._db.execute("SELECT COUNT(DISTINCT namespace) FROM state_values").fetchone()[0]
+            entries = self._db.execute("SELECT COUNT(*) FROM state_journal").fetchone()[0]
+            leases = self._db.execute("SELECT lease FROM state_leases").fetchall()
+        return {
+            "backend": self.backend,
+            "path": self.path,
+            "namespaces": namespaces,
+            "journal_entries": entries,
+            "leases": {lease: self.holder(lease) for (lease,) in leases}
+        }
+
+class LeaderElection:
+    """
+    Elige un único worker para el trabajo en segundo plano
+    
+    Planificador de tareas, indexador de eventos y entrega de notificaciones
+    deben ejecutarse una sola vez aunque haya N workers. Cada worker intenta
+    tomar la concesión `lease` cada `ttl / 3` segundos; quien la tiene llama
+    a `on_elected` y la renueva, y si la pierde (o se detiene) llama a
+    `on_demoted`. Si el líder muere, otro la toma cuando caduca.
+    
+    Si el almacén no responde (base de datos ocupada), el líder deja de
+    serlo antes de que su concesión pueda caducar: otro worker podría
+    tomarla y ejecutar a la vez el mismo trabajo.
+    """
+    
+    def __init__(self, store, lease: str, on_elected: Callable[[], Awaitable[None]],
+                 on_demoted: Callable[[], Awaitable[None]], ttl: Optional[float] = None, owner: Optional[str] = None):
+        self.store = store
+        self.lease = lease
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.ttl = ttl or float(os.getenv("LEADER_LEASE_TTL", DEFAULT_LEASE_TTL))
+        self.owner = owner or worker_id()
+        self.is_leader = False
+        # Momento (monotónico) del último intento de renovación que se confirmó
+        self._renewed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self) -> None:
+        """Primer intento inmediato (un solo worker arranca ya como líder) y renovación en segundo plano"""
+        await self._tick()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            self.is_leader = False
+            await self.on_demoted()
+            self.store.release(self.lease, self.owner)
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error(f"❌ Error renovando la concesión {self.lease}: {e}")
+    
+    async def _tick(self) -> None:
+        attempted_at = time.monotonic()
+        try:
+            acquired = self.store.acquire(self.lease, self.owner, self.ttl)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ No se pudo renovar la concesión {self.lease}: {e}")
+            # Base de datos ocupada: se reintenta en la próxima vuelta salvo que para
+            # entonces la concesión pueda haber caducado y otro worker tomarla
+            if self.is_leader and attempted_at + self.ttl / 3 - self._renewed_at >= self.ttl:
+                self.is_leader = False
+                logger.warning(f"⚠️ Worker {self.owner} deja de ser líder: sin renovar {self.lease} desde hace {attempted_at - self._renewed_at:.1f}s")
+                await self.on_demoted()
+            return
+        if acquired:
+            self._renewed_at = attempted_at
+        if acquired and not self.is_leader:
+            self.is_leader = True
+            logger.info(f"👑 Worker {self.owner} elegido líder ({self.lease})")
+            await self.on_elected()
+        elif not acquired and self.is_leader:
+            self.is_leader = False
+            logger.warning(f"⚠️ Worker {self.owner} pierde la concesión {self.lease}")
+            await self.on_demoted()
+
+_store = None
+
+def get_state_store():
+    """Almacén seleccionado por STATE_BACKEND (memory o sqlite)"""
+    global _store
+    if _store is None:
+        backend = os.getenv("STATE_BACKEND", "memory").lower()
+        if backend == "sqlite":
+            _store = SQLiteStateStore()
+        elif backend == "memory":
+            _store = MemoryStateStore()
+        else:
+            raise ValueError(f"STATE_BACKEND desconocido: {backend}")
+        logger.info(f"🗄️ Almacén de estado: {backend}")
+    return _store
@@ -0,0 +1,588 @@
+"""
+🚚 Transfer Pipeline - Distribución de PYUSD en pipeline
+Nonces locales, firma por adelantado, difusión en pipeline y seguimiento concurrente de recibos
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from web3 import AsyncWeb3, Web3
+from web3.exceptions import TransactionNotFound
+from eth_account import Account
+
+from services.state_store import get_state_store
+
+logger = logging.getLogger(__name__)
+
+# ABI mínimo de transferencia ERC-20
+ERC20_TRANSFER_ABI = [
+    {
+        "constant": False,
+        "inputs": [
+            {"name": "_to", "type": "address"},
+            {"name": "_value", "type": "uint256"}
+        ],
+        "name": "transfer",
+        "outputs": [{"name": "", "type": "bool"}],
+        "type": "function"
+    }
+]
+
+# Fragmentos de error de los nodos (geth, Anvil, Hardhat, Infura)
+UNDERPRICED_ERRORS = ("underpriced", "fee too low", "gas price too low", "less than block base fee")
+KNOWN_TX_ERRORS = ("already known", "known transaction", "already imported")
+NONCE_TOO_LOW_ERRORS = ("nonce too low", "nonce has already been used")
+# Nodos sin cola de nonces futuros: se reintenta cuando se mine el hueco
+NONCE_GAP_ERRORS = ("nonce too high", "invalid transaction nonce")
+
+FILLER_GAS = 21000
+
+# Resultado de cada transferencia con clave de idempotencia, por clave
+TRANSFER_STATE_NAMESPACE = "transfers"
+
+def _error_message(error: Exception) -> str:
+    """Mensaje de error del nodo en minúsculas (web3 lo entrega como dict o texto)"""
+    if error.args and isinstance(error.args[0], dict):
+        return str(error.args[0].get("message", error.args[0])).lower()
+    return str(error).lower()
+
+class TransferRequest:
+    """
+    Transferencia de PYUSD a enviar, con el importe en unidades base del token
+    
+    Con `idempotency_key` el motor la envía una sola vez: si la clave ya
+    tiene una transferencia confirmada, revertida o sin minar, devuelve ese
+    resultado en lugar de enviarla de nuevo.
+    """
+    def __init__(self, company_id: str, to_address: str, amount: int, idempotency_key: Optional[str] = None):
+        self.company_id = company_id
+        self.to_address = to_address
+        self.amount = amount
+        self.idempotency_key = idempotency_key
+
+class ContractCall:
+    """Llamada a un contrato enviada por el motor: mismos nonces locales, reemplazos y seguimiento de recibos que las transferencias"""
+    def __init__(self, label: str, to_address: str, data: str, gas: int):
+        self.company_id = label
+        self.to_address = to_address
+        self.amount = 0
+        self.data = data
+        self.gas = gas
+        self.idempotency_key = None
+
+class TransferResult:
+    """Estado de una transferencia dentro de una distribución"""
+    def __init__(self, company_id: str, to_address: str, amount: int, nonce: int):
+        self.company_id = company_id
+        self.to_address = to_address
+        self.amount = amount
+        self.nonce = nonce
+        self.status = "pending"
+        self.tx_hash: Optional[str] = None
+        self.block_number: Optional[int] = None
+        self.gas_price: Optional[int] = None
+        self.replacements = 0
+        self.error: Optional[str] = None
+        # Todos los hashes difundidos para este nonce (original y reemplazos)
+        self.tx_hashes: List[str] = []
+        # Momento (epoch) en que se vio el nonce minado sin recibo de ningún hash
+        self.missing_receipt_since: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "company_id": self.company_id,
+            "to_address": self.to_address,
+            "amount": self.amount,
+            "nonce": self.nonce,
+            "status": self.status,
+            "tx_hash": self.tx_hash,
+            "block_number": self.block_number,
+            "gas_price": self.gas_price,
+            "replacements": self.replacements,
+            "error": self.error,
+            "tx_hashes": list(self.tx_hashes),
+            "missing_receipt_since": self.missing_receipt_since
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TransferResult":
+        result = cls(data["company_id"], data["to_address"], data["amount"], data["nonce"])
+        for field in ("status", "tx_hash", "block_number", "gas_price", "replacements", "error", "missing_receipt_since"):
+            setattr(result, field, data.get(field))
+        result.tx_hashes = list(data.get("tx_hashes") or [])
+        return result
+
+def recorded_transfers(keys: List[str]) -> Dict[str, TransferResult]:
+    """Resultado guardado por el motor para cada clave de idempotencia que tenga uno"""
+    state = get_state_store()
+    recorded = {}
+    for key in keys:
+        saved = state.get(TRANSFER_STATE_NAMESPACE, key)
+        if saved is not None:
+            recorded[key] = TransferResult.from_dict(saved)
+    return recorded
+
+class NonceManager:
+    """
+    Asigna nonces consecutivos localmente
+    
+    Se sincroniza con el nodo (nonce `pending` de la cuenta) al empezar una
+    distribución y a partir de ahí reparte nonces sin consultar al nodo.
+    """
+    
+    def __init__(self, w3: AsyncWeb3, address: str):
+        self.w3 = w3
+        self.address = address
+        self._next_nonce: Optional[int] = None
+    
+    async def sync(self) -> int:
+        """Recarga el siguiente nonce desde el nodo"""
+        self._next_nonce = await self.w3.eth.get_transaction_count(self.address, "pending")
+        return self._next_nonce
+    
+    def allocate(self) -> int:
+        if self._next_nonce is None:
+            raise RuntimeError("NonceManager no sincronizado")
+        nonce = self._next_nonce
+        self._next_nonce += 1
+        return nonce
+
+class _PendingTransfer:
+    """Transacción firmada de un nonce y todos los hashes difundidos para él"""
+    __slots__ = ("result", "tx", "raw", "hashes", "sent_at", "filler", "resolved", "exhausted_at", "key")
+    
+    def __init__(self, result: TransferResult, tx: Dict[str, Any], key: Optional[str] = None):
+        self.result = result
+        self.key = key
+        self.tx = tx
+        self.raw: bytes = b""
+        self.hashes = result.tx_hashes
+        self.sent_at = 0.0
+        self.filler = False
+        self.resolved = False
+        # Sin más reemplazos: ya no ocupa la ventana, pero se sigue su recibo
+        self.exhausted_at: Optional[float] = None
+
+class TransferPipeline:
+    """
+    Motor de distribución de PYUSD
+    
+    Asigna los nonces localmente y firma todas las transferencias antes de
+    enviar nada. Después las difunde en orden de nonce sin esperar a que se
+    minen, con como mucho `window` transacciones sin confirmar a la vez, y
+    un único bucle sigue los recibos: consulta el nonce `latest` de la
+    cuenta y solo pide recibos de los nonces ya minados. Los errores de
+    precio insuficiente y las transacciones atascadas se reintentan con el
+    mismo nonce y un precio de gas mayor. Si una transferencia falla de forma
+    definitiva, su nonce se ocupa con una autotransferencia vacía para no
+    bloquear las siguientes.
+    
+    Una transacción que sigue sin minar tras los reemplazos permitidos no es
+    un fallo: cualquiera de sus hashes puede minarse aún. Deja libre su hueco
+    de la ventana y se sigue hasta `pending_timeout` segundos más; si no se
+    resuelve, queda `pending` con todos sus hashes y `track` la comprueba
+    después.
+    
+    Que el nonce figure como minado sin que ningún hash tenga recibo tampoco
+    basta para darla por fallida: un nodo retrasado o tras un balanceador
+    puede contar ya el bloque y no servir aún sus recibos. Se siguen pidiendo
+    durante `receipt_grace` segundos y solo entonces se da el nonce por
+    consumido por otra transacción.
+    
+    Recibe un `AsyncWeb3`: todas las llamadas al nodo se esperan en el event
+    loop, sin bloquearlo ni ocupar hilos.
+    """
+    
+    def __init__(self, w3: AsyncWeb3, token_address: str, private_key: str,
+                 token_abi: Optional[List[Dict[str, Any]]] = None,
+                 window: Optional[int] = None,
+                 gas_limit: int = 60000,
+                 gas_bump: Optional[float] = None,
+                 max_gas_price: Optional[int] = None,
+                 poll_interval: Optional[float] = None,
+                 stuck_timeout: Optional[float] = None,
+                 max_replacements: Optional[int] = None,
+                 pending_timeout: Optional[float] = None,
+                 receipt_grace: Optional[float] = None):
+        self.w3 = w3
+        self.token = w3.eth.contract(address=Web3.to_checksum_address(token_address), abi=token_abi or ERC20_TRANSFER_ABI)
+        self.account = Account.from_key(private_key)
+        self.nonces = NonceManager(w3, self.account.address)
+        
+        self.window = window or int(os.getenv("REWARD_TX_WINDOW", "64"))
+        self.gas_limit = gas_limit
+        # Los nodos exigen al menos +10% para reemplazar una transacción
+        self.gas_bump = gas_bump or float(os.getenv("REWARD_TX_GAS_BUMP", "1.125"))
+        max_gas_price_gwei = os.getenv("REWARD_TX_MAX_GAS_PRICE_GWEI")
+        self.max_gas_price = max_gas_price or (Web3.to_wei(float(max_gas_price_gwei), "gwei") if max_gas_price_gwei else None)
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("REWARD_TX_POLL_INTERVAL", "1.0"))
+        self.stuck_timeout = stuck_timeout if stuck_timeout is not None else float(os.getenv("REWARD_TX_STUCK_TIMEOUT", "60"))
+        self.max_replacements = max_replacements if max_replacements is not None else int(os.getenv("REWARD_TX_MAX_REPLACEMENTS", "3"))
+        self.pending_timeout = pending_timeout if pending_timeout is not None else float(os.getenv("REWARD_TX_PENDING_TIMEOUT", "120"))
+        self.receipt_grace = receipt_grace if receipt_grace is not None else float(os.getenv("REWARD_TX_RECEIPT_GRACE", "30"))
+        
+        self._chain_id: Optional[int] = None
+        # Una distribución a la vez: comparten cuenta y secuencia de nonces
+        self._lock = asyncio.Lock()
+        self.state = get_state_store()
+    
+    async def run(self, transfers: List[Union[TransferRequest, ContractCall]]) -> List[TransferResult]:
+        """
+        Envía las transferencias (o llamadas) y espera a sus recibos; devuelve un resultado por cada una
+        
+        Las que tienen una clave de idempotencia ya usada no se envían: se
+        devuelve el resultado guardado (las `pending` se comprueban de nuevo).
+        Solo una clave cuyo resultado es `failed` (el pago no salió) se reenvía.
+        """
+        if not transfers:
+            return []
+        
+        async with self._lock:
+            results: List[Optional[TransferResult]] = [None] * len(transfers)
+            fresh: List[int] = []
+            known: List[Tuple[str, TransferResult]] = []
+            first_by_key: Dict[str, int] = {}
+            for index, transfer in enumerate(transfers):
+                key = transfer.idempotency_key
+                if key is not None and key in first_by_key:
+                    continue
+                if key is not None:
+                    first_by_key[key] = index
+                    saved = self.state.get(TRANSFER_STATE_NAMESPACE, key)
+                    if saved is not None and saved["status"] != "failed":
+                        results[index] = TransferResult.from_dict(saved)
+                        known.append((key, results[index]))
+                        continue
+                fresh.append(index)
+            
+            if known:
+                logger.info(f"🔁 {len(known)} transferencias ya enviadas con la misma clave de idempotencia; no se repiten")
+                unmined = [(key, result) for key, result in known if result.status == "pending"]
+                if unmined:
+                    await self.track([result for _, result in unmined])
+                    await self._remember(unmined)
+            
+            if fresh:
+                for index, result in zip(fresh, await self._run([transfers[index] for index in fresh])):
+                    results[index] = result
+            # Repetidas dentro de la misma llamada: el resultado de la primera
+            for index, transfer in enumerate(transfers):
+                if results[index] is None:
+                    results[index] = results[first_by_key[transfer.idempotency_key]]
+            return results
+    
+    async def _remember(self, keyed: List[Tuple[str, TransferResult]]) -> None:
+        """Guarda el resultado de cada clave de idempotencia, fuera del event loop"""
+        saved = []
+        for key, result in keyed:
+            if key is None:
+                continue
+            data = result.to_dict()
+            # Sin minar aún, el último hash firmado también puede haber salido
+            if result.status == "pending" and result.tx_hash and result.tx_hash not in data["tx_hashes"]:
+                data["tx_hashes"].append(result.tx_hash)
+            saved.append((key, data))
+        if saved:
+            await asyncio.to_thread(lambda: [self.state.put(TRANSFER_STATE_NAMESPACE, key, data) for key, data in saved])
+    
+    async def _remember_replacement(self, entry: _PendingTransfer) -> None:
+        """Un reemplazo añade un hash que puede minarse: se guarda antes de difundirlo"""
+        if entry.key is not None:
+            await self._remember([(entry.key, entry.result)])
+    
+    async def _run(self, transfers: List[Union[TransferRequest, ContractCall]]) -> List[TransferResult]:
+        if self._chain_id is None:
+            self._chain_id = await self.w3.eth.chain_id
+        gas_price = await self._network_gas_price()
+        await self.nonces.sync()
+        
+        pending = [self._sign_transfer(transfer, gas_price) for transfer in transfers]
+        logger.info(f"🚚 {len(pending)} transferencias firmadas (nonces {pending[0].result.nonce}-{pending[-1].result.nonce})")
+        # Antes de difundir nada: si el proceso cae, la clave ya apunta a su nonce y hashes
+        await self._remember([(entry.key, entry.result) for entry in pending])
+        
+        window = asyncio.Semaphore(self.window)
+        in_flight: List[_PendingTransfer] = []
+        broadcast_done = asyncio.Event()
+        tracker = asyncio.create_task(self._track_receipts(in_flight, window, broadcast_done))
+        
+        try:
+            for entry in pending:
+                await window.acquire()
+                if await self._broadcast(entry):
+                    in_flight.append(entry)
+                else:
+                    window.release()
+        finally:
+            broadcast_done.set()
+            await tracker
+        
+        await self._remember([(entry.key, entry.result) for entry in pending])
+        results = [entry.result for entry in pending]
+        confirmed = sum(1 for result in results if result.status == "confirmed")
+        unmined = sum(1 for result in results if result.status == "pending")
+        logger.info(f"✅ Distribución completada: {confirmed}/{len(results)} transferencias confirmadas, {unmined} sin minar aún")
+        return results
+    
+    async def track(self, results: List[TransferResult]) -> List[TransferResult]:
+        """
+        Vuelve a comprobar las transferencias `pending` de una distribución anterior
+        
+        Busca el recibo de cada uno de sus hashes; si el nonce ya está minado
+        sin ninguno de ellos durante más de `receipt_grace` segundos, lo
+        consumió otra transacción y pasa a `failed`.
+        """
+        unmined = [result for result in results if result.status == "pending" and result.tx_hashes]
+        if not unmined:
+            return results
+        entries = []
+        for result in unmined:
+            entry = _PendingTransfer(result, {})
+            entry.hashes = list(result.tx_hashes)
+            entries.append(entry)
+        mined_nonce = await self.w3.eth.get_transaction_count(self.nonces.address, "latest")
+        receipts = await asyncio.gather(*(self._find_receipt(entry) for entry in entries))
+        for entry, receipt in zip(entries, receipts):
+            if receipt is not None or entry.result.nonce < mined_nonce:
+                self._resolve(entry, receipt)
+        return results
+    
+    def _receipt_overdue(self, entry: _PendingTransfer) -> bool:
+        """
+        Nonce minado sin recibo de ninguno de sus hashes: True cuando ya pasó `receipt_grace`
+        
+        Hasta entonces la transferencia sigue `pending` y se vuelven a pedir los recibos.
+        """
+        result = entry.result
+        if result.missing_receipt_since is None:
+            result.missing_receipt_since = time.time()
+            logger.warning(f"⚠️ Nonce {result.nonce} minado sin recibo de sus hashes, se reintenta durante {self.receipt_grace}s")
+        return time.time() - result.missing_receipt_since >= self.receipt_grace
+    
+    def _sign_transfer(self, transfer: Union[TransferRequest, ContractCall], gas_price: int) -> _PendingTransfer:
+        nonce = self.nonces.allocate()
+        result = TransferResult(transfer.company_id, transfer.to_address, transfer.amount, nonce)
+        if isinstance(transfer, ContractCall):
+            to, data, gas = Web3.to_checksum_address(transfer.to_address), transfer.data, transfer.gas
+        else:
+            to = self.token.address
+            data = self.token.encode_abi("transfer", args=[Web3.to_checksum_address(transfer.to_address), transfer.amount])
+            gas = self.gas_limit
+        tx = {
+            "to": to,
+            "value": 0,
+            "data": data,
+            "gas": gas,
+            "gasPrice": gas_price,
+            "nonce": nonce,
+            "chainId": self._chain_id
+        }
+        entry = _PendingTransfer(result, tx, transfer.idempotency_key)
+        self._sign(entry)
+        return entry
+    
+    def _sign(self, entry: _PendingTransfer) -> None:
+        signed = self.account.sign_transaction(entry.tx)
+        entry.raw = signed.raw_transaction
+        entry.result.tx_hash = Web3.to_hex(signed.hash)
+        entry.result.gas_price = entry.tx["gasPrice"]
+    
+    async def _network_gas_price(self) -> int:
+        return await self.w3.eth.gas_price
+    
+    async def _bumped_gas_price(self, current: int) -> Optional[int]:
+        """Nuevo precio para reemplazar una transacción, o None si supera el máximo"""
+        gas_price = max(int(current * self.gas_bump) + 1, await self._network_gas_price())
+        if self.max_gas_price is not None and gas_price > self.max_gas_price:
+            return None
+        return gas_price
+    
+    async def _send(self, entry: _PendingTransfer) -> None:
+        await self.w3.eth.send_raw_transaction(entry.raw)
+    
+    async def _broadcast(self, entry: _PendingTransfer) -> bool:
+        """Difunde una transacción firmada; devuelve True si hay que seguir su recibo"""
+        result = entry.result
+        while True:
+            try:
+                await self._send(entry)
+            except Exception as e:
+                message = _error_message(e)
+                if any(fragment in message for fragment in KNOWN_TX_ERRORS):
+                    pass
+                elif any(fragment in message for fragment in UNDERPRICED_ERRORS) and result.replacements < self.max_replacements:
+                    gas_price = await self._bumped_gas_price(entry.tx["gasPrice"])
+                    if gas_price is None:
+                        return await self._fail(entry, f"Precio de gas por encima del máximo: {message}")
+                    logger.warning(f"⚠️ Nonce {result.nonce} con gas insuficiente, repreciando a {gas_price}")
+                    entry.tx["gasPrice"] = gas_price
+                    result.replacements += 1
+                    self._sign(entry)
+                    await self._remember_replacement(entry)
+                    continue
+                elif any(fragment in message for fragment in NONCE_TOO_LOW_ERRORS):
+                    # El nonce ya se usó fuera de este motor: no hay hueco que rellenar
+                    result.status = "failed"
+                    result.error = message
+                    return False
+                elif any(fragment in message for fragment in NONCE_GAP_ERRORS):
+                    # Se sigue como en vuelo: el reemplazo por atasco la reenviará
+                    logger.warning(f"⚠️ Nonce {result.nonce} rechazado por hueco de nonces, se reenviará")
+                    entry.sent_at = asyncio.get_running_loop().time()
+                    return True
+                else:
+                    return await self._fail(entry, message)
+            
+            entry.hashes.append(result.tx_hash)
+            entry.sent_at = asyncio.get_running_loop().time()
+            return True
+    
+    async def _fail(self, entry: _PendingTransfer, error: str) -> bool:
+        """
+        Marca la transferencia como fallida y ocupa su nonce con una
+        autotransferencia vacía para que los nonces siguientes puedan minarse
+        """
+        result = entry.result
+        logger.error(f"❌ Transferencia a {result.company_id} fallida (nonce {result.nonce}): {error}")
+        result.status = "failed"
+        result.error = error
+        
+        entry.tx = {
+            "to": self.account.address,
+            "value": 0,
+            "gas": FILLER_GAS,
+            "gasPrice": max(entry.tx["gasPrice"], await self._network_gas_price()),
+            "nonce": result.nonce,
+            "chainId": self._chain_id
+        }
+        entry.filler = True
+        # El hash de relleno no es de la transferencia: no va a `tx_hashes`
+        entry.hashes = []
+        self._sign(entry)
+        try:
+            await self._send(entry)
+        except Exception as e:
+            logger.error(f"❌ No se pudo ocupar el nonce {result.nonce}: {_error_message(e)}")
+            return False
+        entry.hashes.append(result.tx_hash)
+        entry.sent_at = asyncio.get_running_loop().time()
+        return True
+    
+    async def _track_receipts(self, in_flight: List[_PendingTransfer], window: asyncio.Semaphore, broadcast_done: asyncio.Event) -> None:
+        """Bucle único de seguimiento de recibos para todas las transacciones en vuelo"""
+        loop = asyncio.get_running_loop()
+        while True:
+            unresolved = [entry for entry in in_flight if not entry.resolved]
+            if not unresolved:
+                if broadcast_done.is_set():
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            
+            # Un nonce por debajo del `latest` de la cuenta ya está minado
+            try:
+                mined_nonce = await self.w3.eth.get_transaction_count(self.nonces.address, "latest")
+                mined = [entry for entry in unresolved if entry.result.nonce < mined_nonce]
+                receipts = await asyncio.gather(*(self._find_receipt(entry) for entry in mined))
+            except Exception as e:
+                logger.warning(f"⚠️ Error consultando recibos, reintentando: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for entry, receipt in zip(mined, receipts):
+                if self._resolve(entry, receipt) and entry.exhausted_at is None:
+                    window.release()
+            
+            now = loop.time()
+            for entry in unresolved:
+                if entry.resolved or entry.exhausted_at is not None or now - entry.sent_at < self.stuck_timeout:
+                    continue
+                # Nonce ya minado: no se reemplaza, solo se espera su recibo
+                if entry.result.missing_receipt_since is not None:
+                    continue
+                if not await self._replace_stuck(entry):
+                    if entry.filler:
+                        entry.resolved = True
+                    else:
+                        # Cualquiera de sus hashes puede minarse aún: no es un fallo
+                        entry.exhausted_at = now
+                        entry.result.error = "Sin minar tras los reemplazos permitidos; puede minarse todavía"
+                        logger.warning(f"⏳ Nonce {entry.result.nonce} sin minar tras {entry.result.replacements} reemplazos, se sigue su recibo")
+                    window.release()
+            
+            # Con la difusión terminada, las que solo esperan recibo se siguen hasta `pending_timeout`
+            waiting = [entry for entry in unresolved if not entry.resolved]
+            if broadcast_done.is_set() and waiting and all(
+                entry.exhausted_at is not None and now - entry.exhausted_at >= self.pending_timeout for entry in waiting
+            ):
+                for entry in waiting:
+                    logger.warning(f"⚠️ Nonce {entry.result.nonce} sigue pendiente; hashes: {', '.join(entry.hashes)}")
+                return
+            
+            if len(mined) < len(unresolved) or any(not entry.resolved for entry in mined):
+                await asyncio.sleep(self.poll_interval)
+    
+    async def _find_receipt(self, entry: _PendingTransfer):
+        """Recibo de la versión de la transacción que se minó (original o reemplazo)"""
+        for tx_hash in reversed(entry.hashes):
+            try:
+                return await self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return None
+    
+    def _resolve(self, entry: _PendingTransfer, receipt) -> bool:
+        """Aplica el recibo del nonce minado; False si aún hay que esperar a que el nodo lo sirva"""
+        result = entry.result
+        if receipt is None:
+            if entry.filler:
+                entry.resolved = True
+                return True
+            if not self._receipt_overdue(entry):
+                return False
+            entry.resolved = True
+            result.status = "failed"
+            result.error = "Nonce consumido por otra transacción"
+            return True
+        
+        entry.resolved = True
+        result.missing_receipt_since = None
+        
+        result.tx_hash = Web3.to_hex(receipt["transactionHash"])
+        result.block_number = receipt["blockNumber"]
+        if entry.filler:
+            return
+        result.error = None
+        if receipt["status"] == 1:
+            result.status = "confirmed"
+        else:
+            result.status = "reverted"
+            result.error = "La transferencia revirtió en el contrato"
+        return True
+    
+    async def _replace_stuck(self, entry: _PendingTransfer) -> bool:
+        """Reemplaza una transacción atascada con más gas; False si ya no se puede"""
+        result = entry.result
+        if result.replacements >= self.max_replacements:
+            return False
+        gas_price = await self._bumped_gas_price(entry.tx["gasPrice"])
+        if gas_price is None:
+            return False
+        
+        logger.warning(f"⏳ Nonce {result.nonce} atascado, reemplazando con gas {gas_price}")
+        entry.tx["gasPrice"] = gas_price
+        result.replacements += 1
+        self._sign(entry)
+        await self._remember_replacement(entry)
+        try:
+            await self._send(entry)
+        except Exception as e:
+            message = _error_message(e)
+            # Minada entre la consulta y el reemplazo: el siguiente sondeo la resuelve
+            if not any(fragment in message for fragment in NONCE_TOO_LOW_ERRORS + KNOWN_TX_ERRORS + UNDERPRICED_ERRORS + NONCE_GAP_ERRORS):
+                logger.error(f"❌ Error reemplazando nonce {result.nonce}: {message}")
+        entry.hashes.append(result.tx_hash)
+        entry.sent_at = asyncio.get_running_loop().time()
+        return True
@@ -0,0 +1,61 @@
+"""
+🔍 Verification Pipeline - Verificación concurrente de Data Coins
+Consultas a Lighthouse con una ventana acotada de verificaciones en vuelo
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from services.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+# (lighthouse_hash, Data Coin, resultado de verify_datacoin)
+VerificationResult = Tuple[str, Dict[str, Any], Dict[str, Any]]
+
+class VerificationPipeline:
+    """
+    Verificación de Data Coins con concurrencia acotada
+    
+    Un grupo fijo de `window` tareas recorre los Data Coins pendientes (no
+    una tarea por Data Coin) y cada resultado se produce en cuanto termina,
+    en orden de finalización. La ventana se limita a las conexiones keep-alive
+    del pool de Lighthouse: por encima, cada petición extra abre y cierra su
+    propia conexión y el trabajo pasa a estar limitado por CPU.
+    """
+    
+    def __init__(self, lighthouse_service, window: Optional[int] = None):
+        self.lighthouse_service = lighthouse_service
+        self.window = window or int(os.getenv("DATACOIN_VERIFY_CONCURRENCY", "32"))
+    
+    def _effective_window(self) -> int:
+        profile = http_clients.profiles.get("lighthouse") or http_clients.profiles["default"]
+        return max(1, min(self.window, profile.max_keepalive_connections))
+    
+    async def verify(self, datacoins: List[Tuple[str, Dict[str, Any]]]) -> AsyncIterator[VerificationResult]:
+        """Verifica los (lighthouse_hash, Data Coin) y produce un resultado por cada uno"""
+        if not datacoins:
+            return
+        pending = iter(datacoins)
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker() -> None:
+            # El iterador es compartido: cada tarea toma el siguiente Data Coin libre
+            for lighthouse_hash, datacoin in pending:
+                try:
+                    result = await self.lighthouse_service.verify_datacoin(lighthouse_hash)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                results.put_nowait((lighthouse_hash, datacoin, result))
+        
+        workers = min(self._effective_window(), len(datacoins))
+        tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+        try:
+            for _ in range(len(datacoins)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,209 @@
+"""
+🧊 View Cache - Read-through cache for contract view calls
+Entries keyed by (function, args, block), dropped on every new block or relevant contract event
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from services.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+# Views whose result a contract event can change. `True` means only the
+# entries whose first argument is the event's address; `False`, all of them.
+EVENT_INVALIDATIONS: Dict[str, Tuple[Tuple[str, bool], ...]] = {
+    "EmpresaRegistrada": (("verTodasEmpresas", False), ("rankingEmpresas", False),
+                          ("consultarScore", True), ("verMetricasEmpresa", True)),
+    "MetricaRegistrada": (("verMetricasEmpresa", True), ("consultarScore", True), ("rankingEmpresas", False)),
+    "ScoreActualizado": (("consultarScore", True), ("rankingEmpresas", False)),
+    "ScoreUpdated": (("consultarScore", True), ("rankingEmpresas", False)),
+    "SubcontratoRegistrado": (("resolver", False),),
+}
+
+def _freeze(value: Any) -> Any:
+    """Hashable form of view arguments"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, str) and value.startswith("0x"):
+        return value.lower()
+    return value
+
+class BlockTracker:
+    """
+    Latest block number, asked to the node at most once per `poll_interval`
+    
+    Concurrent callers share one `eth_blockNumber` request. Without a
+    reachable node (mock mode) blocks are derived from the clock, one per
+    `block_time` seconds, so cached views still expire; the node is asked
+    again every `retry_interval` seconds.
+    """
+    
+    def __init__(self, rpc_url: Optional[str] = None, poll_interval: Optional[float] = None, block_time: Optional[float] = None):
+        self.rpc_url = rpc_url or os.getenv("RPC_URL", "https://sepolia.infura.io/v3/YOUR_KEY")
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("BLOCK_POLL_INTERVAL", "1.0"))
+        self.block_time = block_time or float(os.getenv("CHAIN_BLOCK_TIME", "12"))
+        self.retry_interval = 30.0
+        self.block: Optional[int] = None
+        self.source = "rpc"
+        self.polls = 0
+        self._checked = 0.0
+        self._retry_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+    
+    async def current(self) -> int:
+        if self.block is not None and time.monotonic() - self._checked < self.poll_interval:
+            return self.block
+        if self.source == "clock" and time.monotonic() < self._retry_at:
+            return self._clock_block()
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._poll())
+            self._inflight.add_done_callback(self._polled)
+        return await asyncio.shield(self._inflight)
+    
+    def _polled(self, future: asyncio.Future) -> None:
+        self._inflight = None
+    
+    def _clock_block(self) -> int:
+        # Negative so clock-derived blocks never collide with real ones
+        return -int(time.time() // self.block_time)
+    
+    async def _poll(self) -> int:
+        self.polls += 1
+        try:
+            response = await http_clients.get("rpc").post(
+                self.rpc_url, json={"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}
+            )
+            response.raise_for_status()
+            block = int(response.json()["result"], 16)
+            self.source = "rpc"
+        except Exception as e:
+            if self.source == "rpc":
+                logger.warning(f"⚠️ eth_blockNumber unavailable, deriving blocks from the clock: {e}")
+            block = self._clock_block()
+            self.source = "clock"
+            self._retry_at = time.monotonic() + self.retry_interval
+        self.block = block
+        self._checked = time.monotonic()
+        return block
+
+class ViewCache:
+    """
+    Read-through cache of contract view calls
+    
+    Entries belong to the block they were read at and the whole cache is
+    dropped when a new block arrives; contract events drop the views they
+    affect right away (see `EVENT_INVALIDATIONS`). Concurrent identical
+    reads share one call, and a result is only stored if no block change
+    or invalidation happened while it was being fetched. `consistent=True`
+    skips the cache altogether.
+    """
+    
+    def __init__(self, fetch: Callable[[str, list], Awaitable[Any]], blocks: Optional[BlockTracker] = None,
+                 max_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.fetch = fetch
+        self.blocks = blocks or get_block_tracker()
+        self.max_entries = max_entries or int(os.getenv("VIEW_CACHE_MAX_ENTRIES", "10000"))
+        self.enabled = enabled if enabled is not None else os.getenv("VIEW_CACHE_ENABLED", "true").lower() == "true"
+        self._entries: "OrderedDict[Tuple[str, Any], Any]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, str, Any], asyncio.Future] = {}
+        self._block: Optional[int] = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.invalidations = 0
+    
+    async def call(self, function: str, args: list, consistent: bool = False) -> Any:
+        if consistent or not self.enabled:
+            self.bypassed += 1
+            return await self.fetch(function, args)
+        block = await self.blocks.current()
+        if block != self._block:
+            self._entries.clear()
+            self._block = block
+        key = (function, _freeze(args))
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        flight = (block, *key)
+        future = self._inflight.get(flight)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        self.misses += 1
+        future = asyncio.ensure_future(self._load(key, block, self._generation, args))
+        self._inflight[flight] = future
+        future.add_done_callback(lambda done: self._forget(flight, done))
+        return await asyncio.shield(future)
+    
+    def _forget(self, flight: Tuple[int, str, Any], future: asyncio.Future) -> None:
+        if self._inflight.get(flight) is future:
+            del self._inflight[flight]
+    
+    async def _load(self, key: Tuple[str, Any], block: int, generation: int, args: list) -> Any:
+        value = await self.fetch(key[0], args)
+        if block == self._block and generation == self._generation:
+            self._entries[key] = value
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+    
+    def on_event(self, event: str, address: Optional[str] = None) -> int:
+        """Drop the views affected by a contract event (emitted by `address`)"""
+        dropped = 0
+        for function, by_address in EVENT_INVALIDATIONS.get(event, ()):
+            dropped += self.invalidate(function, [address] if by_address and address else None)
+        return dropped
+    
+    def invalidate(self, function: Optional[str] = None, args: Optional[list] = None) -> int:
+        """Drop every entry of `function` (all of them without a function), or only those for `args`"""
+        self._generation += 1
+        self.invalidations += 1
+        # Reads already in flight may predate the event: later reads must not join them
+        self._inflight.clear()
+        if function is None:
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+        prefix = _freeze(args) if args is not None else None
+        stale = [
+            key for key in self._entries
+            if key[0] == function and (prefix is None or key[1][:len(prefix)] == prefix)
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "block": self._block,
+            "block_source": self.blocks.source,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            "block_polls": self.blocks.polls
+        }
+
+_block_tracker: Optional[BlockTracker] = None
+
+def get_block_tracker() -> BlockTracker:
+    """Block number shared by every view cache"""
+    global _block_tracker
+    if _block_tracker is None:
+        _block_tracker = BlockTracker()
+    return _block_tracker
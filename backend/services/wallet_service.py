@@ -1,30 +1,36 @@
-from web3 import Web3
+import os
+import asyncio
 import logging
-from typing import Dict, Optional
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
 import time
 
+from services.session_registry import get_session_registry
+from services.signature_verifier import get_signature_verifier
+from services.rpc_batcher import get_rpc_batcher
+
 logger = logging.getLogger(__name__)
 
+PYUSD_DECIMALS = int(os.getenv("PYUSD_DECIMALS", "6"))
+
 class WalletService:
     """Service for handling wallet connections and address verification"""
     
-    def __init__(self):
-        self.connected_wallets = {}
-        self.session_store = {}
+    def __init__(self, registry=None):
+        # Connected wallets, sessions and the company -> wallet index, with expiry
+        self.registry = registry or get_session_registry()
+        self.verifier = get_signature_verifier()
+        # Balance reads from concurrent requests share node round trips
+        self.rpc = get_rpc_batcher()
+        self.pyusd_address = os.getenv("PYUSD_CONTRACT_ADDRESS", "0x9fE46736679d2D9a65F0992F2272dE9f3c7fa6e0")
         
     async def verify_wallet_signature(self, address: str, signature: str, message: str) -> bool:
         """Verify that the signature was created by the wallet address"""
-        try:
-            w3 = Web3()
-            message_hash = w3.keccak(text=message)
-            recovered_address = w3.eth.account.recover_message(
-                message_hash, 
-                signature=signature
-            )
-            return recovered_address.lower() == address.lower()
-        except Exception as e:
-            logger.error(f"Signature verification failed: {e}")
-            return False
+        return await self.verifier.verify(address, message, signature)
+    
+    async def verify_wallet_signatures(self, items: List[Tuple[str, str, str]]) -> List[bool]:
+        """Verify many (address, signature, message) at once, in order"""
+        return await self.verifier.verify_batch([(address, message, signature) for address, signature, message in items])
     
     async def connect_wallet(self, address: str, signature: str, company_id: str) -> Dict:
         """Connect a wallet to a company account"""
@@ -37,18 +43,7 @@ class WalletService:
             #     raise ValueError("Invalid wallet signature")
             
             session_id = f"wallet_{address}_{timestamp}"
-            self.connected_wallets[address] = {
-                "company_id": company_id,
-                "connected_at": timestamp,
-                "session_id": session_id,
-                "verified": True
-            }
-            
-            self.session_store[session_id] = {
-                "address": address,
-                "company_id": company_id,
-                "expires_at": timestamp + 86400
-            }
+            session = self.registry.connect(address, company_id, session_id, timestamp)
             
             logger.info(f"Wallet connected: {address} -> Company: {company_id}")
             
@@ -57,6 +52,7 @@ class WalletService:
                 "session_id": session_id,
                 "address": address,
                 "company_id": company_id,
+                "expires_at": session["expires_at"],
                 "message": "Wallet connected successfully"
             }
             
@@ -69,19 +65,16 @@ class WalletService:
     
     async def get_connected_wallet(self, company_id: str) -> Optional[str]:
         """Get the connected wallet address for a company"""
-        for address, data in self.connected_wallets.items():
-            if data["company_id"] == company_id and data["verified"]:
-                return address
-        return None
+        return self.registry.company_wallet(company_id)
+    
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        """Get a live (not expired) wallet session"""
+        return self.registry.session(session_id)
     
     async def disconnect_wallet(self, address: str) -> bool:
         """Disconnect a wallet"""
         try:
-            if address in self.connected_wallets:
-                session_id = self.connected_wallets[address]["session_id"]
-                del self.connected_wallets[address]
-                if session_id in self.session_store:
-                    del self.session_store[session_id]
+            if self.registry.disconnect(address):
                 logger.info(f"Wallet disconnected: {address}")
                 return True
             return False
@@ -91,19 +84,50 @@ class WalletService:
     
     async def get_wallet_balance(self, address: str) -> Dict:
         """Get wallet balance for connected address"""
+        return (await self.get_wallet_balances([address]))[address]
+    
+    async def get_wallet_balances(self, addresses: List[str]) -> Dict[str, Dict]:
+        """
+        Get ETH and PYUSD balances for many addresses in batched node round trips
+        
+        If the node cannot be reached every address gets null balances and an
+        `error` field; balances are never made up.
+        """
         try:
+            eth_balances, pyusd_balances = await asyncio.gather(
+                self.rpc.eth_balances(addresses),
+                self.rpc.balances(self.pyusd_address, addresses)
+            )
+        except Exception as e:
+            logger.warning(f"Balance lookup failed: {e}")
+            error = f"Balance lookup failed: {e}"
             return {
-                "address": address,
-                "eth_balance": "1.234567890123456789",
-                "pyusd_balance": "1000.00",
-                "tokens": [
-                    {
-                        "symbol": "PYUSD",
-                        "balance": "1000.00",
-                        "decimals": 6
-                    }
-                ]
+                address: {"address": address, "eth_balance": None, "pyusd_balance": None, "tokens": [], "error": error}
+                for address in addresses
             }
-        except Exception as e:
-            logger.error(f"Failed to get wallet balance: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+        return {address: self._balance(address, eth_balances[address], pyusd_balances[address]) for address in addresses}
+    
+    @staticmethod
+    def _balance(address: str, wei: int, pyusd_units: int) -> Dict:
+        pyusd = f"{Decimal(pyusd_units) / 10 ** PYUSD_DECIMALS:.2f}"
+        return {
+            "address": address,
+            "eth_balance": str(Decimal(wei) / 10 ** 18),
+            "pyusd_balance": pyusd,
+            "tokens": [
+                {
+                    "symbol": "PYUSD",
+                    "balance": pyusd,
+                    "decimals": PYUSD_DECIMALS
+                }
+            ]
+        }
+
+_wallet_service: Optional[WalletService] = None
+
+def get_wallet_service() -> WalletService:
+    """Wallet service shared by the wallet routes"""
+    global _wallet_service
+    if _wallet_service is None:
+        _wallet_service = WalletService()
+    return _wallet_service
@@ -1,20 +1,40 @@
-from web3 import Web3
 import os
+import asyncio
 from typing import Dict, Optional, Any
 import logging
 
+from services.signature_verifier import get_signature_verifier
+from services.view_cache import ViewCache
+
 logger = logging.getLogger(__name__)
 
+# Event emitted by each write of the master contract (drops the cached views it affects)
+WRITE_EVENTS = {
+    "registrarEmpresa": "EmpresaRegistrada",
+    "registrarMetrica": "MetricaRegistrada",
+    "registrarSubcontrato": "SubcontratoRegistrado",
+}
+
 class Web3Utils:
     """Utilities for Web3 operations and wallet interactions"""
     
     def __init__(self):
-        self.w3 = Web3()
+        self._w3 = None
+        self.view_cache = ViewCache(self._fetch_view)
+    
+    @property
+    def w3(self):
+        """Offline Web3 instance, built on first use (web3 is slow to import)"""
+        if self._w3 is None:
+            from web3 import Web3
+            self._w3 = Web3()
+        return self._w3
         
     @staticmethod
     def is_valid_address(address: str) -> bool:
         """Check if address is a valid Ethereum address"""
         try:
+            from web3 import Web3
             return Web3.isAddress(address)
         except Exception:
             return False
@@ -23,23 +43,15 @@ class Web3Utils:
     def checksum_address(address: str) -> str:
         """Convert address to checksum format"""
         try:
+            from web3 import Web3
             return Web3.toChecksumAddress(address)
         except Exception as e:
             logger.error(f"Invalid address format: {e}")
             raise ValueError("Invalid Ethereum address")
     
-    def verify_signature(self, address: str, message: str, signature: str) -> bool:
-        """Verify message signature against address"""
-        try:
-            message_hash = self.w3.keccak(text=message)
-            recovered_address = self.w3.eth.account.recover_message(
-                message_hash, 
-                signature=signature
-            )
-            return recovered_address.lower() == address.lower()
-        except Exception as e:
-            logger.error(f"Signature verification failed: {e}")
-            return False
+    async def verify_signature(self, address: str, message: str, signature: str) -> bool:
+        """Verify message signature against address (recovery runs in the verifier's process pool)"""
+        return await get_signature_verifier().verify(address, message, signature)
     
     @staticmethod
     def format_balance(balance_wei: int, decimals: int = 18) -> str:
@@ -69,7 +81,19 @@ class Web3Utils:
                 raise ValueError("Wallet de empresa inválida o no registrada")
         # Mock de transacción exitosa
         logger.info(f"Calling contract function {function_name} with args {args} from {sender}")
+        if function_name in WRITE_EVENTS:
+            self.view_cache.on_event(WRITE_EVENTS[function_name], sender)
         return "0xMOCK_TX_HASH"
+    
+    async def read_contract_view(self, function_name: str, args: list, consistent: bool = False) -> Any:
+        """
+        Lectura de una vista a través de la caché por bloque; `consistent` lee siempre del nodo
+        """
+        return await self.view_cache.call(function_name, args, consistent)
+    
+    async def _fetch_view(self, function_name: str, args: list) -> Any:
+        # La llamada al nodo es bloqueante: fuera del bucle de eventos
+        return await asyncio.to_thread(self.call_contract_view, function_name, args)
 
     def call_contract_view(self, function_name: str, args: list) -> Any:
         """
@@ -98,4 +122,13 @@ class Web3Utils:
             return ["0xDemo1", "0xDemo2"]
         if function_name == "demoResolver":
             return "0xSubcontratoDemo"
-        return None
\ No newline at end of file
+        return None
+
+_web3_utils: Optional[Web3Utils] = None
+
+def get_web3_utils() -> Web3Utils:
+    """Utilities shared by the company routes (one view cache per process)"""
+    global _web3_utils
+    if _web3_utils is None:
+        _web3_utils = Web3Utils()
+    return _web3_utils
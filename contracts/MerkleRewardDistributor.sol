@@ -0,0 +1,79 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+interface IERC20Transfer {
+    function transfer(address to, uint256 amount) external returns (bool);
+}
+
+/**
+ * @title MerkleRewardDistributor
+ * @dev Recompensas mensuales en PYUSD por raíz Merkle: el publicador sube una raíz
+ *      por época y cada empresa reclama su importe con una prueba.
+ *      Hoja: keccak256(abi.encodePacked(cuenta, importe)); nodos con pares ordenados.
+ *      El backend publica la raíz y solo después deposita el importe; el propietario
+ *      (quien despliega) puede recuperar tokens enviados por error o no reclamados.
+ */
+contract MerkleRewardDistributor {
+    IERC20Transfer public immutable token;
+    address public immutable publisher;
+    address public immutable owner;
+
+    mapping(uint256 => bytes32) public merkleRoots;
+    mapping(uint256 => mapping(address => bool)) public claimed;
+
+    event MerkleRootPublished(uint256 indexed epoch, bytes32 root, uint256 totalAmount);
+    event RewardClaimed(uint256 indexed epoch, address indexed account, uint256 amount);
+    event TokensRecovered(address indexed to, uint256 amount);
+
+    modifier onlyPublisher() {
+        require(msg.sender == publisher, "Solo el publicador");
+        _;
+    }
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "Solo el propietario");
+        _;
+    }
+
+    constructor(address _token, address _publisher) {
+        require(_token != address(0), "Token requerido");
+        require(_publisher != address(0), "Publicador requerido");
+        token = IERC20Transfer(_token);
+        publisher = _publisher;
+        owner = msg.sender;
+    }
+
+    function publishMerkleRoot(uint256 epoch, bytes32 root, uint256 totalAmount) external onlyPublisher {
+        require(merkleRoots[epoch] == bytes32(0), "Epoca ya publicada");
+        require(root != bytes32(0), "Raiz requerida");
+        merkleRoots[epoch] = root;
+        emit MerkleRootPublished(epoch, root, totalAmount);
+    }
+
+    // Cualquiera puede enviar la reclamación (p. ej. un relayer): el importe va siempre a `account`
+    function claimReward(uint256 epoch, address account, uint256 amount, bytes32[] calldata proof) external {
+        bytes32 root = merkleRoots[epoch];
+        require(root != bytes32(0), "Epoca no publicada");
+        require(!claimed[epoch][account], "Ya reclamado");
+
+        bytes32 computed = keccak256(abi.encodePacked(account, amount));
+        for (uint256 i = 0; i < proof.length; i++) {
+            bytes32 sibling = proof[i];
+            computed = computed <= sibling
+                ? keccak256(abi.encodePacked(computed, sibling))
+                : keccak256(abi.encodePacked(sibling, computed));
+        }
+        require(computed == root, "Prueba invalida");
+
+        claimed[epoch][account] = true;
+        require(token.transfer(account, amount), "Transferencia fallida");
+        emit RewardClaimed(epoch, account, amount);
+    }
+
+    // Recupera tokens del contrato (fondos de una época sin raíz, sobrantes o no reclamados)
+    function recoverTokens(address to, uint256 amount) external onlyOwner {
+        require(to != address(0), "Destino requerido");
+        require(token.transfer(to, amount), "Transferencia fallida");
+        emit TokensRecovered(to, amount);
+    }
+}